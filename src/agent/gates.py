@@ -0,0 +1,51 @@
+import os
+
+# Agent 리서치/알림 게이트 (worker와 임계값 스윕에서 공용, LLM 의존성 없음)
+RESEARCH_MIN_DELTA = int(os.getenv("RESEARCH_MIN_DELTA", "1500"))
+RESEARCH_MIN_GROWTH = float(os.getenv("RESEARCH_MIN_GROWTH", "1.4"))
+RESEARCH_MIN_SEASON = float(os.getenv("RESEARCH_MIN_SEASON", "1.15"))
+RESEARCH_MAJOR_MIN_DELTA = int(os.getenv("RESEARCH_MAJOR_MIN_DELTA", "10000"))
+RESEARCH_MAJOR_MIN_GROWTH = float(os.getenv("RESEARCH_MAJOR_MIN_GROWTH", "1.15"))
+RESEARCH_MAJOR_MIN_SEASON = float(os.getenv("RESEARCH_MAJOR_MIN_SEASON", "1.10"))
+ALERT_MIN_DELTA = int(os.getenv("ALERT_MIN_DELTA", "1500"))
+ALERT_MIN_GROWTH = float(os.getenv("ALERT_MIN_GROWTH", "1.3"))
+ALERT_MAJOR_MIN_DELTA = int(os.getenv("ALERT_MAJOR_MIN_DELTA", "3000"))
+ALERT_MAJOR_MIN_GROWTH = float(os.getenv("ALERT_MAJOR_MIN_GROWTH", "1.5"))
+
+
+def should_research(signal_level, event_type, stats):
+    if event_type == "CATEGORY_ADOPTION":
+        return False, "category_adoption"
+    if signal_level == "SPIKE":
+        return True, ""
+    if signal_level != "CANDIDATE":
+        return False, "not_candidate"
+    growth_ratio = float(stats.get("growth_ratio") or 0.0)
+    season_ratio = float(stats.get("season_ratio") or 0.0)
+    actual_delta = int(stats.get("delta") or 0)
+    is_major = bool(stats.get("major_category"))
+    min_delta = RESEARCH_MAJOR_MIN_DELTA if is_major else RESEARCH_MIN_DELTA
+    min_growth = RESEARCH_MAJOR_MIN_GROWTH if is_major else RESEARCH_MIN_GROWTH
+    if growth_ratio < 1.0:
+        return False, f"decreasing_trend_(ratio:{growth_ratio:.2f})"
+    if actual_delta <= 0:
+        return False, "delta_zero"
+    if is_major:
+        if actual_delta < min_delta:
+            return False, "below_research_threshold"
+        if growth_ratio < min_growth and season_ratio < RESEARCH_MAJOR_MIN_SEASON:
+            return False, "below_research_threshold"
+        return True, ""
+    if actual_delta < min_delta:
+        return False, "below_research_threshold"
+    if growth_ratio < min_growth and season_ratio < RESEARCH_MIN_SEASON:
+        return False, "below_research_threshold"
+    return True, ""
+
+
+def passes_alert_gate(stats):
+    """리서치 후 텔레그램 알림 최소 증가량 게이트"""
+    actual_delta = int(stats.get("delta") or 0)
+    is_major = bool(stats.get("major_category"))
+    min_alert_delta = ALERT_MAJOR_MIN_DELTA if is_major else ALERT_MIN_DELTA
+    return actual_delta > 0 and actual_delta >= min_alert_delta
@@ -2,65 +2,22 @@ import json
 import os
 import time
 import logging
-import psycopg2
 
 from src.agent.graph import app as agent_app
 from src.notify.telegram_bot import send_telegram_message
-
-_default_pg_host = "postgres" if os.path.exists("/.dockerenv") else "localhost"
-PG_HOST = os.getenv("POSTGRES_HOST", _default_pg_host)
-PG_PORT = os.getenv("POSTGRES_PORT", "5432")
-PG_DSN = (
-    f"host={PG_HOST} port={PG_PORT} "
-    f"dbname={os.getenv('POSTGRES_DB', 'streampulse_meta')} "
-    f"user={os.getenv('POSTGRES_USER', 'user')} "
-    f"password={os.getenv('POSTGRES_PASSWORD', 'password')}"
-)
+from src.storage import postgres as pg
+from src.agent.gates import passes_alert_gate, should_research
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 AGENT_ALERT_MODE = os.getenv("AGENT_ALERT_MODE", "confirmed")
 ALERT_KEYWORDS = [
     kw.strip() for kw in os.getenv("ALERT_KEYWORDS", "패치,업데이트").split(",") if kw.strip()
 ]
-RESEARCH_MIN_DELTA = int(os.getenv("RESEARCH_MIN_DELTA", "1500"))
-RESEARCH_MIN_GROWTH = float(os.getenv("RESEARCH_MIN_GROWTH", "1.4"))
-RESEARCH_MIN_SEASON = float(os.getenv("RESEARCH_MIN_SEASON", "1.15"))
-RESEARCH_MAJOR_MIN_DELTA = int(os.getenv("RESEARCH_MAJOR_MIN_DELTA", "10000"))
-RESEARCH_MAJOR_MIN_GROWTH = float(os.getenv("RESEARCH_MAJOR_MIN_GROWTH", "1.15"))
-RESEARCH_MAJOR_MIN_SEASON = float(os.getenv("RESEARCH_MAJOR_MIN_SEASON", "1.10"))
-ALERT_MIN_DELTA = int(os.getenv("ALERT_MIN_DELTA", "1500"))
-ALERT_MIN_GROWTH = float(os.getenv("ALERT_MIN_GROWTH", "1.3"))
-ALERT_MAJOR_MIN_DELTA = int(os.getenv("ALERT_MAJOR_MIN_DELTA", "3000"))
-ALERT_MAJOR_MIN_GROWTH = float(os.getenv("ALERT_MAJOR_MIN_GROWTH", "1.5"))
-
-def get_pg_conn():
-    return psycopg2.connect(PG_DSN)
 
 def fetch_pending(limit=3):
-    conn = get_pg_conn()
-    conn.autocommit = False
-    cur = conn.cursor()
-    cur.execute(
-        """
-        WITH cte AS (
-            SELECT event_id, platform, category_name, event_type, growth_rate, cause_detail
-            FROM signal_events
-            WHERE analysis_status = 'PENDING'
-            ORDER BY created_at ASC
-            LIMIT %s
-            FOR UPDATE SKIP LOCKED
-        )
-        UPDATE signal_events
-        SET analysis_status = 'IN_PROGRESS'
-        WHERE event_id IN (SELECT event_id FROM cte)
-        RETURNING event_id, platform, category_name, event_type, growth_rate, cause_detail
-        """,
-        (limit,),
-    )
-    rows = cur.fetchall()
-    conn.commit()
-    conn.close()
-    return rows
+    with pg.connection() as conn:
+        cur = conn.cursor()
+        return pg.execute_prepared(cur, "fetch_pending", (limit,)).fetchall()
 
 def update_event(
     event_id,
@@ -80,8 +37,6 @@ def update_event(
     evidence_keywords,
     event_kind,
 ):
-    conn = get_pg_conn()
-    cur = conn.cursor()
     extra = {
         "ai_report": report,
         "spike_reason": spike_reason,
@@ -96,73 +51,32 @@ def update_event(
         "evidence_keywords": evidence_keywords,
         "event_kind": event_kind,
     }
-    cur.execute(
-        """
-        UPDATE signal_events
-        SET analysis_status = %s,
-            analysis_tier = %s,
-            spike_reason = %s,
-            entity_keywords = %s::jsonb,
-            context_cache_key = %s,
-            cause_detail = cause_detail || %s::jsonb
-        WHERE event_id = %s
-        """,
-        (
-            status,
-            tier,
-            spike_reason,
-            json.dumps(entity_keywords, ensure_ascii=False),
-            cache_key,
-            json.dumps(extra, ensure_ascii=False),
-            event_id,
-        ),
-    )
-    conn.commit()
-    conn.close()
+    with pg.connection() as conn:
+        cur = conn.cursor()
+        pg.execute_prepared(
+            cur,
+            "update_event",
+            (
+                status,
+                tier,
+                spike_reason,
+                json.dumps(entity_keywords, ensure_ascii=False),
+                cache_key,
+                json.dumps(extra, ensure_ascii=False),
+                event_id,
+            ),
+        )
+        pg.notify(pg.EVENTS_CHANNEL, {"event_id": event_id}, cur)
 
 def mark_failed(event_id, error):
-    conn = get_pg_conn()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        UPDATE signal_events
-        SET analysis_status = 'FAILED',
-            cause_detail = cause_detail || %s::jsonb
-        WHERE event_id = %s
-        """,
-        (json.dumps({"ai_error": str(error)}, ensure_ascii=False), event_id),
-    )
-    conn.commit()
-    conn.close()
-
-def should_research(signal_level, event_type, stats):
-    if event_type == "CATEGORY_ADOPTION":
-        return False, "category_adoption"
-    if signal_level == "SPIKE":
-        return True, ""
-    if signal_level != "CANDIDATE":
-        return False, "not_candidate"
-    growth_ratio = float(stats.get("growth_ratio") or 0.0)
-    season_ratio = float(stats.get("season_ratio") or 0.0)
-    actual_delta = int(stats.get("delta") or 0)
-    is_major = bool(stats.get("major_category"))
-    min_delta = RESEARCH_MAJOR_MIN_DELTA if is_major else RESEARCH_MIN_DELTA
-    min_growth = RESEARCH_MAJOR_MIN_GROWTH if is_major else RESEARCH_MIN_GROWTH
-    if growth_ratio < 1.0:
-        return False, f"decreasing_trend_(ratio:{growth_ratio:.2f})"
-    if actual_delta <= 0:
-        return False, "delta_zero"
-    if is_major:
-        if actual_delta < min_delta:
-            return False, "below_research_threshold"
-        if growth_ratio < min_growth and season_ratio < RESEARCH_MAJOR_MIN_SEASON:
-            return False, "below_research_threshold"
-        return True, ""
-    if actual_delta < min_delta:
-        return False, "below_research_threshold"
-    if growth_ratio < min_growth and season_ratio < RESEARCH_MIN_SEASON:
-        return False, "below_research_threshold"
-    return True, ""
+    with pg.connection() as conn:
+        cur = conn.cursor()
+        pg.execute_prepared(
+            cur,
+            "mark_failed",
+            (json.dumps({"ai_error": str(error)}, ensure_ascii=False), event_id),
+        )
+        pg.notify(pg.EVENTS_CHANNEL, {"event_id": event_id}, cur)
 
 def process_event(row):
     event_id, platform, category_name, event_type, growth_rate, cause_detail = row
@@ -239,26 +153,21 @@ def process_event(row):
     signal_level = cause.get("signal_level", "")
     verdict = result.get("analysis_verdict", "")
     event_keywords = result.get("event_keywords", []) or []
-    growth_ratio = float(stats.get("growth_ratio") or 0.0)
-    actual_delta = int(stats.get("delta") or 0)
-    is_major = bool(stats.get("major_category"))
-    min_alert_delta = ALERT_MAJOR_MIN_DELTA if is_major else ALERT_MIN_DELTA
-    min_alert_growth = ALERT_MAJOR_MIN_GROWTH if is_major else ALERT_MIN_GROWTH
-    passes_alert_gate = actual_delta > 0 and actual_delta >= min_alert_delta
+    gate_ok = passes_alert_gate(stats)
     should_alert = False
     if AGENT_ALERT_MODE == "all":
-        should_alert = passes_alert_gate
+        should_alert = gate_ok
     elif AGENT_ALERT_MODE == "confirmed":
-        if verdict == "CONFIRMED" and passes_alert_gate:
+        if verdict == "CONFIRMED" and gate_ok:
             should_alert = True
         elif (
             signal_level == "CANDIDATE"
-            and passes_alert_gate
+            and gate_ok
             and any(kw in event_keywords for kw in ALERT_KEYWORDS)
         ):
             should_alert = True
 
-    print(f"[Agent] [4/4] event_id={event_id} 결과·알림: verdict={verdict} gate={passes_alert_gate} should_alert={should_alert} → {'발송' if should_alert else '스킵'}")
+    print(f"[Agent] [4/4] event_id={event_id} 결과·알림: verdict={verdict} gate={gate_ok} should_alert={should_alert} → {'발송' if should_alert else '스킵'}")
     if should_alert:
         try:
             stats = cause.get("stats", {})
@@ -288,15 +197,15 @@ def process_event(row):
         print(f"[Agent] [4/4] 알림 스킵 event_id={event_id} verdict={verdict} mode={AGENT_ALERT_MODE}")
 
 def _startup_checks():
-    """EC2 이관 후 알람 안 올 때 원인 파악용: Postgres·필수 env 검사."""
+    """EC2 이관 후 알람 안 올 때 원인 파악용: Postgres(+signal_events 스키마 보강)·필수 env 검사."""
     errors = []
     try:
-        conn = get_pg_conn()
-        conn.close()
-        print("[Agent Worker] ✅ Postgres 연결 OK")
+        # Detector보다 먼저 떠도 update_event/mark_failed가 쓰는 컬럼(updated_at 등)이 있도록
+        pg.ensure_signal_events()
+        print("[Agent Worker] ✅ Postgres 연결 OK (signal_events 스키마 확인)")
     except Exception as e:
-        errors.append(f"Postgres 연결 실패: {e}")
-        print(f"[Agent Worker] ❌ Postgres 연결 실패: {e}")
+        errors.append(f"Postgres 연결/스키마 확인 실패: {e}")
+        print(f"[Agent Worker] ❌ Postgres 연결/스키마 확인 실패: {e}")
 
     for key in ("OPENAI_API_KEY", "TELEGRAM_TOKEN", "TELEGRAM_CHAT_ID"):
         val = os.getenv(key)
@@ -0,0 +1,100 @@
+"""
+API DuckDB 연결 부하 테스트: 요청마다 새로 연결(이전 방식) vs 공용 핸들 + 스레드별 커서.
+
+    python -m src.api.load_bench --db data/analytics.db --threads 1 8 --requests 400 --max-p95 150
+
+서비스 함수(/api/live, /api/trend, /api/new)를 스레드 수별로 번갈아 호출해
+요청 지연(p50/p95)과 처리량을 비교하고, 두 방식의 응답이 같은지 확인한다.
+같은 프로세스에 열린 연결이 있으면 DuckDB가 인스턴스를 재사용하므로, 연결 비용은 스레드 1개에서 가장 잘 드러난다.
+
+다음 중 하나라도 어기면 종료 코드 1 (회귀 테스트로 사용):
+- 두 방식의 응답이 다름
+- 공용 핸들이 실행 중 다시 열림 (opens != 1)
+- 스레드 1개에서 공용 핸들 p50이 이전 방식보다 --min-speedup배 이상 빠르지 않음
+- 공용 핸들 p95가 --max-p95(ms) 초과 (지정 시)
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.api.services import dashboard, duck
+
+
+def _calls(category):
+    return [
+        ("live", dashboard.get_live_traffic),
+        ("trend", lambda: dashboard.get_trend_data(category, hours=6)),
+        ("new", dashboard.get_new_categories),
+    ]
+
+
+def run(path, pooled, threads, requests, category):
+    """(요청별 지연 ms 배열, 초당 요청 수, 엔드포인트별 첫 응답, 핸들 지표)"""
+    duck._handle = duck.DuckHandle(path, pooled=pooled)
+    calls = _calls(category)
+    first = {name: fn().body for name, fn in calls}
+
+    def one(i):
+        _, fn = calls[i % len(calls)]
+        started = time.perf_counter()
+        fn()
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        latencies = np.array(list(pool.map(one, range(requests))))
+    rps = requests / (time.perf_counter() - started)
+    metrics = duck.metrics()
+    duck._handle.close()
+    return latencies, rps, first, metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API DuckDB 연결 방식 부하 테스트")
+    parser.add_argument("--db", default=duck.DUCK_PATH)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--category", help="trend 조회 카테고리 (기본: 최신 스냅샷 최다 시청 카테고리)")
+    parser.add_argument("--min-speedup", type=float, default=2.0,
+                        help="스레드 1개에서 요구하는 공용 핸들 p50 개선 배수")
+    parser.add_argument("--max-p95", type=float, help="공용 핸들 p95 상한(ms), 스레드 수마다 적용")
+    args = parser.parse_args()
+
+    category = args.category
+    if category is None:
+        duck._handle = duck.DuckHandle(args.db, pooled=False)
+        live = json.loads(dashboard.get_live_traffic().body)
+        category = live[0]["category_name"] if live else ""
+
+    failures = []
+    for threads in args.threads:
+        results, p50 = {}, {}
+        for label, pooled in (("per-request", False), ("pooled", True)):
+            latencies, rps, first, metrics = run(args.db, pooled, threads, args.requests, category)
+            results[label] = first
+            p50[label] = np.percentile(latencies, 50)
+            p95 = np.percentile(latencies, 95)
+            print(
+                f"[LoadBench] 스레드 {threads:>2} {label:>11} | p50 {p50[label]:7.2f}ms "
+                f"p95 {p95:7.2f}ms | {rps:7.1f} req/s "
+                f"| opens {metrics['opens'] if pooled else '-'}"
+            )
+            if pooled and metrics["opens"] != 1:
+                failures.append(f"스레드 {threads}: 공용 핸들 {metrics['opens']}회 열림")
+            if pooled and args.max_p95 is not None and p95 > args.max_p95:
+                failures.append(f"스레드 {threads}: p95 {p95:.2f}ms > {args.max_p95:g}ms")
+        if results["per-request"] != results["pooled"]:
+            failures.append(f"스레드 {threads}: 응답 불일치")
+        speedup = p50["per-request"] / p50["pooled"] if p50["pooled"] else float("inf")
+        if threads == 1 and speedup < args.min_speedup:
+            failures.append(f"스레드 1: p50 개선 {speedup:.2f}배 < {args.min_speedup:g}배")
+    for failure in failures:
+        print(f"[LoadBench] 실패 | {failure}")
+    print(f"[LoadBench] {'통과' if not failures else f'실패 {len(failures)}건'}")
+    raise SystemExit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,90 +1,192 @@
-from typing import Optional
+import json
+from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from src.api.services import cache
 from src.api.services import dashboard as service
+from src.api.services import duck, serialize, stream
 
 router = APIRouter()
 
-@router.get("/live")
-def get_live():
+
+def _render(payload):
+    """JSONResponse와 같은 직렬화"""
+    return json.dumps(
+        jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _respond(result):
+    """서비스 결과 -> 응답 Payload. 직렬화된 관계(Payload)는 그대로, 레코드 목록은 JSON으로"""
+    if isinstance(result, serialize.Payload):
+        return serialize.Payload(result.media_type, serialize.wrap_data(result))
+    return serialize.Payload(serialize.JSON, _render({"data": result}))
+
+
+def _cached(request: Request, endpoint: str, params: dict, compute):
+    """
+    스냅샷 버전 기준 응답 캐시 + ETag. If-None-Match가 맞으면 본문 없이 304.
+    재계산이 늦거나 실패하면 이전 응답을 주고(X-Cache: STALE), 이전 응답도 없을 때만 500.
+    compute(media_type): Accept로 고른 형식(JSON / Arrow IPC stream / Parquet)의 결과.
+    """
+    media_type = serialize.negotiate(request.headers.get("accept"))
+    if media_type != serialize.JSON:
+        params = dict(params, format=media_type)
+    version = duck.version()
     try:
-        return {"data": service.get_live_traffic()}
+        entry, status = cache.get(endpoint, params, version, lambda: _respond(compute(media_type)))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    headers = {
+        "ETag": entry.etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept",
+        "X-Cache": status,
+        "X-Snapshot-Version": entry.version,
+    }
+    if cache.etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+
+@router.get("/live")
+def get_live(request: Request):
+    return _cached(request, "live", {}, service.get_live_traffic)
+
+@router.get("/stream")
+def get_stream(
+    request: Request,
+    last_event_id: Optional[str] = Query(None, description="이어받을 마지막 메시지 id (Last-Event-ID 헤더 우선)"),
+):
+    """live(스냅샷 변경분) / events(추가·갱신된 signal_events) Server-Sent Events"""
+    return StreamingResponse(
+        stream.subscribe(request.headers.get("last-event-id") or last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.get("/events")
 def get_events(
     since: Optional[str] = Query(None, description="YYYY-MM-DD, filter from this date"),
-    limit: Optional[int] = Query(None, ge=1, le=500, description="Max rows when since is set"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size (default 20, or 100 with since/cursor)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
 ):
     try:
-        return {"data": service.get_events(since=since, limit=limit)}
+        data, next_cursor = service.get_events(since=since, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return {"data": data, "next_cursor": next_cursor}
 
 
 @router.get("/trend")
 def get_trend(
+    request: Request,
     category: str = Query(...),
     hours: int = Query(12, ge=1, le=720),
     start: Optional[str] = Query(None, description="YYYY-MM-DD"),
     end: Optional[str] = Query(None, description="YYYY-MM-DD"),
+    limit: Optional[int] = Query(None, ge=1, le=10000, description="Page size (default: whole range, 2000 with cursor)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    points: Optional[int] = Query(None, ge=3, le=5000, description="Downsample to about this many points per platform"),
+    bucket: Optional[int] = Query(None, ge=5, le=1440, description="Downsample to fixed buckets of this many minutes"),
+    mode: Optional[str] = Query(None, description="lttb (shape-preserving, default with points) | avg (time buckets)"),
 ):
+    media_type = serialize.negotiate(request.headers.get("accept"))
     try:
-        return {"data": service.get_trend_data(category, hours=hours, start=start, end=end)}
+        payload = service.get_trend_data(
+            category, hours=hours, start=start, end=end, media_type=media_type, limit=limit, cursor=cursor,
+            points=points, bucket=bucket, mode=mode,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-@router.get("/flash")
-def get_flash(
+    headers = {"Vary": "Accept"}
+    if payload.next_cursor:
+        headers["X-Next-Cursor"] = payload.next_cursor
+    return Response(content=serialize.wrap_data(payload), media_type=payload.media_type, headers=headers)
+
+@router.get("/trend/batch")
+def get_trend_batch(
+    request: Request,
+    category: List[str] = Query(..., description="Repeat for each category"),
+    platform: Optional[List[str]] = Query(None, description="Repeat to restrict platforms"),
+    hours: int = Query(12, ge=1, le=720),
     start: Optional[str] = Query(None, description="YYYY-MM-DD"),
     end: Optional[str] = Query(None, description="YYYY-MM-DD"),
+    points: Optional[int] = Query(None, ge=3, le=5000, description="Shared time buckets: about this many per series"),
+    bucket: Optional[int] = Query(None, ge=5, le=1440, description="Shared time buckets of this many minutes"),
+    detail: bool = Query(False, description="Include top_streamers_detail"),
 ):
+    media_type = serialize.negotiate(request.headers.get("accept"))
     try:
-        return {"data": service.get_flash_categories(start=start, end=end)}
+        payload = service.get_trend_batch(
+            category, platform, hours=hours, start=start, end=end, points=points, bucket=bucket,
+            detail=detail, media_type=media_type,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return Response(content=serialize.wrap_data(payload), media_type=payload.media_type, headers={"Vary": "Accept"})
+
+
+@router.get("/flash")
+def get_flash(
+    request: Request,
+    start: Optional[str] = Query(None, description="YYYY-MM-DD"),
+    end: Optional[str] = Query(None, description="YYYY-MM-DD"),
+):
+    return _cached(
+        request, "flash", {"start": start, "end": end},
+        lambda media_type: service.get_flash_categories(start=start, end=end, media_type=media_type),
+    )
 
 
 @router.get("/daily-top")
 def get_daily_top(
+    request: Request,
     start: Optional[str] = Query(None, description="YYYY-MM-DD"),
     end: Optional[str] = Query(None, description="YYYY-MM-DD"),
 ):
-    try:
-        return {"data": service.get_daily_category_top(start=start, end=end)}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return _cached(
+        request, "daily-top", {"start": start, "end": end},
+        lambda media_type: service.get_daily_category_top(start=start, end=end, media_type=media_type),
+    )
 
 
 @router.get("/king")
 def get_king(
+    request: Request,
     start: Optional[str] = Query(None, description="YYYY-MM-DD"),
     end: Optional[str] = Query(None, description="YYYY-MM-DD"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Top N streamers"),
 ):
-    try:
-        return {"data": service.get_king_of_streamers(start=start, end=end)}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return _cached(
+        request, "king", {"start": start, "end": end, "limit": limit},
+        lambda media_type: service.get_king_of_streamers(start=start, end=end, limit=limit, media_type=media_type),
+    )
 
 
 @router.get("/new")
-def get_new():
-    try:
-        return {"data": service.get_new_categories()}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+def get_new(request: Request):
+    return _cached(request, "new", {}, service.get_new_categories)
 
 
 @router.get("/volatility")
 def get_volatility(
+    request: Request,
     start: Optional[str] = Query(None, description="YYYY-MM-DD"),
     end: Optional[str] = Query(None, description="YYYY-MM-DD"),
 ):
-    try:
-        return {"data": service.get_volatility_metrics(start=start, end=end)}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return _cached(
+        request, "volatility", {"start": start, "end": end},
+        lambda media_type: service.get_volatility_metrics(start=start, end=end, media_type=media_type),
+    )
 
 
 @router.get("/insights-period")
@@ -96,3 +198,19 @@ def get_insights_period(
         return {"data": service.get_insights_period(start=start, end=end)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/detector-runs")
+def get_detector_runs(
+    limit: int = Query(50, ge=1, le=500),
+    status: Optional[str] = Query(None, description="ok | skipped | error"),
+):
+    try:
+        return {"data": service.get_detector_runs(limit=limit, status=status)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/metrics")
+def get_metrics():
+    return {"data": dict(service.get_metrics(), stream=stream.metrics())}
@@ -0,0 +1,136 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+# 같은 스냅샷 버전이라도 이 시간(초)이 지나면 다시 계산 ("최근 24시간"처럼 현재 시각 기준 구간이 밀리므로)
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+# 이전 응답이 있을 때 재계산을 기다리는 최대 시간(초). 넘기거나 실패하면 이전 응답을 준다.
+RESPONSE_CACHE_STALE_WAIT = float(os.getenv("RESPONSE_CACHE_STALE_WAIT", "2"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+
+
+class Entry:
+    __slots__ = ("version", "body", "media_type", "etag", "created")
+
+    def __init__(self, version, body, media_type="application/json"):
+        self.version = version
+        self.body = body
+        self.media_type = media_type
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        self.created = time.monotonic()
+
+
+def normalize_params(params):
+    """None을 뺀 (이름, 값) 정렬 튜플 -> 파라미터 순서/누락 표기가 달라도 같은 키"""
+    return tuple(sorted((k, str(v).strip()) for k, v in params.items() if v is not None))
+
+
+class ResponseCache:
+    """
+    (endpoint, 정규화 파라미터) -> 직렬화된 응답 본문. 스냅샷 버전이 바뀌거나 TTL이 지나면 다시 계산.
+
+    - 같은 키의 재계산은 한 번만 돌고(진행 중 Future 공유), 기다리던 요청은 그 결과를 받는다.
+    - 이전 응답이 있으면 재계산을 RESPONSE_CACHE_STALE_WAIT까지만 기다리고, 늦거나 실패하면 이전 응답(STALE)을 준다.
+      늦은 재계산은 백그라운드에서 끝까지 돌아 다음 요청부터 반영된다.
+    - 이전 응답이 없으면 끝까지 기다리고 실패는 그대로 올린다.
+    """
+
+    def __init__(self, ttl=RESPONSE_CACHE_TTL, stale_wait=RESPONSE_CACHE_STALE_WAIT,
+                 max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.stale_wait = stale_wait
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="response-cache")
+        self._metrics = {"hits": 0, "misses": 0, "stale": 0, "errors": 0, "coalesced": 0}
+
+    def _fresh(self, entry, version):
+        return entry.version == version and time.monotonic() - entry.created < self.ttl
+
+    def _refresh(self, key, version, compute):
+        try:
+            payload = compute()
+            entry = Entry(version, payload.body, payload.media_type)
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return entry
+        except Exception:
+            with self._lock:
+                self._metrics["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def get(self, key, version, compute):
+        """
+        compute(): 응답 본문 (.body bytes, .media_type). 반환: (Entry, 'HIT' | 'MISS' | 'STALE')
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._fresh(entry, version):
+                self._entries.move_to_end(key)
+                self._metrics["hits"] += 1
+                return entry, "HIT"
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._inflight[key] = self._executor.submit(self._refresh, key, version, compute)
+            else:
+                # 진행 중인 재계산에 합류 (같은 키 동시 요청)
+                self._metrics["coalesced"] += 1
+        try:
+            fresh = future.result(timeout=self.stale_wait if entry is not None else None)
+        except FutureTimeout:
+            fresh = None
+        except Exception as e:
+            if entry is None:
+                raise
+            print(f"[API] 응답 재계산 실패 (이전 응답 사용): {key[0]} {e}")
+            fresh = None
+        with self._lock:
+            if fresh is None:
+                self._metrics["stale"] += 1
+                return entry, "STALE"
+            self._metrics["misses"] += 1
+            return fresh, "MISS"
+
+    def metrics(self):
+        with self._lock:
+            out = dict(self._metrics)
+            out["entries"] = len(self._entries)
+            out["bytes"] = sum(len(e.body) for e in self._entries.values())
+            out["inflight"] = len(self._inflight)
+        total = out["hits"] + out["misses"] + out["stale"]
+        out["hit_ratio"] = round((out["hits"] + out["stale"]) / total, 4) if total else 0.0
+        return out
+
+
+def etag_matches(header, etag):
+    """If-None-Match 헤더(목록, W/ 접두, *)가 etag와 맞는지"""
+    if not header:
+        return False
+    for token in header.split(","):
+        token = token.strip()
+        if token == "*" or token.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+_cache = ResponseCache()
+
+
+def get(endpoint, params, version, compute):
+    return _cache.get((endpoint, normalize_params(params)), version, compute)
+
+
+def metrics():
+    return _cache.metrics()
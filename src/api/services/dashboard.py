@@ -1,25 +1,37 @@
+import base64
+import binascii
 import json
-import os
+import math
 import re
+import threading
 import time
 from datetime import datetime, timedelta
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 
-import duckdb
 import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine, text
 
-DUCK_PATH = os.getenv("DB_PATH", "data/analytics.db")
-PG_USER = os.getenv("POSTGRES_USER", "user")
-PG_PASS = os.getenv("POSTGRES_PASSWORD", "password")
-PG_DB = os.getenv("POSTGRES_DB", "streampulse_meta")
-PG_HOST = os.getenv("POSTGRES_HOST", "postgres")
-PG_PORT = os.getenv("POSTGRES_PORT", "5432")
-PG_URL = f"postgresql://{PG_USER}:{PG_PASS}@{PG_HOST}:{PG_PORT}/{PG_DB}"
+from src.api.services import cache, duck, serialize
+from src.api.services.singleflight import SingleFlight
+from src.storage import postgres as pg
 
 _DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
 
+# 같은 인자로 동시에 들어온 무거운 조회를 한 번만 실행 (응답 캐시가 없는 엔드포인트용)
+_flight = SingleFlight()
+
+EVENTS_PAGE_MAX = 500
+TREND_PAGE_DEFAULT = 2000
+TREND_PAGE_MAX = 10000
+TREND_SAMPLE_MODES = ("lttb", "avg")
+TREND_BATCH_MAX = 50
+# 트렌드 페이지 조회 시 처음 훑는 시간 폭. 한 페이지가 안 차면 4배씩 넓힌다 (남은 구간 전체 정렬 방지)
+TREND_PAGE_WINDOW = timedelta(hours=6)
+# signal_event_daily 요약을 이어서 채울지 확인하는 주기(초)
+INSIGHTS_ROLLUP_CHECK = 60
+# 자정 직전에 시작해 자정 넘어 커밋된 이벤트를 놓치지 않도록, 날짜가 바뀌고 이만큼(분) 지난 뒤 요약에 넣는다
+INSIGHTS_DAY_GRACE = 10
+
 
 def _parse_date_utc(s: Optional[str]) -> Optional[datetime]:
     """Parse YYYY-MM-DD to UTC 00:00. Returns None if invalid or None."""
@@ -44,17 +56,20 @@ def _parse_start_end(start: Optional[str], end: Optional[str]) -> Tuple[Optional
     return s, end_exclusive
 
 
-def _get_connection(retries=3, backoff=0.2):
-    last_err = None
-    for attempt in range(retries):
-        try:
-            return duckdb.connect(DUCK_PATH, read_only=True)
-        except Exception as e:
-            last_err = e
-            if attempt < retries - 1:
-                time.sleep(backoff * (2 ** attempt))
-                continue
-            raise last_err
+def encode_cursor(*values) -> str:
+    """페이지 키 값 -> 불투명 커서 문자열 (base64url JSON)"""
+    raw = json.dumps(values, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(token: str, size: int) -> list:
+    """encode_cursor 역변환. 형식이 맞지 않으면 ValueError"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise ValueError("invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("invalid cursor")
+    return values
 
 def _normalize_records(records):
     normalized = []
@@ -88,24 +103,32 @@ def _parse_top_streamers(value):
             return []
     return []
 
-def get_live_traffic():
-    con = _get_connection()
-    try:
-        since = datetime.utcnow() - timedelta(hours=24)
-        query = f"""
+def get_live_traffic(media_type: str = serialize.JSON):
+    since = datetime.utcnow() - timedelta(hours=24)
+    with duck.cursor() as con:
+        rel = con.sql(
+            """
             WITH stats AS (
                 SELECT platform, ts_utc,
                        COUNT(*) AS row_count,
                        SUM(viewers) AS total_viewers
                 FROM traffic_category_snapshot
-                WHERE ts_utc >= CAST('{since}' AS TIMESTAMP)
+                WHERE ts_utc >= ?
                 GROUP BY platform, ts_utc
             ),
-            latest AS (
+            healthy AS (
                 SELECT platform, MAX(ts_utc) AS max_ts
                 FROM stats
                 WHERE total_viewers > 0 AND row_count > 0
                 GROUP BY platform
+            ),
+            latest AS (
+                SELECT platform, max_ts FROM healthy
+                UNION ALL
+                -- 시청자가 잡힌 스냅샷이 하나도 없으면 플랫폼별 가장 최근 스냅샷
+                SELECT platform, MAX(ts_utc) FROM stats
+                WHERE NOT EXISTS (SELECT 1 FROM healthy)
+                GROUP BY platform
             )
             SELECT t.platform, t.category_name, t.viewers, t.top_streamers_detail, t.ts_utc
             FROM traffic_category_snapshot t
@@ -113,361 +136,656 @@ def get_live_traffic():
               ON t.platform = l.platform
              AND t.ts_utc = l.max_ts
             ORDER BY t.viewers DESC
+            """,
+            params=[since],
+        )
+        return serialize.encode(rel, media_type, json_columns=("top_streamers_detail",))
+
+def get_trend_data(
+    category_name: str,
+    hours: int = 12,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    media_type: str = serialize.JSON,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    points: Optional[int] = None,
+    bucket: Optional[int] = None,
+    mode: Optional[str] = None,
+):
+    """
+    (ts_utc, platform) 순 트렌드. limit/cursor가 없으면 구간 전체, 있으면 한 페이지와
+    Payload.next_cursor (다음 페이지 키, 마지막 페이지면 None).
+    points(플랫폼별 목표 점 수)/bucket(분)을 주면 DuckDB 안에서 줄여서 반환 (_trend_downsample_sql).
+    """
+    if (points or bucket) and (limit or cursor):
+        raise ValueError("points/bucket cannot be combined with limit/cursor")
+    if mode is not None and mode not in TREND_SAMPLE_MODES:
+        raise ValueError(f"mode must be one of {', '.join(TREND_SAMPLE_MODES)}")
+    key = ("trend", category_name, media_type, limit, cursor, points, bucket, mode) + (
+        (None, start, end) if start and end else (hours, None, None)
+    )
+    return _flight.do(
+        key,
+        lambda: _trend_data(category_name, hours, start, end, media_type, limit, cursor, points, bucket, mode),
+    )
+
+def _trend_data(category_name, hours, start, end, media_type, limit=None, cursor=None,
+                points=None, bucket=None, mode=None):
+    if start and end:
+        start_dt, end_dt = _parse_start_end(start, end)
+        if start_dt is None or end_dt is None:
+            return serialize.empty(media_type)
+    else:
+        start_dt, end_dt = datetime.utcnow() - timedelta(hours=hours), None
+    where, params = ["category_name = ?"], [category_name]
+    if cursor is not None:
+        ts, platform = decode_cursor(cursor, 2)
+        try:
+            after = datetime.fromisoformat(ts)
+        except (TypeError, ValueError):
+            raise ValueError("invalid cursor")
+        start_dt = max(start_dt, after)
+        where.append("(ts_utc > ? OR platform > ?)")
+        params += [after, platform]
+        limit = limit or TREND_PAGE_DEFAULT
+    where.append("ts_utc >= ?")
+    params.append(start_dt)
+    if end_dt is not None:
+        where.append("ts_utc < ?")
+        params.append(end_dt)
+    if points or bucket:
+        span = ((end_dt or datetime.utcnow()) - start_dt).total_seconds()
+        sql, params = _trend_downsample_sql(" AND ".join(where), params, span, points, bucket, mode)
+        with duck.cursor() as con:
+            return serialize.encode(con.sql(sql, params=params), media_type, json_columns=("top_streamers_detail",))
+    with duck.cursor() as con:
+        next_key = None
+        if limit:
+            limit = min(int(limit), TREND_PAGE_MAX)
+            where, params, next_key = _trend_page(con, where, params, start_dt, end_dt, limit)
+        rel = con.sql(
+            f"""
+            SELECT ts_utc, platform, viewers, top_streamers_detail
+            FROM traffic_category_snapshot
+            WHERE {" AND ".join(where)}
+            ORDER BY ts_utc ASC, platform ASC
+            {"LIMIT " + str(limit) if limit else ""}
+            """,
+            params=params,
+        )
+        payload = serialize.encode(rel, media_type, json_columns=("top_streamers_detail",))
+    if next_key is not None:
+        payload.next_cursor = encode_cursor(next_key[0].isoformat(), next_key[1])
+    return payload
+
+def _bucket_seconds(span_seconds, points, bucket):
+    """버킷 폭(초): bucket분, 없으면 구간/points를 수집 주기(5분) 단위로 올림"""
+    if bucket:
+        return int(bucket) * 60
+    return max(300, math.ceil(span_seconds / points / 300) * 300)
+
+def _trend_downsample_sql(where, params, span_seconds, points, bucket, mode):
+    """
+    다운샘플 쿼리와 파라미터. 두 방식 모두 top_streamers_detail은 남는 점에서만 읽는다.
+
+    - avg: 고정 시간 버킷(bucket분, 없으면 구간/points를 5분 단위로 올림)별 평균 시청자(viewers)와
+      최고치(peak_viewers), 최고치 시점의 Top 스트리머. ts_utc는 버킷 시작 시각.
+    - lttb: 플랫폼별로 행을 points개 구간으로 균등 분할해 구간마다 실제 점 하나를 남긴다(처음/끝 점 유지).
+      원래 LTTB는 직전에 고른 점을 기준으로 삼아 순차적이지만, 여기서는 앞뒤 구간 평균점과 만드는
+      삼각형 넓이가 가장 큰 점을 고르는 집합 연산 변형이라 윈도 함수 한 번으로 끝난다.
+    mode 기본값: points면 lttb, bucket만 주면 avg.
+    """
+    mode = mode or ("lttb" if points else "avg")
+    if mode == "lttb" and not points:
+        points = max(3, int(span_seconds // (bucket * 60)))
+    if mode == "avg":
+        seconds = _bucket_seconds(span_seconds, points, bucket)
+        return f"""
+            SELECT time_bucket(INTERVAL '{int(seconds)} seconds', ts_utc) AS ts_utc, platform,
+                   CAST(AVG(viewers) AS INT) AS viewers,
+                   MAX(viewers) AS peak_viewers,
+                   ARG_MAX(top_streamers_detail, viewers) AS top_streamers_detail
+            FROM traffic_category_snapshot
+            WHERE {where}
+            GROUP BY 1, 2
+            ORDER BY 1, 2
+        """, params
+    points = int(points)
+    return f"""
+        WITH src AS (
+            SELECT rowid AS rid, platform, ts_utc, viewers, epoch(ts_utc) AS x,
+                   row_number() OVER (PARTITION BY platform ORDER BY ts_utc) AS rn,
+                   count(*) OVER (PARTITION BY platform) AS n
+            FROM traffic_category_snapshot
+            WHERE {where}
+        ),
+        bucketed AS (
+            SELECT *,
+                   CASE WHEN rn = 1 THEN 0
+                        WHEN rn = n THEN {points} - 1
+                        ELSE 1 + CAST(floor((rn - 2) * ({points} - 2) / greatest(n - 2, 1)) AS BIGINT)
+                   END AS bucket
+            FROM src
+        ),
+        centers AS (
+            SELECT platform, bucket,
+                   lag(ax) OVER w AS pax, lag(ay) OVER w AS pay,
+                   lead(ax) OVER w AS nax, lead(ay) OVER w AS nay
+            FROM (
+                SELECT platform, bucket, AVG(x) AS ax, AVG(viewers) AS ay
+                FROM bucketed
+                GROUP BY 1, 2
+            )
+            WINDOW w AS (PARTITION BY platform ORDER BY bucket)
+        ),
+        kept AS (
+            SELECT b.rid
+            FROM bucketed b
+            JOIN centers c USING (platform, bucket)
+            QUALIFY row_number() OVER (
+                PARTITION BY b.platform, b.bucket
+                ORDER BY abs(
+                    (coalesce(c.pax, b.x) - coalesce(c.nax, b.x)) * (b.viewers - coalesce(c.pay, b.viewers))
+                    - (coalesce(c.pax, b.x) - b.x) * (coalesce(c.nay, b.viewers) - coalesce(c.pay, b.viewers))
+                ) DESC, b.ts_utc
+            ) = 1
+        )
+        SELECT ts_utc, platform, viewers, top_streamers_detail
+        FROM traffic_category_snapshot
+        WHERE {where} AND rowid IN (SELECT rid FROM kept)
+        ORDER BY ts_utc ASC, platform ASC
+    """, params + params
+
+def get_trend_batch(
+    categories: List[str],
+    platforms: Optional[List[str]] = None,
+    hours: int = 12,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    points: Optional[int] = None,
+    bucket: Optional[int] = None,
+    detail: bool = False,
+    media_type: str = serialize.JSON,
+):
+    """
+    여러 카테고리(/플랫폼) 트렌드를 한 번의 스캔으로: (ts_utc, platform, category_name) 순 행.
+    points/bucket을 주면 모든 시계열이 같은 시간 버킷(avg: 평균 viewers, peak_viewers)을 쓴다.
+    detail이면 top_streamers_detail 포함 (버킷이면 최고치 시점).
+    """
+    categories = sorted(set(c for c in categories if c))
+    platforms = sorted(set(p for p in platforms or [] if p))
+    if not categories:
+        return serialize.empty(media_type)
+    if len(categories) > TREND_BATCH_MAX:
+        raise ValueError(f"at most {TREND_BATCH_MAX} categories")
+    key = ("trend-batch", tuple(categories), tuple(platforms), media_type, points, bucket, detail) + (
+        (None, start, end) if start and end else (hours, None, None)
+    )
+    return _flight.do(
+        key,
+        lambda: _trend_batch(categories, platforms, hours, start, end, points, bucket, detail, media_type),
+    )
+
+def _trend_batch(categories, platforms, hours, start, end, points, bucket, detail, media_type):
+    if start and end:
+        start_dt, end_dt = _parse_start_end(start, end)
+        if start_dt is None or end_dt is None:
+            return serialize.empty(media_type)
+    else:
+        start_dt, end_dt = datetime.utcnow() - timedelta(hours=hours), None
+    where = [f"category_name IN ({', '.join('?' * len(categories))})", "ts_utc >= ?"]
+    params = list(categories) + [start_dt]
+    if platforms:
+        where.append(f"platform IN ({', '.join('?' * len(platforms))})")
+        params += platforms
+    if end_dt is not None:
+        where.append("ts_utc < ?")
+        params.append(end_dt)
+    if points or bucket:
+        span = ((end_dt or datetime.utcnow()) - start_dt).total_seconds()
+        seconds = _bucket_seconds(span, points, bucket)
+        sql = f"""
+            SELECT time_bucket(INTERVAL '{int(seconds)} seconds', ts_utc) AS ts_utc, platform, category_name,
+                   CAST(AVG(viewers) AS INT) AS viewers,
+                   MAX(viewers) AS peak_viewers
+                   {", ARG_MAX(top_streamers_detail, viewers) AS top_streamers_detail" if detail else ""}
+            FROM traffic_category_snapshot
+            WHERE {" AND ".join(where)}
+            GROUP BY 1, 2, 3
+            ORDER BY 1, 2, 3
         """
-        df = con.execute(query).df()
-        if df.empty:
-            fallback = f"""
-                WITH latest AS (
-                    SELECT platform, MAX(ts_utc) AS max_ts
-                    FROM traffic_category_snapshot
-                    WHERE ts_utc >= CAST('{since}' AS TIMESTAMP)
-                    GROUP BY platform
-                )
-                SELECT t.platform, t.category_name, t.viewers, t.top_streamers_detail, t.ts_utc
-                FROM traffic_category_snapshot t
-                JOIN latest l
-                  ON t.platform = l.platform
-                 AND t.ts_utc = l.max_ts
-                ORDER BY t.viewers DESC
-            """
-            df = con.execute(fallback).df()
-        if not df.empty:
-            df["top_streamers_detail"] = df["top_streamers_detail"].apply(_parse_top_streamers)
-        return _df_to_records(df)
-    finally:
-        con.close()
+    else:
+        sql = f"""
+            SELECT ts_utc, platform, category_name, viewers
+                   {", top_streamers_detail" if detail else ""}
+            FROM traffic_category_snapshot
+            WHERE {" AND ".join(where)}
+            ORDER BY ts_utc ASC, platform ASC, category_name ASC
+        """
+    with duck.cursor() as con:
+        return serialize.encode(con.sql(sql, params=params), media_type, json_columns=("top_streamers_detail",))
 
-def get_trend_data(category_name: str, hours: int = 12, start: Optional[str] = None, end: Optional[str] = None):
-    con = _get_connection()
-    try:
-        if start and end:
-            start_dt, end_dt = _parse_start_end(start, end)
-            if start_dt is None or end_dt is None:
-                return []
-            q = """
-                SELECT ts_utc, platform, viewers, top_streamers_detail
-                FROM traffic_category_snapshot
-                WHERE category_name = ? AND ts_utc >= ? AND ts_utc < ?
-                ORDER BY ts_utc ASC
-            """
-            df = con.execute(q, [category_name, start_dt, end_dt]).df()
-        else:
-            since = datetime.utcnow() - timedelta(hours=hours)
-            q = """
-                SELECT ts_utc, platform, viewers, top_streamers_detail
-                FROM traffic_category_snapshot
-                WHERE category_name = ? AND ts_utc >= ?
-                ORDER BY ts_utc ASC
-            """
-            df = con.execute(q, [category_name, since]).df()
-        if not df.empty:
-            df["top_streamers_detail"] = df["top_streamers_detail"].apply(_parse_top_streamers)
-        return _df_to_records(df)
-    finally:
-        con.close()
+def _trend_page(con, where, params, start_dt, end_dt, limit):
+    """
+    한 페이지(limit행)가 들어가는 시간 창을 찾아 (조건, 파라미터, 다음 페이지 키) 반환.
+    ORDER BY ... LIMIT도 조건에 맞는 남은 구간을 모두 읽어 정렬하므로, 창을 좁게 시작해 찰 때까지 넓힌다.
+    """
+    window = TREND_PAGE_WINDOW
+    bound = end_dt if end_dt is not None else datetime.utcnow()
+    while True:
+        upper = start_dt + window
+        last = upper >= bound
+        w, p = (where, params) if last else (where + ["ts_utc < ?"], params + [upper])
+        # limit번째 행 키와 그 다음 행 존재 여부
+        keys = con.execute(
+            f"""
+            SELECT ts_utc, platform
+            FROM traffic_category_snapshot
+            WHERE {" AND ".join(w)}
+            ORDER BY ts_utc ASC, platform ASC
+            LIMIT 2 OFFSET ?
+            """,
+            p + [limit - 1],
+        ).fetchall()
+        if len(keys) == 2:
+            return w, p, keys[0]
+        if last:
+            return w, p, None
+        window *= 4
+
+def _pg_df(sql, params=None):
+    columns, rows = pg.query(sql, params)
+    return pd.DataFrame(rows, columns=columns)
+
+def get_events(since: Optional[str] = None, limit: Optional[int] = None, cursor: Optional[str] = None):
+    """
+    (created_at, event_id) 내림차순 이벤트 한 페이지와 다음 페이지 커서 (마지막이면 None).
+    기본 건수: since/cursor가 없으면 20, 있으면 100 (최대 EVENTS_PAGE_MAX)
+    """
+    after = None
+    if cursor is not None:
+        created_at, event_id = decode_cursor(cursor, 2)
+        try:
+            after = (datetime.fromisoformat(created_at), int(event_id))
+        except (TypeError, ValueError):
+            raise ValueError("invalid cursor")
+    key = ("events", since, limit, cursor)
+    return _flight.do(key, lambda: _events(since, limit, after))
 
-def get_events(since: Optional[str] = None, limit: Optional[int] = None):
+def _events(since, limit, after):
+    default = 20 if since is None and after is None else 100
+    lim = min(int(limit or default), EVENTS_PAGE_MAX)
+    where, params = [], []
+    if since is not None:
+        since_dt = _parse_date_utc(since)
+        if since_dt is None:
+            return [], None
+        where.append("created_at >= %s")
+        params.append(since_dt)
+    if after is not None:
+        # created_at 범위 조건으로 idx_signal_events_created_at을 타고, 같은 시각은 event_id로 이어간다
+        where.append("created_at <= %s AND (created_at < %s OR event_id < %s)")
+        params += [after[0], after[0], after[1]]
     try:
-        engine = create_engine(PG_URL)
-        if since is not None:
-            since_dt = _parse_date_utc(since)
-            if since_dt is None:
-                return []
-            lim = min(int(limit or 100), 500)
-            q = text(
-                "SELECT * FROM signal_events WHERE created_at >= :since ORDER BY created_at DESC LIMIT :lim"
-            )
-            df = pd.read_sql(q, engine, params={"since": since_dt, "lim": lim})
-        else:
-            q = text("SELECT * FROM signal_events ORDER BY created_at DESC LIMIT 20")
-            df = pd.read_sql(q, engine)
-        return _df_to_records(df)
+        df = _pg_df(
+            f"""
+            SELECT * FROM signal_events
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY created_at DESC, event_id DESC
+            LIMIT %s
+            """,
+            tuple(params) + (lim + 1,),
+        )
     except Exception:
-        return []
+        return [], None
+    records = _df_to_records(df.iloc[:lim])
+    if len(df) <= lim:
+        return records, None
+    return records, encode_cursor(records[-1]["created_at"], records[-1]["event_id"])
 
-def get_flash_categories(start: Optional[str] = None, end: Optional[str] = None):
-    con = _get_connection()
-    try:
+def get_events_cursor() -> datetime:
+    """
+    가장 최근 이벤트 추가/갱신 시각 (/api/stream 변경 피드 시작점). 이벤트가 없으면 DB 현재 시각
+    (changed_at과 같은 DB 시간대, API 프로세스 시계/시간대와 무관)
+    """
+    _, rows = pg.query(
+        "SELECT COALESCE(MAX(COALESCE(updated_at, created_at)), NOW()::timestamp) FROM signal_events"
+    )
+    return rows[0][0]
+
+def get_changed_events(after: datetime, limit: int = 500):
+    """추가/갱신 시각(COALESCE(updated_at, created_at))이 after 이후인 이벤트, 변경 시각 순"""
+    df = _pg_df(
+        """
+        SELECT *, COALESCE(updated_at, created_at) AS changed_at
+        FROM signal_events
+        WHERE COALESCE(updated_at, created_at) > %s
+        ORDER BY changed_at ASC
+        LIMIT %s
+        """,
+        (after, limit),
+    )
+    return _df_to_records(df)
+
+def get_flash_categories(start: Optional[str] = None, end: Optional[str] = None, media_type: str = serialize.JSON):
+    if start and end:
+        start_dt, end_dt = _parse_start_end(start, end)
+        if start_dt is None or end_dt is None:
+            return serialize.empty(media_type)
+        where, params = "ts_utc >= ? AND ts_utc < ?", [start_dt, end_dt]
+    else:
+        where, params = "ts_utc >= ?", [datetime.utcnow() - timedelta(days=30)]
+    with duck.cursor() as con:
         ts_check = con.execute("SELECT MAX(ts_utc) FROM traffic_category_snapshot").fetchone()
         if not ts_check or not ts_check[0]:
-            return []
-        last_ts = ts_check[0]
-        if start and end:
-            start_dt, end_dt = _parse_start_end(start, end)
-            if start_dt is None or end_dt is None:
-                return []
-            q = """
-                WITH stats AS (
-                    SELECT
-                        platform, category_name,
-                        MAX(viewers) as peak_viewers,
-                        ARG_MAX(top_streamers_detail, viewers) as peak_streamer_json,
-                        COUNT(DISTINCT CAST(ts_utc AS DATE)) FILTER (WHERE viewers > 1000) as active_days
-                    FROM traffic_category_snapshot
-                    WHERE ts_utc >= ? AND ts_utc < ?
-                    GROUP BY platform, category_name
-                ),
-                current_status AS (
-                    SELECT platform, category_name, viewers as curr_viewers, top_streamers_detail as curr_streamer_json
-                    FROM traffic_category_snapshot
-                    WHERE ts_utc = ?
-                )
-                SELECT
-                    s.platform, s.category_name, s.peak_viewers, s.active_days, s.peak_streamer_json,
-                    c.curr_viewers, c.curr_streamer_json
-                FROM stats s
-                JOIN current_status c ON s.platform = c.platform AND s.category_name = c.category_name
-                WHERE s.peak_viewers > 2000
-                  AND s.active_days < 5
-                  AND c.curr_viewers < 300
-                ORDER BY s.peak_viewers DESC
-                LIMIT 50
-            """
-            df = con.execute(q, [start_dt, end_dt, last_ts]).df()
-        else:
-            thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-            q = """
-                WITH stats AS (
-                    SELECT
-                        platform, category_name,
-                        MAX(viewers) as peak_viewers,
-                        ARG_MAX(top_streamers_detail, viewers) as peak_streamer_json,
-                        COUNT(DISTINCT CAST(ts_utc AS DATE)) FILTER (WHERE viewers > 1000) as active_days
-                    FROM traffic_category_snapshot
-                    WHERE ts_utc >= ?
-                    GROUP BY platform, category_name
-                ),
-                current_status AS (
-                    SELECT platform, category_name, viewers as curr_viewers, top_streamers_detail as curr_streamer_json
-                    FROM traffic_category_snapshot
-                    WHERE ts_utc = ?
-                )
+            return serialize.empty(media_type)
+        # peak/current 방송자 이름: Top 스트리머 JSON 첫 항목의 name (없거나 깨지면 '-')
+        rel = con.sql(
+            f"""
+            WITH stats AS (
                 SELECT
-                    s.platform, s.category_name, s.peak_viewers, s.active_days, s.peak_streamer_json,
-                    c.curr_viewers, c.curr_streamer_json
-                FROM stats s
-                JOIN current_status c ON s.platform = c.platform AND s.category_name = c.category_name
-                WHERE s.peak_viewers > 2000
-                  AND s.active_days < 5
-                  AND c.curr_viewers < 300
-                ORDER BY s.peak_viewers DESC
-                LIMIT 50
-            """
-            df = con.execute(q, [thirty_days_ago, last_ts]).df()
-        if df.empty:
-            return []
-
-        def extract_name(json_str):
-            try:
-                if not json_str:
-                    return "-"
-                data = json.loads(json_str) if isinstance(json_str, str) else json_str
-                if isinstance(data, list) and len(data) > 0:
-                    return data[0].get("name", "-")
-                return "-"
-            except Exception:
-                return "-"
-
-        df["peak_contributor"] = df["peak_streamer_json"].apply(extract_name)
-        df["current_broadcaster"] = df["curr_streamer_json"].apply(extract_name)
-        return _df_to_records(df)
-    finally:
-        con.close()
-
-def get_daily_category_top(start: Optional[str] = None, end: Optional[str] = None):
-    con = _get_connection()
-    try:
-        if start and end:
-            start_dt, end_dt = _parse_start_end(start, end)
-            if start_dt is None or end_dt is None:
-                return []
-            q = """
-                SELECT platform, category_name,
-                       CAST(AVG(viewers) AS INT) as avg_viewers,
-                       MAX(viewers) as peak_viewers
+                    platform, category_name,
+                    MAX(viewers) as peak_viewers,
+                    ARG_MAX(top_streamers_detail, viewers) as peak_streamer_json,
+                    COUNT(DISTINCT CAST(ts_utc AS DATE)) FILTER (WHERE viewers > 1000) as active_days
                 FROM traffic_category_snapshot
-                WHERE ts_utc >= ? AND ts_utc < ?
+                WHERE {where}
                 GROUP BY platform, category_name
-                ORDER BY avg_viewers DESC
-            """
-            df = con.execute(q, [start_dt, end_dt]).df()
-        else:
-            yesterday = datetime.utcnow() - timedelta(days=1)
-            q = """
-                SELECT platform, category_name,
-                       CAST(AVG(viewers) AS INT) as avg_viewers,
-                       MAX(viewers) as peak_viewers
+            ),
+            current_status AS (
+                SELECT platform, category_name, viewers as curr_viewers, top_streamers_detail as curr_streamer_json
                 FROM traffic_category_snapshot
-                WHERE ts_utc >= ?
-                GROUP BY platform, category_name
-                ORDER BY avg_viewers DESC
-            """
-            df = con.execute(q, [yesterday]).df()
-        return _df_to_records(df)
-    finally:
-        con.close()
+                WHERE ts_utc = ?
+            )
+            SELECT
+                s.platform, s.category_name, s.peak_viewers, s.active_days, s.peak_streamer_json,
+                c.curr_viewers, c.curr_streamer_json,
+                COALESCE(TRY(json_extract_string(s.peak_streamer_json, '$[0].name')), '-') AS peak_contributor,
+                COALESCE(TRY(json_extract_string(c.curr_streamer_json, '$[0].name')), '-') AS current_broadcaster
+            FROM stats s
+            JOIN current_status c ON s.platform = c.platform AND s.category_name = c.category_name
+            WHERE s.peak_viewers > 2000
+              AND s.active_days < 5
+              AND c.curr_viewers < 300
+            ORDER BY s.peak_viewers DESC
+            LIMIT 50
+            """,
+            params=params + [ts_check[0]],
+        )
+        return serialize.encode(rel, media_type)
 
-def get_king_of_streamers(start: Optional[str] = None, end: Optional[str] = None):
-    con = _get_connection()
-    try:
-        if start and end:
-            start_dt, end_dt = _parse_start_end(start, end)
-            if start_dt is None or end_dt is None:
-                return []
-            q = """
-                SELECT platform, category_name, top_streamers_detail, ts_utc
-                FROM traffic_category_snapshot
-                WHERE ts_utc >= ? AND ts_utc < ?
-            """
-            df_raw = con.execute(q, [start_dt, end_dt]).df()
-        else:
-            yesterday = datetime.utcnow() - timedelta(days=1)
-            q = """
-                SELECT platform, category_name, top_streamers_detail, ts_utc
-                FROM traffic_category_snapshot
-                WHERE ts_utc >= ?
-            """
-            df_raw = con.execute(q, [yesterday]).df()
-
-        streamer_list = []
-        for _, row in df_raw.iterrows():
-            if row["top_streamers_detail"]:
-                try:
-                    details = row["top_streamers_detail"]
-                    if isinstance(details, str):
-                        details = json.loads(details)
-                    if isinstance(details, list):
-                        for d in details:
-                            cat_name = row["category_name"] or ""
-                            if not cat_name.strip():
-                                cat_name = "[General/Talk]"
-                            streamer_list.append({
-                                "platform": row["platform"],
-                                "category": cat_name,
-                                "streamer": d.get("name", "Unknown"),
-                                "title": d.get("title", ""),
-                                "viewers": int(d.get("viewers", 0)),
-                                "timestamp": row["ts_utc"]
-                            })
-                except Exception:
-                    continue
-
-        if not streamer_list:
-            return []
+def get_daily_category_top(start: Optional[str] = None, end: Optional[str] = None, media_type: str = serialize.JSON):
+    if start and end:
+        start_dt, end_dt = _parse_start_end(start, end)
+        if start_dt is None or end_dt is None:
+            return serialize.empty(media_type)
+        where, params = "ts_utc >= ? AND ts_utc < ?", [start_dt, end_dt]
+    else:
+        where, params = "ts_utc >= ?", [datetime.utcnow() - timedelta(days=1)]
+    with duck.cursor() as con:
+        rel = con.sql(
+            f"""
+            SELECT platform, category_name,
+                   CAST(AVG(viewers) AS INT) as avg_viewers,
+                   MAX(viewers) as peak_viewers
+            FROM traffic_category_snapshot
+            WHERE {where}
+            GROUP BY platform, category_name
+            ORDER BY avg_viewers DESC
+            """,
+            params=params,
+        )
+        return serialize.encode(rel, media_type)
 
-        df_streamers = pd.DataFrame(streamer_list)
-        idx = df_streamers.groupby(["platform", "streamer", "category"])["viewers"].idxmax()
-        df_ranking = df_streamers.loc[idx].sort_values(by="viewers", ascending=False)
-        return _df_to_records(df_ranking)
-    finally:
-        con.close()
+def get_king_of_streamers(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: Optional[int] = None,
+    media_type: str = serialize.JSON,
+):
+    """
+    (platform, streamer, category)별 최고 시청자 시점, 시청자 내림차순. Top 스트리머 JSON 목록을 DuckDB 안에서 펼친다.
+    이전 pandas 구현과 같은 규칙:
+    - 목록 원소가 객체가 아니거나 viewers를 int()로 못 바꾸면(null, 소수 문자열, 배열 등) 그 원소부터 행의 나머지는 버림
+      (viewers 없음 -> 0, 숫자는 버림, true/false -> 1/0, "1_000"처럼 int()가 받는 정수 문자열은 허용)
+    - 카테고리명이 NULL인 행은 제외, 빈 문자열이면 [General/Talk], 이름이 null인 항목은 제외
+    - 같은 최고치면 먼저 적재된 스냅샷 행(rowid, 목록 순서) -> idxmax와 같은 선택
+    정렬 동률은 (platform, streamer, category) 순으로 고정한다. 이전 구현은 이 순서에서 불안정 정렬
+    (quicksort)을 해 동률이 많으면 순서가 실행마다 달라질 수 있었다.
+    """
+    if start and end:
+        start_dt, end_dt = _parse_start_end(start, end)
+        if start_dt is None or end_dt is None:
+            return serialize.empty(media_type)
+        where, params = "ts_utc >= ? AND ts_utc < ?", [start_dt, end_dt]
+    else:
+        where, params = "ts_utc >= ?", [datetime.utcnow() - timedelta(days=1)]
+    if limit:
+        params.append(int(limit))
+    with duck.cursor() as con:
+        rel = con.sql(
+            f"""
+            WITH src AS (
+                SELECT rowid AS rid, platform, category_name, ts_utc, TRY_CAST(top_streamers_detail AS JSON) AS j
+                FROM traffic_category_snapshot
+                WHERE {where} AND top_streamers_detail <> '' AND category_name IS NOT NULL
+            ),
+            mentions AS (
+                SELECT rid, platform, category_name, ts_utc,
+                       unnest(json_extract(j, '$[*]')) AS d,
+                       unnest(range(CAST(json_array_length(j) AS BIGINT))) AS pos
+                FROM src
+                WHERE json_type(j) = 'ARRAY'
+            ),
+            parsed AS (
+                SELECT *,
+                       CASE WHEN json_type(d) <> 'OBJECT' THEN NULL
+                            WHEN NOT json_exists(d, '$.viewers') THEN 0
+                            WHEN json_type(d, '$.viewers') IN ('BIGINT', 'UBIGINT')
+                                THEN TRY_CAST(d->>'viewers' AS BIGINT)
+                            WHEN json_type(d, '$.viewers') = 'DOUBLE'
+                                THEN TRY_CAST(trunc(TRY_CAST(d->>'viewers' AS DOUBLE)) AS BIGINT)
+                            WHEN json_type(d, '$.viewers') = 'BOOLEAN'
+                                THEN CASE WHEN d->>'viewers' = 'true' THEN 1 ELSE 0 END
+                            WHEN json_type(d, '$.viewers') = 'VARCHAR'
+                                 AND regexp_full_match(d->>'viewers', '\\s*[+-]?[0-9]+(_[0-9]+)*\\s*')
+                                THEN TRY_CAST(regexp_replace(d->>'viewers', '[\\s_]', '', 'g') AS BIGINT)
+                       END AS viewers
+                FROM mentions
+            ),
+            cut AS (
+                SELECT *, MIN(CASE WHEN viewers IS NULL THEN pos END) OVER (PARTITION BY rid) AS bad_pos
+                FROM parsed
+            ),
+            items AS (
+                SELECT platform,
+                       CASE WHEN trim(category_name) = '' THEN '[General/Talk]' ELSE category_name END AS category,
+                       CASE WHEN json_exists(d, '$.name') THEN d->>'name' ELSE 'Unknown' END AS streamer,
+                       CASE WHEN json_exists(d, '$.title') THEN d->>'title' ELSE '' END AS title,
+                       viewers, rid, ts_utc, pos
+                FROM cut
+                WHERE bad_pos IS NULL OR pos < bad_pos
+            )
+            SELECT platform, category, streamer, title, viewers, ts_utc AS "timestamp"
+            FROM items
+            WHERE platform IS NOT NULL AND streamer IS NOT NULL
+            QUALIFY row_number() OVER (
+                PARTITION BY platform, streamer, category ORDER BY viewers DESC, rid, pos
+            ) = 1
+            ORDER BY viewers DESC, platform, streamer, category
+            {"LIMIT ?" if limit else ""}
+            """,
+            params=params,
+        )
+        return serialize.encode(rel, media_type)
 
-def get_new_categories():
-    con = _get_connection()
-    try:
-        now = datetime.utcnow()
-        yesterday = now - timedelta(days=1)
-        past_start = yesterday - timedelta(days=7)
-        query = f"""
+def get_new_categories(media_type: str = serialize.JSON):
+    now = datetime.utcnow()
+    yesterday = now - timedelta(days=1)
+    past_start = yesterday - timedelta(days=7)
+    with duck.cursor() as con:
+        rel = con.sql(
+            """
             WITH today_cats AS (
                 SELECT DISTINCT platform, category_name
                 FROM traffic_category_snapshot
-                WHERE ts_utc >= CAST('{yesterday}' AS TIMESTAMP)
+                WHERE ts_utc >= ?
             ),
             past_history AS (
                 SELECT DISTINCT platform, category_name
                 FROM traffic_category_snapshot
-                WHERE ts_utc BETWEEN CAST('{past_start}' AS TIMESTAMP) AND CAST('{yesterday}' AS TIMESTAMP)
+                WHERE ts_utc BETWEEN ? AND ?
             )
             SELECT t.platform, t.category_name
             FROM today_cats t
             LEFT JOIN past_history p ON t.platform = p.platform AND t.category_name = p.category_name
             WHERE p.category_name IS NULL
             LIMIT 20
-        """
-        df = con.execute(query).df()
-        return _df_to_records(df)
-    finally:
-        con.close()
+            """,
+            params=[yesterday, past_start, yesterday],
+        )
+        return serialize.encode(rel, media_type)
+
+def get_volatility_metrics(start: Optional[str] = None, end: Optional[str] = None, media_type: str = serialize.JSON):
+    if start and end:
+        start_dt, end_dt = _parse_start_end(start, end)
+        if start_dt is None or end_dt is None:
+            return serialize.empty(media_type)
+        where, params = "ts_utc >= ? AND ts_utc < ?", [start_dt, end_dt]
+    else:
+        where, params = "ts_utc >= ?", [datetime.utcnow() - timedelta(days=1)]
+    with duck.cursor() as con:
+        rel = con.sql(
+            f"""
+            SELECT platform, category_name,
+                   CAST(AVG(viewers) AS INT) as avg_v,
+                   (STDDEV(viewers) / NULLIF(AVG(viewers),0)) as volatility_index
+            FROM traffic_category_snapshot
+            WHERE {where}
+            GROUP BY 1, 2
+            HAVING avg_v > 500
+            """,
+            params=params,
+        )
+        return serialize.encode(rel, media_type)
 
-def get_volatility_metrics(start: Optional[str] = None, end: Optional[str] = None):
-    con = _get_connection()
-    try:
-        if start and end:
-            start_dt, end_dt = _parse_start_end(start, end)
-            if start_dt is None or end_dt is None:
-                return []
-            q = """
-                SELECT platform, category_name,
-                       CAST(AVG(viewers) AS INT) as avg_v,
-                       (STDDEV(viewers) / NULLIF(AVG(viewers),0)) as volatility_index
-                FROM traffic_category_snapshot
-                WHERE ts_utc >= ? AND ts_utc < ?
-                GROUP BY 1, 2
-                HAVING avg_v > 500
-            """
-            df = con.execute(q, [start_dt, end_dt]).df()
-        else:
-            yesterday = datetime.utcnow() - timedelta(days=1)
-            q = """
-                SELECT platform, category_name,
-                       CAST(AVG(viewers) AS INT) as avg_v,
-                       (STDDEV(viewers) / NULLIF(AVG(viewers),0)) as volatility_index
-                FROM traffic_category_snapshot
-                WHERE ts_utc >= ?
-                GROUP BY 1, 2
-                HAVING avg_v > 500
-            """
-            df = con.execute(q, [yesterday]).df()
-        return _df_to_records(df)
-    finally:
-        con.close()
+
+_daily_lock = threading.Lock()
+_daily = {"through": None, "checked": float("-inf")}
+
+
+def _rollup_insights() -> Optional[datetime]:
+    """
+    signal_event_daily를 지난 날짜까지 이어서 채우고, 요약이 완성된 경계(그 날짜 00:00, 없으면 None)를 반환.
+    지난 날짜의 이벤트 수는 바뀌지 않으므로 한 번 넣은 행은 다시 계산하지 않는다.
+    실패하면 이전 경계를 그대로 쓴다 (경계 이후는 원본에서 집계하므로 결과는 같다).
+    """
+    with _daily_lock:
+        now = time.monotonic()
+        if now - _daily["checked"] >= INSIGHTS_ROLLUP_CHECK:
+            _daily["checked"] = now
+            try:
+                with pg.connection() as conn:
+                    cur = conn.cursor()
+                    cur.execute(
+                        "SELECT (NOW()::timestamp - %s * INTERVAL '1 minute')::date", (INSIGHTS_DAY_GRACE,)
+                    )
+                    cutoff = cur.fetchone()[0]
+                    if cutoff != _daily["through"]:
+                        # 다른 API 워커와 같은 날짜를 두 번 넣지 않도록 채우기만 직렬화 (조회는 막지 않음)
+                        cur.execute("LOCK TABLE signal_event_daily IN SHARE ROW EXCLUSIVE MODE")
+                        cur.execute(
+                            """
+                            INSERT INTO signal_event_daily (day, platform, event_type, n)
+                            SELECT created_at::date, platform, event_type, COUNT(*)
+                            FROM signal_events
+                            WHERE created_at >= COALESCE(
+                                      (SELECT MAX(day) + 1 FROM signal_event_daily), '-infinity'::date)
+                              AND created_at < %s
+                            GROUP BY 1, 2, 3
+                            """,
+                            (cutoff,),
+                        )
+                _daily["through"] = cutoff
+            except Exception as e:
+                print(f"[API] insights 일별 요약 갱신 실패 (원본에서 집계): {e}")
+        through = _daily["through"]
+    return datetime.combine(through, datetime.min.time()) if through else None
 
 
 def get_insights_period(start: str, end: str) -> dict:
-    """기간 내 signal_events 집계: total, by_platform, by_event_type."""
+    """
+    기간 내 signal_events 집계: total, by_platform, by_event_type.
+    요약이 끝난 날짜는 signal_event_daily에서, 그 이후(오늘)는 원본에서 세어 GROUPING SETS 한 번으로 합친다.
+    """
+    out = {"total_events": 0, "by_platform": {}, "by_event_type": {}, "start": start, "end": end}
     start_dt, end_dt = _parse_start_end(start, end)
     if start_dt is None or end_dt is None:
-        return {
-            "total_events": 0,
-            "by_platform": {},
-            "by_event_type": {},
-            "start": start,
-            "end": end,
-        }
-    try:
-        engine = create_engine(PG_URL)
-        q = text("""
-            SELECT COUNT(*) as n FROM signal_events
-            WHERE created_at >= :s AND created_at < :e
-        """)
-        total = int(pd.read_sql(q, engine, params={"s": start_dt, "e": end_dt}).iloc[0]["n"])
-        q_plat = text("""
-            SELECT platform, COUNT(*) as n FROM signal_events
-            WHERE created_at >= :s AND created_at < :e
-            GROUP BY platform
-        """)
-        df_plat = pd.read_sql(q_plat, engine, params={"s": start_dt, "e": end_dt})
-        by_platform = {str(r["platform"]): int(r["n"]) for _, r in df_plat.iterrows()}
-        q_typ = text("""
-            SELECT event_type, COUNT(*) as n FROM signal_events
-            WHERE created_at >= :s AND created_at < :e
-            GROUP BY event_type
+        return out
+    through = _rollup_insights()
+    parts = [
+        """
+        SELECT platform, event_type, COUNT(*) AS n
+        FROM signal_events
+        WHERE created_at >= GREATEST(%(start)s, %(through)s) AND created_at < %(end)s
+        GROUP BY platform, event_type
+        """
+    ]
+    if through is not None:
+        parts.insert(0, """
+        SELECT platform, event_type, n
+        FROM signal_event_daily
+        WHERE day >= %(start)s AND day < LEAST(%(end)s, %(through)s)
         """)
-        df_typ = pd.read_sql(q_typ, engine, params={"s": start_dt, "e": end_dt})
-        by_event_type = {str(r["event_type"]): int(r["n"]) for _, r in df_typ.iterrows()}
-        return {
-            "total_events": total,
-            "by_platform": by_platform,
-            "by_event_type": by_event_type,
-            "start": start,
-            "end": end,
-        }
+    try:
+        _, rows = pg.query(
+            f"""
+            WITH counts AS ({" UNION ALL ".join(parts)})
+            SELECT GROUPING(platform), GROUPING(event_type), platform, event_type, COALESCE(SUM(n), 0)
+            FROM counts
+            GROUP BY GROUPING SETS ((), (platform), (event_type))
+            """,
+            {"start": start_dt, "end": end_dt, "through": through or start_dt},
+        )
+    except Exception:
+        return out
+    for all_platforms, all_types, platform, event_type, n in rows:
+        if all_platforms and all_types:
+            out["total_events"] = int(n)
+        elif all_types:
+            out["by_platform"][str(platform)] = int(n)
+        else:
+            out["by_event_type"][str(event_type)] = int(n)
+    return out
+
+
+def get_detector_runs(limit: int = 50, status: Optional[str] = None):
+    """Detector 실행 이력 (최신순): 단계별 소요 시간(ms)/건수/당시 임계값"""
+    where = "WHERE status = %s" if status else ""
+    params = ((status,) if status else ()) + (min(int(limit), 500),)
+    try:
+        df = _pg_df(
+            f"""
+            SELECT run_id, started_at, as_of, snapshot, worker_slot, status, error,
+                   total_ms, phases, counts, thresholds
+            FROM detector_runs
+            {where}
+            ORDER BY started_at DESC
+            LIMIT %s
+            """,
+            params,
+        )
+        return _df_to_records(df)
     except Exception:
-        return {
-            "total_events": 0,
-            "by_platform": {},
-            "by_event_type": {},
-            "start": start,
-            "end": end,
-        }
+        return []
+
+
+def get_metrics() -> dict:
+    """API 프로세스 내부 지표 (Postgres 풀, DuckDB 핸들, 응답 캐시, 동시 요청 합치기)"""
+    return {
+        "postgres": pg.pool_metrics(),
+        "duckdb": duck.metrics(),
+        "response_cache": cache.metrics(),
+        "singleflight": _flight.metrics(),
+    }
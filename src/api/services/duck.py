@@ -0,0 +1,231 @@
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+import duckdb
+
+from src.storage.duckdb_store import write_intent_path
+
+DUCK_PATH = os.getenv("DB_PATH", "data/analytics.db")
+# 요청이 없을 때 연결을 놓기까지의 시간(초)
+DUCK_IDLE_SECONDS = float(os.getenv("DUCK_IDLE_SECONDS", "30"))
+# Collector 쓰기 예고 중 요청이 쓰기 완료를 기다리는 최대 시간(초). 넘기면 그냥 열기를 시도한다.
+DUCK_WRITE_WAIT = float(os.getenv("DUCK_WRITE_WAIT", "10"))
+# 이보다 오래된 쓰기 예고 파일은 비정상 종료로 남은 것으로 보고 무시
+DUCK_WRITE_INTENT_TTL = float(os.getenv("DUCK_WRITE_INTENT_TTL", "120"))
+# 감시 스레드 점검 주기(초)
+DUCK_WATCH_INTERVAL = 0.2
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+class DuckHandle:
+    """
+    API 프로세스 공용 읽기 전용 DuckDB 핸들.
+
+    - 데이터베이스 인스턴스 하나를 열어 두고(카탈로그/버퍼 캐시 유지) 스레드마다 cursor()를 하나씩 재사용한다.
+    - DuckDB는 다른 프로세스가 커밋한 내용을 열려 있는 읽기 전용 인스턴스에 반영하지 않으므로,
+      파일(+WAL)의 inode/크기/mtime이 바뀌면 진행 중 요청이 끝난 뒤 다시 연다.
+    - 읽기 연결이 열려 있으면 Collector가 쓰기 락을 못 잡는다. Collector가 쓰기 예고 파일을 만들면
+      진행 중 요청이 끝나는 대로 닫고, 새 요청은 쓰기가 끝날 때까지(최대 DUCK_WRITE_WAIT) 기다린다.
+    - DUCK_IDLE_SECONDS 동안 요청이 없어도 닫는다 (다른 도구의 쓰기 연결을 막지 않도록).
+    pooled=False면 요청마다 새로 연결한다 (이전 방식, 부하 테스트 비교용).
+    """
+
+    def __init__(self, path=DUCK_PATH, pooled=True):
+        self.path = path
+        self.pooled = pooled
+        self._cond = threading.Condition()
+        self._conn = None
+        self._cursors = {}
+        self._signature = None
+        self._active = 0
+        self._draining = None
+        self._last_used = 0.0
+        self._watcher = None
+        self._metrics = {
+            "opens": 0,
+            "open_failures": 0,
+            "closes": {"write_intent": 0, "file_changed": 0, "idle": 0, "error": 0},
+            "leases": 0,
+            "cursors": 0,
+            "write_waits": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+        }
+
+    def _file_signature(self):
+        return _stat(self.path), _stat(f"{self.path}.wal")
+
+    def _writer_waiting(self):
+        st = _stat(write_intent_path(self.path))
+        return st is not None and time.time() - st[2] / 1e9 < DUCK_WRITE_INTENT_TTL
+
+    def _connect(self, retries=3, backoff=0.2):
+        for attempt in range(retries):
+            try:
+                return duckdb.connect(self.path, read_only=True)
+            except Exception:
+                self._metrics["open_failures"] += 1
+                if attempt < retries - 1:
+                    time.sleep(backoff * (2 ** attempt))
+                    continue
+                raise
+
+    def _open_locked(self):
+        signature = self._file_signature()
+        self._conn = self._connect()
+        self._signature = signature
+        self._last_used = time.monotonic()
+        self._metrics["opens"] += 1
+        self._start_watcher()
+
+    def _close_locked(self, reason):
+        for cur in self._cursors.values():
+            try:
+                cur.close()
+            except Exception:
+                pass
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+        self._conn, self._cursors, self._draining = None, {}, None
+        self._metrics["closes"][reason] += 1
+        self._cond.notify_all()
+
+    def _stale_reason(self):
+        """열린 핸들을 닫아야 하는 이유 (없으면 None)"""
+        if self._writer_waiting():
+            return "write_intent"
+        if self._file_signature() != self._signature:
+            return "file_changed"
+        return None
+
+    def _acquire(self):
+        started = time.perf_counter()
+        deadline = time.monotonic() + DUCK_WRITE_WAIT
+        waited_for_writer = False
+        with self._cond:
+            while True:
+                if self._conn is not None and self._draining is None:
+                    self._draining = self._stale_reason()
+                if self._draining is not None:
+                    if self._active == 0:
+                        self._close_locked(self._draining)
+                    else:
+                        self._cond.wait(DUCK_WATCH_INTERVAL)
+                    continue
+                if self._conn is None and self._writer_waiting() and time.monotonic() < deadline:
+                    waited_for_writer = True
+                    self._cond.wait(DUCK_WATCH_INTERVAL)
+                    continue
+                if self._conn is None:
+                    self._open_locked()
+                break
+            tid = threading.get_ident()
+            cur = self._cursors.get(tid)
+            if cur is None:
+                cur = self._cursors[tid] = self._conn.cursor()
+                self._metrics["cursors"] += 1
+            self._active += 1
+            waited = (time.perf_counter() - started) * 1000
+            self._metrics["leases"] += 1
+            self._metrics["write_waits"] += int(waited_for_writer)
+            self._metrics["wait_ms_total"] += waited
+            self._metrics["wait_ms_max"] = max(self._metrics["wait_ms_max"], waited)
+            return cur
+
+    def _release(self, error=None):
+        with self._cond:
+            self._active -= 1
+            self._last_used = time.monotonic()
+            if error is not None and isinstance(error, duckdb.IOException) and self._draining is None:
+                self._draining = "error"
+            if self._draining is not None and self._active == 0:
+                self._close_locked(self._draining)
+
+    @contextmanager
+    def cursor(self):
+        """요청 1건 동안 쓸 읽기 전용 커서 (같은 스레드는 같은 커서를 재사용)"""
+        if not self.pooled:
+            con = self._connect()
+            try:
+                yield con
+            finally:
+                con.close()
+            return
+        cur = self._acquire()
+        try:
+            yield cur
+        except BaseException as e:
+            self._release(e)
+            raise
+        self._release()
+
+    def _start_watcher(self):
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name="duck-handle-watcher", daemon=True)
+            self._watcher.start()
+
+    def _watch(self):
+        """요청이 없는 동안에도 쓰기 예고/파일 교체/유휴 시간을 보고 핸들을 닫는다"""
+        while True:
+            time.sleep(DUCK_WATCH_INTERVAL)
+            with self._cond:
+                if self._conn is None:
+                    continue
+                reason = self._draining or self._stale_reason()
+                if reason is None and self._active == 0 and time.monotonic() - self._last_used > DUCK_IDLE_SECONDS:
+                    reason = "idle"
+                if reason is None:
+                    continue
+                if self._active == 0:
+                    self._close_locked(reason)
+                else:
+                    self._draining = reason
+
+    def close(self):
+        with self._cond:
+            while self._active:
+                self._cond.wait()
+            if self._conn is not None:
+                self._close_locked("idle")
+
+    def version(self):
+        """DB 파일(+WAL) 상태로 만든 스냅샷 버전 (쓰기마다 바뀜, DB를 열지 않아 쓰기 중에도 바로 응답)"""
+        return format(zlib.crc32(repr(self._file_signature()).encode()), "08x")
+
+    def metrics(self):
+        with self._cond:
+            out = {k: (dict(v) if isinstance(v, dict) else v) for k, v in self._metrics.items()}
+            out["open"] = self._conn is not None
+            out["active"] = self._active
+        out["wait_ms_total"] = round(out["wait_ms_total"], 3)
+        out["wait_ms_max"] = round(out["wait_ms_max"], 3)
+        out["wait_ms_avg"] = round(out["wait_ms_total"] / out["leases"], 3) if out["leases"] else 0.0
+        out["pooled"] = self.pooled
+        return out
+
+
+_handle = DuckHandle()
+
+
+def cursor():
+    return _handle.cursor()
+
+
+def version():
+    return _handle.version()
+
+
+def metrics():
+    return _handle.metrics()
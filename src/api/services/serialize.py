@@ -0,0 +1,105 @@
+import io
+
+JSON = "application/json"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+_ACCEPT = {
+    ARROW_STREAM: ARROW_STREAM,
+    PARQUET: PARQUET,
+    "application/x-parquet": PARQUET,
+}
+
+# TIMESTAMP -> datetime.isoformat()과 같은 문자열 (마이크로초가 0이면 생략)
+_ISO_TS = (
+    "CASE WHEN epoch_us({col}) % 1000000 = 0 THEN strftime({col}, '%Y-%m-%dT%H:%M:%S') "
+    "ELSE strftime({col}, '%Y-%m-%dT%H:%M:%S.%f') END"
+)
+
+
+class Payload:
+    """직렬화된 응답 본문 + media type (JSON이면 data 배열 본문). 페이지 조회면 다음 페이지 커서"""
+
+    __slots__ = ("media_type", "body", "next_cursor")
+
+    def __init__(self, media_type, body, next_cursor=None):
+        self.media_type = media_type
+        self.body = body
+        self.next_cursor = next_cursor
+
+
+def negotiate(accept):
+    """Accept 헤더 -> JSON / ARROW_STREAM / PARQUET (모르는 값은 JSON)"""
+    for token in (accept or "").split(","):
+        media = _ACCEPT.get(token.split(";")[0].strip().lower())
+        if media:
+            return media
+    return JSON
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _json_field(name, dtype, json_columns):
+    col = _quote(name)
+    if name in json_columns:
+        # 문자열로 저장된 JSON(top_streamers_detail 등)은 파싱 없이 그대로 끼워 넣는다 (없거나 깨지면 [])
+        return f"COALESCE(TRY_CAST({col} AS JSON), '[]'::JSON)"
+    if dtype.startswith("TIMESTAMP") and "TIME ZONE" not in dtype:
+        return _ISO_TS.format(col=col)
+    return col
+
+
+def json_rows(rel, json_columns=()):
+    """
+    DuckDB 관계 -> JSON 배열 bytes. 행을 DuckDB 안에서 to_json으로 만들고 Python은 이어 붙이기만 한다
+    (DataFrame/레코드 dict/셀 단위 변환 없음). 행 순서는 관계의 ORDER BY를 따른다.
+    """
+    fields = ", ".join(
+        f"{_quote(name)} := {_json_field(name, str(dtype), json_columns)}"
+        for name, dtype in zip(rel.columns, rel.types)
+    )
+    rows = rel.project(f"to_json(struct_pack({fields}))::VARCHAR").fetchall()
+    return ("[" + ",".join(row[0] for row in rows) + "]").encode("utf-8")
+
+
+def _arrow_body(table, media_type):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = io.BytesIO()
+    if media_type == PARQUET:
+        pq.write_table(table, sink, compression="zstd")
+    else:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue()
+
+
+def encode(rel, media_type=JSON, json_columns=()):
+    """
+    관계 -> Payload. Arrow/Parquet은 DuckDB Arrow 결과를 그대로 내보낸다
+    (JSON 문자열 컬럼도 문자열 그대로, 시각은 timestamp 타입).
+    """
+    if media_type == JSON:
+        return Payload(JSON, json_rows(rel, json_columns))
+    return Payload(media_type, _arrow_body(rel.to_arrow_table(), media_type))
+
+
+def empty(media_type=JSON):
+    """결과 없음 (잘못된 기간 등)"""
+    if media_type == JSON:
+        return Payload(JSON, b"[]")
+    import pyarrow as pa
+
+    return Payload(media_type, _arrow_body(pa.table({}), media_type))
+
+
+def wrap_data(payload):
+    """JSON data 배열 본문 -> {"data": [...], "next_cursor": ...} 응답 본문 (Arrow/Parquet은 그대로)"""
+    if payload.media_type != JSON:
+        return payload.body
+    if payload.next_cursor:
+        # 커서는 base64url이라 이스케이프할 문자가 없다
+        return b'{"data":' + payload.body + b',"next_cursor":"' + payload.next_cursor.encode("ascii") + b'"}'
+    return b'{"data":' + payload.body + b"}"
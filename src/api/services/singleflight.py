@@ -0,0 +1,82 @@
+import threading
+import time
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    같은 키로 동시에 들어온 호출을 하나로 합친다: 먼저 온 호출(leader)만 fn()을 실행하고,
+    실행 중에 온 호출(follower)은 그 결과(또는 예외)를 그대로 받는다. 끝난 뒤에 온 호출은 새로 실행한다(캐시 아님).
+    결과 객체는 follower와 공유되므로 호출 측에서 수정하지 않는다.
+    key[0]을 엔드포인트 이름으로 보고 엔드포인트별 지표를 모은다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._metrics = {}
+
+    def _stats(self, name):
+        stats = self._metrics.get(name)
+        if stats is None:
+            stats = self._metrics[name] = {
+                "calls": 0, "executions": 0, "coalesced": 0,
+                "queue_ms_total": 0.0, "queue_ms_max": 0.0, "exec_ms_total": 0.0,
+            }
+        return stats
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            stats = self._stats(key[0])
+            stats["calls"] += 1
+        started = time.perf_counter()
+        if not leader:
+            call.done.wait()
+            queued = (time.perf_counter() - started) * 1000
+            with self._lock:
+                stats["coalesced"] += 1
+                stats["queue_ms_total"] += queued
+                stats["queue_ms_max"] = max(stats["queue_ms_max"], queued)
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                stats["executions"] += 1
+                stats["exec_ms_total"] += (time.perf_counter() - started) * 1000
+            call.done.set()
+
+    def metrics(self):
+        with self._lock:
+            out = {name: dict(stats) for name, stats in self._metrics.items()}
+            out_inflight = len(self._calls)
+        for stats in out.values():
+            stats["coalescing_ratio"] = round(stats["coalesced"] / stats["calls"], 4) if stats["calls"] else 0.0
+            stats["queue_ms_avg"] = (
+                round(stats["queue_ms_total"] / stats["coalesced"], 3) if stats["coalesced"] else 0.0
+            )
+            stats["exec_ms_avg"] = (
+                round(stats["exec_ms_total"] / stats["executions"], 3) if stats["executions"] else 0.0
+            )
+            for name in ("queue_ms_total", "queue_ms_max", "exec_ms_total"):
+                stats[name] = round(stats[name], 3)
+        return {"inflight": out_inflight, "endpoints": out}
@@ -0,0 +1,259 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from src.api.services import dashboard, duck
+from src.storage import postgres as pg
+
+# 알림이 없을 때 변경을 확인하는 주기(초). Collector/Detector/Agent 알림이 오면 바로 확인한다.
+STREAM_POLL_SECONDS = float(os.getenv("STREAM_POLL_SECONDS", "5"))
+# 재연결 시 이어받을 수 있는 최근 메시지 수. 더 뒤처진 구독자는 전체 스냅샷부터 다시 받는다.
+STREAM_BACKLOG = int(os.getenv("STREAM_BACKLOG", "500"))
+# 메시지가 없을 때 연결 유지용 주석을 보내는 주기(초)
+STREAM_KEEPALIVE = float(os.getenv("STREAM_KEEPALIVE", "15"))
+# 이벤트 변경 시각(NOW() = 트랜잭션 시작 시각)이 커밋 순서와 어긋날 수 있어 이만큼(초) 겹쳐서 다시 조회
+STREAM_EVENT_LAG = float(os.getenv("STREAM_EVENT_LAG", "60"))
+STREAM_EVENT_LIMIT = 500
+# 첫 구독자가 첫 스냅샷을 기다리는 최대 시간(초)
+STREAM_READY_TIMEOUT = 10.0
+
+
+def _dumps(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _live_key(row):
+    return row["platform"], row["category_name"]
+
+
+def _live_changed(old, new):
+    # 스냅샷 시각만 바뀐 행은 보내지 않는다
+    return (
+        old is None
+        or old["viewers"] != new["viewers"]
+        or old["top_streamers_detail"] != new["top_streamers_detail"]
+    )
+
+
+def _changed_at(row):
+    return datetime.fromisoformat(row["changed_at"])
+
+
+class StreamHub:
+    """
+    /api/stream 공용 변경 피드. 업스트림(DuckDB 스냅샷, signal_events)은 프로세스당 스레드 하나가 확인하고,
+    변경은 SSE 메시지로 한 번만 직렬화해 최근 STREAM_BACKLOG개를 순번과 함께 보관한다.
+    구독자는 자기 순번 이후 메시지를 그대로 이어 보내므로 구독자 수만큼 조회/직렬화가 늘지 않는다.
+
+    - live: 새 스냅샷에서 시청자/Top 스트리머가 바뀐 카테고리(upserts)와 빠진 카테고리(removed).
+      full=true면 전체 목록 (첫 연결, 이어받기 불가 시)
+    - events: 추가되거나 갱신된 signal_events 행 (/api/events와 같은 형식 + changed_at)
+    메시지 id는 "<hub epoch>-<순번>"이고, 재연결 때 Last-Event-ID로 이어받는다.
+    """
+
+    def __init__(self, backlog=STREAM_BACKLOG, poll_seconds=STREAM_POLL_SECONDS):
+        self.epoch = format(int(time.time() * 1000), "x")
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._log = deque(maxlen=backlog)
+        self._live = {}
+        self._live_version = None
+        self._live_body = "[]"
+        self._events_cursor = None
+        self._events_sent = {}
+        self._subscribers = 0
+        self._loops = {}
+        self._active = threading.Event()
+        self._ready = threading.Event()
+        self._thread = None
+        self._metrics = {
+            "published": {"live": 0, "events": 0},
+            "resumed": 0,
+            "resets": 0,
+            "refreshes": 0,
+            "upstream_errors": 0,
+            "refresh_ms_last": 0.0,
+        }
+
+    # ---- 업스트림 (스레드 1개) ----
+
+    def _run(self):
+        listener = None
+        while True:
+            if not self._active.is_set():
+                # 구독자가 없으면 LISTEN 연결도 놓고 쉰다. 다시 구독하면 밀린 변경부터 반영한 뒤 응답
+                self._ready.clear()
+                if listener is not None:
+                    listener.close()
+                    listener = None
+                self._active.wait()
+            self.refresh()
+            self._ready.set()
+            if listener is None:
+                listener = pg.Listener(pg.SNAPSHOT_CHANNEL, pg.EVENTS_CHANNEL)
+            listener.wait(self.poll_seconds)
+
+    def refresh(self):
+        started = time.perf_counter()
+        for step in (self._refresh_live, self._refresh_events):
+            try:
+                step()
+            except Exception as e:
+                self._metrics["upstream_errors"] += 1
+                print(f"[API] stream {step.__name__} 실패: {e}")
+        self._metrics["refreshes"] += 1
+        self._metrics["refresh_ms_last"] = round((time.perf_counter() - started) * 1000, 3)
+
+    def _refresh_live(self):
+        version = duck.version()
+        if version == self._live_version:
+            return
+        rows = json.loads(dashboard.get_live_traffic().body)
+        current = {_live_key(row): row for row in rows}
+        first = self._live_version is None
+        upserts = [row for key, row in current.items() if _live_changed(self._live.get(key), row)]
+        removed = [{"platform": p, "category_name": c} for p, c in self._live if (p, c) not in current]
+        snapshots = {}
+        for row in rows:
+            snapshots[row["platform"]] = max(snapshots.get(row["platform"], ""), row["ts_utc"] or "")
+        with self._lock:
+            self._live, self._live_version = current, version
+            self._live_body = _dumps(rows)
+        if not first and (upserts or removed):
+            self.publish("live", {
+                "version": version, "full": False, "snapshots": snapshots,
+                "upserts": upserts, "removed": removed,
+            })
+
+    def _refresh_events(self):
+        first = self._events_cursor is None
+        if first:
+            self._events_cursor = dashboard.get_events_cursor()
+        rows = dashboard.get_changed_events(
+            self._events_cursor - timedelta(seconds=STREAM_EVENT_LAG), STREAM_EVENT_LIMIT
+        )
+        fresh = [row for row in rows if self._events_sent.get(row["event_id"]) != row["changed_at"]]
+        if rows:
+            self._events_cursor = max(self._events_cursor, _changed_at(rows[-1]))
+        for row in fresh:
+            self._events_sent[row["event_id"]] = row["changed_at"]
+        horizon = (self._events_cursor - timedelta(seconds=STREAM_EVENT_LAG)).isoformat()
+        self._events_sent = {k: v for k, v in self._events_sent.items() if v >= horizon}
+        if fresh and not first:
+            # 처음에는 겹침 구간의 기존 이벤트를 보낸 것으로만 기록 (목록은 /api/events로 받는다)
+            self.publish("events", {"data": fresh})
+
+    def publish(self, name, data):
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            self._log.append((seq, self._message(seq, name, _dumps(data))))
+            self._metrics["published"][name] += 1
+            loops = list(self._loops)
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._wake, loop)
+            except RuntimeError:
+                pass  # 닫힌 이벤트 루프
+
+    def _message(self, seq, name, body):
+        return f"id: {self.epoch}-{seq}\nevent: {name}\ndata: {body}\n\n".encode("utf-8")
+
+    # ---- 구독자 (이벤트 루프) ----
+
+    def _wake(self, loop):
+        state = self._loops.get(loop)
+        if state is not None:
+            old, state[0] = state[0], asyncio.Event()
+            old.set()
+
+    def _attach(self, loop):
+        with self._lock:
+            if loop not in self._loops:
+                self._loops[loop] = [asyncio.Event(), 0]
+            self._loops[loop][1] += 1
+            self._subscribers += 1
+            self._active.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stream-hub", daemon=True)
+                self._thread.start()
+
+    def _detach(self, loop):
+        with self._lock:
+            self._subscribers -= 1
+            self._loops[loop][1] -= 1
+            if self._loops[loop][1] == 0:
+                del self._loops[loop]
+            if self._subscribers == 0:
+                self._active.clear()
+
+    def _resume(self, last_id):
+        """(처음 보낼 메시지 목록, 마지막 순번). 이어받을 수 없으면 live 전체 스냅샷부터"""
+        with self._lock:
+            epoch, _, seq = (last_id or "").partition("-")
+            if epoch == self.epoch and seq.isdigit():
+                seq = int(seq)
+                oldest = self._log[0][0] if self._log else self._seq + 1
+                if oldest - 1 <= seq <= self._seq:
+                    self._metrics["resumed"] += 1
+                    return [body for s, body in self._log if s > seq], self._seq
+            if last_id:
+                self._metrics["resets"] += 1
+            body = f'{{"version":{_dumps(self._live_version)},"full":true,"upserts":{self._live_body},"removed":[]}}'
+            return [self._message(self._seq, "live", body)], self._seq
+
+    def _since(self, seq):
+        with self._lock:
+            if self._log and self._log[0][0] > seq + 1:
+                return None, self._seq  # 너무 뒤처짐 -> 전체 스냅샷부터
+            return [body for s, body in self._log if s > seq], self._seq
+
+    async def subscribe(self, last_id=None):
+        """SSE 본문 조각(bytes)을 내보내는 비동기 제너레이터. 연결이 끊기면(취소) 구독 해제"""
+        loop = asyncio.get_running_loop()
+        self._attach(loop)
+        try:
+            await loop.run_in_executor(None, self._ready.wait, STREAM_READY_TIMEOUT)
+            messages, seq = self._resume(last_id)
+            yield b"retry: 3000\n\n" + b"".join(messages)
+            while True:
+                changed = self._loops[loop][0]
+                messages, latest = self._since(seq)
+                if messages is None:
+                    messages, latest = self._resume(None)
+                    self._metrics["resets"] += 1
+                seq = latest
+                if messages:
+                    yield b"".join(messages)
+                    continue
+                try:
+                    await asyncio.wait_for(changed.wait(), STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+        finally:
+            self._detach(loop)
+
+    def metrics(self):
+        with self._lock:
+            out = {k: (dict(v) if isinstance(v, dict) else v) for k, v in self._metrics.items()}
+            out["subscribers"] = self._subscribers
+            out["seq"] = self._seq
+            out["backlog"] = len(self._log)
+            out["epoch"] = self.epoch
+        return out
+
+
+_hub = StreamHub()
+
+
+def subscribe(last_id=None):
+    return _hub.subscribe(last_id)
+
+
+def metrics():
+    return _hub.metrics()
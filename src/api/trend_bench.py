@@ -0,0 +1,109 @@
+"""
+/api/trend 직렬화 벤치마크: 이전 방식(DataFrame -> 레코드 dict -> json.dumps) vs DuckDB 관계 직접 직렬화.
+
+    python -m src.api.trend_bench --db data/analytics.db --hours 720 --repeat 5
+
+같은 조회를 이전 방식, JSON(DuckDB to_json), Arrow IPC stream, Parquet(zstd)으로 직렬화해
+응답 본문 생성 시간(p50), 할당 최고치(tracemalloc: Python 객체/numpy 배열, DuckDB 내부 버퍼는 제외), 본문 크기를 비교하고
+JSON 본문이 이전 방식과 바이트 단위로 같은지 확인한다. --points를 주면 다운샘플(lttb / avg) JSON도 함께 잰다.
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from src.api.routes.dashboard import _render
+from src.api.services import dashboard, duck, serialize
+
+
+def _legacy(category, hours):
+    """이전 /api/trend 경로 (fetchdf + 셀 단위 JSON 파싱 + 레코드 정규화)"""
+    since = datetime.utcnow() - timedelta(hours=hours)
+    with duck.cursor() as con:
+        df = con.execute(
+            """
+            SELECT ts_utc, platform, viewers, top_streamers_detail
+            FROM traffic_category_snapshot
+            WHERE category_name = ? AND ts_utc >= ?
+            ORDER BY ts_utc ASC, platform ASC
+            """,
+            [category, since],
+        ).df()
+    if not df.empty:
+        df["top_streamers_detail"] = df["top_streamers_detail"].apply(dashboard._parse_top_streamers)
+    return _render({"data": dashboard._df_to_records(df)})
+
+
+def _fast(category, hours, media_type, **sample):
+    return serialize.wrap_data(dashboard._trend_data(category, hours, None, None, media_type, **sample))
+
+
+def measure(fn, repeat):
+    """(본문, 지연 ms 배열, tracemalloc 최고치 bytes)"""
+    body = fn()
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - started) * 1000)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return body, np.array(latencies), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/api/trend 직렬화 벤치마크")
+    parser.add_argument("--db", default=duck.DUCK_PATH)
+    parser.add_argument("--hours", type=int, default=720)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--category", help="조회 카테고리 (기본: 구간 내 스냅샷 행이 가장 많은 카테고리)")
+    parser.add_argument("--points", type=int, help="다운샘플 목표 점 수 (플랫폼별)")
+    args = parser.parse_args()
+
+    duck._handle = duck.DuckHandle(args.db)
+    category = args.category
+    if category is None:
+        with duck.cursor() as con:
+            row = con.execute(
+                """
+                SELECT category_name FROM traffic_category_snapshot
+                WHERE ts_utc >= ? GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 1
+                """,
+                [datetime.utcnow() - timedelta(hours=args.hours)],
+            ).fetchone()
+        category = row[0] if row else ""
+
+    paths = [
+        ("legacy", lambda: _legacy(category, args.hours)),
+        ("json", lambda: _fast(category, args.hours, serialize.JSON)),
+        ("arrow", lambda: _fast(category, args.hours, serialize.ARROW_STREAM)),
+        ("parquet", lambda: _fast(category, args.hours, serialize.PARQUET)),
+    ]
+    if args.points:
+        paths += [
+            ("lttb", lambda: _fast(category, args.hours, serialize.JSON, points=args.points, mode="lttb")),
+            ("avg", lambda: _fast(category, args.hours, serialize.JSON, points=args.points, mode="avg")),
+        ]
+    print(f"[TrendBench] category={category!r} hours={args.hours}")
+    bodies = {}
+    for name, fn in paths:
+        body, latencies, peak = measure(fn, args.repeat)
+        bodies[name] = body
+        print(
+            f"[TrendBench] {name:>7} | p50 {np.percentile(latencies, 50):8.2f}ms "
+            f"| peak {peak / 1e6:7.2f}MB | body {len(body) / 1e6:7.3f}MB"
+        )
+    rows = len(json.loads(bodies["legacy"])["data"])
+    same = bodies["legacy"] == bodies["json"]
+    print(f"[TrendBench] 행 {rows}, JSON 본문 비교: {'일치' if same else '불일치'}")
+    duck._handle.close()
+    raise SystemExit(0 if same else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -93,7 +93,8 @@ def fetch_categories() -> List[Dict[str, Any]]:
     ts = get_utc_now()
     
     for cat_id, data in agg_data.items():
-        top_5 = sorted(data["streams"], key=lambda x: x["viewers"], reverse=True)[:5]
+        streams = sorted(data["streams"], key=lambda x: x["viewers"], reverse=True)
+        top_5 = streams[:5]
         
         results.append({
             "ts_utc": ts,
@@ -102,7 +103,9 @@ def fetch_categories() -> List[Dict[str, Any]]:
             "category_name": str(data["name"]),
             "viewers": int(data["total_viewers"]),
             "open_lives": int(data["lives"]),
-            "top_streamers_detail": top_5
+            "top_streamers_detail": top_5,
+            # 스트리머 단위 감지용 전체 방송 목록 (저장 시 STREAMER_MIN_VIEWERS 미만 제외)
+            "streams": streams,
         })
         
     print(f"[CHZZK] 수집 완료. 총 {len(results)}개 카테고리.")
@@ -4,6 +4,7 @@ import logging
 from src.collectors import soop, chzzk
 from src.storage.duckdb_store import DuckDBStore
 from src.notify.telegram_bot import send_telegram_message
+from src.storage import postgres as pg
 
 store = DuckDBStore()
 
@@ -14,6 +15,7 @@ def job_basic_collection():
     [통합 수집] 5분마다 실행
     """
     logging.info("[Runner] === 수집 시작 (%s) ===", time.strftime("%H:%M:%S"))
+    snapshots = {}
     
     try:
         data_soop = soop.fetch_categories()
@@ -27,18 +29,35 @@ def job_basic_collection():
                 soop_total,
             )
         else:
-            store.save_category_snapshot(data_soop)
+            snapshots["SOOP"] = store.save_category_snapshot(data_soop)
     except Exception as e:
         logging.exception("[Runner] SOOP 수집 실패: %s", e)
 
     try:
         data_chzzk = chzzk.fetch_categories()
-        store.save_category_snapshot(data_chzzk)
+        snapshots["CHZZK"] = store.save_category_snapshot(data_chzzk)
     except Exception as e:
         logging.exception("[Runner] CHZZK 수집 실패: %s", e)
-        
+
+    publish_snapshot_committed(snapshots)
     logging.info("[Runner] === 수집 종료 ===")
 
+def publish_snapshot_committed(snapshots):
+    """저장 완료된 스냅샷 시각을 Detector에 알림 (실패해도 Detector는 폴링으로 동작)"""
+    snapshots = {p: ts for p, ts in snapshots.items() if ts is not None}
+    if not snapshots:
+        return
+    payload = {
+        "epoch": max(snapshots.values()).isoformat(),
+        "snapshots": {p: ts.isoformat() for p, ts in snapshots.items()},
+        "committed_at": time.time(),
+    }
+    try:
+        pg.notify(pg.SNAPSHOT_CHANNEL, payload)
+        logging.info("[Runner] 스냅샷 커밋 알림 전송 epoch=%s", payload["epoch"])
+    except Exception as e:
+        logging.warning("[Runner] 스냅샷 커밋 알림 실패: %s", e)
+
 def job_health_check():
     """8시간마다 생존 신고"""
     logging.info("[System] 🏥 정기 생존 신고")
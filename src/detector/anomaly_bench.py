@@ -0,0 +1,196 @@
+"""
+카테고리 이상 점수(category_anomaly_state) 증분 갱신 벤치마크 + 결과 검증.
+
+    python -m src.detector.anomaly_bench --categories 50000 --ticks 60
+
+합성 카테고리(시청자 수 5 ~ 50만, 계수 잡음 + 곱셈 잡음, 1%는 3배 급등)를 5분 주기 스냅샷으로 만들어
+Collector와 같은 경로(_incoming -> DuckDBStore._update_anomaly_state)로 갱신 시간을 재고,
+numpy로 같은 점화식을 돌린 값과 최종 상태를 비교한다.
+끝으로 배수(x / 직전 EWM 평균 >= ratio)와 점수(>= score)가 급등이 아닌 샘플에서 울리는 비율(오탐)과
+급등 샘플에서 울리는 비율(재현율)을 카테고리 규모별로 출력한다.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from src.storage.duckdb_store import (
+    ABS_DEV_TO_SIGMA,
+    ANOMALY_ALPHA,
+    ANOMALY_MIN_SAMPLES,
+    DuckDBStore,
+)
+
+# 규모 구간 (직전 EWM 평균 기준)
+SIZE_BUCKETS = ((0, 100), (100, 1000), (1000, 10000), (10000, None))
+
+
+def synthesize(categories, ticks, seed=42):
+    """(ticks x categories) 시청자 수 행렬과 급등 마스크"""
+    rng = np.random.default_rng(seed)
+    base = np.exp(rng.uniform(np.log(5), np.log(500000), categories))
+    phase = np.sin(np.arange(ticks) / 288 * 2 * np.pi)[:, None]
+    mean = base * (1 + 0.3 * phase)
+    viewers = rng.poisson(mean * rng.uniform(0.92, 1.08, (ticks, categories))).astype(float)
+    spikes = rng.random((ticks, categories)) < 0.01
+    viewers[spikes] *= 3
+    return np.maximum(1, np.round(viewers)), spikes
+
+
+class Reference:
+    """_update_anomaly_state와 같은 점화식 (numpy, 검증용)"""
+
+    def __init__(self, first):
+        self.n = np.ones(len(first))
+        self.mean = first.copy()
+        self.var = np.zeros(len(first))
+        self.median = first.copy()
+        self.mad = np.zeros(len(first))
+        self.score = np.full(len(first), np.nan)
+        self.z = np.full(len(first), np.nan)
+
+    def update(self, x):
+        a = ANOMALY_ALPHA
+        scale = np.maximum(ABS_DEV_TO_SIGMA * self.mad, np.sqrt(np.maximum(self.median, 1)))
+        ready = self.n >= ANOMALY_MIN_SAMPLES
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.score = np.where(ready, (x - self.median) / scale, np.nan)
+            self.z = np.where(ready & (self.var > 0), (x - self.mean) / np.sqrt(self.var), np.nan)
+        d = x - self.mean
+        prev_mean = self.mean
+        self.mean = self.mean + a * d
+        self.var = (1 - a) * (self.var + a * d * d)
+        dev = x - self.median
+        self.median = self.median + a * scale * np.sign(dev)
+        self.mad = self.mad + a * (np.abs(dev) - self.mad)
+        self.n += 1
+        return prev_mean
+
+
+def load_tick(con, ts, names, values):
+    """Collector와 같이 _incoming을 스냅샷 1회분으로 채운다"""
+    con.execute("DELETE FROM _incoming")
+    con.execute(
+        """
+        INSERT INTO _incoming
+        SELECT ?, 'BENCH', UNNEST(?::VARCHAR[]), UNNEST(?::VARCHAR[]), UNNEST(?::INTEGER[]), 0, '[]'
+        """,
+        [ts, names, names, values],
+    )
+
+
+def fire_rates(ratio_hits, score_hits, sizes, spikes):
+    """규모 구간별 (하한, 상한, 샘플 수, [배수 오탐, 점수 오탐, 배수 재현율, 점수 재현율])"""
+    rate = lambda hits, mask: hits[mask].mean() if mask.any() else 0.0
+    out = []
+    for lo, hi in SIZE_BUCKETS:
+        bucket = (sizes >= lo) & (sizes < (hi if hi is not None else np.inf))
+        quiet, spiked = bucket & ~spikes, bucket & spikes
+        out.append((lo, hi, int(bucket.sum()), [
+            rate(ratio_hits, quiet), rate(score_hits, quiet),
+            rate(ratio_hits, spiked), rate(score_hits, spiked),
+        ]))
+    return out
+
+
+def run(categories, ticks, ratio, score_threshold):
+    viewers, spikes = synthesize(categories, ticks)
+    names = [f"cat{i}" for i in range(categories)]
+    workdir = tempfile.mkdtemp(prefix="anomaly_bench_")
+    os.environ["DB_PATH"] = os.path.join(workdir, "bench.db")
+    try:
+        store = DuckDBStore()
+        con = store._get_connection()
+        con.execute("CREATE TEMP TABLE _incoming AS SELECT * FROM traffic_category_snapshot LIMIT 0")
+        start = datetime(2026, 10, 1)
+        reference = None
+        elapsed = []
+        ratio_hits = np.zeros((ticks, categories), dtype=bool)
+        score_hits = np.zeros((ticks, categories), dtype=bool)
+        sizes = np.zeros((ticks, categories))
+        scored = np.zeros((ticks, categories), dtype=bool)
+        for t in range(ticks):
+            x = viewers[t]
+            load_tick(con, start + timedelta(minutes=5 * t), names, x.astype(int).tolist())
+            started = time.perf_counter()
+            con.execute("BEGIN TRANSACTION")
+            store._update_anomaly_state(con)
+            con.execute("COMMIT")
+            elapsed.append((time.perf_counter() - started) * 1000)
+            if reference is None:
+                reference = Reference(x)
+                continue
+            prev_mean = reference.update(x)
+            sizes[t] = prev_mean
+            ratio_hits[t] = x / prev_mean >= ratio
+            score_hits[t] = reference.score >= score_threshold
+            scored[t] = reference.n > ANOMALY_MIN_SAMPLES
+
+        state = con.execute(
+            """
+            SELECT CAST(substr(category_name, 4) AS INTEGER) AS i, sample_count,
+                   ewm_mean, ewm_var, ewm_median, ewm_mad, anomaly_score, ewm_z
+            FROM category_anomaly_state ORDER BY i
+            """
+        ).fetchnumpy()
+        size_mb = con.execute(
+            "SELECT SUM(total_blocks * block_size) / 1e6 FROM pragma_database_size()"
+        ).fetchone()[0]
+        con.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    def close(actual, expected):
+        actual = np.asarray(actual, dtype=float)
+        both = np.isnan(actual) & np.isnan(expected)
+        return both | np.isclose(actual, expected, rtol=1e-4, atol=1e-2)
+
+    checks = {
+        "sample_count": close(state["sample_count"], reference.n),
+        "ewm_mean": close(state["ewm_mean"], reference.mean),
+        "ewm_var": close(state["ewm_var"], reference.var),
+        "ewm_median": close(state["ewm_median"], reference.median),
+        "ewm_mad": close(state["ewm_mad"], reference.mad),
+        "anomaly_score": close(state["anomaly_score"], reference.score),
+        "ewm_z": close(state["ewm_z"], reference.z),
+    }
+    warm = np.sort(elapsed[1:])
+    print(
+        f"[AnomalyBench] 카테고리 {categories:,}개 x {ticks}회 | 갱신 중앙값 {np.median(warm):.1f}ms "
+        f"(p95 {warm[int(len(warm) * 0.95) - 1]:.1f}ms, 첫 INSERT {elapsed[0]:.1f}ms) | "
+        f"카테고리당 {np.median(warm) * 1000 / categories:.2f}us | DB {size_mb:.1f}MB"
+    )
+    ok = True
+    for name, matched in checks.items():
+        if not matched.all():
+            ok = False
+            print(f"[AnomalyBench] {name} 불일치 {int((~matched).sum())}건")
+    print(f"[AnomalyBench] numpy 점화식 비교: {'일치' if ok else '불일치'}")
+
+    print(f"[AnomalyBench] 발화율 (배수 >= {ratio:g} / 점수 >= {score_threshold:g}): 오탐 | 재현율")
+    for lo, hi, n, rates in fire_rates(ratio_hits[scored], score_hits[scored], sizes[scored], spikes[scored]):
+        label = f"{lo:,}~{hi:,}" if hi is not None else f"{lo:,}~"
+        fp_r, fp_s, tp_r, tp_s = (r * 100 for r in rates)
+        print(
+            f"  평균 {label:>13}명 {n:>9,}샘플 | 배수 {fp_r:6.2f}% 점수 {fp_s:6.2f}% "
+            f"| 배수 {tp_r:6.2f}% 점수 {tp_s:6.2f}%"
+        )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="카테고리 이상 점수 증분 갱신 벤치마크/검증")
+    parser.add_argument("--categories", type=int, default=50000)
+    parser.add_argument("--ticks", type=int, default=60, help="스냅샷 수 (5분 주기)")
+    parser.add_argument("--ratio", type=float, default=1.5, help="비교할 배수 임계값")
+    parser.add_argument("--score", type=float, default=6.0, help="비교할 점수 임계값")
+    args = parser.parse_args()
+    raise SystemExit(0 if run(args.categories, args.ticks, args.ratio, args.score) else 1)
+
+
+if __name__ == "__main__":
+    main()
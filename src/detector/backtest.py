@@ -0,0 +1,201 @@
+"""
+과거 구간 재생 백테스트.
+
+    python -m src.detector.backtest --start "2026-09-01 00:00" --end "2026-10-01 00:00" \
+        --set growth_threshold=1.5 --set major_top_n=8 --out events.jsonl
+
+구간 전체의 판정 입력을 윈도우 쿼리 한 번으로 계산(features.py)한 뒤, 수집 라운드마다
+실시간 경로와 같은 규칙(rules.py)·이벤트 수명(lifecycle.py)·이벤트 선별(select_events)을
+시뮬레이션 시계로 적용한다. 쿨타임/열린 이벤트는 메모리에서만 유지하며(분석은 바로 끝난 것으로 봄)
+Postgres/텔레그램에는 아무것도 쓰지 않는다.
+"""
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import duckdb
+import numpy as np
+
+from src.detector.cooldown import CooldownIndex
+from src.detector.features import collection_rounds, load_history_features
+from src.detector.lifecycle import LifecycleIndex, frame_observations
+from src.detector.rules import build_frame_columns
+from src.detector.signal_detector import (
+    DUCK_PATH,
+    RULES,
+    SEASONAL_BASELINE,
+    SEASONAL_MIN_SAMPLES,
+    select_events,
+)
+
+
+def _noop(*args, **kwargs):
+    pass
+
+
+def snapshot_times(duck, start, end):
+    """구간 안 플랫폼별 스냅샷 시각 (정렬)"""
+    rows = duck.execute(
+        """
+        SELECT DISTINCT platform, ts_utc
+        FROM traffic_category_snapshot
+        WHERE ts_utc BETWEEN ? AND ?
+        ORDER BY ts_utc
+        """,
+        [start, end],
+    ).fetchall()
+    by_platform = {}
+    for platform, ts in rows:
+        by_platform.setdefault(platform, []).append(ts)
+    return by_platform
+
+
+def round_indices(duck, frame, start, end):
+    """
+    수집 라운드별 (epoch, 프레임 행 인덱스) 목록. 각 라운드는 플랫폼별 epoch 이전 최신 스냅샷 행
+    (실시간 경로의 as_of 재생과 동일)이며, 직전 라운드와 스냅샷이 같으면 건너뛴다.
+    """
+    groups = {}
+    for i, key in enumerate(zip(frame["platform"], frame["ts_utc"])):
+        groups.setdefault(key, []).append(i)
+    groups = {key: np.array(idx, dtype=np.int64) for key, idx in groups.items()}
+
+    times = snapshot_times(duck, start, end)
+    positions = {platform: 0 for platform in times}
+    rounds = []
+    last_key = None
+    for epoch in collection_rounds(ts for values in times.values() for ts in values):
+        current = []
+        for platform, values in times.items():
+            pos = positions[platform]
+            while pos + 1 < len(values) and values[pos + 1] <= epoch:
+                pos += 1
+            positions[platform] = pos
+            if values[pos] <= epoch:
+                current.append((platform, values[pos]))
+        key = tuple(current)
+        if key == last_key:
+            continue
+        last_key = key
+        parts = [groups[k] for k in current if k in groups]
+        if parts:
+            rounds.append((epoch, np.concatenate(parts)))
+    return rounds
+
+
+def run_backtest(duck, start, end, rules=None, baseline=SEASONAL_BASELINE,
+                 min_samples=SEASONAL_MIN_SAMPLES, columns=None):
+    """
+    [start, end] 구간을 수집 라운드 단위로 재생해 발생했을 이벤트 목록과 실행 통계 반환.
+    columns: 미리 계산한 load_history_features 결과 (파라미터만 바꿔 반복 실행할 때 재사용)
+    """
+    rules = rules or RULES
+    started = time.perf_counter()
+    if columns is None:
+        columns = load_history_features(
+            duck, start, end, rules["min_absolute_delta"], profile=baseline == "profile"
+        )
+    feature_sec = time.perf_counter() - started
+
+    frame = build_frame_columns(columns, rules, min_samples)
+    rounds = round_indices(duck, frame, start, end)
+    cooldowns = CooldownIndex(None)
+    lifecycle = LifecycleIndex()
+    events = []
+    evaluated = reanalyses = 0
+    for epoch, idx in rounds:
+        flags = rules.classify({name: values[idx] for name, values in frame.items()})
+        cooldowns.advance(epoch)
+        updates = lifecycle.observe(frame_observations(lifecycle.keys(), flags), epoch, rules)
+        reanalyses += sum(u["requeue"] for u in updates)
+        lifecycle.mark_analyzed()
+        lifecycle.block(cooldowns)
+        for ev in select_events(flags, cooldowns, rules, log=_noop):
+            ev["ts"] = epoch
+            events.append(ev)
+            lifecycle.open(ev, epoch, analysis_status="DONE")
+        evaluated += len(idx)
+
+    stats = {
+        "rounds": len(rounds),
+        "rows": int(evaluated),
+        "reanalyses": int(reanalyses),
+        "feature_sec": round(feature_sec, 2),
+        "total_sec": round(time.perf_counter() - started, 2),
+    }
+    return events, stats
+
+
+def _parse_override(text):
+    name, _, value = text.partition("=")
+    if not value:
+        raise argparse.ArgumentTypeError(f"name=value 형식이어야 함: {text}")
+    number = float(value)
+    return name.strip(), int(number) if number.is_integer() and "." not in value else number
+
+
+def main():
+    parser = argparse.ArgumentParser(description="traffic_category_snapshot 과거 구간 감지 재생")
+    parser.add_argument("--db", default=DUCK_PATH)
+    parser.add_argument("--start", help="시작 시각 (기본: end - days)")
+    parser.add_argument("--end", help="끝 시각 (기본: 마지막 스냅샷)")
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--baseline", choices=["profile", "window"], default=SEASONAL_BASELINE)
+    parser.add_argument("--set", dest="overrides", action="append", type=_parse_override, default=[],
+                        help="임계값 덮어쓰기 (예: growth_threshold=1.5), 여러 번 지정 가능")
+    parser.add_argument("--out", help="이벤트 JSONL 저장 경로")
+    args = parser.parse_args()
+
+    rules = RULES.with_thresholds(**dict(args.overrides)) if args.overrides else RULES
+    duck = duckdb.connect(args.db, read_only=True)
+    try:
+        end = datetime.fromisoformat(args.end) if args.end else duck.execute(
+            "SELECT MAX(ts_utc) FROM traffic_category_snapshot"
+        ).fetchone()[0]
+        if end is None:
+            print("[Backtest] 데이터 없음")
+            return
+        start = datetime.fromisoformat(args.start) if args.start else end - timedelta(days=args.days)
+        events, stats = run_backtest(duck, start, end, rules=rules, baseline=args.baseline)
+    finally:
+        duck.close()
+
+    print(
+        f"[Backtest] {start} ~ {end} | 라운드 {stats['rounds']} | 평가 {stats['rows']}행 | "
+        f"피처 {stats['feature_sec']}s / 전체 {stats['total_sec']}s"
+    )
+    if args.overrides:
+        print(f"[Backtest] 임계값 덮어쓰기: {dict(args.overrides)}")
+    print(f"[Backtest] 이벤트 {len(events)}건 (열린 이벤트 재분석 {stats['reanalyses']}건)")
+    for label, counter in (
+        ("signal_level", Counter(ev["signal_level"] for ev in events)),
+        ("event_type", Counter(ev["event_type"] for ev in events)),
+        ("platform", Counter(ev["platform"] for ev in events)),
+    ):
+        print(f"  {label}: {dict(counter.most_common())}")
+    top = Counter((ev["platform"], ev["category"]) for ev in events).most_common(10)
+    for (platform, cat), n in top:
+        print(f"  {platform} {cat}: {n}건")
+
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            for ev in events:
+                f.write(json.dumps({
+                    "ts": ev["ts"].isoformat(),
+                    "platform": ev["platform"],
+                    "category": ev["category"],
+                    "signal_level": ev["signal_level"],
+                    "event_type": ev["event_type"],
+                    "analysis_status": ev["analysis_status"],
+                    "growth_rate": ev["growth_rate"],
+                    "cause_detail": ev["cause_detail"],
+                }, ensure_ascii=False, default=str) + "\n")
+        print(f"[Backtest] 저장: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import difflib
+import os
+import re
+import unicodedata
+
+import yaml
+
+from src.detector.rules import DETECTOR_RULES_PATH
+
+# 이름이 정확히 같지 않은 플랫폼 간 카테고리를 같은 키로 볼 최소 유사도 (difflib ratio)
+CATEGORY_MATCH_RATIO = float(os.getenv("CATEGORY_MATCH_RATIO", "0.9"))
+# 초기 색인에 쓰는 최근 카테고리 이름 구간(일)
+CATEGORY_INDEX_DAYS = int(os.getenv("CATEGORY_INDEX_DAYS", "14"))
+
+_STRIP = re.compile(r"[\W_]+", re.UNICODE)
+_DIGITS = re.compile(r"\d+")
+
+
+def normalize(name):
+    """NFKC + casefold + 공백/구두점 제거 ('League of Legends!' -> 'leagueoflegends')"""
+    return _STRIP.sub("", unicodedata.normalize("NFKC", name or "").casefold())
+
+
+def load_category_map(path=DETECTOR_RULES_PATH):
+    """settings.yaml detector.category_map (없으면 빈 dict)"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            config = (yaml.safe_load(f) or {}).get("detector") or {}
+    except OSError:
+        return {}
+    return config.get("category_map") or {}
+
+
+class CategoryIndex:
+    """
+    (platform, category_name) -> 플랫폼 공통 카테고리 키.
+
+    - aliases로 지정한 이름은 정규 이름의 키로 고정
+    - 정규화(normalize) 결과가 같으면 같은 키
+    - 그 밖에는 다른 플랫폼에만 있는 이름 중 유사도 match_ratio 이상인 가장 가까운 이름의 키
+      (숫자가 다르면 시리즈/연도가 다른 것으로 보고 매칭하지 않음)
+    - separate에 있는 이름(기타 등)은 플랫폼별로 따로 둔다
+    처음 보는 이름은 조회 시점에 이미 색인된 이름과 비교해 추가한다.
+    """
+
+    def __init__(self, aliases=None, separate=(), match_ratio=CATEGORY_MATCH_RATIO):
+        self.match_ratio = float(match_ratio)
+        self._alias = {}
+        for canonical, names in (aliases or {}).items():
+            for name in [canonical, *(names or [])]:
+                self._alias[normalize(name)] = normalize(canonical)
+        self._separate = {normalize(name) for name in separate or ()}
+        self._keys = {}        # (platform, name) -> key
+        self._norm_key = {}    # 정규화 이름 -> key
+        self._platforms = {}   # 정규화 이름 -> 그 이름이 있는 플랫폼 집합
+
+    @classmethod
+    def from_settings(cls, path=DETECTOR_RULES_PATH):
+        config = load_category_map(path)
+        return cls(
+            config.get("aliases"),
+            config.get("separate"),
+            config.get("match_ratio", CATEGORY_MATCH_RATIO),
+        )
+
+    def build(self, names):
+        """(platform, category_name) 목록 일괄 색인 (정렬 순서로 처리해 워커마다 같은 결과)"""
+        for platform, name in sorted(set(names)):
+            self.canonical(platform, name)
+        return self
+
+    def load(self, duck, source="traffic_category_snapshot", days=CATEGORY_INDEX_DAYS):
+        """DuckDB에 최근 days일 동안 나온 카테고리 이름으로 색인"""
+        rows = duck.execute(f"""
+            SELECT DISTINCT platform, category_name
+            FROM {source}
+            WHERE ts_utc >= (SELECT MAX(ts_utc) FROM {source}) - INTERVAL {int(days)} DAY
+        """).fetchall()
+        return self.build((p, c) for p, c in rows if c is not None)
+
+    def canonical(self, platform, name):
+        key = self._keys.get((platform, name))
+        if key is None:
+            key = self._keys[(platform, name)] = self._resolve(platform, name)
+        return key
+
+    def _resolve(self, platform, name):
+        norm = normalize(name)
+        if not norm or norm in self._separate:
+            return f"{platform}:{norm or name}"
+        key = self._alias.get(norm) or self._norm_key.get(norm) or self._fuzzy(platform, norm) or norm
+        self._norm_key.setdefault(norm, key)
+        self._platforms.setdefault(norm, set()).add(platform)
+        return key
+
+    def _fuzzy(self, platform, norm):
+        """다른 플랫폼에만 있는 이름 중 가장 가까운 이름의 키"""
+        digits = _DIGITS.findall(norm)
+        matcher = difflib.SequenceMatcher(None, b=norm)
+        best, best_ratio = None, self.match_ratio
+        for other, platforms in self._platforms.items():
+            if platform in platforms or other in self._separate or _DIGITS.findall(other) != digits:
+                continue
+            matcher.set_seq1(other)
+            if matcher.real_quick_ratio() < best_ratio or matcher.quick_ratio() < best_ratio:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= best_ratio:
+                best, best_ratio = other, ratio
+        return self._norm_key[best] if best is not None else None
+
+    def __len__(self):
+        return len(self._keys)
+
+
+def _primary_order(ev):
+    # 분석 대상(PENDING) > SPIKE > 증가량 큰 순
+    return (ev["analysis_status"] != "PENDING", ev["signal_level"] != "SPIKE", -ev["actual_delta"])
+
+
+def correlate_events(events, index):
+    """
+    같은 실행에서 나온 카테고리 이벤트 중 공통 키가 같고 플랫폼이 둘 이상인 묶음을 1건으로 병합.
+    대표 이벤트(_primary_order 첫 번째)에 나머지 플랫폼 이벤트를 cause_detail.correlated로 붙인다.
+    스트리머 이벤트는 그대로 둔다. 반환: 병합된 이벤트 목록 (처음 나온 순서 유지)
+    """
+    groups = {}
+    order = []
+    for ev in events:
+        if ev["event_type"] == "STREAMER_SPIKE":
+            order.append([ev])
+            continue
+        key = index.canonical(ev["platform"], ev["category"])
+        if key not in groups:
+            groups[key] = []
+            order.append(groups[key])
+        groups[key].append(ev)
+
+    merged = []
+    for group in order:
+        if len({ev["platform"] for ev in group}) < 2:
+            merged += group
+            continue
+        group = sorted(group, key=_primary_order)
+        primary = group[0]
+        detail = primary["cause_detail"]
+        detail["canonical_category"] = index.canonical(primary["platform"], primary["category"])
+        detail["correlated"] = [
+            {
+                "platform": ev["platform"],
+                "category": ev["category"],
+                "signal_level": ev["signal_level"],
+                "event_type": ev["event_type"],
+                "stats": ev["cause_detail"]["stats"],
+                "clues": ev["cause_detail"]["clues"][:1],
+            }
+            for ev in group[1:]
+        ]
+        detail["stats"]["platforms_current"] = sum(ev["cur_view"] for ev in group)
+        primary["platforms"] = [ev["platform"] for ev in group]
+        merged.append(primary)
+    return merged
@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from src.storage import postgres as pg
+
+
+def streamer_key(streamer_id):
+    """스트리머 이벤트의 쿨타임 키 (카테고리 키와 같은 인덱스를 공유)"""
+    return f"streamer:{streamer_id}"
+
+
+class CooldownIndex:
+    """
+    (platform, category 또는 streamer_key) -> 마지막 이벤트 시각 인메모리 인덱스.
+    실행당 한 번 signal_events에서 최대 쿨타임 구간만 읽고, 같은 실행에서 만든 이벤트는 record로 반영한다.
+    """
+
+    def __init__(self, now, last_seen=None):
+        self.now = now
+        self._last = dict(last_seen or {})
+
+    @classmethod
+    def load(cls, cur, minutes):
+        """가장 긴 쿨타임(minutes) 안의 이벤트 키 조회. 기준 시각은 DB 시계(NOW())."""
+        rows = pg.execute_prepared(cur, "cooldown_keys", (minutes,)).fetchall()
+        last_seen = {}
+        for _, platform, cat, streamer_id, ts in rows:
+            if platform is None:
+                continue
+            key = (platform, streamer_key(streamer_id) if streamer_id else cat)
+            if key not in last_seen or ts > last_seen[key]:
+                last_seen[key] = ts
+        return cls(rows[0][0], last_seen)
+
+    def advance(self, now):
+        """재생(backtest)용: 기준 시각을 시뮬레이션 시계로 이동"""
+        self.now = now
+
+    def active(self, platform, category, minutes):
+        last = self._last.get((platform, category))
+        return last is not None and last >= self.now - timedelta(minutes=minutes)
+
+    def record(self, platform, category, ts=None):
+        self._last[(platform, category)] = ts or self.now
+
+    def __len__(self):
+        return len(self._last)
@@ -0,0 +1,114 @@
+from datetime import timedelta
+
+import numpy as np
+
+from src.detector.rules import ROW_COLUMNS
+from src.storage.duckdb_store import SEASONAL_MAX_SAMPLES, SLOT_EXPR, SNAPSHOT_ROWS
+
+# 인접 스냅샷 시각 간격이 이보다 크면 새 수집 라운드 (플랫폼/페이지별 수 초 차이는 한 라운드)
+ROUND_GAP_SECONDS = 60
+
+# 실시간 BASELINE_QUERY의 창(60분/170~166h/26~22h)을 행 단위 RANGE 윈도우로 한 번에 계산.
+# 각 행 = "그 행의 시각이 플랫폼 최신 시각일 때" 실시간 경로가 만드는 값 (같은 이름 행 합산도 동일).
+HISTORY_FEATURE_QUERY = """
+    WITH src AS ({snapshot_rows}),
+    feat AS (
+        SELECT ts_utc, platform, category_name, viewers, open_lives, top_streamers_detail,
+               MEDIAN(viewers) OVER w60 AS median_60m,
+               FIRST_VALUE(viewers) OVER w60 AS view_1h_ago,
+               FIRST_VALUE(open_lives) OVER w60 AS open_1h_ago,
+               FIRST_VALUE(top_streamers_detail) OVER w60 AS top_1h_ago,
+               AVG(viewers) OVER w7d AS avg_7d,
+               AVG(viewers) OVER w24h AS avg_24h
+        FROM src
+        WINDOW
+            w60 AS (PARTITION BY platform, category_name ORDER BY ts_utc
+                    RANGE BETWEEN INTERVAL 60 MINUTE PRECEDING AND CURRENT ROW),
+            w7d AS (PARTITION BY platform, category_name ORDER BY ts_utc
+                    RANGE BETWEEN INTERVAL 170 HOUR PRECEDING AND INTERVAL 166 HOUR PRECEDING),
+            w24h AS (PARTITION BY platform, category_name ORDER BY ts_utc
+                     RANGE BETWEEN INTERVAL 26 HOUR PRECEDING AND INTERVAL 22 HOUR PRECEDING)
+    ){profile_cte}
+    SELECT f.ts_utc, f.platform, f.category_name, f.viewers, f.open_lives,
+           f.median_60m, f.view_1h_ago, f.open_1h_ago, f.top_1h_ago,
+           f.avg_7d, f.avg_24h, f.top_streamers_detail,
+           {profile_cols}
+    FROM feat f
+    {profile_join}
+    WHERE f.ts_utc BETWEEN TIMESTAMP '{start}' AND TIMESTAMP '{end}'
+      AND f.viewers >= {min_viewers}
+    ORDER BY f.ts_utc, f.platform
+"""
+
+# 시점 기준 계절 프로필: 같은 슬롯 최근 N개 샘플(현재 행 포함, 스냅샷당 1개)의 중앙값/MAD, 누적 샘플 수
+PROFILE_CTE = f""",
+    prof AS (
+        SELECT ts_utc, platform, category_name,
+               MEDIAN(viewers) OVER wp AS prof_median,
+               MAD(viewers) OVER wp AS prof_mad,
+               COUNT(viewers) OVER (
+                   PARTITION BY platform, category_name, {SLOT_EXPR.format(ts="ts_utc")}
+                   ORDER BY ts_utc ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+               ) AS prof_samples
+        FROM ({SNAPSHOT_ROWS.format(source="traffic_category_snapshot", where="ts_utc <= TIMESTAMP '{end}'")})
+        WHERE viewers IS NOT NULL
+        WINDOW wp AS (
+            PARTITION BY platform, category_name, {SLOT_EXPR.format(ts="ts_utc")}
+            ORDER BY ts_utc ROWS BETWEEN {SEASONAL_MAX_SAMPLES - 1} PRECEDING AND CURRENT ROW
+        )
+    )"""
+
+
+def load_history_features(duck, start, end, min_viewers, profile=True):
+    """
+    [start, end] 구간 모든 스냅샷 행의 판정 입력을 한 번의 윈도우 쿼리로 계산.
+    반환: ROW_COLUMNS + ts_utc + prof_* 컬럼 dict (build_frame_columns 입력 형식)
+    """
+    query = HISTORY_FEATURE_QUERY.format(
+        snapshot_rows=SNAPSHOT_ROWS.format(
+            source="traffic_category_snapshot",
+            where=f"ts_utc BETWEEN TIMESTAMP '{start}' - INTERVAL 170 HOUR AND TIMESTAMP '{end}'",
+        ),
+        start=start,
+        end=end,
+        min_viewers=min_viewers,
+        profile_cte=PROFILE_CTE.format(end=end) if profile else "",
+        profile_cols="p.prof_median, p.prof_mad, COALESCE(p.prof_samples, 0) AS prof_samples"
+        if profile else "NULL AS prof_median, NULL AS prof_mad, 0 AS prof_samples",
+        profile_join="""LEFT JOIN prof p
+      ON p.platform = f.platform AND p.category_name = f.category_name AND p.ts_utc = f.ts_utc"""
+        if profile else "",
+    )
+    df = duck.execute(query).df()
+    columns = {"ts_utc": np.array(df["ts_utc"].dt.to_pydatetime(), dtype=object)}
+    names = ("ts_utc",) + ROW_COLUMNS[:-1] + ("top_cur", "prof_median", "prof_mad", "prof_samples")
+    for name, col in zip(names[1:], df.columns[1:]):
+        series = df[col]
+        if series.dtype.kind in "fiu" and name not in ("open_now", "open_1h"):
+            columns[name] = series.to_numpy()
+        else:
+            # NULL은 None으로 (이벤트 JSON에 그대로 기록되는 값)
+            values = series.astype(object).where(series.notna(), None).to_numpy()
+            columns[name] = np.array(
+                [int(v) if isinstance(v, float) else v for v in values], dtype=object
+            ) if name in ("open_now", "open_1h") else values
+    columns["prof_mad"] = np.array(
+        [None if v is None or v != v else float(v) for v in columns["prof_mad"]], dtype=object
+    )
+    columns["prof_samples"] = np.asarray(columns["prof_samples"], dtype=np.int64)
+    return columns
+
+
+def collection_rounds(ts_values, gap_seconds=ROUND_GAP_SECONDS):
+    """
+    정렬된 스냅샷 시각들을 수집 라운드로 묶어 라운드별 epoch(라운드 마지막 시각) 목록 반환.
+    실시간 경로에서 Collector가 알림으로 보내는 epoch(max(스냅샷 시각))에 해당한다.
+    """
+    epochs = []
+    gap = timedelta(seconds=gap_seconds)
+    for ts in sorted(set(ts_values)):
+        if epochs and ts - epochs[-1] <= gap:
+            epochs[-1] = ts
+        else:
+            epochs.append(ts)
+    return epochs
@@ -0,0 +1,230 @@
+import json
+import os
+from datetime import timedelta
+
+from src.detector.cooldown import streamer_key
+from src.storage import postgres as pg
+
+# 이벤트 수명 단계. CLOSED 전까지는 같은 키에 새 이벤트를 만들지 않고 이 이벤트를 갱신한다.
+LIFECYCLE_STATES = ("ONSET", "ESCALATION", "PEAK", "DECAY", "CLOSED")
+# signal_events.timeline에 남기는 최근 관측 수 (5분 주기 24시간)
+LIFECYCLE_TIMELINE_POINTS = int(os.getenv("LIFECYCLE_TIMELINE_POINTS", "288"))
+
+_BUSY = ("PENDING", "IN_PROGRESS")
+# Agent가 판정과 관계없이 항상 건너뛰는 이벤트 유형 (src/agent/gates.py) -> 재분석하지 않음
+_NEVER_RESEARCHED = ("CATEGORY_ADOPTION",)
+
+
+def event_key(platform, category, streamer_id=None):
+    """쿨타임 인덱스와 같은 키"""
+    return (platform, streamer_key(streamer_id) if streamer_id else category)
+
+
+class LifecycleIndex:
+    """
+    열린 이벤트(lifecycle_state != CLOSED) 인메모리 인덱스: key -> 상태 dict.
+
+    실행마다 현재 관측(시청자 수, 기준선 대비 배수)으로 단계를 옮긴다.
+    - ESCALATION: 최고치 갱신 / PEAK: 최고치의 decay_ratio 이상 유지 / DECAY: 그 아래로 하락
+    - CLOSED: 기준선 대비 배수가 close_ratio 미만, close_minutes 동안 관측 없음, 또는 max_hours 경과
+    - 재분석: 분석이 끝난(게이트에서 SKIPPED 포함, CATEGORY_ADOPTION 제외) 이벤트가 분석 시점 대비 reanalyze_growth배·reanalyze_delta 이상 더 오르거나
+      CANDIDATE에서 SPIKE로 올라서면 PENDING으로 되돌린다 (그 밖의 갱신은 LLM을 다시 부르지 않음)
+    """
+
+    def __init__(self, events=None):
+        self._open = {}
+        self._blocked = {}
+        for ev in events or ():
+            self._add(ev)
+
+    @classmethod
+    def load(cls, cur):
+        events = []
+        for (event_id, platform, category, streamer_id, state, status, level, created_at,
+             last_seen_at, peak, analyzed, correlated, event_type) in pg.execute_prepared(cur, "open_events").fetchall():
+            events.append({
+                "event_id": event_id,
+                "key": event_key(platform, category, streamer_id),
+                "state": state,
+                "event_type": event_type,
+                "analysis_status": status,
+                "signal_level": level or "CANDIDATE",
+                "created_at": created_at,
+                "last_seen_at": last_seen_at or created_at,
+                "peak_viewers": peak or 0,
+                "analyzed_viewers": analyzed or peak or 0,
+                # 플랫폼 간 병합 이벤트에 묶인 다른 플랫폼 카테고리도 열린 동안 새 이벤트를 막는다
+                "also": [(c.get("platform"), c.get("category")) for c in correlated or []],
+            })
+        return cls(events)
+
+    def _add(self, ev):
+        self._open[ev["key"]] = ev
+        for key in ev.get("also") or ():
+            self._blocked[key] = ev["key"]
+
+    def open(self, ev, now, event_id=None, analysis_status=None):
+        """
+        새로 INSERT한 이벤트(select_events 결과 1건)를 ONSET으로 등록.
+        analysis_status: 재생(backtest)에서는 분석이 바로 끝난 것으로 보고 DONE을 넘긴다.
+        """
+        key = event_key(ev["platform"], ev["category"], ev.get("streamer_id"))
+        self._add({
+            "event_id": event_id,
+            "key": key,
+            "state": "ONSET",
+            "event_type": ev["event_type"],
+            "analysis_status": analysis_status or ev["analysis_status"],
+            "signal_level": ev["signal_level"],
+            "created_at": now,
+            "last_seen_at": now,
+            "peak_viewers": ev["cur_view"],
+            "analyzed_viewers": ev["cur_view"],
+            "also": [(c["platform"], c["category"]) for c in ev["cause_detail"].get("correlated", [])],
+        })
+
+    def block(self, cooldowns):
+        """열린 이벤트의 키는 쿨타임과 관계없이 새 이벤트를 만들지 않도록 쿨타임 인덱스에 기록"""
+        for platform, key in list(self._open) + list(self._blocked):
+            cooldowns.record(platform, key)
+
+    def keys(self):
+        return list(self._open)
+
+    def observe(self, observations, now, rules, owns=None):
+        """
+        observations: key -> (시청자, 기준선 대비 배수, SPIKE 여부, stats 패치). 없는 키는 이번에 관측되지 않음.
+        owns: 샤드 모드에서 이 워커가 갱신할 키인지 판정하는 함수
+        반환: signal_events에 반영할 갱신 목록 (CLOSED 된 이벤트는 인덱스에서 빠진다)
+        """
+        updates = []
+        close_after = timedelta(minutes=rules["lifecycle_close_minutes"])
+        max_age = timedelta(hours=rules["lifecycle_max_hours"])
+        for key, ev in list(self._open.items()):
+            if owns is not None and not owns(key):
+                continue
+            seen = observations.get(key)
+            requeue = False
+            if seen is None:
+                if now - ev["last_seen_at"] < close_after and now - ev["created_at"] < max_age:
+                    continue
+                viewers = ratio = level = stats = None
+                state = "CLOSED"
+            else:
+                viewers, ratio, spike, stats = seen
+                level = "SPIKE" if spike or ev["signal_level"] == "SPIKE" else "CANDIDATE"
+                if ratio < rules["lifecycle_close_ratio"] or now - ev["created_at"] >= max_age:
+                    state = "CLOSED"
+                elif viewers > ev["peak_viewers"]:
+                    state = "ESCALATION"
+                elif viewers >= ev["peak_viewers"] * rules["lifecycle_decay_ratio"]:
+                    state = "PEAK"
+                else:
+                    state = "DECAY"
+                if (
+                    state == "ESCALATION"
+                    and ev["analysis_status"] not in _BUSY
+                    and ev.get("event_type") not in _NEVER_RESEARCHED
+                ):
+                    analyzed = ev["analyzed_viewers"]
+                    requeue = (level == "SPIKE" and ev["signal_level"] != "SPIKE") or (
+                        viewers >= analyzed * rules["lifecycle_reanalyze_growth"]
+                        and viewers - analyzed >= rules["lifecycle_reanalyze_delta"]
+                    )
+                ev["last_seen_at"] = now
+                ev["peak_viewers"] = max(ev["peak_viewers"], viewers)
+                if requeue:
+                    ev["analyzed_viewers"] = viewers
+                    ev["analysis_status"] = "PENDING"
+                    ev["signal_level"] = level
+            ev["state"] = state
+            if state == "CLOSED":
+                self._close(key)
+            updates.append({
+                "event_id": ev["event_id"],
+                "key": key,
+                "state": state,
+                "viewers": viewers,
+                "ratio": ratio,
+                "requeue": requeue,
+                "signal_level": level,
+                "stats": stats,
+            })
+        return updates
+
+    def mark_analyzed(self):
+        """재생(backtest)용: 다시 PENDING이 된 이벤트의 분석이 바로 끝난 것으로 처리"""
+        for ev in self._open.values():
+            if ev["analysis_status"] == "PENDING":
+                ev["analysis_status"] = "DONE"
+
+    def _close(self, key):
+        self._open.pop(key, None)
+        self._blocked = {k: v for k, v in self._blocked.items() if v != key}
+
+    def __len__(self):
+        return len(self._open)
+
+
+def _stats(current, delta, growth, season):
+    """재분석 때 cause_detail.stats에 덮어쓸 값 (NaN은 None)"""
+    finite = lambda v: None if v != v else round(float(v), 2)
+    return {
+        "current": int(current),
+        "delta": int(round(delta)) if delta == delta else 0,
+        "growth_ratio": finite(growth),
+        "season_ratio": finite(season),
+    }
+
+
+def frame_observations(keys, flags, streamer_flags=None):
+    """
+    열린 이벤트 키(keys)만 골라 판정 프레임에서 관측값 추출.
+    카테고리: 계절 기준선 대비 배수 / 스트리머: 장기 기준선 대비 배수 (기준선 없으면 관측 없음)
+    """
+    keys = set(keys)
+    observations = {}
+    if not keys:
+        return observations
+    for i, key in enumerate(zip(flags["platform"], flags["category"])):
+        if key in keys:
+            season = float(flags["season_ratio"][i])
+            observations[key] = (
+                int(flags["cur_view"][i]), season, bool(flags["spike"][i]),
+                _stats(flags["cur_view"][i], flags["actual_delta"][i], flags["growth_ratio"][i], season),
+            )
+    if streamer_flags is not None:
+        for i, (platform, sid) in enumerate(zip(streamer_flags["platform"], streamer_flags["streamer_id"])):
+            key = (platform, streamer_key(sid))
+            season = float(streamer_flags["streamer_season_ratio"][i])
+            if key in keys and season == season:
+                observations[key] = (
+                    int(streamer_flags["viewers"][i]), season, bool(streamer_flags["streamer_spike"][i]),
+                    _stats(
+                        streamer_flags["viewers"][i], streamer_flags["streamer_delta"][i],
+                        streamer_flags["streamer_growth_ratio"][i], season,
+                    ),
+                )
+    return observations
+
+
+def apply_updates(cur, updates):
+    """observe 결과를 signal_events에 한 번에 반영 (prepared + 배열 unnest). 반영 건수 반환."""
+    updates = [u for u in updates if u["event_id"] is not None]
+    if not updates:
+        return 0
+    pg.execute_prepared(
+        cur,
+        "lifecycle_update",
+        (
+            [u["event_id"] for u in updates],
+            [u["state"] for u in updates],
+            [u["viewers"] for u in updates],
+            [u["ratio"] for u in updates],
+            [u["requeue"] for u in updates],
+            [u["signal_level"] for u in updates],
+            [json.dumps(u["stats"]) if u["stats"] else None for u in updates],
+            LIFECYCLE_TIMELINE_POINTS,
+        ),
+    )
+    return cur.rowcount
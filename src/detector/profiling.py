@@ -0,0 +1,94 @@
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+from src.storage import postgres as pg
+
+# 실행 기록 단계 (detector_runs.phases 키, 표시 순서)
+PHASES = (
+    "duckdb_query",   # 최신 시각 + 기준선 행 + 계절 프로필 조회
+    "build_frame",    # 행 -> 판정 컬럼 프레임
+    "classify",       # signal_rules (관심 집합/순위 포함)
+    "cooldown",       # 쿨타임 적재 + 검사
+    "lifecycle",      # 열린 이벤트 단계/최고치 갱신 + 재분석 판단
+    "contribution",   # Top 스트리머 JSON 기반 기여율/event_rules
+    "correlate",      # 플랫폼 간 같은 카테고리 동시 급등 병합
+    "insert",         # signal_events INSERT
+    "telegram",       # 즉시 알림 전송
+)
+
+
+class RunProfile:
+    """detect_spikes 1회 실행의 단계별 소요 시간(ms)과 건수 집계"""
+
+    def __init__(self, as_of=None, worker=None):
+        self.started_at = datetime.now()
+        self.as_of = as_of
+        self.worker = worker
+        self.snapshot = None
+        self.status = "ok"
+        self.error = None
+        self.phases = {}
+        self.counts = Counter()
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+    def count(self, name, n=1):
+        self.counts[name] += int(n)
+
+    def total_ms(self):
+        return (time.perf_counter() - self._t0) * 1000
+
+    def summary(self):
+        ordered = [name for name in PHASES if name in self.phases]
+        return " ".join(f"{name}={self.phases[name]:.0f}ms" for name in ordered)
+
+    def save(self, thresholds=None):
+        """detector_runs에 1행 기록 (실패해도 감지에는 영향 없음)"""
+        try:
+            with pg.connection() as conn:
+                conn.cursor().execute(
+                    """
+                    INSERT INTO detector_runs
+                        (started_at, as_of, snapshot, worker_slot, status, error,
+                         total_ms, phases, counts, thresholds)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s::jsonb, %s::jsonb, %s::jsonb)
+                    """,
+                    (
+                        self.started_at,
+                        self.as_of,
+                        self.snapshot,
+                        self.worker,
+                        self.status,
+                        self.error,
+                        round(self.total_ms(), 3),
+                        json.dumps({k: round(v, 3) for k, v in self.phases.items()}),
+                        json.dumps(dict(self.counts)),
+                        json.dumps(thresholds or {}),
+                    ),
+                )
+        except Exception as e:
+            print(f"[Detector] 실행 기록 저장 실패: {e}")
+
+
+class _NoProfile:
+    """프로파일 없이 호출될 때(백테스트/스윕)의 빈 구현"""
+
+    @contextmanager
+    def phase(self, name):
+        yield
+
+    def count(self, name, n=1):
+        pass
+
+
+NO_PROFILE = _NoProfile()
@@ -0,0 +1,227 @@
+"""
+감지 기준선 쿼리 벤치마크 + 결과 비교.
+
+    python -m src.detector.query_bench --days 30 180
+    python -m src.detector.query_bench --db data/analytics.db --ticks 48
+
+합성 데이터(기본) 또는 기존 DB에서 단일 스캔 BASELINE_QUERY와 이전 방식(구간별 4회 조인)의
+실행 시간을 재고, 여러 시점을 재생하며 결정적인 컬럼(현재값/60분 중앙값/7일·24시간 평균)이
+같은지 확인한다. 이전 방식의 1시간 전 값(FIRST)은 행 순서에 따라 달라지므로 비교에서 제외.
+이전 방식은 카테고리명이 같은 행을 그대로 내므로, 같은 규칙(SNAPSHOT_ROWS)으로 합친 입력에 실행한다.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import duckdb
+
+from src.detector.signal_detector import RULES, fetch_baseline_rows, fetch_last_ts
+from src.detector.state import _rows_match
+from src.storage.duckdb_store import SNAPSHOT_ROWS
+
+# 이전 방식: last_ts 이후 구간별 CTE 4개를 조인
+LEGACY_BASELINE_QUERY = """
+    WITH
+    last_ts AS (
+        SELECT platform, MAX(ts_utc) AS ts
+        FROM {source}
+        GROUP BY platform
+    ),
+    curr AS (
+        SELECT t.platform, t.category_name, t.viewers, t.open_lives, t.top_streamers_detail, t.ts_utc
+        FROM {source} t
+        JOIN last_ts lt ON t.platform = lt.platform AND t.ts_utc = lt.ts
+    ),
+    short_term AS (
+        SELECT t.platform, t.category_name, MEDIAN(t.viewers) as median_60m,
+               FIRST(t.viewers) as view_1h_ago, FIRST(t.open_lives) as open_1h_ago,
+               FIRST(t.top_streamers_detail) as top_1h_ago
+        FROM {source} t
+        JOIN last_ts lt ON t.platform = lt.platform
+        WHERE t.ts_utc BETWEEN lt.ts - INTERVAL 60 MINUTE
+                         AND lt.ts
+        GROUP BY t.platform, t.category_name
+    ),
+    seasonal_7d AS (
+        SELECT t.platform, t.category_name, AVG(t.viewers) as avg_7d
+        FROM {source} t
+        JOIN last_ts lt ON t.platform = lt.platform
+        WHERE t.ts_utc BETWEEN lt.ts - INTERVAL 170 HOUR
+                         AND lt.ts - INTERVAL 166 HOUR
+        GROUP BY t.platform, t.category_name
+    ),
+    seasonal_24h AS (
+        SELECT t.platform, t.category_name, AVG(t.viewers) as avg_24h
+        FROM {source} t
+        JOIN last_ts lt ON t.platform = lt.platform
+        WHERE t.ts_utc BETWEEN lt.ts - INTERVAL 26 HOUR
+                         AND lt.ts - INTERVAL 22 HOUR
+        GROUP BY t.platform, t.category_name
+    )
+    SELECT
+        c.platform, c.category_name, c.viewers, c.open_lives,
+        s.median_60m, s.view_1h_ago, s.open_1h_ago, s.top_1h_ago,
+        d7.avg_7d, d24.avg_24h,
+        c.top_streamers_detail
+    FROM curr c
+    LEFT JOIN short_term s ON c.platform = s.platform AND c.category_name = s.category_name
+    LEFT JOIN seasonal_7d d7 ON c.platform = d7.platform AND c.category_name = d7.category_name
+    LEFT JOIN seasonal_24h d24 ON c.platform = d24.platform AND c.category_name = d24.category_name
+    WHERE c.viewers >= {min_viewers}
+"""
+
+# BASELINE_QUERY 행에서 1시간 전 값(view_1h, open_1h, top_1h) 위치
+NONDETERMINISTIC = (5, 6, 7)
+
+
+def snapshot_source(source):
+    """이전 방식 입력: 같은 스냅샷의 같은 카테고리명 행을 BASELINE_QUERY와 같은 규칙으로 합친 source"""
+    return f"({SNAPSHOT_ROWS.format(source=source, where='TRUE')})"
+
+
+# 5분 주기, 플랫폼별 카테고리 수만큼 시간순으로 적재 (SOOP 절반은 1초 늦게 수집된 것으로)
+SYNTHETIC_QUERY = """
+    CREATE TABLE traffic_category_snapshot AS
+    WITH ticks AS (
+        SELECT ts + to_seconds(hash(ts) % 20) AS ts
+        FROM range(TIMESTAMP '{start}', TIMESTAMP '{end}', INTERVAL 5 MINUTE) r(ts)
+    ),
+    cats AS (
+        SELECT p.platform, c.i AS cat, 200 + hash(p.platform, c.i) % 40000 AS base
+        FROM (VALUES ('SOOP'), ('CHZZK')) p(platform), range({categories}) c(i)
+    ),
+    rows AS (
+        SELECT CASE WHEN c.platform = 'SOOP' AND c.cat >= {categories} // 2
+                    THEN t.ts + INTERVAL 1 SECOND ELSE t.ts END AS ts_utc,
+               c.platform, c.cat,
+               (c.base * (1 + 0.5 * sin(hour(t.ts) / 24 * 2 * pi())) * (0.85 + random() * 0.3)
+                * CASE WHEN random() < 0.01 THEN 4 ELSE 1 END)::INTEGER AS viewers
+        FROM ticks t, cats c
+        WHERE random() >= 0.03
+    ),
+    -- 7개 중 1개 카테고리는 같은 이름의 다른 category_id 행이 함께 수집된 것으로
+    dup AS (
+        SELECT ts_utc, platform, cat, cat::VARCHAR AS category_id, viewers FROM rows
+        UNION ALL
+        SELECT ts_utc, platform, cat, cat || '-alt', (viewers * (0.2 + random()))::INTEGER
+        FROM rows WHERE cat % 7 = 3
+    )
+    SELECT ts_utc, platform, category_id, 'cat' || cat AS category_name, viewers,
+           (1 + hash(ts_utc, category_id) % 80)::INTEGER AS open_lives,
+           '[{{"id": "s' || category_id || '", "viewers": ' || (viewers * 0.4)::INTEGER || '}}]'
+               AS top_streamers_detail
+    FROM dup
+    ORDER BY ts_utc, platform
+"""
+
+
+def synthesize(path, days, categories, end=datetime(2026, 10, 1, 12, 0)):
+    """days일치 합성 스냅샷으로 path에 새 DB 생성, 행 수 반환"""
+    con = duckdb.connect(path)
+    try:
+        con.execute("SELECT setseed(0.42)")
+        con.execute(SYNTHETIC_QUERY.format(
+            start=end - timedelta(days=days), end=end, categories=categories
+        ))
+        return con.execute("SELECT COUNT(*) FROM traffic_category_snapshot").fetchone()[0]
+    finally:
+        con.close()
+
+
+def replay_points(duck, ticks):
+    """최근 ticks개 + 전 구간에서 고르게 ticks개 스냅샷 시각"""
+    times = [r[0] for r in duck.execute(
+        "SELECT DISTINCT ts_utc FROM traffic_category_snapshot ORDER BY ts_utc"
+    ).fetchall()]
+    step = max(1, len(times) // ticks)
+    return sorted(set(times[-ticks:] + times[::step]))
+
+
+def compare(duck, points):
+    """시점별로 두 쿼리의 결정적 컬럼 비교, (비교 행 수, 불일치 시점 수) 반환"""
+    min_viewers = RULES["min_absolute_delta"]
+    rows = mismatches = 0
+    for ts in points:
+        source = f"(SELECT * FROM traffic_category_snapshot WHERE ts_utc <= TIMESTAMP '{ts}')"
+        expected = sorted(
+            duck.execute(LEGACY_BASELINE_QUERY.format(
+                source=snapshot_source(source), min_viewers=min_viewers
+            )).fetchall(),
+            key=lambda r: (r[0], r[1]),
+        )
+        actual = sorted(fetch_baseline_rows(duck, source=source), key=lambda r: (r[0], r[1]))
+        strip = lambda r: tuple(v for i, v in enumerate(r) if i not in NONDETERMINISTIC)
+        rows += len(expected)
+        if len(expected) != len(actual) or any(
+            not _rows_match(strip(e), strip(a)) for e, a in zip(expected, actual)
+        ):
+            mismatches += 1
+            print(f"[QueryBench] {ts} 불일치: legacy={len(expected)}행 new={len(actual)}행")
+    return rows, mismatches
+
+
+def timed(fn, repeat):
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def bench(duck, repeat):
+    """최신 시점 기준 두 쿼리 평균 실행 시간(ms)"""
+    legacy = LEGACY_BASELINE_QUERY.format(
+        source=snapshot_source("traffic_category_snapshot"), min_viewers=RULES["min_absolute_delta"]
+    )
+    return {
+        "legacy_ms": timed(lambda: duck.execute(legacy).fetchall(), repeat),
+        # 실시간 경로와 같이 최신 시각 조회 포함
+        "single_pass_ms": timed(lambda: fetch_baseline_rows(duck, last_rows=fetch_last_ts(duck)), repeat),
+    }
+
+
+def run(path, label, ticks, repeat):
+    duck = duckdb.connect(path, read_only=True)
+    try:
+        n = duck.execute("SELECT COUNT(*) FROM traffic_category_snapshot").fetchone()[0]
+        timing = bench(duck, repeat)
+        rows, mismatches = compare(duck, replay_points(duck, ticks))
+    finally:
+        duck.close()
+    print(
+        f"[QueryBench] {label} ({n:,}행) | legacy {timing['legacy_ms']:.1f}ms | "
+        f"single-pass {timing['single_pass_ms']:.1f}ms | 비교 {rows}행, 불일치 시점 {mismatches}건"
+    )
+    return mismatches == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="감지 기준선 쿼리 벤치마크/결과 비교")
+    parser.add_argument("--db", help="기존 DuckDB 파일 (미지정 시 합성 데이터)")
+    parser.add_argument("--days", type=float, nargs="+", default=[30, 180], help="합성 데이터 기간(일)")
+    parser.add_argument("--categories", type=int, default=60, help="합성 데이터 플랫폼별 카테고리 수")
+    parser.add_argument("--ticks", type=int, default=24, help="비교할 재생 시점 수")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.db:
+        ok = run(args.db, os.path.basename(args.db), args.ticks, args.repeat)
+        raise SystemExit(0 if ok else 1)
+
+    workdir = tempfile.mkdtemp(prefix="query_bench_")
+    ok = True
+    try:
+        for days in args.days:
+            path = os.path.join(workdir, f"synthetic_{days:g}d.db")
+            synthesize(path, days, args.categories)
+            ok = run(path, f"합성 {days:g}일", args.ticks, args.repeat) and ok
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
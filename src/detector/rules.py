@@ -0,0 +1,344 @@
+import os
+
+import numpy as np
+import yaml
+
+# 급등 판정 규칙/임계값 (config/settings.yaml의 detector 섹션)
+DETECTOR_RULES_PATH = os.getenv("DETECTOR_RULES_PATH", "config/settings.yaml")
+
+# settings.yaml에 없을 때의 기본 임계값. 같은 이름의 환경변수(대문자)가 있으면 우선한다.
+DEFAULT_THRESHOLDS = {
+    "min_absolute_delta": 1500,
+    "delta_ratio": 0.3,
+    "growth_threshold": 1.7,
+    "seasonal_threshold": 1.2,
+    "baseline_floor": 300,
+    "cooldown_minutes": 30,
+    "candidate_cooldown_minutes": 120,
+    "interest_growth": 1.2,
+    "interest_delta": 500,
+    "interest_top_n": 10,
+    "major_top_n": 12,
+    "person_contribution": 0.5,
+    "adoption_dominance": 0.85,
+    "market_open_delta": 3,
+    "market_top2_5_growth": 1.2,
+    "market_top2_5_delta": 500,
+    "person_min_growth": 2.0,
+    "person_min_delta": 1500,
+    "person_delta_ratio": 0.5,
+    "streamer_growth": 2.0,
+    "streamer_season_growth": 1.5,
+    "streamer_min_delta": 1000,
+    "streamer_baseline_floor": 100,
+    "streamer_min_samples": 4,
+    "streamer_cooldown_minutes": 60,
+    "lifecycle_decay_ratio": 0.85,
+    "lifecycle_close_ratio": 1.1,
+    "lifecycle_close_minutes": 30,
+    "lifecycle_max_hours": 12,
+    "lifecycle_reanalyze_growth": 1.5,
+    "lifecycle_reanalyze_delta": 3000,
+}
+# major_growth_threshold 미지정 시 growth_threshold에서 뺀 값 (주요 카테고리는 기본 배수보다 낮게)
+MAJOR_GROWTH_OFFSET = 0.2
+
+_COMPARE = {
+    ">=": np.greater_equal,
+    ">": np.greater,
+    "<=": np.less_equal,
+    "<": np.less,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+_ARITH = {"+": np.add, "-": np.subtract, "*": np.multiply, "/": np.divide}
+
+
+class RuleError(ValueError):
+    pass
+
+
+class RuleSet:
+    """
+    선언형 규칙 묶음. 규칙은 위에서부터 순서대로 전체 카테고리 배열에 한 번에 계산되고,
+    결과는 같은 이름의 컬럼으로 프레임에 추가되어 뒤 규칙에서 참조할 수 있다.
+
+    - when: [a, 비교연산자, b] / {all: [...]} / {any: [...]} / {not: ...}
+      {by_key: 조건} -> 같은 (platform, category) 행 중 하나라도 만족하면 True
+    - expr: 숫자·컬럼·임계값 이름, [a, 사칙연산자, b], {if: 조건, then: a, else: b}, {max|min: [...]}
+    - rank: {by, top, per, where} -> where를 만족하는 행 중 by 내림차순 상위 top (per 그룹별, 키 단위)
+    """
+
+    def __init__(self, thresholds, signal_rules, event_rules, candidate_reasons, streamer_rules=(),
+                 derived_major=False):
+        self.thresholds = dict(thresholds)
+        # major_growth_threshold를 growth_threshold에서 계산했는지 (설정/환경변수로 지정하지 않음)
+        self.derived_major = derived_major
+        self.signal_rules = list(signal_rules)
+        self.event_rules = list(event_rules)
+        self.candidate_reasons = list(candidate_reasons)
+        self.streamer_rules = list(streamer_rules)
+
+    def __getitem__(self, name):
+        return self.thresholds[name]
+
+    def with_thresholds(self, **overrides):
+        """
+        임계값 일부를 바꾼 새 RuleSet. major_growth_threshold가 계산값이면 growth_threshold를 따라 다시 계산
+        (직접 지정하면 그 값 사용)
+        """
+        unknown = set(overrides) - set(self.thresholds)
+        if unknown:
+            raise RuleError(f"알 수 없는 임계값: {sorted(unknown)}")
+        thresholds = dict(self.thresholds)
+        thresholds.update(overrides)
+        derived_major = self.derived_major and "major_growth_threshold" not in overrides
+        if derived_major:
+            thresholds["major_growth_threshold"] = float(thresholds["growth_threshold"]) - MAJOR_GROWTH_OFFSET
+        return RuleSet(
+            thresholds, self.signal_rules, self.event_rules, self.candidate_reasons, self.streamer_rules,
+            derived_major,
+        )
+
+    def classify(self, frame):
+        """build_frame 결과에 signal_rules 적용 (spike/candidate 등 bool 컬럼 추가)"""
+        return self._apply(self.signal_rules, frame)
+
+    def judge_events(self, frame):
+        """쿨타임을 통과한 후보 프레임에 event_rules 적용 (PERSON/시장 증거/점유 판정)"""
+        return self._apply(self.event_rules, frame)
+
+    def classify_streamers(self, frame):
+        """스트리머 기준선 프레임에 streamer_rules 적용 (streamer_spike bool 컬럼 추가)"""
+        return self._apply(self.streamer_rules, frame)
+
+    def _apply(self, rules, frame):
+        env = dict(frame)
+        n = _frame_len(frame)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for rule in rules:
+                name = rule["name"]
+                if "when" in rule:
+                    value = self._eval(rule["when"], env, n).astype(bool)
+                elif "expr" in rule:
+                    value = self._eval(rule["expr"], env, n)
+                elif "rank" in rule:
+                    value = self._rank(rule["rank"], env, n)
+                else:
+                    raise RuleError(f"규칙 {name}: when/expr/rank 중 하나가 필요")
+                env[name] = np.broadcast_to(np.asarray(value), (n,))
+        return env
+
+    def _eval(self, node, env, n):
+        if isinstance(node, (bool, int, float)):
+            return np.asarray(node)
+        if isinstance(node, str):
+            if node in env:
+                return np.asarray(env[node])
+            if node in self.thresholds:
+                return np.asarray(self.thresholds[node])
+            raise RuleError(f"알 수 없는 이름: {node}")
+        if isinstance(node, list) and len(node) == 3 and isinstance(node[1], str):
+            op = node[1]
+            if op in _COMPARE:
+                return _COMPARE[op](self._eval(node[0], env, n), self._eval(node[2], env, n))
+            if op in _ARITH:
+                return _ARITH[op](self._eval(node[0], env, n), self._eval(node[2], env, n))
+        if isinstance(node, dict):
+            if "all" in node:
+                out = np.ones(n, dtype=bool)
+                for sub in node["all"]:
+                    out &= self._eval(sub, env, n).astype(bool)
+                return out
+            if "any" in node:
+                out = np.zeros(n, dtype=bool)
+                for sub in node["any"]:
+                    out |= self._eval(sub, env, n).astype(bool)
+                return out
+            if "not" in node:
+                return ~self._eval(node["not"], env, n).astype(bool)
+            if "by_key" in node:
+                hit = np.broadcast_to(self._eval(node["by_key"], env, n).astype(bool), (n,))
+                if "key_id" not in env:
+                    return hit
+                key_id = np.asarray(env["key_id"])
+                return np.isin(key_id, key_id[hit])
+            if "if" in node:
+                return np.where(
+                    self._eval(node["if"], env, n).astype(bool),
+                    self._eval(node["then"], env, n),
+                    self._eval(node["else"], env, n),
+                )
+            if "max" in node:
+                return np.maximum.reduce([np.broadcast_to(self._eval(sub, env, n), (n,)) for sub in node["max"]])
+            if "min" in node:
+                return np.minimum.reduce([np.broadcast_to(self._eval(sub, env, n), (n,)) for sub in node["min"]])
+        raise RuleError(f"해석할 수 없는 규칙 식: {node!r}")
+
+    def _rank(self, spec, env, n):
+        by = np.broadcast_to(self._eval(spec["by"], env, n), (n,)).astype(float)
+        top = int(self._eval(spec["top"], env, n))
+        mask = np.ones(n, dtype=bool)
+        if "where" in spec:
+            mask &= np.broadcast_to(self._eval(spec["where"], env, n).astype(bool), (n,))
+        # 여러 실행(round_id)을 한 프레임으로 평가할 때는 실행별로 따로 순위
+        group = np.asarray(env["round_id"], dtype=np.int64) if "round_id" in env else np.zeros(n, dtype=np.int64)
+        if "per" in spec and n:
+            _, codes = np.unique(np.asarray(env[spec["per"]]), return_inverse=True)
+            group = group * (int(codes.max()) + 1) + codes.reshape(-1)
+
+        idx = np.flatnonzero(mask)
+        # sorted(reverse=True)와 같은 순서: 그룹별 값 내림차순, 동률은 원래 순서
+        order = idx[np.lexsort((idx, -by[idx], group[idx]))]
+        g = group[order]
+        starts = np.r_[0, np.flatnonzero(g[1:] != g[:-1]) + 1]
+        pos = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+        out = np.zeros(n, dtype=bool)
+        out[order[pos < top]] = True
+        if "key_id" in env:
+            # 같은 (platform, category) 행이 여럿이면 키 단위로 판정
+            key_id = np.asarray(env["key_id"])
+            out = np.isin(key_id, key_id[out])
+        return out
+
+
+def _frame_len(frame):
+    for value in frame.values():
+        return len(value)
+    return 0
+
+
+def _cast_env(name, default):
+    raw = os.getenv(name.upper())
+    if raw is None:
+        return default
+    return int(raw) if isinstance(default, int) and not isinstance(default, bool) else float(raw)
+
+
+def load_rules(path=DETECTOR_RULES_PATH):
+    """settings.yaml의 detector 섹션 로드. 임계값 우선순위: 환경변수 > settings.yaml > 기본값"""
+    with open(path, encoding="utf-8") as f:
+        config = (yaml.safe_load(f) or {}).get("detector") or {}
+    if not config.get("signal_rules"):
+        raise RuleError(f"{path}: detector.signal_rules 없음")
+
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    thresholds.update(config.get("thresholds") or {})
+    thresholds = {name: _cast_env(name, value) for name, value in thresholds.items()}
+    derived_major = False
+    if "major_growth_threshold" not in thresholds:
+        raw = os.getenv("MAJOR_GROWTH_THRESHOLD")
+        derived_major = raw is None
+        thresholds["major_growth_threshold"] = (
+            float(thresholds["growth_threshold"]) - MAJOR_GROWTH_OFFSET if derived_major else float(raw)
+        )
+    return RuleSet(
+        thresholds,
+        config["signal_rules"],
+        config.get("event_rules") or [],
+        config.get("candidate_reasons") or [],
+        config.get("streamer_rules") or [],
+        derived_major,
+    )
+
+
+# BASELINE_QUERY / BaselineState.current_rows 행 순서
+ROW_COLUMNS = (
+    "platform", "category", "cur_view", "open_now", "med_60m", "view_1h",
+    "open_1h", "top_1h", "avg_7d", "avg_24h", "top_cur",
+)
+
+
+def build_frame(rows, profiles, rules, min_samples, anomaly=None):
+    """
+    BASELINE_QUERY 행 + (platform, category) 프로필 dict -> 판정용 컬럼 프레임.
+    anomaly: (platform, category) -> (anomaly_score, ewm_z) (category_anomaly_state, 없으면 NaN)
+    """
+    columns = {name: list(col) for name, col in zip(ROW_COLUMNS, zip(*rows))} if rows else {
+        name: [] for name in ROW_COLUMNS
+    }
+    found = [profiles.get(key) for key in zip(columns["platform"], columns["category"])]
+    columns["prof_median"] = [p["median"] if p else None for p in found]
+    columns["prof_mad"] = [p["mad"] if p else None for p in found]
+    columns["prof_samples"] = [p["samples"] if p else 0 for p in found]
+    if anomaly:
+        scores = [anomaly.get(key, (None, None)) for key in zip(columns["platform"], columns["category"])]
+        columns["anomaly_score"] = [s for s, _ in scores]
+        columns["ewm_z"] = [z for _, z in scores]
+    return build_frame_columns(columns, rules, min_samples)
+
+
+def _num(values):
+    if isinstance(values, np.ndarray) and values.dtype.kind in "fiu":
+        return values.astype(float)
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+
+def _obj(values):
+    out = np.empty(len(values), dtype=object)
+    out[:] = list(values) if not isinstance(values, np.ndarray) else values
+    return out
+
+
+def build_frame_columns(columns, rules, min_samples):
+    """
+    컬럼 입력(ROW_COLUMNS + prof_median/prof_mad/prof_samples [+ anomaly_score/ewm_z]) -> 판정용 프레임.
+    기준선 선택(프로필 > 7d > 24h > 현재x0.8)과 baseline_floor 미만 제외까지 반영한다.
+    그 밖의 입력 컬럼(ts_utc 등)은 그대로 같은 행만 남겨 전달.
+    """
+    cur = _num(columns["cur_view"])
+    keys = list(zip(columns["platform"], columns["category"]))
+    key_ids = {}
+    key_id = np.array([key_ids.setdefault(key, len(key_ids)) for key in keys], dtype=np.int64)
+    prof_median = _num(columns["prof_median"])
+    prof_samples = _num(columns["prof_samples"])
+    d7 = _num(columns["avg_7d"])
+    d24 = _num(columns["avg_24h"])
+
+    # 값이 있고 0이 아니면 사용 (기존 truthy 판정과 동일)
+    use_profile = (np.nan_to_num(prof_median) != 0) & (prof_samples >= min_samples)
+    use_7d = ~use_profile & (np.nan_to_num(d7) != 0)
+    use_24h = ~use_profile & ~use_7d & (np.nan_to_num(d24) != 0)
+    seasonal_base = np.select(
+        [use_profile, use_7d, use_24h], [prof_median, d7, d24], default=cur * 0.8
+    )
+    baseline_source = np.select(
+        [use_profile, use_7d, use_24h], ["profile", "7d", "24h"], default="fallback"
+    ).astype(object)
+
+    med = _num(columns["med_60m"])
+    med = np.where(np.nan_to_num(med) != 0, med, cur * 0.8)
+    view = _num(columns["view_1h"])
+    view = np.where(np.nan_to_num(view) != 0, view, cur * 0.8)
+
+    keep = np.flatnonzero(~(seasonal_base < rules["baseline_floor"]))
+    seasonal_base = seasonal_base[keep]
+    cur = cur[keep]
+    med = med[keep]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth_ratio = np.where(med > 0, cur / med, 0.0)
+        season_ratio = np.where(seasonal_base > 0, cur / seasonal_base, 0.0)
+    frame = {
+        name: _obj(values)[keep] for name, values in columns.items()
+        if name not in ("cur_view", "med_60m", "view_1h", "avg_7d", "avg_24h",
+                        "prof_median", "prof_mad", "prof_samples", "anomaly_score", "ewm_z")
+    }
+    missing = [None] * len(columns["cur_view"])
+    frame.update({
+        "key_id": key_id[keep],
+        "cur_view": np.asarray(columns["cur_view"], dtype=np.int64)[keep],
+        "view_1h": view[keep],
+        "med_60m": med,
+        "seasonal_base": seasonal_base,
+        "baseline_source": baseline_source[keep],
+        "season_mad": _obj(columns["prof_mad"])[keep],
+        "season_samples": _obj(columns["prof_samples"])[keep],
+        "growth_ratio": growth_ratio,
+        "season_ratio": season_ratio,
+        "anomaly_score": _num(columns.get("anomaly_score", missing))[keep],
+        "ewm_z": _num(columns.get("ewm_z", missing))[keep],
+        "dynamic_delta_req": np.maximum(rules["min_absolute_delta"], seasonal_base * rules["delta_ratio"]),
+        "actual_delta": np.maximum(0, np.round(cur - seasonal_base)).astype(np.int64),
+    })
+    return frame
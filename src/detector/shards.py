@@ -0,0 +1,181 @@
+import math
+import os
+import zlib
+
+import numpy as np
+import psycopg2
+
+from src.storage import postgres as pg
+
+# (platform, category) 키 해시 공간(32bit)을 나누는 샤드 수. 1이면 단일 노드.
+DETECTOR_SHARDS = int(os.getenv("DETECTOR_SHARDS", "1"))
+# 동시에 살아 있을 수 있는 최대 워커 수 (멤버 슬롯 수)
+DETECTOR_MAX_WORKERS = int(os.getenv("DETECTOR_MAX_WORKERS", "32"))
+
+# pg_advisory_lock(key1, key2)의 key1 네임스페이스
+SHARD_LOCK_NS = 0x53500001
+MEMBER_LOCK_NS = 0x53500002
+
+
+def key_hash(platform, category):
+    return zlib.crc32(f"{platform}\x1f{category}".encode("utf-8"))
+
+
+def shard_of(platform, category, shards=DETECTOR_SHARDS):
+    """키 해시의 연속 구간 단위 샤드 번호 (shard i = [i*2^32/n, (i+1)*2^32/n))"""
+    return key_hash(platform, category) * shards >> 32
+
+
+def shard_mask(platforms, categories, owned, shards=DETECTOR_SHARDS):
+    """owned 샤드에 속한 행 bool 마스크"""
+    ids = np.array([shard_of(p, c, shards) for p, c in zip(platforms, categories)], dtype=np.int64)
+    return np.isin(ids, list(owned))
+
+
+class ShardLease:
+    """
+    Postgres 세션 advisory lock으로 샤드를 임대하는 워커 멤버십.
+
+    - 워커는 멤버 슬롯 하나와 샤드 여러 개를 전용 연결(풀 밖, autocommit)의 세션 락으로 잡는다.
+      워커가 죽어 연결이 끊기면 락이 풀리고, 다른 워커가 다음 실행에서 넘겨받는다.
+    - acquire(): 실행 시작 시 공정 몫(ceil(샤드 수 / 멤버 수))까지 빈 샤드를 잡는다.
+    - adopt(): 자기 몫을 처리한 뒤에도 비어 있는 샤드(죽은 워커 몫, 방금 반납된 몫)를 모두 넘겨받는다.
+      주인 없는 샤드가 한 라운드도 비지 않게 하면서, 덜 가진 워커가 먼저 가져갈 기회를 준다.
+    - release_excess(): 실행 끝에 공정 몫을 넘는 샤드를 놓는다.
+    - 샤드별 처리 완료 스냅샷을 detector_shards에 기록해, 라운드 중간에 넘겨받은 샤드를
+      같은 스냅샷으로 다시 처리하지 않는다.
+    """
+
+    def __init__(self, shards=DETECTOR_SHARDS, max_workers=DETECTOR_MAX_WORKERS):
+        self.shards = shards
+        self.max_workers = max_workers
+        self.conn = None
+        self.slot = None
+        self.owned = set()
+
+    def _connect(self):
+        conn = psycopg2.connect(pg.PG_DSN)
+        conn.autocommit = True
+        cur = conn.cursor()
+        for slot in range(self.max_workers):
+            cur.execute("SELECT pg_try_advisory_lock(%s, %s)", (MEMBER_LOCK_NS, slot))
+            if cur.fetchone()[0]:
+                self.conn, self.slot, self.owned = conn, slot, set()
+                print(f"[Shard] 워커 슬롯 {slot} 참여 (샤드 {self.shards}개)")
+                return
+        conn.close()
+        raise RuntimeError(f"빈 워커 슬롯 없음 (DETECTOR_MAX_WORKERS={self.max_workers})")
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+        self.conn, self.slot, self.owned = None, None, set()
+
+    def _members(self, cur):
+        cur.execute(
+            """
+            SELECT COUNT(*) FROM pg_locks
+            WHERE locktype = 'advisory' AND granted AND classid = %s::oid AND objsubid = 2
+              AND database = (SELECT oid FROM pg_database WHERE datname = current_database())
+            """,
+            (MEMBER_LOCK_NS,),
+        )
+        return max(1, cur.fetchone()[0])
+
+    def _pending(self, cur, shards, snapshot):
+        """shards 중 snapshot을 아직 처리하지 않은 샤드"""
+        cur.execute(
+            "SELECT shard FROM detector_shards WHERE shard = ANY(%s) AND snapshot >= %s",
+            (sorted(shards), snapshot),
+        )
+        return frozenset(shards) - {row[0] for row in cur.fetchall()}
+
+    def _take(self, cur, limit):
+        """슬롯 위치에서부터 훑어(워커마다 다른 구간부터) 빈 샤드를 limit개까지 잡고, 새로 잡은 샤드 반환"""
+        taken = set()
+        start = self.slot * self.shards // self.max_workers
+        for k in range(self.shards):
+            if len(self.owned) >= limit:
+                break
+            shard = (start + k) % self.shards
+            if shard in self.owned:
+                continue
+            cur.execute("SELECT pg_try_advisory_lock(%s, %s)", (SHARD_LOCK_NS, shard))
+            if cur.fetchone()[0]:
+                self.owned.add(shard)
+                taken.add(shard)
+        return taken
+
+    def acquire(self, snapshot):
+        """
+        공정 몫까지 빈 샤드를 잡고, 보유 샤드 중 snapshot을 아직 처리하지 않은 샤드 집합 반환.
+        연결 실패 시 None (이번 실행 건너뜀).
+        """
+        try:
+            if self.conn is None or self.conn.closed:
+                self.close()
+                self._connect()
+            cur = self.conn.cursor()
+            self._take(cur, math.ceil(self.shards / self._members(cur)))
+            return self._pending(cur, self.owned, snapshot)
+        except Exception as e:
+            print(f"[Shard] 샤드 임대 실패 (이번 실행 건너뜀): {e}")
+            self.close()
+            return None
+
+    def adopt(self, snapshot):
+        """남은 빈 샤드를 모두 잡고, 그중 snapshot을 아직 처리하지 않은 샤드 집합 반환"""
+        if self.conn is None:
+            return frozenset()
+        try:
+            cur = self.conn.cursor()
+            taken = self._take(cur, self.shards)
+            return self._pending(cur, taken, snapshot) if taken else frozenset()
+        except Exception as e:
+            print(f"[Shard] 빈 샤드 인수 실패: {e}")
+            self.close()
+            return frozenset()
+
+    def complete(self, snapshot, shards):
+        """shards를 snapshot까지 처리 완료로 기록 (락을 놓기 전에 호출)"""
+        try:
+            self.conn.cursor().execute(
+                """
+                INSERT INTO detector_shards (shard, snapshot, worker_slot, updated_at)
+                SELECT s, %s, %s, NOW() FROM unnest(%s::int[]) AS s
+                ON CONFLICT (shard) DO UPDATE
+                SET snapshot = GREATEST(detector_shards.snapshot, EXCLUDED.snapshot),
+                    worker_slot = EXCLUDED.worker_slot,
+                    updated_at = EXCLUDED.updated_at
+                """,
+                (snapshot, self.slot, sorted(shards)),
+            )
+        except Exception as e:
+            print(f"[Shard] 처리 기록 실패: {e}")
+            self.close()
+
+    def held(self):
+        """처리 결과를 쓰기 직전: 락을 잡은 세션이 아직 살아 있는지"""
+        try:
+            self.conn.cursor().execute("SELECT 1")
+            return True
+        except Exception:
+            self.close()
+            return False
+
+    def release_excess(self):
+        """공정 몫을 넘는 샤드 반납 (번호가 큰 것부터)"""
+        if self.conn is None:
+            return
+        try:
+            cur = self.conn.cursor()
+            fair = math.ceil(self.shards / self._members(cur))
+            for shard in sorted(self.owned, reverse=True)[:max(0, len(self.owned) - fair)]:
+                cur.execute("SELECT pg_advisory_unlock(%s, %s)", (SHARD_LOCK_NS, shard))
+                self.owned.discard(shard)
+        except Exception as e:
+            print(f"[Shard] 샤드 반납 실패: {e}")
+            self.close()
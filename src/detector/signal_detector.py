@@ -1,7 +1,6 @@
 import time
 import schedule
 import duckdb
-import psycopg2
 import os
 import requests
 import json
@@ -9,88 +8,203 @@ import numpy as np
 import logging
 from datetime import datetime, timedelta
 from src.notify.telegram_bot import send_telegram_message
+from src.detector.state import BaselineState
+from src.detector.category_map import CategoryIndex, correlate_events
+from src.detector.cooldown import CooldownIndex, streamer_key
+from src.detector.rules import build_frame, load_rules
+from src.detector.lifecycle import LifecycleIndex, apply_updates, frame_observations
+from src.detector.shards import DETECTOR_SHARDS, ShardLease, shard_mask, shard_of
+from src.detector.profiling import NO_PROFILE, RunProfile
+from src.detector.streamer import build_streamer_frame, fetch_streamer_rows, select_streamer_events
+from src.storage import postgres as pg
+from src.storage.duckdb_store import SNAPSHOT_AGG
 
 DUCK_PATH = os.getenv("DB_PATH", "data/analytics.db")
-_default_pg_host = "postgres" if os.path.exists("/.dockerenv") else "localhost"
-PG_HOST = os.getenv("POSTGRES_HOST", _default_pg_host)
-PG_PORT = os.getenv("POSTGRES_PORT", "5432")
-PG_DSN = (
-    f"host={PG_HOST} port={PG_PORT} "
-    f"dbname={os.getenv('POSTGRES_DB', 'streampulse_meta')} "
-    f"user={os.getenv('POSTGRES_USER', 'user')} "
-    f"password={os.getenv('POSTGRES_PASSWORD', 'password')}"
-)
 AGENT_URL = "http://agent:8000/analyze"
 
-MIN_ABSOLUTE_DELTA = 1500   # 최소 증가량 (하한선)
-DELTA_RATIO = 0.3           # 동적 델타 비율 (30%)
-GROWTH_THRESHOLD = 1.7      # 1.7배 (단기 급등)
-SEASONAL_THRESHOLD = 1.2    # 1.2배 (장기 추세 대비)
-COOLDOWN_MINUTES = 30       # 재알림 금지
-CANDIDATE_COOLDOWN_MINUTES = int(os.getenv("CANDIDATE_COOLDOWN_MINUTES", "120"))
-BASELINE_FLOOR = 300        # 기준 시청자 하한선
-INTEREST_GROWTH = float(os.getenv("INTEREST_GROWTH", "1.2"))
-INTEREST_DELTA = int(os.getenv("INTEREST_DELTA", "500"))
-INTEREST_TOP_N = int(os.getenv("INTEREST_TOP_N", "10"))
-MAJOR_TOP_N = int(os.getenv("MAJOR_TOP_N", "12"))
-MAJOR_GROWTH_THRESHOLD = float(
-    os.getenv("MAJOR_GROWTH_THRESHOLD", str(GROWTH_THRESHOLD - 0.2))
-)
+# 판정 임계값/규칙: config/settings.yaml (환경변수로 개별 임계값 덮어쓰기 가능)
+RULES = load_rules()
 ALERT_MODE = os.getenv("DETECTOR_ALERT_MODE", "post_research")
+# sql: 매 실행 전체 창 재조회 / stateful: 인메모리 기준선 증분 갱신
+DETECTOR_MODE = os.getenv("DETECTOR_MODE", "sql")
+DETECTOR_STATE_PATH = os.getenv("DETECTOR_STATE_PATH", "state/detector_state.pkl")
+# profile: 요일x시 계절 프로필 중앙값 우선 / window: 7일·24시간 전 ±2시간 평균만 사용
+SEASONAL_BASELINE = os.getenv("SEASONAL_BASELINE", "profile")
+SEASONAL_MIN_SAMPLES = int(os.getenv("SEASONAL_MIN_SAMPLES", "24"))
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+# notify: Collector 스냅샷 커밋 알림(LISTEN)으로 즉시 실행, 알림 없으면 폴링 / poll: 5분 타이머만
+DETECTOR_TRIGGER = os.getenv("DETECTOR_TRIGGER", "notify")
+DETECTOR_POLL_SECONDS = int(os.getenv("DETECTOR_POLL_SECONDS", "300"))
 
-def get_pg_conn():
-    return psycopg2.connect(PG_DSN)
+_baseline_state = None
+_last_snapshot = None
+_category_index = None
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
 def init_db():
     """Postgres 테이블 초기화"""
     try:
-        conn = get_pg_conn()
-        cur = conn.cursor()
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS signal_events (
-                event_id SERIAL PRIMARY KEY,
-                created_at TIMESTAMP DEFAULT NOW(),
-                platform VARCHAR(20),
-                category_name VARCHAR(100),
-                event_type VARCHAR(50), 
-                growth_rate FLOAT,
-                cause_detail JSONB,
-                analysis_status VARCHAR(20),
-                analysis_tier VARCHAR(10),
-                spike_reason TEXT,
-                entity_keywords JSONB,
-                context_cache_key TEXT
-            );
-            CREATE INDEX IF NOT EXISTS idx_cool ON signal_events (platform, category_name, created_at);
-            CREATE INDEX IF NOT EXISTS idx_signal_events_created_at ON signal_events (created_at DESC);
-        """)
-        cur.execute("ALTER TABLE signal_events ADD COLUMN IF NOT EXISTS analysis_status VARCHAR(20)")
-        cur.execute("ALTER TABLE signal_events ADD COLUMN IF NOT EXISTS analysis_tier VARCHAR(10)")
-        cur.execute("ALTER TABLE signal_events ADD COLUMN IF NOT EXISTS spike_reason TEXT")
-        cur.execute("ALTER TABLE signal_events ADD COLUMN IF NOT EXISTS entity_keywords JSONB")
-        cur.execute("ALTER TABLE signal_events ADD COLUMN IF NOT EXISTS context_cache_key TEXT")
-        conn.commit()
-        conn.close()
+        with pg.connection() as conn:
+            cur = conn.cursor()
+            pg.ensure_signal_events(cur)
+            cur.execute("""
+                -- detect_spikes 실행별 단계 소요 시간/건수 (src/detector/profiling.py)
+                CREATE TABLE IF NOT EXISTS detector_runs (
+                    run_id SERIAL PRIMARY KEY,
+                    started_at TIMESTAMP,
+                    as_of TIMESTAMP,
+                    snapshot TIMESTAMP,
+                    worker_slot INT,
+                    status VARCHAR(20),
+                    error TEXT,
+                    total_ms FLOAT,
+                    phases JSONB,
+                    counts JSONB,
+                    thresholds JSONB
+                );
+                CREATE INDEX IF NOT EXISTS idx_detector_runs_started_at ON detector_runs (started_at DESC);
+                -- 샤드 워커별 처리 완료 스냅샷 (src/detector/shards.py)
+                CREATE TABLE IF NOT EXISTS detector_shards (
+                    shard INT PRIMARY KEY,
+                    snapshot TIMESTAMP,
+                    worker_slot INT,
+                    updated_at TIMESTAMP DEFAULT NOW()
+                );
+            """)
+            # /api/insights-period 일별 이벤트 수 요약: 지난 날짜만 API가 이어서 채운다 (오늘은 원본에서 집계)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS signal_event_daily (
+                    day DATE NOT NULL,
+                    platform VARCHAR(20),
+                    event_type VARCHAR(50),
+                    n INT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_signal_event_daily_day ON signal_event_daily (day);
+            """)
     except Exception as e:
         print(f"[Detector] DB Init Fail: {e}")
 
-def check_cooldown(platform, category, minutes):
-    """쿨타임 체크 (30분)"""
+def _db_now(fallback):
+    """DB 시계(NOW()). 조회 실패 시 fallback"""
     try:
-        conn = get_pg_conn()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT 1 FROM signal_events
-            WHERE platform = %s AND category_name = %s
-              AND created_at >= NOW() - INTERVAL '%s minutes'
-        """, (platform, category, minutes))
-        exists = cur.fetchone()
-        conn.close()
-        return exists is not None
+        return pg.query("SELECT NOW()::timestamp")[1][0][0]
     except Exception:
-        return False
+        return fallback
+
+def load_cooldowns(as_of):
+    """
+    실행당 1회: 가장 긴 쿨타임 구간의 이벤트 키를 인메모리 인덱스로 적재.
+    조회 실패 시 빈 인덱스. 기준 시각은 DB 시계, DB에 닿지 않으면 as_of(판정 스냅샷 시각).
+    """
+    minutes = max(
+        RULES["cooldown_minutes"], RULES["candidate_cooldown_minutes"], RULES["streamer_cooldown_minutes"]
+    )
+    try:
+        with pg.connection() as conn:
+            return CooldownIndex.load(conn.cursor(), minutes)
+    except Exception as e:
+        print(f"[Detector] 쿨타임 조회 실패 (쿨타임 없이 진행): {e}")
+        return CooldownIndex(_db_now(as_of))
+
+def load_lifecycle():
+    """실행당 1회: 열린 이벤트 적재"""
+    try:
+        with pg.connection() as conn:
+            return LifecycleIndex.load(conn.cursor())
+    except Exception as e:
+        print(f"[Detector] 열린 이벤트 조회 실패 (수명 갱신 없이 진행): {e}")
+        return LifecycleIndex()
+
+def update_lifecycle(lifecycle, flags, streamer_flags, cooldowns, profile=NO_PROFILE, owns=None):
+    """
+    열린 이벤트를 현재 관측으로 갱신(단계/최고치/시계열, 큰 추가 상승이면 재분석)한 뒤
+    아직 열린 키는 새 이벤트를 만들지 않도록 쿨타임 인덱스에 기록.
+    """
+    with profile.phase("lifecycle"):
+        observations = frame_observations(lifecycle.keys(), flags, streamer_flags)
+        updates = lifecycle.observe(observations, cooldowns.now, RULES, owns)
+        lifecycle.block(cooldowns)
+        if updates:
+            try:
+                with pg.connection() as conn:
+                    cur = conn.cursor()
+                    if apply_updates(cur, updates):
+                        pg.notify(pg.EVENTS_CHANNEL, {"updated": len(updates)}, cur)
+            except Exception as e:
+                print(f"[Detector] 이벤트 수명 갱신 실패: {e}")
+                return
+    for u in updates:
+        profile.count(f"lifecycle_{u['state'].lower()}")
+        if u["requeue"]:
+            profile.count("reanalysis")
+            print(f"[Detector] 재분석 요청 | {u['key'][0]} {u['key'][1]} | 시청자={u['viewers']} ({u['state']})")
+        elif u["state"] == "CLOSED":
+            print(f"[Detector] 이벤트 종료 | {u['key'][0]} {u['key'][1]}")
+
+def insert_events(events):
+    """실행 끝에 감지 이벤트를 한 번에 INSERT (prepared + 배열 unnest). 성공 건수 반환."""
+    if not events:
+        return 0
+    try:
+        with pg.connection() as conn:
+            cur = conn.cursor()
+            pg.execute_prepared(
+                cur,
+                "insert_events",
+                (
+                    [ev["platform"] for ev in events],
+                    [ev["category"] for ev in events],
+                    [ev["event_type"] for ev in events],
+                    [float(ev["growth_rate"]) for ev in events],
+                    [json.dumps(ev["cause_detail"]) for ev in events],
+                    [ev["analysis_status"] for ev in events],
+                    [ev["analysis_tier"] for ev in events],
+                    [ev.get("streamer_id") for ev in events],
+                    [int(ev["cur_view"]) for ev in events],
+                ),
+            )
+            pg.notify(pg.EVENTS_CHANNEL, {"inserted": len(events)}, cur)
+    except Exception as e:
+        print(f"❌ Alert Fail: {e}")
+        return 0
+    for ev in events:
+        print(
+            f"[Detector] DB INSERT | {ev['platform']} {ev['category']} | "
+            f"signal_level={ev['signal_level']} status={ev['analysis_status']}"
+        )
+    return len(events)
+
+def send_spike_alert(ev):
+    clue_list = ev["clues"]
+    top_streamer_name = clue_list[0].get("name", "Unknown") if clue_list else "Unknown"
+    if ev["event_type"] == "STREAMER_SPIKE":
+        msg = (
+            f"🚨 **[스트리머 급등] {ev['platform']}**\n"
+            f"스트리머: `{top_streamer_name}` ({ev['category']})\n"
+            f"현재 시청자: {ev['cur_view']:,}명\n"
+            f"증가량: +{ev['actual_delta']:,}명\n"
+            f"방송 중 평소: {int(round(ev['seasonal_base'])):,}명"
+        )
+        try:
+            send_telegram_message(msg)
+            logging.info("🚨 [Telegram] %s 스트리머 알림 전송 완료", top_streamer_name)
+        except Exception as e:
+            print(f"❌ Alert Fail: {e}")
+        return
+    msg = (
+        f"🚨 **[급등 감지] {'+'.join(ev.get('platforms') or [ev['platform']])}**\n"
+        f"카테고리: `{ev['category']}`\n"
+        f"현재 시청자: {ev['cur_view']:,}명\n"
+        f"증가량: +{ev['actual_delta']:,}명\n"
+        f"기준 시청자: {int(round(ev['seasonal_base'])):,}명\n"
+        f"핵심 원인: {top_streamer_name}"
+    )
+    try:
+        send_telegram_message(msg)
+        logging.info("🚨 [Telegram] %s 알림 전송 완료", ev["category"])
+    except Exception as e:
+        print(f"❌ Alert Fail: {e}")
 
 def calculate_contribution(cur_view, past_view, cur_top_json, past_top_json):
     """
@@ -141,313 +255,504 @@ def sum_top2_5_viewers(top_list):
         return 0
     return sum(int(item.get("viewers", 0) or 0) for item in top_list[1:5])
 
-def detect_spikes():
-    ts = time.strftime("%H:%M:%S")
-    print(f"\n[Detector] 🔍 V3 로직 분석 시작 ({ts})")
-    
-    try:
-        duck = duckdb.connect(DUCK_PATH, read_only=True)
-        try:
-            last_rows = duck.execute(
-                "SELECT platform, MAX(ts_utc) AS ts FROM traffic_category_snapshot GROUP BY platform"
-            ).fetchall()
-            if not last_rows:
-                print("[Detector] 데이터 부족.")
-                return
+def cooldown_minutes(flags, i, rules=None):
+    rules = rules or RULES
+    return rules["cooldown_minutes"] if flags["spike"][i] else rules["candidate_cooldown_minutes"]
 
-            # 스파이크 판정을 위한 기준선/단기/장기 지표를 한 번에 조회
-            query = f"""
-        WITH 
-        -- 0. 플랫폼별 최신 시각
-        last_ts AS (
-            SELECT platform, MAX(ts_utc) AS ts
-            FROM traffic_category_snapshot
-            GROUP BY platform
-        ),
-        -- 1. 현재 데이터 (플랫폼별 최신 스냅샷)
-        curr AS (
-            SELECT t.platform, t.category_name, t.viewers, t.open_lives, t.top_streamers_detail, t.ts_utc
-            FROM traffic_category_snapshot t
-            JOIN last_ts lt ON t.platform = lt.platform AND t.ts_utc = lt.ts
-        ),
-        -- 2. 단기 베이스라인 (직전 60분 중앙값)
-        short_term AS (
-            SELECT t.platform, t.category_name, MEDIAN(t.viewers) as median_60m, 
-                   FIRST(t.viewers) as view_1h_ago, FIRST(t.open_lives) as open_1h_ago,
-                   FIRST(t.top_streamers_detail) as top_1h_ago
-            FROM traffic_category_snapshot t
-            JOIN last_ts lt ON t.platform = lt.platform
-            WHERE t.ts_utc BETWEEN lt.ts - INTERVAL 60 MINUTE 
-                             AND lt.ts
-            GROUP BY t.platform, t.category_name
-        ),
-        -- 3. 장기 베이스라인 A (7일 전, 동일 시간대 ±2시간)
-        seasonal_7d AS (
-            SELECT t.platform, t.category_name, AVG(t.viewers) as avg_7d
-            FROM traffic_category_snapshot t
-            JOIN last_ts lt ON t.platform = lt.platform
-            WHERE t.ts_utc BETWEEN lt.ts - INTERVAL 170 HOUR 
-                             AND lt.ts - INTERVAL 166 HOUR
-            GROUP BY t.platform, t.category_name
-        ),
-        -- 4. 장기 베이스라인 B (전날 동일 시간대 ±2시간)
-        seasonal_24h AS (
-            SELECT t.platform, t.category_name, AVG(t.viewers) as avg_24h
-            FROM traffic_category_snapshot t
-            JOIN last_ts lt ON t.platform = lt.platform
-            WHERE t.ts_utc BETWEEN lt.ts - INTERVAL 26 HOUR 
-                             AND lt.ts - INTERVAL 22 HOUR
-            GROUP BY t.platform, t.category_name
+def event_features(flags, idx):
+    """
+    신호 행(idx)의 Top 스트리머 JSON을 풀어 event_rules 입력(기여율/점유율/시장 지표) 프레임 생성.
+    임계값과 무관하므로 스윕에서는 전체 행에 대해 한 번만 계산한다.
+    """
+    contribution, total_delta, clues = [], [], []
+    top1, open_delta, top2_5_cur, top2_5_base = [], [], [], []
+    for i in idx:
+        cur_view = flags["cur_view"][i]
+        _, ratio, clue_list = calculate_contribution(
+            cur_view, flags["view_1h"][i], flags["top_cur"][i], flags["top_1h"][i]
         )
-        SELECT 
-            c.platform, c.category_name, c.viewers, c.open_lives,
-            s.median_60m, s.view_1h_ago, s.open_1h_ago, s.top_1h_ago,
-            d7.avg_7d, d24.avg_24h,
-            c.top_streamers_detail
-        FROM curr c
-        LEFT JOIN short_term s ON c.platform = s.platform AND c.category_name = s.category_name
-        LEFT JOIN seasonal_7d d7 ON c.platform = d7.platform AND c.category_name = d7.category_name
-        LEFT JOIN seasonal_24h d24 ON c.platform = d24.platform AND c.category_name = d24.category_name
-        WHERE c.viewers >= {MIN_ABSOLUTE_DELTA}
-        """
-        
-            rows = duck.execute(query).fetchall()
-        finally:
-            duck.close()
-
-        records = []
-        print(f"[Detector] DuckDB 분석 대상 {len(rows)}건")
-        for row in rows:
-            platform, cat, cur_view, open_now, med_60m, view_1h, open_1h, top_1h, avg_7d, avg_24h, top_cur = row
-
-            if avg_7d:
-                seasonal_base = avg_7d
-            elif avg_24h:
-                seasonal_base = avg_24h
-            else:
-                seasonal_base = cur_view * 0.8
-
-            if not med_60m:
-                med_60m = cur_view * 0.8
-            if not view_1h:
-                view_1h = cur_view * 0.8
-
-            if seasonal_base < BASELINE_FLOOR:
-                continue
-
-            dynamic_delta_req = max(MIN_ABSOLUTE_DELTA, seasonal_base * DELTA_RATIO)
-            actual_delta = max(0, int(round(cur_view - seasonal_base)))
-            growth_ratio = cur_view / med_60m if med_60m > 0 else 0.0
-            season_ratio = cur_view / seasonal_base if seasonal_base > 0 else 0.0
-
-            records.append({
-                "platform": platform,
-                "category": cat,
-                "cur_view": cur_view,
-                "open_now": open_now,
-                "med_60m": med_60m,
-                "view_1h": view_1h,
-                "open_1h": open_1h,
-                "top_1h": top_1h,
-                "seasonal_base": seasonal_base,
-                "growth_ratio": growth_ratio,
-                "season_ratio": season_ratio,
-                "dynamic_delta_req": dynamic_delta_req,
-                "actual_delta": actual_delta,
-                "top_cur": top_cur,
-            })
-
-        major_set = set()
-        by_platform = {}
-        for rec in records:
-            by_platform.setdefault(rec["platform"], []).append(rec)
-        for platform, recs in by_platform.items():
-            recs_sorted = sorted(recs, key=lambda r: r["seasonal_base"], reverse=True)
-            for rec in recs_sorted[:MAJOR_TOP_N]:
-                major_set.add((platform, rec["category"]))
-
-        interest_keys = set()
-        for rec in records:
-            if rec["growth_ratio"] >= INTEREST_GROWTH and rec["actual_delta"] >= INTEREST_DELTA:
-                interest_keys.add((rec["platform"], rec["category"]))
-        delta_candidates = [r for r in records if r["actual_delta"] > 0]
-        ratio_candidates = [r for r in records if r["growth_ratio"] > 1.0 and r["actual_delta"] > 0]
-        top_by_delta = sorted(delta_candidates, key=lambda r: r["actual_delta"], reverse=True)[:INTEREST_TOP_N]
-        top_by_ratio = sorted(ratio_candidates, key=lambda r: r["growth_ratio"], reverse=True)[:INTEREST_TOP_N]
-        top_delta_keys = {(r["platform"], r["category"]) for r in top_by_delta}
-        top_ratio_keys = {(r["platform"], r["category"]) for r in top_by_ratio}
-        interest_keys |= top_delta_keys | top_ratio_keys
-
-        alerts = 0
-        for rec in records:
-            platform = rec["platform"]
-            cat = rec["category"]
-            cur_view = rec["cur_view"]
-            med_60m = rec["med_60m"]
-            seasonal_base = rec["seasonal_base"]
-            growth_ratio = rec["growth_ratio"]
-            season_ratio = rec["season_ratio"]
-            dynamic_delta_req = rec["dynamic_delta_req"]
-            actual_delta = rec["actual_delta"]
-
-            is_major = (platform, cat) in major_set
-            growth_threshold = MAJOR_GROWTH_THRESHOLD if is_major else GROWTH_THRESHOLD
-            cond_short = cur_view >= med_60m * growth_threshold
-            cond_season = cur_view >= seasonal_base * SEASONAL_THRESHOLD
-            cond_delta = actual_delta >= dynamic_delta_req
-
-            if actual_delta <= 0:
-                continue
-
-            signal_level = None
-            candidate_reasons = []
-            key = (platform, cat)
-
-            if cond_short and cond_season and cond_delta:
-                signal_level = "SPIKE"
-            elif key in interest_keys:
-                signal_level = "CANDIDATE"
-                if growth_ratio >= INTEREST_GROWTH and actual_delta >= INTEREST_DELTA:
-                    candidate_reasons.append("ratio_delta")
-                if key in top_delta_keys:
-                    candidate_reasons.append("top_delta")
-                if key in top_ratio_keys:
-                    candidate_reasons.append("top_ratio")
-            else:
-                if growth_ratio >= INTEREST_GROWTH and growth_ratio < growth_threshold:
-                    print(
-                        f"👀 [관심] {platform} {cat}: {cur_view}명 "
-                        f"(평소 {int(med_60m)}명, {growth_ratio:.2f}배) -> 기준 미달로 탈락"
-                    )
-                continue
-
-            cooldown_minutes = (
-                CANDIDATE_COOLDOWN_MINUTES
-                if signal_level == "CANDIDATE"
-                else COOLDOWN_MINUTES
+        contribution.append(ratio)
+        total_delta.append(cur_view - flags["view_1h"][i])
+        clues.append(clue_list)
+        top_list = parse_top_list(flags["top_cur"][i])
+        top1.append(extract_top1_viewers(top_list))
+        open_now, open_1h = flags["open_now"][i], flags["open_1h"][i]
+        open_delta.append(open_now - open_1h if open_now is not None and open_1h is not None else None)
+        top2_5_cur.append(sum_top2_5_viewers(top_list))
+        top2_5_base.append(sum_top2_5_viewers(parse_top_list(flags["top_1h"][i])))
+
+    sel = np.asarray(idx, dtype=np.int64)
+    frame = {name: np.asarray(flags[name])[sel] for name in flags}
+    cur = frame["cur_view"].astype(float)
+    top1 = np.array(top1, dtype=np.int64)
+    top2_5_cur = np.array(top2_5_cur, dtype=np.int64)
+    top2_5_base = np.array(top2_5_base, dtype=np.int64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dominance = np.where(cur != 0, top1 / cur, 0)
+    frame.update({
+        "contribution": np.array(contribution, dtype=float),
+        "total_delta": np.array(total_delta, dtype=float),
+        "clues": np.array(clues + [None], dtype=object)[:-1],
+        "top1_viewers": top1,
+        "dominance_index": dominance,
+        "open_delta_raw": np.array(open_delta + [None], dtype=object)[:-1],
+        "open_delta": np.array([np.nan if v is None else v for v in open_delta], dtype=float),
+        "top2_5_current": top2_5_cur,
+        "top2_5_baseline": top2_5_base,
+        "top2_5_delta": top2_5_cur - top2_5_base,
+    })
+    return frame
+
+def judge_events(flags, idx, rules=None):
+    """쿨타임을 통과한 신호 행에 event_rules(PERSON/시장 증거/점유/PERSON 보정) 적용"""
+    frame = event_features(flags, idx)
+    frame["is_spike"] = frame["spike"]
+    return (rules or RULES).judge_events(frame)
+
+def _round_or_none(value):
+    """NaN(상태 없음/워밍업 중)은 None"""
+    return None if value != value else round(float(value), 2)
+
+def build_event(flags, judged, i, j, rules=None):
+    """flags[i] / judged[j] -> signal_events INSERT 1건"""
+    signal_level = "SPIKE" if flags["spike"][i] else "CANDIDATE"
+    candidate_reasons = (
+        [name for name in (rules or RULES).candidate_reasons if flags[name][i]]
+        if signal_level == "CANDIDATE" else []
+    )
+    if judged["category_adoption"][j]:
+        classification = "CATEGORY_ADOPTION"
+    elif judged["person_issue"][j]:
+        classification = "PERSON_ISSUE"
+    else:
+        classification = "STRUCTURE_ISSUE"
+
+    cur_view = int(flags["cur_view"][i])
+    seasonal_base = float(flags["seasonal_base"][i])
+    actual_delta = int(flags["actual_delta"][i])
+    clue_list = judged["clues"][j]
+    event_detail = {
+        "signal_level": signal_level,
+        "candidate_reasons": candidate_reasons,
+        "stats": {
+            "current": cur_view,
+            "baseline_season": int(round(seasonal_base)),
+            "delta": actual_delta,
+            "growth_ratio": round(float(flags["growth_ratio"][i]), 2),
+            "season_ratio": round(float(flags["season_ratio"][i]), 2),
+            "delta_req": int(round(float(flags["dynamic_delta_req"][i]))),
+            "major_category": bool(flags["is_major"][i]),
+            "major_growth_threshold": float(flags["applied_growth_threshold"][i]),
+            "baseline_source": flags["baseline_source"][i],
+            "season_mad": flags["season_mad"][i],
+            "season_samples": flags["season_samples"][i],
+            "anomaly_score": _round_or_none(flags["anomaly_score"][i]),
+            "ewm_z": _round_or_none(flags["ewm_z"][i]),
+        },
+        "market": {
+            "dominance_index": float(judged["dominance_index"][j]),
+            "top1_viewers": int(judged["top1_viewers"][j]),
+            "open_lives": flags["open_now"][i],
+            "open_lives_1h": flags["open_1h"][i],
+            "open_lives_delta": judged["open_delta_raw"][j],
+            "top2_5_current": int(judged["top2_5_current"][j]),
+            "top2_5_baseline": int(judged["top2_5_baseline"][j]),
+            "top2_5_delta": int(judged["top2_5_delta"][j]),
+            "market_proof": bool(judged["market_proof"][j]),
+            "early_exit": bool(judged["category_adoption"][j]),
+        },
+        "clues": clue_list[:3],
+    }
+    return {
+        "platform": flags["platform"][i],
+        "category": flags["category"][i],
+        "event_type": classification,
+        "growth_rate": round(cur_view / seasonal_base, 2),
+        "cause_detail": event_detail,
+        "analysis_status": "SKIPPED" if classification == "CATEGORY_ADOPTION" else "PENDING",
+        "analysis_tier": "NONE",
+        "signal_level": signal_level,
+        "cur_view": cur_view,
+        "actual_delta": actual_delta,
+        "seasonal_base": seasonal_base,
+        "clues": clue_list,
+    }
+
+def select_events(flags, cooldowns, rules=None, log=print, profile=NO_PROFILE):
+    """
+    classify 결과에서 SPIKE/CANDIDATE 행을 쿨타임·event_rules로 걸러 INSERT할 이벤트 목록 생성.
+    확정된 이벤트는 cooldowns에 기록된다.
+    """
+    rules = rules or RULES
+    with profile.phase("cooldown"):
+        signals = np.flatnonzero(flags["spike"] | flags["candidate"])
+        passed = [
+            i for i in signals
+            if not cooldowns.active(flags["platform"][i], flags["category"][i], cooldown_minutes(flags, i, rules))
+        ]
+    profile.count("cooldown_skipped", len(signals) - len(passed))
+    with profile.phase("contribution"):
+        judged = judge_events(flags, passed, rules)
+
+    events = []
+    for j, i in enumerate(passed):
+        platform = flags["platform"][i]
+        cat = flags["category"][i]
+        # 같은 실행 안에서 먼저 확정된 키는 쿨타임 적용
+        if cooldowns.active(platform, cat, cooldown_minutes(flags, i, rules)):
+            continue
+        if judged["person_rejected"][j]:
+            profile.count("person_rejected")
+            log(
+                f"⚠️ [PERSON 보정] {platform} {cat}: "
+                f"growth={flags['growth_ratio'][i]:.2f}, delta={int(flags['actual_delta'][i])} -> 기준 미달"
             )
-            if check_cooldown(platform, cat, cooldown_minutes):
-                continue
+            continue
+        ev = build_event(flags, judged, i, j, rules)
+        label = "🚨 [SPIKE]" if ev["signal_level"] == "SPIKE" else "👀 [후보]"
+        log(
+            f"{label} {platform} {cat}: {ev['cur_view']}명 "
+            f"(기여율: {judged['contribution'][j]*100:.1f}% -> {ev['event_type']})"
+        )
+        log(f"[Detector] 감지 {ev['signal_level']} | {platform} {cat} | 시청자={ev['cur_view']} delta={ev['actual_delta']} 분류={ev['event_type']}")
+        events.append(ev)
+        profile.count(f"events_{ev['signal_level'].lower()}")
+        cooldowns.record(platform, cat)
+    return events
+
+# 스파이크 판정을 위한 기준선/단기/장기 지표를 한 번에 조회.
+# 필요한 세 구간(최근 60분, 전날 ±2시간, 7일 전 ±2시간)만 상수 범위로 읽어(zonemap으로 나머지
+# 블록은 건너뜀) (platform, category)별 FILTER 집계 한 번으로 현재값/단기/장기 지표를 계산한다.
+# 정확한 구간 경계는 플랫폼별 최신 시각 기준. 장기 구간은 시청자 수만 읽는다.
+# 같은 스냅샷의 같은 카테고리명 행은 먼저 한 행으로 합친다(SNAPSHOT_AGG: 시청자 합, Top은 최대 행).
+# 1시간 전 값 = 60분 창의 가장 이른 스냅샷 행 (stateful 경로·백테스트와 동일)
+BASELINE_QUERY = """
+    WITH 
+    -- 0. 플랫폼별 최신 시각 (파라미터)
+    last_ts AS (
+        SELECT UNNEST($1::VARCHAR[]) AS platform, UNNEST($2::TIMESTAMP[]) AS ts
+    ),
+    -- 1. 판정에 쓰는 구간의 행 (최근 60분 / 7일 전 / 전날). 플랫폼 최신 시각이 멀리 떨어지면
+    --    구간이 겹칠 수 있어 앞 구간에 이미 읽은 행은 뒤 구간에서 뺀다 (합산 중복 방지)
+    rows AS (
+        SELECT platform, category_name, category_id, ts_utc, viewers, open_lives, top_streamers_detail
+        FROM {source} WHERE ts_utc BETWEEN $3 AND $4
+        UNION ALL
+        SELECT platform, category_name, category_id, ts_utc, viewers, NULL, NULL
+        FROM {source} WHERE ts_utc BETWEEN $5 AND $6 AND ts_utc NOT BETWEEN $3 AND $4
+        UNION ALL
+        SELECT platform, category_name, category_id, ts_utc, viewers, NULL, NULL
+        FROM {source}
+        WHERE ts_utc BETWEEN $7 AND $8 AND ts_utc NOT BETWEEN $3 AND $4 AND ts_utc NOT BETWEEN $5 AND $6
+    ),
+    -- 2. 스냅샷당 (platform, category_name) 1행
+    win AS (
+        SELECT platform, category_name, ts_utc, {snapshot_agg}
+        FROM rows
+        GROUP BY platform, category_name, ts_utc
+    ),
+    agg AS (
+        SELECT t.platform, t.category_name,
+            -- 현재 데이터 (플랫폼별 최신 스냅샷, 키당 1행)
+            COUNT(*) FILTER (WHERE t.ts_utc = lt.ts) AS n_curr,
+            ANY_VALUE(t.viewers) FILTER (WHERE t.ts_utc = lt.ts) AS viewers,
+            ANY_VALUE(t.open_lives) FILTER (WHERE t.ts_utc = lt.ts) AS open_lives,
+            ANY_VALUE(t.top_streamers_detail) FILTER (WHERE t.ts_utc = lt.ts) AS top_streamers_detail,
+            -- 단기 베이스라인 (직전 60분 중앙값, 창의 첫 스냅샷)
+            MEDIAN(t.viewers) FILTER (WHERE t.ts_utc >= lt.ts - INTERVAL 60 MINUTE) AS median_60m,
+            ARG_MIN({{'viewers': t.viewers, 'open_lives': t.open_lives, 'top': t.top_streamers_detail}}, t.ts_utc)
+                FILTER (WHERE t.ts_utc >= lt.ts - INTERVAL 60 MINUTE) AS first_60m,
+            -- 장기 베이스라인 A (7일 전, 동일 시간대 ±2시간)
+            AVG(t.viewers) FILTER (
+                WHERE t.ts_utc BETWEEN lt.ts - INTERVAL 170 HOUR AND lt.ts - INTERVAL 166 HOUR
+            ) AS avg_7d,
+            -- 장기 베이스라인 B (전날 동일 시간대 ±2시간)
+            AVG(t.viewers) FILTER (
+                WHERE t.ts_utc BETWEEN lt.ts - INTERVAL 26 HOUR AND lt.ts - INTERVAL 22 HOUR
+            ) AS avg_24h
+        FROM win t
+        JOIN last_ts lt ON t.platform = lt.platform
+        GROUP BY t.platform, t.category_name
+    )
+    SELECT 
+        platform, category_name, viewers, open_lives,
+        median_60m, first_60m.viewers, first_60m.open_lives, first_60m.top,
+        avg_7d, avg_24h,
+        top_streamers_detail
+    FROM agg
+    WHERE n_curr > 0 AND viewers >= {min_viewers}
+"""
+
+# 기준선 구간: (시작, 끝) = 최신 시각 - (앞, 뒤)
+BASELINE_RANGES = (
+    (timedelta(minutes=60), timedelta(0)),
+    (timedelta(hours=170), timedelta(hours=166)),
+    (timedelta(hours=26), timedelta(hours=22)),
+)
 
-            cause, ratio, clue_list = calculate_contribution(
-                cur_view, rec["view_1h"], rec["top_cur"], rec["top_1h"]
-            )
-            top_list = parse_top_list(rec["top_cur"])
-            past_top_list = parse_top_list(rec["top_1h"])
-            top1_viewers = extract_top1_viewers(top_list)
-            dominance_index = (top1_viewers / cur_view) if cur_view else 0
-            open_delta = (
-                (rec["open_now"] - rec["open_1h"])
-                if rec["open_now"] is not None and rec["open_1h"] is not None
-                else None
+def fetch_last_ts(duck, source="traffic_category_snapshot"):
+    """
+    플랫폼별 최신 스냅샷 시각 [(platform, ts)].
+    전체 최신 시각(통계로 바로 조회) 기준 170시간 안만 읽으므로, 그보다 오래 수집이 끊긴 플랫폼은 제외된다.
+    """
+    return duck.execute(f"""
+        SELECT platform, MAX(ts_utc) AS ts
+        FROM {source}
+        WHERE ts_utc >= (SELECT MAX(ts_utc) FROM {source}) - INTERVAL 170 HOUR
+        GROUP BY platform
+    """).fetchall()
+
+def baseline_params(last_rows):
+    """BASELINE_QUERY 파라미터: 플랫폼별 최신 시각 + 전 플랫폼을 덮는 구간별 스캔 범위"""
+    lo = min(ts for _, ts in last_rows)
+    hi = max(ts for _, ts in last_rows)
+    params = [[p for p, _ in last_rows], [ts for _, ts in last_rows]]
+    for before, after in BASELINE_RANGES:
+        params += [lo - before, hi - after]
+    return params
+
+def fetch_baseline_rows(duck, source="traffic_category_snapshot", last_rows=None):
+    """SQL 경로: 최신 스냅샷 + 단기/장기 기준선 (source로 기준 시점 이전만 잘라 재생 가능)"""
+    if last_rows is None:
+        last_rows = fetch_last_ts(duck, source)
+    if not last_rows:
+        return []
+    query = BASELINE_QUERY.format(
+        source=source, snapshot_agg=SNAPSHOT_AGG, min_viewers=RULES["min_absolute_delta"]
+    )
+    return duck.execute(query, baseline_params(last_rows)).fetchall()
+
+def fetch_stateful_rows(duck, source="traffic_category_snapshot"):
+    """stateful 경로: 새 스냅샷만 반영한 인메모리 상태에서 SQL 경로와 같은 행 생성"""
+    global _baseline_state
+    if _baseline_state is None:
+        _baseline_state = BaselineState.load(DETECTOR_STATE_PATH)
+        if _baseline_state is None:
+            _baseline_state = BaselineState()
+            print("[Detector] 상태 체크포인트 없음 -> DuckDB에서 재구성")
+    applied = _baseline_state.refresh(duck, source=source)
+    rows = _baseline_state.current_rows(RULES["min_absolute_delta"])
+    _baseline_state.save(DETECTOR_STATE_PATH)
+    print(f"[Detector] stateful 상태 갱신 {applied}행 반영")
+    return rows
+
+def fetch_seasonal_profiles(duck, source="traffic_category_snapshot"):
+    """플랫폼별 최신 시각의 요일x시 슬롯 프로필을 (platform, category) 키로 조회"""
+    try:
+        rows = duck.execute(f"""
+            WITH last_ts AS (
+                SELECT platform, MAX(ts_utc) AS ts
+                FROM {source}
+                GROUP BY platform
             )
-            top2_5_current = sum_top2_5_viewers(top_list)
-            top2_5_baseline = sum_top2_5_viewers(past_top_list)
-            top2_5_delta = top2_5_current - top2_5_baseline
-            market_proof = False
-            if open_delta is not None and open_delta >= 3:
-                market_proof = True
-            if top2_5_baseline > 0:
-                if top2_5_current >= top2_5_baseline * 1.2 and top2_5_delta >= 500:
-                    market_proof = True
-
-            classification = cause
-            early_exit = False
-            if dominance_index >= 0.85 and not market_proof:
-                classification = "CATEGORY_ADOPTION"
-                early_exit = True
-
-            if signal_level == "SPIKE" and classification == "PERSON_ISSUE":
-                stricter_delta = max(1500, seasonal_base * 0.5)
-                if growth_ratio < 2.0 or actual_delta < stricter_delta:
-                    print(
-                        f"⚠️ [PERSON 보정] {platform} {cat}: "
-                        f"growth={growth_ratio:.2f}, delta={int(actual_delta)} -> 기준 미달"
-                    )
-                    continue
-
-            label = "🚨 [SPIKE]" if signal_level == "SPIKE" else "👀 [후보]"
-            print(
-                f"{label} {platform} {cat}: {cur_view}명 "
-                f"(기여율: {ratio*100:.1f}% -> {classification})"
+            SELECT p.platform, p.category_name, p.median, p.mad, p.sample_count, p.ewm_mean
+            FROM category_seasonal_profile p
+            JOIN last_ts lt
+              ON p.platform = lt.platform
+             AND p.slot = (isodow(lt.ts) - 1) * 24 + hour(lt.ts)
+        """).fetchall()
+    except Exception as e:
+        print(f"[Detector] 계절 프로필 조회 실패 (window 기준선 사용): {e}")
+        return {}
+    return {
+        (platform, cat): {"median": median, "mad": mad, "samples": n, "ewm_mean": ewm}
+        for platform, cat, median, mad, n, ewm in rows
+    }
+
+def fetch_anomaly_scores(duck, last_rows):
+    """
+    Collector가 갱신한 category_anomaly_state에서 플랫폼별 최신 스냅샷 점수를 (platform, category) 키로 조회.
+    상태는 최신 값만 있어 과거 재생(as_of)에서는 해당 스냅샷 행이 없고 점수는 비어 있다.
+    """
+    if not last_rows:
+        return {}
+    try:
+        rows = duck.execute(
+            """
+            WITH last_ts AS (
+                SELECT UNNEST(?::VARCHAR[]) AS platform, UNNEST(?::TIMESTAMP[]) AS ts
             )
-            print(f"[Detector] 감지 {signal_level} | {platform} {cat} | 시청자={cur_view} delta={actual_delta} 분류={classification}")
-
-            event_detail = {
-                "signal_level": signal_level,
-                "candidate_reasons": candidate_reasons,
-                "stats": {
-                    "current": cur_view,
-                    "baseline_season": int(round(seasonal_base)),
-                    "delta": actual_delta,
-                    "growth_ratio": round(growth_ratio, 2),
-                    "season_ratio": round(season_ratio, 2),
-                    "delta_req": int(round(dynamic_delta_req)),
-                    "major_category": is_major,
-                    "major_growth_threshold": growth_threshold,
-                },
-                "market": {
-                    "dominance_index": dominance_index,
-                    "top1_viewers": top1_viewers,
-                    "open_lives": rec["open_now"],
-                    "open_lives_1h": rec["open_1h"],
-                    "open_lives_delta": open_delta,
-                    "top2_5_current": top2_5_current,
-                    "top2_5_baseline": top2_5_baseline,
-                    "top2_5_delta": top2_5_delta,
-                    "market_proof": market_proof,
-                    "early_exit": early_exit,
-                },
-                "clues": clue_list[:3],
-            }
+            SELECT a.platform, a.category_name, a.anomaly_score, a.ewm_z
+            FROM category_anomaly_state a
+            JOIN last_ts lt ON a.platform = lt.platform
+            WHERE a.last_ts > lt.ts - INTERVAL 60 SECOND AND a.last_ts <= lt.ts
+            """,
+            [[p for p, _ in last_rows], [ts for _, ts in last_rows]],
+        ).fetchall()
+    except Exception as e:
+        print(f"[Detector] 이상 점수 조회 실패 (점수 없이 판정): {e}")
+        return {}
+    return {(platform, cat): (score, z) for platform, cat, score, z in rows}
+
+def load_category_index(duck, source="traffic_category_snapshot"):
+    """플랫폼 공통 카테고리 색인 (첫 실행에 최근 이름으로 만들고, 이후 새 이름은 조회 시 추가)"""
+    global _category_index
+    if _category_index is None:
+        try:
+            _category_index = CategoryIndex.from_settings().load(duck, source)
+            print(f"[Detector] 카테고리 색인 {len(_category_index)}개 이름")
+        except Exception as e:
+            print(f"[Detector] 카테고리 색인 생성 실패 (새 이름만 색인): {e}")
+            _category_index = CategoryIndex.from_settings()
+    return _category_index
+
+def log_near_misses(flags):
+    for i in np.flatnonzero(flags["near_miss"]):
+        print(
+            f"👀 [관심] {flags['platform'][i]} {flags['category'][i]}: {flags['cur_view'][i]}명 "
+            f"(평소 {int(flags['med_60m'][i])}명, {flags['growth_ratio'][i]:.2f}배) -> 기준 미달로 탈락"
+        )
 
+def classify_streamers(rows):
+    """스트리머 기준선 행에 streamer_rules 적용 (규칙이 없으면 None)"""
+    if not RULES.streamer_rules:
+        return None
+    return RULES.classify_streamers(build_streamer_frame(rows))
+
+def select_all_events(flags, streamer_flags, cooldowns, index, profile=NO_PROFILE):
+    """카테고리 이벤트(플랫폼 간 동시 급등은 1건으로 병합) + 스트리머 이벤트 (쿨타임 인덱스 공유)"""
+    events = select_events(flags, cooldowns, profile=profile)
+    with profile.phase("correlate"):
+        merged = correlate_events(events, index)
+    profile.count("correlated_merged", len(events) - len(merged))
+    if streamer_flags is not None:
+        with profile.phase("cooldown"):
+            merged += select_streamer_events(streamer_flags, cooldowns, RULES, profile=profile)
+    return merged
+
+def shard_key(key, index):
+    """이벤트 키 -> shard_of 입력 (카테고리는 플랫폼 공통 키, 스트리머는 플랫폼별 키)"""
+    platform, name = key
+    if name.startswith("streamer:"):
+        return platform, name
+    return "", index.canonical(platform, name)
+
+def insert_shard_events(flags, lease, snapshot, index, profile=NO_PROFILE, streamer_flags=None):
+    """
+    샤드 모드: 임대한 샤드의 키만 이벤트 선별/INSERT. 순위 등 판정(flags)은 전체 키 기준이라
+    단일 노드와 결과가 같다. 자기 몫을 처리한 뒤 비어 있는 샤드를 넘겨받아 한 번 더 처리한다.
+    카테고리는 플랫폼 공통 키로 샤드를 정해 교차 플랫폼 병합이 한 워커 안에서 일어나게 하고,
+    스트리머 이벤트는 (platform, streamer_key) 해시로 같은 샤드 공간을 나눈다.
+    반환: INSERT된 이벤트 목록
+    """
+    with profile.phase("cooldown"):
+        cooldowns = load_cooldowns(snapshot)
+    lifecycle = load_lifecycle()
+    inserted = []
+    shards = lease.acquire(snapshot)
+    while shards:
+        profile.count("shards", len(shards))
+        keys = [shard_key(key, index) for key in zip(flags["platform"], flags["category"])]
+        mine = shard_mask([p for p, _ in keys], [k for _, k in keys], shards, lease.shards)
+        part = dict(
+            flags,
+            spike=flags["spike"] & mine,
+            candidate=flags["candidate"] & mine,
+            near_miss=flags["near_miss"] & mine,
+        )
+        streamer_part = None
+        if streamer_flags is not None:
+            streamer_mine = shard_mask(
+                streamer_flags["platform"], [streamer_key(sid) for sid in streamer_flags["streamer_id"]],
+                shards, lease.shards,
+            )
+            streamer_part = dict(streamer_flags, streamer_spike=streamer_flags["streamer_spike"] & streamer_mine)
+        print(f"[Shard] 샤드 {sorted(shards)} 처리 | 대상 {int(mine.sum())}/{len(mine)}건")
+        owned = frozenset(shards)
+        update_lifecycle(
+            lifecycle, flags, streamer_flags, cooldowns, profile,
+            owns=lambda key: shard_of(*shard_key(key, index), lease.shards) in owned,
+        )
+        log_near_misses(part)
+        events = select_all_events(part, streamer_part, cooldowns, index, profile)
+        if events and not lease.held():
+            # 락이 풀렸으면 다른 워커가 같은 샤드를 처리할 수 있으므로 결과를 버린다
+            print(f"[Shard] 임대 연결 끊김 -> 이벤트 {len(events)}건 폐기")
+            break
+        with profile.phase("insert"):
+            n = insert_events(events)
+        inserted += events[:n]
+        if n == len(events):
+            lease.complete(snapshot, shards)
+        shards = lease.adopt(snapshot)
+    return inserted
+
+def detect_spikes(as_of=None, lease=None):
+    """
+    as_of: Collector 알림의 스냅샷 시각. 지정 시 그 시각까지의 데이터만으로 판정.
+    lease: ShardLease. 지정 시 순위 등 판정은 전체 키로 하고, 이벤트 처리는 임대한 샤드의 키만.
+    직전 실행과 같은 스냅샷이면 건너뛴다. 단계별 소요 시간/건수는 detector_runs에 기록.
+    """
+    global _last_snapshot
+    ts = time.strftime("%H:%M:%S")
+    print(f"\n[Detector] 🔍 V3 로직 분석 시작 ({ts})")
+    source = "traffic_category_snapshot"
+    if as_of is not None:
+        source = f"(SELECT * FROM traffic_category_snapshot WHERE ts_utc <= TIMESTAMP '{as_of}')"
+    profile = RunProfile(as_of=as_of)
+    
+    try:
+        with profile.phase("duckdb_query"):
+            duck = duckdb.connect(DUCK_PATH, read_only=True)
             try:
-                analysis_status = "SKIPPED" if classification == "CATEGORY_ADOPTION" else "PENDING"
-                analysis_tier = "NONE"
-                conn = get_pg_conn()
-                cur = conn.cursor()
-                cur.execute(
-                    """
-                        INSERT INTO signal_events
-                            (platform, category_name, event_type, growth_rate, cause_detail, analysis_status, analysis_tier)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    """,
-                    (
-                        platform,
-                        cat,
-                        classification,
-                        round(cur_view / seasonal_base, 2),
-                        json.dumps(event_detail),
-                        analysis_status,
-                        analysis_tier,
-                    ),
-                )
-                conn.commit()
-                conn.close()
-
-                print(f"[Detector] DB INSERT | {platform} {cat} | signal_level={signal_level} status={analysis_status}")
+                last_rows = fetch_last_ts(duck, source)
+                if not last_rows:
+                    print("[Detector] 데이터 부족.")
+                    profile.status = "skipped"
+                    return
+                snapshot_key = tuple(sorted(last_rows))
+                profile.snapshot = max(ts for _, ts in last_rows)
+                if snapshot_key == _last_snapshot:
+                    print("[Detector] 새 스냅샷 없음 -> 건너뜀")
+                    profile.status = "skipped"
+                    return
+
+                if DETECTOR_MODE == "stateful":
+                    rows = fetch_stateful_rows(duck, source=source)
+                else:
+                    rows = fetch_baseline_rows(duck, source=source, last_rows=last_rows)
+                profiles = fetch_seasonal_profiles(duck, source=source) if SEASONAL_BASELINE == "profile" else {}
+                streamer_rows = fetch_streamer_rows(duck, last_rows) if RULES.streamer_rules else []
+                anomaly = fetch_anomaly_scores(duck, last_rows)
+                index = load_category_index(duck, source)
+            finally:
+                duck.close()
+        _last_snapshot = snapshot_key
+        profile.count("rows", len(rows))
+        profile.count("streamers", len(streamer_rows))
+
+        print(f"[Detector] DuckDB 분석 대상 {len(rows)}건 (스트리머 {len(streamer_rows)}명)")
+        with profile.phase("build_frame"):
+            frame = build_frame(rows, profiles, RULES, SEASONAL_MIN_SAMPLES, anomaly)
+        with profile.phase("classify"):
+            flags = RULES.classify(frame)
+            streamer_flags = classify_streamers(streamer_rows)
+        for name in ("spike", "candidate", "near_miss"):
+            profile.count(name, flags[name].sum())
+        if streamer_flags is not None:
+            profile.count("streamer_spike", streamer_flags["streamer_spike"].sum())
+        if lease is None:
+            log_near_misses(flags)
+            with profile.phase("cooldown"):
+                cooldowns = load_cooldowns(profile.snapshot)
+            update_lifecycle(load_lifecycle(), flags, streamer_flags, cooldowns, profile)
+            pending_events = select_all_events(flags, streamer_flags, cooldowns, index, profile)
+            with profile.phase("insert"):
+                pending_events = pending_events[:insert_events(pending_events)]
+        else:
+            pending_events = insert_shard_events(flags, lease, profile.snapshot, index, profile, streamer_flags)
+            profile.worker = lease.slot
+        alerts = len(pending_events)
+        profile.count("inserted", alerts)
+        with profile.phase("telegram"):
+            for ev in pending_events:
                 if (
-                    signal_level == "SPIKE"
-                    and classification != "CATEGORY_ADOPTION"
+                    ev["signal_level"] == "SPIKE"
+                    and ev["event_type"] != "CATEGORY_ADOPTION"
                     and ALERT_MODE == "immediate"
                 ):
-                    top_streamer_name = (
-                        clue_list[0].get("name", "Unknown") if clue_list else "Unknown"
-                    )
-                    msg = (
-                        f"🚨 **[급등 감지] {platform}**\n"
-                        f"카테고리: `{cat}`\n"
-                        f"현재 시청자: {cur_view:,}명\n"
-                        f"증가량: +{actual_delta:,}명\n"
-                        f"기준 시청자: {int(round(seasonal_base)):,}명\n"
-                        f"핵심 원인: {top_streamer_name}"
-                    )
-                    send_telegram_message(msg)
-                    logging.info("🚨 [Telegram] %s 알림 전송 완료", cat)
-
-                alerts += 1
-            except Exception as e:
-                print(f"❌ Alert Fail: {e}")
+                    send_spike_alert(ev)
+                    profile.count("telegram_sent")
 
         if alerts > 0:
             print(f"[Detector] {alerts}건 감지 완료.")
@@ -456,17 +761,58 @@ def detect_spikes():
 
     except Exception as e:
         print(f"[Detector] Error: {e}")
+        profile.status = "error"
+        profile.error = str(e)
+    finally:
+        if lease is not None:
+            lease.release_excess()
+        if profile.status != "skipped":
+            print(f"[Detector] 실행 {profile.total_ms():.0f}ms | {profile.summary()}")
+        profile.save(RULES.thresholds)
+
+def run_for_snapshot(payload, lease=None):
+    """스냅샷 커밋 알림 1건 처리: 해당 epoch 기준 감지 + 커밋→감지 완료 지연 기록"""
+    epoch = payload.get("epoch")
+    as_of = None
+    if epoch:
+        try:
+            as_of = datetime.fromisoformat(epoch)
+        except ValueError:
+            print(f"[Detector] 알림 epoch 형식 오류: {epoch}")
+    detect_spikes(as_of=as_of, lease=lease)
+    committed_at = payload.get("committed_at")
+    if committed_at:
+        lag = time.time() - float(committed_at)
+        print(f"[Detector] 스냅샷 {epoch} 처리 완료 (커밋 후 {lag:.1f}s)")
 
 def run():
     print("👀 [Signal Detector V3] 가동 - (Weekly/Median/Delta)")
-    # Collector(5분 주기)와 DuckDB 접근 시각을 엇갈리게 90초 대기
-    time.sleep(90)
+    # 여러 워커가 (platform, category) 해시 구간을 나눠 처리
+    lease = ShardLease() if DETECTOR_SHARDS > 1 else None
+    if DETECTOR_TRIGGER != "notify":
+        # Collector(5분 주기)와 DuckDB 접근 시각을 엇갈리게 90초 대기
+        time.sleep(90)
+        init_db()
+        schedule.every(5).minutes.do(detect_spikes, lease=lease)
+
+        while True:
+            schedule.run_pending()
+            time.sleep(1)
+
     init_db()
-    schedule.every(5).minutes.do(detect_spikes)
-    
+    listener = pg.Listener(pg.SNAPSHOT_CHANNEL)
+    last_run = time.monotonic()
+    print(f"[Detector] 스냅샷 알림 대기 (폴링 대체 {DETECTOR_POLL_SECONDS}s)")
     while True:
-        schedule.run_pending()
-        time.sleep(1)
+        remaining = DETECTOR_POLL_SECONDS - (time.monotonic() - last_run)
+        payloads = listener.wait(max(1.0, remaining))
+        for payload in payloads:
+            run_for_snapshot(payload, lease=lease)
+            last_run = time.monotonic()
+        if not payloads and time.monotonic() - last_run >= DETECTOR_POLL_SECONDS:
+            print("[Detector] 스냅샷 알림 없음 -> 폴링 실행")
+            detect_spikes(lease=lease)
+            last_run = time.monotonic()
 
 if __name__ == "__main__":
     run()
@@ -0,0 +1,336 @@
+import os
+import pickle
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from src.storage.duckdb_store import SNAPSHOT_ROWS
+
+# SQL 경로(detect_spikes)와 동일한 창 정의 (초 단위)
+SHORT_WINDOW = 60 * 60
+SEASONAL_WINDOWS = (
+    ("avg_7d", 170 * 3600, 166 * 3600),
+    ("avg_24h", 26 * 3600, 22 * 3600),
+)
+HORIZON = max(lo for _, lo, _ in SEASONAL_WINDOWS)
+
+STATE_VERSION = 2
+_INITIAL_COLUMNS = 2048
+_INITIAL_ROWS = 256
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch(ts):
+    """naive UTC datetime -> epoch 초 (로컬 타임존 해석 방지)"""
+    return (ts - _EPOCH).total_seconds()
+
+
+class _PlatformBuffer:
+    """
+    플랫폼 하나의 카테고리 x 스냅샷 시청자 행렬 (열 = 스냅샷 시각, 링 버퍼).
+    단기 창의 open_lives/top 원본은 recent에 시각별로만 보관한다.
+    """
+
+    def __init__(self):
+        self.col_ts = np.full(_INITIAL_COLUMNS, np.nan)
+        self.values = np.full((_INITIAL_ROWS, _INITIAL_COLUMNS), np.nan)
+        self.rows = {}
+        self.names = []
+        self.head = 0
+        self.last_ts = None
+        self.recent = {}
+
+    def _row(self, category):
+        idx = self.rows.get(category)
+        if idx is not None:
+            return idx
+        idx = len(self.names)
+        if idx >= self.values.shape[0]:
+            grown = np.full((self.values.shape[0] * 2, self.values.shape[1]), np.nan)
+            grown[: self.values.shape[0]] = self.values
+            self.values = grown
+        self.rows[category] = idx
+        self.names.append(category)
+        return idx
+
+    def _grow_columns(self):
+        """보존 구간이 링을 넘치면 시간순으로 재배열 후 용량 2배"""
+        cap = self.col_ts.shape[0]
+        order = np.argsort(np.where(np.isnan(self.col_ts), np.inf, self.col_ts), kind="stable")
+        col_ts = np.full(cap * 2, np.nan)
+        values = np.full((self.values.shape[0], cap * 2), np.nan)
+        col_ts[:cap] = self.col_ts[order]
+        values[:, :cap] = self.values[:, order]
+        self.col_ts, self.values = col_ts, values
+        self.head = int(np.count_nonzero(~np.isnan(col_ts)))
+
+    def _next_column(self, ts):
+        old = self.col_ts[self.head]
+        if not np.isnan(old) and old >= ts - HORIZON:
+            self._grow_columns()
+        col = self.head
+        self.col_ts[col] = ts
+        self.values[:, col] = np.nan
+        self.head = (col + 1) % self.col_ts.shape[0]
+        return col
+
+    def append(self, ts, items):
+        """스냅샷 하나(동일 ts_utc 행들) 반영. items: (category, viewers, open_lives, top)"""
+        if self.last_ts is not None and ts == self.last_ts:
+            col = int(np.nonzero(self.col_ts == ts)[0][0])
+        else:
+            col = self._next_column(ts)
+            self.last_ts = ts
+        detail = self.recent.setdefault(ts, {})
+        for category, viewers, open_lives, top in items:
+            row = self._row(category)
+            self.values[row, col] = np.nan if viewers is None else viewers
+            detail[category] = (open_lives, top)
+        cutoff = ts - SHORT_WINDOW
+        for old_ts in [t for t in self.recent if t < cutoff]:
+            del self.recent[old_ts]
+
+    def compact(self):
+        """보존 구간 내 값이 하나도 없는 카테고리 행 제거"""
+        if self.last_ts is None:
+            return
+        live = ~np.isnan(self.col_ts) & (self.col_ts >= self.last_ts - HORIZON)
+        n = len(self.names)
+        keep = np.nonzero((~np.isnan(self.values[:n][:, live])).any(axis=1))[0]
+        if len(keep) == n:
+            return
+        values = np.full((max(_INITIAL_ROWS, len(keep)), self.values.shape[1]), np.nan)
+        values[: len(keep)] = self.values[keep]
+        self.values = values
+        self.names = [self.names[i] for i in keep]
+        self.rows = {name: i for i, name in enumerate(self.names)}
+
+    def current_rows(self, platform, min_viewers):
+        """최신 스냅샷 기준 SQL 경로와 같은 형태의 행 목록"""
+        if self.last_ts is None:
+            return []
+        now = self.last_ts
+        n = len(self.names)
+        cur_col = int(np.nonzero(self.col_ts == now)[0][0])
+        cur_vals = self.values[:n, cur_col]
+        sel = np.nonzero(~np.isnan(cur_vals) & (cur_vals >= min_viewers))[0]
+        if len(sel) == 0:
+            return []
+        block = self.values[sel]
+
+        short_mask = (self.col_ts >= now - SHORT_WINDOW) & (self.col_ts <= now)
+        short_ts = self.col_ts[short_mask]
+        short_vals = block[:, short_mask]
+        median_60m = np.nanmedian(short_vals, axis=1)
+        first_idx = np.argmin(np.where(np.isnan(short_vals), np.inf, short_ts), axis=1)
+
+        seasonal = []
+        for _, lo, hi in SEASONAL_WINDOWS:
+            mask = (self.col_ts >= now - lo) & (self.col_ts <= now - hi)
+            vals = block[:, mask]
+            counts = np.count_nonzero(~np.isnan(vals), axis=1)
+            sums = np.nansum(vals, axis=1)
+            seasonal.append((counts, sums))
+
+        cur_detail = self.recent.get(now, {})
+        rows = []
+        for i, row in enumerate(sel):
+            category = self.names[row]
+            first_ts = short_ts[first_idx[i]]
+            open_1h, top_1h = self.recent.get(first_ts, {}).get(category, (None, None))
+            open_now, top_cur = cur_detail.get(category, (None, None))
+            avgs = [
+                float(sums[i] / counts[i]) if counts[i] else None
+                for counts, sums in seasonal
+            ]
+            rows.append((
+                platform,
+                category,
+                int(cur_vals[row]),
+                open_now,
+                float(median_60m[i]),
+                int(short_vals[i, first_idx[i]]),
+                open_1h,
+                top_1h,
+                avgs[0],
+                avgs[1],
+                top_cur,
+            ))
+        return rows
+
+
+class BaselineState:
+    """
+    Detector stateful 모드용 인메모리 기준선.
+    매 실행마다 새 스냅샷만 반영하고, 디스크 체크포인트/DuckDB 재구성으로 콜드 스타트를 처리한다.
+    """
+
+    def __init__(self):
+        self.platforms = {}
+
+    @classmethod
+    def load(cls, path):
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                payload = pickle.load(f)
+            if payload.get("version") != STATE_VERSION:
+                return None
+            state = cls()
+            state.platforms = payload["platforms"]
+            return state
+        except Exception as e:
+            print(f"[Detector] 상태 체크포인트 로드 실패: {e}")
+            return None
+
+    def save(self, path):
+        if not path:
+            return
+        for buf in self.platforms.values():
+            buf.compact()
+        tmp = f"{path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(tmp, "wb") as f:
+                pickle.dump(
+                    {"version": STATE_VERSION, "saved_at": time.time(), "platforms": self.platforms},
+                    f,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"[Detector] 상태 체크포인트 저장 실패: {e}")
+
+    def apply_rows(self, rows):
+        """
+        (platform, category, ts_utc, viewers, open_lives, top) 행을 ts 순서대로 반영.
+        스냅샷당 카테고리 1행 (같은 이름 행은 SNAPSHOT_ROWS로 SQL 경로와 같이 합친 뒤 넘긴다)
+        """
+        batch_key = None
+        items = []
+        for platform, category, ts, viewers, open_lives, top in rows:
+            key = (platform, to_epoch(ts))
+            if key != batch_key:
+                if items:
+                    self._append(batch_key, items)
+                batch_key, items = key, []
+            items.append((category, viewers, open_lives, top))
+        if items:
+            self._append(batch_key, items)
+
+    def _append(self, key, items):
+        platform, ts = key
+        buf = self.platforms.setdefault(platform, _PlatformBuffer())
+        if buf.last_ts is not None and ts < buf.last_ts:
+            return
+        buf.append(ts, items)
+
+    def rebuild(self, duck, source="traffic_category_snapshot"):
+        """DuckDB에서 보존 구간(최대 170시간)만 읽어 상태 재구성"""
+        self.platforms = {}
+        kept = f"""(
+            SELECT t.* FROM {source} t
+            JOIN last_ts lt ON t.platform = lt.platform
+            WHERE t.ts_utc >= lt.ts - INTERVAL {HORIZON // 3600} HOUR
+        )"""
+        rows = duck.execute(f"""
+            WITH last_ts AS (
+                SELECT platform, MAX(ts_utc) AS ts FROM {source} GROUP BY platform
+            ),
+            snap AS ({SNAPSHOT_ROWS.format(source=kept, where="TRUE")})
+            SELECT t.platform, t.category_name, t.ts_utc, t.viewers, t.open_lives,
+                   CASE WHEN t.ts_utc >= lt.ts - INTERVAL 60 MINUTE THEN t.top_streamers_detail END
+            FROM snap t
+            JOIN last_ts lt ON t.platform = lt.platform
+            ORDER BY t.platform, t.ts_utc
+        """).fetchall()
+        self.apply_rows(rows)
+        return len(rows)
+
+    def refresh(self, duck, source="traffic_category_snapshot"):
+        """마지막 반영 시각 이후 스냅샷만 읽어 반영. 새 플랫폼/데이터 역행 시 전체 재구성."""
+        last_rows = duck.execute(
+            f"SELECT platform, MAX(ts_utc) FROM {source} GROUP BY platform"
+        ).fetchall()
+        latest = {p: to_epoch(ts) for p, ts in last_rows if ts is not None}
+        needs_rebuild = not self.platforms or any(
+            p not in self.platforms
+            or self.platforms[p].last_ts is None
+            or latest[p] < self.platforms[p].last_ts
+            or latest[p] - self.platforms[p].last_ts > HORIZON
+            for p in latest
+        )
+        if needs_rebuild:
+            return self.rebuild(duck, source=source)
+        watermark = min(self.platforms[p].last_ts for p in latest)
+        rows = duck.execute(
+            f"""
+            SELECT platform, category_name, ts_utc, viewers, open_lives, top_streamers_detail
+            FROM ({SNAPSHOT_ROWS.format(source=source, where="ts_utc > ?")})
+            ORDER BY platform, ts_utc
+            """,
+            [_EPOCH + timedelta(seconds=watermark)],
+        ).fetchall()
+        fresh = [r for r in rows if to_epoch(r[2]) > self.platforms[r[0]].last_ts]
+        self.apply_rows(fresh)
+        return len(fresh)
+
+    def current_rows(self, min_viewers):
+        rows = []
+        for platform, buf in self.platforms.items():
+            rows.extend(buf.current_rows(platform, min_viewers))
+        return rows
+
+
+def _rows_match(a, b):
+    if len(a) != len(b):
+        return False
+    for x, y in zip(a, b):
+        if isinstance(x, float) or isinstance(y, float):
+            if x is None or y is None or abs(x - y) > 1e-6 * max(1.0, abs(x)):
+                return False
+        elif x != y:
+            return False
+    return True
+
+
+def verify_replay(duck, ticks=24):
+    """최근 ticks개 스냅샷 시점을 순서대로 재생하며 SQL 경로와 stateful 결과 비교"""
+    from src.detector.signal_detector import RULES, fetch_baseline_rows
+
+    points = duck.execute(
+        "SELECT DISTINCT ts_utc FROM traffic_category_snapshot ORDER BY ts_utc DESC LIMIT ?",
+        [ticks],
+    ).fetchall()
+    state = BaselineState()
+    mismatches = 0
+    for (ts,) in reversed(points):
+        source = f"(SELECT * FROM traffic_category_snapshot WHERE ts_utc <= TIMESTAMP '{ts}')"
+        state.refresh(duck, source=source)
+        expected = sorted(fetch_baseline_rows(duck, source=source), key=lambda r: (r[0], r[1]))
+        actual = sorted(state.current_rows(RULES["min_absolute_delta"]), key=lambda r: (r[0], r[1]))
+        bad = [
+            (e, a) for e, a in zip(expected, actual) if not _rows_match(e, a)
+        ]
+        if len(expected) != len(actual) or bad:
+            mismatches += 1
+            print(f"[Replay] {ts} 불일치: sql={len(expected)}행 state={len(actual)}행 diff={len(bad)}")
+    print(f"[Replay] {len(points)}개 시점 비교 완료, 불일치 {mismatches}건")
+    return mismatches == 0
+
+
+if __name__ == "__main__":
+    import argparse
+    import duckdb
+
+    parser = argparse.ArgumentParser(description="stateful 기준선과 SQL 경로 재생 비교")
+    parser.add_argument("--ticks", type=int, default=24)
+    args = parser.parse_args()
+    con = duckdb.connect(os.getenv("DB_PATH", "data/analytics.db"), read_only=True)
+    try:
+        ok = verify_replay(con, ticks=args.ticks)
+    finally:
+        con.close()
+    raise SystemExit(0 if ok else 1)
@@ -0,0 +1,128 @@
+import numpy as np
+
+from src.detector.cooldown import streamer_key
+from src.detector.profiling import NO_PROFILE
+from src.detector.rules import _num, _obj
+
+# Collector가 스냅샷 저장 때 갱신한 streamer_baseline에서 플랫폼별 최신 스냅샷에 잡힌 스트리머만 조회.
+# SOOP은 페이지마다 수집 시각이 조금씩 달라 최신 시각 기준 1분 안의 행을 같은 스냅샷으로 본다.
+# 기준 시점(as_of) 이후에 갱신된 스트리머는 last_ts가 더 뒤라 제외된다 (과거 재생은 평가 대상 없음).
+STREAMER_QUERY = """
+    WITH last_ts AS (
+        SELECT UNNEST(?::VARCHAR[]) AS platform, UNNEST(?::TIMESTAMP[]) AS ts
+    )
+    SELECT b.platform, b.streamer_id, b.streamer_name, b.category_name, b.title,
+           b.last_viewers, b.base_short, b.base_long, b.session_samples, b.sample_count,
+           b.session_started
+    FROM streamer_baseline b
+    JOIN last_ts lt ON b.platform = lt.platform
+    WHERE b.last_ts > lt.ts - INTERVAL 60 SECOND AND b.last_ts <= lt.ts
+"""
+
+# STREAMER_QUERY 행 순서
+STREAMER_COLUMNS = (
+    "platform", "streamer_id", "streamer_name", "category", "title",
+    "viewers", "base_short", "base_long", "session_samples", "sample_count",
+    "session_started",
+)
+_NUMERIC = ("viewers", "base_short", "base_long", "session_samples", "sample_count")
+
+
+def fetch_streamer_rows(duck, last_rows):
+    """플랫폼별 최신 스냅샷 시각 [(platform, ts)] 기준 스트리머 기준선 행 (테이블 없으면 빈 목록)"""
+    if not last_rows:
+        return []
+    try:
+        return duck.execute(
+            STREAMER_QUERY, [[p for p, _ in last_rows], [ts for _, ts in last_rows]]
+        ).fetchall()
+    except Exception as e:
+        print(f"[Detector] 스트리머 기준선 조회 실패 (스트리머 감지 생략): {e}")
+        return []
+
+
+def build_streamer_frame(rows):
+    """STREAMER_QUERY 행 -> streamer_rules 입력 컬럼 프레임 (기준선 NULL은 NaN)"""
+    columns = list(zip(*rows)) if rows else [()] * len(STREAMER_COLUMNS)
+    return {
+        name: _num(values) if name in _NUMERIC else _obj(values)
+        for name, values in zip(STREAMER_COLUMNS, columns)
+    }
+
+
+def build_streamer_event(flags, i):
+    """flags[i] -> STREAMER_SPIKE 이벤트 1건 (카테고리 이벤트와 같은 cause_detail 구조)"""
+    viewers = int(flags["viewers"][i])
+    base_short = float(flags["base_short"][i])
+    base_long = float(flags["base_long"][i])
+    delta = int(round(viewers - base_short))
+    clue = {
+        "id": flags["streamer_id"][i],
+        "name": flags["streamer_name"][i],
+        "title": flags["title"][i],
+        "viewers": viewers,
+    }
+    started = flags["session_started"][i]
+    event_detail = {
+        "signal_level": "SPIKE",
+        "candidate_reasons": [],
+        "stats": {
+            "current": viewers,
+            "baseline_season": int(round(base_long)),
+            "baseline_session": int(round(base_short)),
+            "delta": delta,
+            "growth_ratio": round(float(flags["streamer_growth_ratio"][i]), 2),
+            "season_ratio": round(float(flags["streamer_season_ratio"][i]), 2),
+            "major_category": False,
+            "baseline_source": "streamer",
+            "session_samples": int(flags["session_samples"][i]),
+        },
+        "streamer": {
+            "id": clue["id"],
+            "name": clue["name"],
+            "session_started": started.isoformat() if started is not None else None,
+        },
+        "clues": [clue],
+    }
+    return {
+        "platform": flags["platform"][i],
+        "category": flags["category"][i],
+        "streamer_id": clue["id"],
+        "event_type": "STREAMER_SPIKE",
+        "growth_rate": round(viewers / base_short, 2),
+        "cause_detail": event_detail,
+        "analysis_status": "PENDING",
+        "analysis_tier": "NONE",
+        "signal_level": "SPIKE",
+        "cur_view": viewers,
+        "actual_delta": delta,
+        "seasonal_base": base_short,
+        "clues": [clue],
+    }
+
+
+def select_streamer_events(flags, cooldowns, rules, log=print, profile=NO_PROFILE):
+    """
+    streamer_spike 행을 증가량 큰 순으로 쿨타임(스트리머 키) 검사해 INSERT할 이벤트 목록 생성.
+    확정된 이벤트는 cooldowns에 기록된다.
+    """
+    minutes = rules["streamer_cooldown_minutes"]
+    idx = np.flatnonzero(flags["streamer_spike"])
+    idx = idx[np.argsort(-flags["streamer_delta"][idx], kind="stable")]
+    events = []
+    for i in idx:
+        platform = flags["platform"][i]
+        key = streamer_key(flags["streamer_id"][i])
+        if cooldowns.active(platform, key, minutes):
+            profile.count("streamer_cooldown_skipped")
+            continue
+        ev = build_streamer_event(flags, i)
+        log(
+            f"🚨 [STREAMER] {platform} {flags['streamer_name'][i]} ({ev['category']}): {ev['cur_view']}명 "
+            f"(세션 평소 {int(round(ev['seasonal_base']))}명, {ev['growth_rate']:.2f}배)"
+        )
+        events.append(ev)
+        profile.count("events_streamer")
+        cooldowns.record(platform, key)
+    return events
+
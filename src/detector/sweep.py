@@ -0,0 +1,411 @@
+"""
+임계값 스윕 (그리드/랜덤 탐색).
+
+    python -m src.detector.sweep --days 30 \
+        --grid growth_threshold=1.5,1.7,1.9 --grid interest_top_n=5,10 \
+        --range research_min_growth=1.2:1.6 --random 2000 --workers 8 --out sweep.csv
+
+1) 구간 판정 입력을 한 번 계산해 라운드 단위로 펼친 숫자 배열을 --cache-dir에 .npy로 저장
+   (Top 스트리머 JSON 기반 기여율/시장 지표도 임계값과 무관하므로 미리 계산).
+2) 프로세스 풀의 각 워커가 배열을 memmap으로 공유해 조합마다 규칙 평가 + 메모리 쿨타임 재생.
+3) 과거 signal_events의 분석 판정(CONFIRMED / NO_EVENT)과 대조해 조합별 알림량·정밀도 대리지표·
+   Agent 호출 비용 추정을 보고한다.
+"""
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from multiprocessing import Pool
+
+import duckdb
+import numpy as np
+
+from src.agent import gates
+from src.detector.backtest import _parse_override, round_indices
+from src.detector.features import load_history_features
+from src.detector.rules import build_frame_columns
+from src.detector.signal_detector import (
+    DUCK_PATH,
+    RULES,
+    SEASONAL_BASELINE,
+    SEASONAL_MIN_SAMPLES,
+    event_features,
+)
+from src.storage import postgres as pg
+
+SWEEP_CACHE_DIR = os.getenv("SWEEP_CACHE_DIR", "state/sweep")
+
+# Agent 게이트 파라미터 (소문자 이름 -> gates 모듈 기본값)
+GATE_PARAMS = {
+    name.lower(): getattr(gates, name)
+    for name in (
+        "RESEARCH_MIN_DELTA", "RESEARCH_MIN_GROWTH", "RESEARCH_MIN_SEASON",
+        "RESEARCH_MAJOR_MIN_DELTA", "RESEARCH_MAJOR_MIN_GROWTH", "RESEARCH_MAJOR_MIN_SEASON",
+        "ALERT_MIN_DELTA", "ALERT_MAJOR_MIN_DELTA",
+    )
+}
+
+# 라운드 단위로 펼쳐 저장하는 숫자 컬럼
+FEATURE_COLUMNS = (
+    "round_id", "t", "platform", "key", "cur_view", "med_60m", "seasonal_base",
+    "growth_ratio", "season_ratio", "actual_delta", "contribution", "total_delta",
+    "dominance_index", "open_delta", "top2_5_current", "top2_5_baseline", "top2_5_delta",
+)
+VERDICTS = {"CONFIRMED": 1, "NO_EVENT": 0}
+
+
+# event_features 입력 컬럼 (Top 스트리머 JSON 파싱은 워커로 나눠 처리)
+_EVENT_INPUTS = ("cur_view", "view_1h", "top_cur", "top_1h", "open_now", "open_1h")
+_EVENT_OUTPUTS = (
+    "contribution", "total_delta", "dominance_index", "open_delta",
+    "top2_5_current", "top2_5_baseline", "top2_5_delta",
+)
+
+
+def _event_chunk(chunk):
+    extra = event_features(chunk, np.arange(len(chunk["cur_view"])))
+    return {name: np.asarray(extra[name], dtype=float) for name in _EVENT_OUTPUTS}
+
+
+def prepare_features(duck, start, end, cache_dir, min_viewers, baseline, min_samples, workers=1):
+    """구간 피처를 라운드 단위 숫자 배열로 펼쳐 cache_dir에 저장 (같은 조건이면 재사용)"""
+    spec = {
+        "start": str(start), "end": str(end), "min_viewers": min_viewers,
+        "baseline": baseline, "min_samples": min_samples,
+    }
+    digest = hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:12]
+    path = os.path.join(cache_dir, digest)
+    meta_path = os.path.join(path, "meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            return path, json.load(f)
+
+    columns = load_history_features(duck, start, end, min_viewers, profile=baseline == "profile")
+    # baseline_floor/min_absolute_delta/delta_ratio는 조합마다 다시 적용하므로 여기서는 거르지 않음
+    frame = build_frame_columns(
+        columns, RULES.with_thresholds(baseline_floor=float("-inf")), min_samples
+    )
+    bounds = np.array_split(np.arange(len(frame["cur_view"])), max(1, workers * 4))
+    chunks = [{name: frame[name][b] for name in _EVENT_INPUTS} for b in bounds]
+    with Pool(workers) as pool:
+        parts = pool.map(_event_chunk, chunks)
+    extra = {name: np.concatenate([p[name] for p in parts]) for name in _EVENT_OUTPUTS}
+    rounds = round_indices(duck, frame, start, end)
+
+    platforms = sorted(set(frame["platform"].tolist()))
+    platform_code = np.array([platforms.index(p) for p in frame["platform"]], dtype=np.int64)
+    keys = {}
+    key_code = np.array(
+        [keys.setdefault(k, len(keys)) for k in zip(frame["platform"], frame["category"])],
+        dtype=np.int64,
+    )
+    row = np.concatenate([idx for _, idx in rounds]) if rounds else np.array([], dtype=np.int64)
+    round_id = np.concatenate(
+        [np.full(len(idx), r, dtype=np.int64) for r, (_, idx) in enumerate(rounds)]
+    ) if rounds else np.array([], dtype=np.int64)
+    epoch_sec = np.array([(epoch - start).total_seconds() for epoch, _ in rounds], dtype=float)
+
+    arrays = {
+        "round_id": round_id,
+        "t": epoch_sec[round_id] if len(round_id) else np.array([], dtype=float),
+        "platform": platform_code[row],
+        "key": key_code[row],
+    }
+    for name in FEATURE_COLUMNS[4:]:
+        source = extra if name in extra else frame
+        arrays[name] = np.asarray(source[name][row], dtype=float)
+
+    os.makedirs(path, exist_ok=True)
+    for name, values in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), values)
+    meta = dict(spec, rounds=len(rounds), rows=int(len(row)), platforms=platforms,
+                keys=[list(k) for k in keys])
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    return path, meta
+
+
+def load_labels(start, end, keys, shift_hours=0.0):
+    """
+    분석 완료된 signal_events(cause_detail.analysis_verdict) -> (key 코드, 구간 시작 기준 초, 판정) 배열.
+    shift_hours: created_at(Postgres 시계)과 ts_utc(수집기 시계)의 시간대 차이 보정.
+    """
+    shift = timedelta(hours=shift_hours)
+    _, rows = pg.query(
+        """
+        SELECT platform, category_name, created_at, cause_detail->>'analysis_verdict'
+        FROM signal_events
+        WHERE cause_detail->>'analysis_verdict' IN ('CONFIRMED', 'NO_EVENT')
+          AND created_at BETWEEN %s AND %s
+        """,
+        (start - shift, end - shift),
+    )
+    index = {tuple(k): i for i, k in enumerate(keys)}
+    out = [
+        (index[(platform, cat)], (created_at + shift - start).total_seconds(), VERDICTS[verdict])
+        for platform, cat, created_at, verdict in rows
+        if (platform, cat) in index
+    ]
+    return np.array(out, dtype=float).reshape(-1, 3), len(rows)
+
+
+_shared = {}
+
+
+def _init_worker(path, labels, match_seconds, cost_per_call, days):
+    _shared["features"] = {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in FEATURE_COLUMNS
+    }
+    _shared["labels"] = labels
+    _shared["match_seconds"] = match_seconds
+    _shared["cost_per_call"] = cost_per_call
+    _shared["days"] = days
+
+
+def evaluate(params):
+    """조합 1개: 규칙 평가 -> 쿨타임 재생 -> Agent 게이트 -> 라벨 대조"""
+    features = _shared["features"]
+    rule_params = {k: v for k, v in params.items() if k not in GATE_PARAMS}
+    gate = dict(GATE_PARAMS)
+    gate.update({k: v for k, v in params.items() if k in GATE_PARAMS})
+    rules = RULES.with_thresholds(**rule_params)
+
+    cur = np.asarray(features["cur_view"])
+    base = np.asarray(features["seasonal_base"])
+    rows = np.flatnonzero((cur >= rules["min_absolute_delta"]) & ~(base < rules["baseline_floor"]))
+    f = {name: np.asarray(features[name][rows]) for name in FEATURE_COLUMNS}
+    n = len(rows)
+    f["dynamic_delta_req"] = np.maximum(rules["min_absolute_delta"], f["seasonal_base"] * rules["delta_ratio"])
+    # 라운드 안에서만 키 단위 판정이 되도록 (라운드, 키) 조합으로 키 id 부여
+    f["key_id"] = f["round_id"] * (int(f["key"].max()) + 1 if n else 1) + f["key"]
+    flags = rules.classify(f)
+
+    sig = np.flatnonzero(flags["spike"] | flags["candidate"])
+    ev = {name: np.asarray(values)[sig] for name, values in flags.items()}
+    ev["is_spike"] = ev["spike"]
+    judged = rules.judge_events(ev)
+
+    # 쿨타임 재생 (라운드 순서대로, 라운드 안 중복 키 포함 실시간 경로와 동일)
+    spike_cd = rules["cooldown_minutes"] * 60
+    cand_cd = rules["candidate_cooldown_minutes"] * 60
+    last = {}
+    emitted = []
+    for j, (key, t, is_spike, rejected) in enumerate(zip(
+        ev["key"].tolist(), ev["t"].tolist(), ev["spike"].tolist(), judged["person_rejected"].tolist()
+    )):
+        prev = last.get(key)
+        if prev is not None and prev >= t - (spike_cd if is_spike else cand_cd):
+            continue
+        if rejected:
+            continue
+        emitted.append(j)
+        last[key] = t
+    emitted = np.array(emitted, dtype=np.int64)
+
+    spike = ev["spike"][emitted]
+    adoption = judged["category_adoption"][emitted]
+    major = ev["is_major"][emitted]
+    # 이벤트 JSON과 같은 반올림 값으로 게이트 판정 (gates.should_research와 동일 조건)
+    growth = np.round(ev["growth_ratio"][emitted], 2)
+    season = np.round(ev["season_ratio"][emitted], 2)
+    delta = ev["actual_delta"][emitted]
+    min_delta = np.where(major, gate["research_major_min_delta"], gate["research_min_delta"])
+    min_growth = np.where(major, gate["research_major_min_growth"], gate["research_min_growth"])
+    min_season = np.where(major, gate["research_major_min_season"], gate["research_min_season"])
+    candidate_ok = (
+        (growth >= 1.0) & (delta > 0) & (delta >= min_delta)
+        & ~((growth < min_growth) & (season < min_season))
+    )
+    research = ~adoption & (spike | candidate_ok)
+    alert_gate = research & (delta > 0) & (
+        delta >= np.where(major, gate["alert_major_min_delta"], gate["alert_min_delta"])
+    )
+
+    # 라벨 대조: 같은 키의 리서치 대상 이벤트가 라벨 시각 ±match_seconds 안에 있으면 적중
+    labels = _shared["labels"]
+    confirmed_hit = no_event_hit = 0
+    if len(labels):
+        stride = float(max(ev["t"].max() if len(ev["t"]) else 0, labels[:, 1].max()) + 2 * _shared["match_seconds"] + 1)
+        r = emitted[research]
+        stamp = np.sort(ev["key"][r] * stride + ev["t"][r])
+        target = labels[:, 0] * stride + labels[:, 1]
+        lo = np.searchsorted(stamp, target - _shared["match_seconds"], side="left")
+        hi = np.searchsorted(stamp, target + _shared["match_seconds"], side="right")
+        hit = hi > lo
+        confirmed_hit = int((hit & (labels[:, 2] == 1)).sum())
+        no_event_hit = int((hit & (labels[:, 2] == 0)).sum())
+    confirmed_total = int((labels[:, 2] == 1).sum()) if len(labels) else 0
+
+    calls = int(research.sum())
+    days = _shared["days"] or 1
+    return dict(
+        params,
+        events=int(len(emitted)),
+        spikes=int(spike.sum()),
+        candidates=int(len(emitted) - spike.sum()),
+        adoption=int(adoption.sum()),
+        agent_calls=calls,
+        agent_cost=round(calls * _shared["cost_per_call"], 4),
+        alert_gate=int(alert_gate.sum()),
+        alerts_per_day=round(float(alert_gate.sum()) / days, 2),
+        confirmed_hit=confirmed_hit,
+        no_event_hit=no_event_hit,
+        recall=round(confirmed_hit / confirmed_total, 4) if confirmed_total else None,
+        precision=round(confirmed_hit / (confirmed_hit + no_event_hit), 4)
+        if confirmed_hit + no_event_hit else None,
+    )
+
+
+def _parse_values(text):
+    name, _, values = text.partition("=")
+    out = []
+    for raw in values.split(","):
+        number = float(raw)
+        out.append(int(number) if number.is_integer() and "." not in raw else number)
+    if not out:
+        raise argparse.ArgumentTypeError(f"name=v1,v2,... 형식이어야 함: {text}")
+    return name.strip(), out
+
+
+def _parse_range(text):
+    name, _, bounds = text.partition("=")
+    lo, _, hi = bounds.partition(":")
+    if not hi:
+        raise argparse.ArgumentTypeError(f"name=lo:hi 형식이어야 함: {text}")
+    return name.strip(), (lo, hi)
+
+
+def build_combinations(grid, ranges, n_random, seed=0):
+    """--grid 데카르트 곱, --random 지정 시 grid 값/range 구간에서 무작위 n개"""
+    known = set(RULES.thresholds) | set(GATE_PARAMS)
+    unknown = (set(grid) | set(ranges)) - known
+    if unknown:
+        raise SystemExit(f"알 수 없는 파라미터: {sorted(unknown)} (가능: {sorted(known)})")
+    if not n_random:
+        names = list(grid)
+        return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+    rnd = random.Random(seed)
+    combos = []
+    for _ in range(n_random):
+        combo = {name: rnd.choice(values) for name, values in grid.items()}
+        for name, (lo, hi) in ranges.items():
+            if "." in lo or "." in hi:
+                combo[name] = round(rnd.uniform(float(lo), float(hi)), 3)
+            else:
+                combo[name] = rnd.randint(int(lo), int(hi))
+        combos.append(combo)
+    return combos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="감지/Agent 게이트 임계값 스윕")
+    parser.add_argument("--db", default=DUCK_PATH)
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--days", type=float, default=30)
+    parser.add_argument("--baseline", choices=["profile", "window"], default=SEASONAL_BASELINE)
+    parser.add_argument("--grid", action="append", type=_parse_values, default=[],
+                        help="name=v1,v2,... (여러 번 지정)")
+    parser.add_argument("--range", dest="ranges", action="append", type=_parse_range, default=[],
+                        help="name=lo:hi (--random과 함께 사용)")
+    parser.add_argument("--random", type=int, default=0, help="무작위 조합 수")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--set", dest="overrides", action="append", type=_parse_override, default=[],
+                        help="모든 조합에 공통 적용할 값")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--cache-dir", default=SWEEP_CACHE_DIR)
+    parser.add_argument("--match-minutes", type=float, default=30,
+                        help="라벨 이벤트와 재생 이벤트 시각 허용 차이")
+    parser.add_argument("--label-shift-hours", type=float, default=0.0,
+                        help="signal_events.created_at 시간대 보정 (ts_utc 기준으로 더할 시간)")
+    parser.add_argument("--no-labels", action="store_true", help="Postgres 라벨 없이 알림량/비용만 계산")
+    parser.add_argument("--cost-per-call", type=float, default=1.0,
+                        help="Agent 리서치 1건 비용 (기본 1 = 호출 수)")
+    parser.add_argument("--sort", default="precision",
+                        choices=["precision", "recall", "agent_cost", "alerts_per_day", "events"])
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--out", help="전체 결과 CSV 경로")
+    args = parser.parse_args()
+
+    grid = dict(args.grid)
+    ranges = dict(args.ranges)
+    common = dict(args.overrides)
+    combos = build_combinations(grid, ranges, args.random, args.seed)
+    combos = [dict(common, **combo) for combo in combos]
+    # 현재 설정(기준선)을 항상 첫 조합으로 포함
+    combos.insert(0, dict(common))
+    min_viewers = min(
+        [RULES["min_absolute_delta"]] + [c["min_absolute_delta"] for c in combos if "min_absolute_delta" in c]
+    )
+
+    started = time.perf_counter()
+    duck = duckdb.connect(args.db, read_only=True)
+    try:
+        end = datetime.fromisoformat(args.end) if args.end else duck.execute(
+            "SELECT MAX(ts_utc) FROM traffic_category_snapshot"
+        ).fetchone()[0]
+        if end is None:
+            print("[Sweep] 데이터 없음")
+            return
+        start = datetime.fromisoformat(args.start) if args.start else end - timedelta(days=args.days)
+        path, meta = prepare_features(
+            duck, start, end, args.cache_dir, min_viewers, args.baseline, SEASONAL_MIN_SAMPLES,
+            workers=args.workers,
+        )
+    finally:
+        duck.close()
+    print(
+        f"[Sweep] 피처 준비 {time.perf_counter() - started:.1f}s | {start} ~ {end} | "
+        f"라운드 {meta['rounds']} | {meta['rows']}행 | {path}"
+    )
+
+    labels = np.zeros((0, 3))
+    if not args.no_labels:
+        try:
+            labels, total = load_labels(start, end, meta["keys"], args.label_shift_hours)
+            print(
+                f"[Sweep] 라벨 {total}건 (대조 가능 {len(labels)}건: "
+                f"CONFIRMED {int((labels[:, 2] == 1).sum())} / NO_EVENT {int((labels[:, 2] == 0).sum())})"
+            )
+        except Exception as e:
+            print(f"[Sweep] 라벨 조회 실패 (알림량/비용만 계산): {e}")
+
+    days = (end - start).total_seconds() / 86400
+    started = time.perf_counter()
+    init_args = (path, labels, args.match_minutes * 60, args.cost_per_call, days)
+    with Pool(args.workers, initializer=_init_worker, initargs=init_args) as pool:
+        results = pool.map(evaluate, combos, chunksize=max(1, len(combos) // (args.workers * 4)))
+    elapsed = time.perf_counter() - started
+    print(f"[Sweep] {len(combos)}개 조합 평가 {elapsed:.1f}s ({args.workers} workers)")
+
+    baseline, results = results[0], results[1:] or results[:1]
+    reverse = args.sort in ("precision", "recall", "events")
+    ranked = sorted(
+        results,
+        key=lambda r: (r[args.sort] is None, -(r[args.sort] or 0) if reverse else (r[args.sort] or 0)),
+    )
+    metric_cols = ["events", "spikes", "candidates", "agent_calls", "agent_cost",
+                   "alerts_per_day", "confirmed_hit", "no_event_hit", "recall", "precision"]
+    print(f"[Sweep] 현재 설정: " + " ".join(f"{c}={baseline[c]}" for c in metric_cols))
+    for r in ranked[:args.top]:
+        params = {k: v for k, v in r.items() if k not in metric_cols and k not in ("adoption", "alert_gate")}
+        print(f"  {params} -> " + " ".join(f"{c}={r[c]}" for c in metric_cols))
+
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        fields = sorted({k for r in results for k in r} - set(metric_cols) - {"adoption", "alert_gate"})
+        fields += metric_cols + ["adoption", "alert_gate"]
+        with open(args.out, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows([baseline] + ranked)
+        print(f"[Sweep] 저장: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
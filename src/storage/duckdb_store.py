@@ -2,8 +2,54 @@ import duckdb
 import os
 import json
 import time
+from contextlib import contextmanager
 from typing import List, Dict, Any
 
+# 시간대(요일x시) 계절 프로필: 슬롯당 최근 샘플 수 / 감쇠 반감기(주)
+SEASONAL_MAX_SAMPLES = int(os.getenv("SEASONAL_MAX_SAMPLES", "48"))
+SEASONAL_HALFLIFE_WEEKS = float(os.getenv("SEASONAL_HALFLIFE_WEEKS", "2"))
+# 5분 주기 기준 슬롯당 주 12샘플
+SEASONAL_EWM_ALPHA = 1 - 0.5 ** (1 / (12 * SEASONAL_HALFLIFE_WEEKS))
+SLOT_EXPR = "((isodow({ts}) - 1) * 24 + hour({ts}))"
+
+# 한 스냅샷에 같은 (platform, category_name) 행이 여럿이면(category_id만 다름) 한 행으로 합친다.
+# 시청자/방송 수는 합, Top 스트리머는 시청자가 가장 많은 행(동률이면 category_id 순)의 것.
+SNAPSHOT_AGG = (
+    "SUM(viewers)::BIGINT AS viewers, SUM(open_lives)::BIGINT AS open_lives, "
+    "FIRST(top_streamers_detail ORDER BY viewers DESC NULLS LAST, category_id, top_streamers_detail) "
+    "AS top_streamers_detail"
+)
+SNAPSHOT_ROWS = f"""
+    SELECT ts_utc, platform, category_name, {SNAPSHOT_AGG}
+    FROM {{source}}
+    WHERE {{where}}
+    GROUP BY ts_utc, platform, category_name
+"""
+
+# 카테고리 이상 점수 상태: EWM 반감기(샘플 수, 5분 주기) / 점수를 내기 시작하는 최소 샘플 수
+ANOMALY_HALFLIFE = float(os.getenv("ANOMALY_HALFLIFE", "24"))
+ANOMALY_MIN_SAMPLES = int(os.getenv("ANOMALY_MIN_SAMPLES", "24"))
+ANOMALY_ALPHA = 1 - 0.5 ** (1 / ANOMALY_HALFLIFE)
+# 정규분포에서 평균 절대편차 -> 표준편차 환산 (sqrt(pi/2))
+ABS_DEV_TO_SIGMA = 1.2533
+
+# 스트리머 시계열: 이 시청자 수 미만 방송은 저장하지 않음
+STREAMER_MIN_VIEWERS = int(os.getenv("STREAMER_MIN_VIEWERS", "100"))
+# 직전 샘플과 이 간격(분) 넘게 떨어지면 새 방송(세션)으로 보고 단기 기준선을 초기화
+STREAMER_SESSION_GAP_MINUTES = int(os.getenv("STREAMER_SESSION_GAP_MINUTES", "20"))
+# 단기(세션 내) / 장기(방송 중 샘플 전체) EWM 반감기 (샘플 수, 5분 주기)
+STREAMER_SHORT_HALFLIFE = float(os.getenv("STREAMER_SHORT_HALFLIFE", "3"))
+STREAMER_LONG_HALFLIFE = float(os.getenv("STREAMER_LONG_HALFLIFE", "288"))
+STREAMER_SHORT_ALPHA = 1 - 0.5 ** (1 / STREAMER_SHORT_HALFLIFE)
+STREAMER_LONG_ALPHA = 1 - 0.5 ** (1 / STREAMER_LONG_HALFLIFE)
+
+def write_intent_path(db_path: str) -> str:
+    """
+    쓰기 예고 파일 경로. 쓰기 연결은 읽기 전용 연결이 하나라도 열려 있으면 락을 못 잡으므로,
+    연결을 오래 들고 있는 읽기 쪽(API)은 이 파일이 보이면 연결을 놓는다.
+    """
+    return f"{db_path}.write"
+
 def _is_lock_error(e: BaseException) -> bool:
     msg = str(e).lower()
     return "lock" in msg or "could not set lock" in msg or "conflicting lock" in msg
@@ -17,28 +63,275 @@ class DuckDBStore:
         """DuckDB 연결 객체 반환"""
         return duckdb.connect(self.db_path)
 
-    def _init_schema(self):
-        """테이블이 없으면 생성 (V3: 상위 5 상세 정보 컬럼 추가)"""
-        con = self._get_connection()
+    def _connect_for_write(self, announce, retries=6, backoff=0.5):
+        """쓰기 연결 (읽기 전용 연결이 쓰기 예고를 보고 놓을 때까지 락 오류 재시도)"""
+        for attempt in range(retries):
+            announce()
+            try:
+                return self._get_connection()
+            except Exception as e:
+                if not _is_lock_error(e) or attempt == retries - 1:
+                    raise
+                time.sleep(backoff * (2 ** attempt))
+
+    @contextmanager
+    def _write_intent(self):
+        """쓰기 동안 예고 파일 유지 (재시도마다 touch로 mtime 갱신, 끝나면 삭제)"""
+        path = write_intent_path(self.db_path)
+
+        def touch():
+            try:
+                with open(path, "a"):
+                    os.utime(path)
+            except OSError:
+                pass
+
         try:
-            con.execute("""
-                CREATE TABLE IF NOT EXISTS traffic_category_snapshot (
-                    ts_utc TIMESTAMP,
-                    platform VARCHAR,
-                    category_id VARCHAR,
-                    category_name VARCHAR,
-                    viewers INTEGER,
-                    open_lives INTEGER,
-                    top_streamers_detail VARCHAR 
-                );
-            """)
+            yield touch
         finally:
-            con.close()
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _init_schema(self):
+        """테이블이 없으면 생성 (V3: 상위 5 상세 정보 컬럼 추가)"""
+        with self._write_intent() as announce:
+            con = self._connect_for_write(announce)
+            try:
+                con.execute("""
+                    CREATE TABLE IF NOT EXISTS traffic_category_snapshot (
+                        ts_utc TIMESTAMP,
+                        platform VARCHAR,
+                        category_id VARCHAR,
+                        category_name VARCHAR,
+                        viewers INTEGER,
+                        open_lives INTEGER,
+                        top_streamers_detail VARCHAR 
+                    );
+                """)
+                con.execute("""
+                    CREATE TABLE IF NOT EXISTS category_seasonal_profile (
+                        platform VARCHAR,
+                        category_name VARCHAR,
+                        slot SMALLINT,
+                        sample_count BIGINT,
+                        ewm_mean DOUBLE,
+                        median DOUBLE,
+                        mad DOUBLE,
+                        samples DOUBLE[],
+                        updated_at TIMESTAMP,
+                        PRIMARY KEY (platform, category_name, slot)
+                    );
+                """)
+                # 카테고리별 이상 점수 상태 (스냅샷마다 O(1) 증분 갱신, 창을 저장하지 않음)
+                con.execute("""
+                    CREATE TABLE IF NOT EXISTS category_anomaly_state (
+                        platform VARCHAR,
+                        category_name VARCHAR,
+                        last_ts TIMESTAMP,
+                        last_viewers INTEGER,
+                        sample_count INTEGER,
+                        ewm_mean DOUBLE,
+                        ewm_var DOUBLE,
+                        ewm_median DOUBLE,
+                        ewm_mad DOUBLE,
+                        anomaly_score DOUBLE,
+                        ewm_z DOUBLE,
+                        PRIMARY KEY (platform, category_name)
+                    );
+                """)
+                # 스트리머별 시청자 시계열 (시간순 적재라 ts_utc zonemap이 시간 인덱스 역할)
+                con.execute("""
+                    CREATE TABLE IF NOT EXISTS traffic_streamer_snapshot (
+                        ts_utc TIMESTAMP,
+                        platform VARCHAR,
+                        streamer_id VARCHAR,
+                        category_name VARCHAR,
+                        viewers INTEGER
+                    );
+                """)
+                # 스트리머별 최신 샘플 + 기준선 (스냅샷 저장 때 증분 갱신, Detector는 이 표만 읽음)
+                con.execute("""
+                    CREATE TABLE IF NOT EXISTS streamer_baseline (
+                        platform VARCHAR,
+                        streamer_id VARCHAR,
+                        streamer_name VARCHAR,
+                        category_name VARCHAR,
+                        title VARCHAR,
+                        last_ts TIMESTAMP,
+                        last_viewers INTEGER,
+                        session_started TIMESTAMP,
+                        session_samples INTEGER,
+                        short_ewm DOUBLE,
+                        base_short DOUBLE,
+                        long_ewm DOUBLE,
+                        base_long DOUBLE,
+                        sample_count BIGINT,
+                        PRIMARY KEY (platform, streamer_id)
+                    );
+                """)
+                profiled = con.execute("SELECT COUNT(*) FROM category_seasonal_profile").fetchone()[0]
+                if not profiled:
+                    self._rebuild_seasonal_profile(con)
+            finally:
+                con.close()
+
+    def _rebuild_seasonal_profile(self, con):
+        """기존 스냅샷으로 계절 프로필 일괄 생성 (증분 갱신과 같은 EWM/샘플 규칙)"""
+        decay = 1 - SEASONAL_EWM_ALPHA
+        con.execute(f"""
+            INSERT INTO category_seasonal_profile
+            WITH snap AS (
+                -- 증분 갱신과 같이 스냅샷당 샘플 1개 (같은 카테고리 행이 여럿이면 합, SNAPSHOT_AGG와 동일)
+                SELECT platform, category_name, ts_utc, SUM(viewers)::DOUBLE AS v
+                FROM traffic_category_snapshot
+                WHERE viewers IS NOT NULL
+                GROUP BY ALL
+            ),
+            s AS (
+                SELECT platform, category_name,
+                       {SLOT_EXPR.format(ts="ts_utc")} AS slot,
+                       v, ts_utc,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY platform, category_name, {SLOT_EXPR.format(ts="ts_utc")}
+                           ORDER BY ts_utc DESC
+                       ) AS rn,
+                       COUNT(*) OVER (
+                           PARTITION BY platform, category_name, {SLOT_EXPR.format(ts="ts_utc")}
+                       ) AS n
+                FROM snap
+            )
+            SELECT platform, category_name, slot,
+                   MAX(n),
+                   SUM(v * CASE WHEN rn = n THEN pow({decay}, rn - 1)
+                                ELSE {SEASONAL_EWM_ALPHA} * pow({decay}, rn - 1) END),
+                   MEDIAN(v) FILTER (WHERE rn <= {SEASONAL_MAX_SAMPLES}),
+                   MAD(v) FILTER (WHERE rn <= {SEASONAL_MAX_SAMPLES}),
+                   LIST(v ORDER BY ts_utc) FILTER (WHERE rn <= {SEASONAL_MAX_SAMPLES}),
+                   MAX(ts_utc)
+            FROM s
+            GROUP BY platform, category_name, slot
+        """)
+        count = con.execute("SELECT COUNT(*) FROM category_seasonal_profile").fetchone()[0]
+        if count:
+            print(f"[DuckDB] 계절 프로필 초기 생성 {count}개 슬롯")
+
+    def _update_seasonal_profile(self, con):
+        """_incoming 스냅샷으로 (플랫폼, 카테고리, 요일x시 슬롯) 프로필 증분 갱신"""
+        window = f"list_slice(list_append(p.samples, EXCLUDED.ewm_mean), -{SEASONAL_MAX_SAMPLES}, -1)"
+        con.execute(f"""
+            INSERT INTO category_seasonal_profile AS p
+            SELECT platform, category_name, slot, 1, v, v, 0.0, [v], ts
+            FROM (
+                SELECT platform, category_name,
+                       {SLOT_EXPR.format(ts="ts_utc")} AS slot,
+                       SUM(viewers)::DOUBLE AS v, MAX(ts_utc) AS ts
+                FROM _incoming
+                WHERE viewers IS NOT NULL
+                GROUP BY ALL
+            )
+            ON CONFLICT (platform, category_name, slot) DO UPDATE SET
+                sample_count = p.sample_count + 1,
+                ewm_mean = p.ewm_mean + {SEASONAL_EWM_ALPHA} * (EXCLUDED.ewm_mean - p.ewm_mean),
+                median = list_aggregate({window}, 'median'),
+                mad = list_aggregate({window}, 'mad'),
+                samples = {window},
+                updated_at = EXCLUDED.updated_at
+        """)
+
+    def _update_anomaly_state(self, con):
+        """
+        _incoming 스냅샷으로 카테고리 이상 점수 상태를 O(1) 증분 갱신.
+        - EWM 평균/분산 -> ewm_z = (x - 평균) / 표준편차
+        - 스트리밍 중앙값(부호 방향으로 척도 x alpha만큼 이동)과 중앙값 기준 EWM 평균 절대편차(ewm_mad)
+          -> anomaly_score = (x - 중앙값) / max(1.2533 x ewm_mad, sqrt(중앙값))
+        점수는 이번 샘플을 반영하기 전 상태로 계산한다. sqrt(중앙값)은 시청자 수(계수 데이터)의
+        포아송 잡음 하한이라 작은 카테고리의 흔들림이 큰 점수로 번지지 않는다.
+        한 스냅샷에 같은 (platform, category_name) 행이 여럿이면 계절 프로필과 같이 합을 샘플로 쓴다
+        (BASELINE_QUERY도 스냅샷별 합으로 기준선 계산, SNAPSHOT_AGG).
+        """
+        a = ANOMALY_ALPHA
+        x = "EXCLUDED.last_viewers"
+        scale = f"GREATEST({ABS_DEV_TO_SIGMA} * p.ewm_mad, sqrt(GREATEST(p.ewm_median, 1)))"
+        con.execute(f"""
+            INSERT INTO category_anomaly_state AS p
+            SELECT platform, category_name, ts, v, 1, v, 0, v, 0, NULL, NULL
+            FROM (
+                SELECT platform, category_name, MAX(ts_utc) AS ts, SUM(viewers)::INTEGER AS v
+                FROM _incoming
+                WHERE viewers IS NOT NULL
+                GROUP BY ALL
+            )
+            ON CONFLICT (platform, category_name) DO UPDATE SET
+                last_ts = EXCLUDED.last_ts,
+                last_viewers = {x},
+                sample_count = p.sample_count + 1,
+                anomaly_score = CASE WHEN p.sample_count >= {ANOMALY_MIN_SAMPLES}
+                                     THEN ({x} - p.ewm_median) / {scale} END,
+                ewm_z = CASE WHEN p.sample_count >= {ANOMALY_MIN_SAMPLES} AND p.ewm_var > 0
+                             THEN ({x} - p.ewm_mean) / sqrt(p.ewm_var) END,
+                ewm_mean = p.ewm_mean + {a} * ({x} - p.ewm_mean),
+                ewm_var = (1 - {a}) * (p.ewm_var + {a} * pow({x} - p.ewm_mean, 2)),
+                ewm_median = p.ewm_median + {a} * {scale} * sign({x} - p.ewm_median),
+                ewm_mad = p.ewm_mad + {a} * (abs({x} - p.ewm_median) - p.ewm_mad)
+            WHERE EXCLUDED.last_ts > p.last_ts
+        """)
+
+    def _update_streamer_baseline(self, con):
+        """
+        _incoming_streamers로 스트리머 기준선 증분 갱신.
+        base_short/base_long은 이번 샘플을 반영하기 직전의 EWM (현재값과 비교할 기준선).
+        세션이 끊겼다 다시 시작하면 단기 기준선은 비우고 장기 기준선만 이어간다.
+        """
+        new_session = f"(EXCLUDED.last_ts - b.last_ts > INTERVAL {STREAMER_SESSION_GAP_MINUTES} MINUTE)"
+        con.execute(f"""
+            INSERT INTO streamer_baseline AS b
+            SELECT platform, streamer_id, streamer_name, category_name, title,
+                   ts_utc, viewers, ts_utc, 1, viewers, NULL, viewers, NULL, 1
+            FROM _incoming_streamers
+            ON CONFLICT (platform, streamer_id) DO UPDATE SET
+                streamer_name = EXCLUDED.streamer_name,
+                category_name = EXCLUDED.category_name,
+                title = EXCLUDED.title,
+                last_ts = EXCLUDED.last_ts,
+                last_viewers = EXCLUDED.last_viewers,
+                session_started = CASE WHEN {new_session} THEN EXCLUDED.last_ts ELSE b.session_started END,
+                session_samples = CASE WHEN {new_session} THEN 1 ELSE b.session_samples + 1 END,
+                base_short = CASE WHEN {new_session} THEN NULL ELSE b.short_ewm END,
+                short_ewm = CASE WHEN {new_session} THEN EXCLUDED.last_viewers
+                                 ELSE b.short_ewm + {STREAMER_SHORT_ALPHA} * (EXCLUDED.last_viewers - b.short_ewm) END,
+                base_long = b.long_ewm,
+                long_ewm = b.long_ewm + {STREAMER_LONG_ALPHA} * (EXCLUDED.last_viewers - b.long_ewm),
+                sample_count = b.sample_count + 1
+            WHERE EXCLUDED.last_ts > b.last_ts
+        """)
+
+    @staticmethod
+    def _streamer_values(data):
+        """카테고리 행의 방송 목록(streams, 없으면 Top 5) -> 스트리머별 1행 (여러 번 나오면 시청자 최대)"""
+        latest = {}
+        for d in data:
+            for s in d.get("streams") or d.get("top_streamers_detail") or []:
+                viewers = int(s.get("viewers") or 0)
+                sid = s.get("id")
+                if not sid or viewers < STREAMER_MIN_VIEWERS:
+                    continue
+                key = (d["platform"], str(sid))
+                if key not in latest or viewers > latest[key][-1]:
+                    latest[key] = (
+                        d["ts_utc"], d["platform"], str(sid), s.get("name"),
+                        d["category_name"], s.get("title") or "", viewers,
+                    )
+        return list(latest.values())
 
     def save_category_snapshot(self, data: List[Dict[str, Any]]):
-        """카테고리 데이터 저장 (JSON 변환 포함). 락 충돌 시 최대 6회 재시도(백오프 2/4/8/16/32초)."""
+        """
+        카테고리 데이터 저장 (JSON 변환 포함). 락 충돌 시 최대 6회 재시도(백오프 2/4/8/16/32초).
+        저장된 스냅샷의 ts_utc(DB에 기록된 값 기준 최댓값)를 반환.
+        """
         if not data:
-            return
+            return None
 
         values = []
         for d in data:
@@ -52,33 +345,70 @@ class DuckDBStore:
                 d['open_lives'],
                 detail_json,
             ))
+        streamers = self._streamer_values(data)
 
         max_retries = 6
         backoff = 2.0
         last_err = None
-        for attempt in range(max_retries):
-            con = None
-            try:
-                con = self._get_connection()
-                con.executemany("""
-                    INSERT INTO traffic_category_snapshot 
-                    (ts_utc, platform, category_id, category_name, viewers, open_lives, top_streamers_detail)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, values)
-                print(f"[DuckDB] 스냅샷 {len(data)}건 저장 완료 (Top 5 포함).")
-                return
-            except Exception as e:
-                last_err = e
-                if _is_lock_error(e) and attempt < max_retries - 1:
-                    wait = backoff * (2**attempt)
-                    print(f"[DuckDB] 락 대기 재시도 {attempt + 1}/{max_retries} ({wait:.0f}s 후)")
-                    time.sleep(wait)
-                    continue
-                print(f"[DuckDB] 저장 실패: {e}")
-                raise last_err
-            finally:
-                if con:
+        with self._write_intent() as announce:
+            for attempt in range(max_retries):
+                con = None
+                announce()
+                try:
+                    con = self._get_connection()
+                    # 스냅샷 저장과 계절 프로필 갱신을 한 트랜잭션으로 묶음
+                    con.execute("CREATE TEMP TABLE IF NOT EXISTS _incoming AS SELECT * FROM traffic_category_snapshot LIMIT 0")
+                    con.execute("DELETE FROM _incoming")
+                    con.executemany("""
+                        INSERT INTO _incoming 
+                        (ts_utc, platform, category_id, category_name, viewers, open_lives, top_streamers_detail)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """, values)
+                    con.execute("""
+                        CREATE TEMP TABLE IF NOT EXISTS _incoming_streamers (
+                            ts_utc TIMESTAMP, platform VARCHAR, streamer_id VARCHAR, streamer_name VARCHAR,
+                            category_name VARCHAR, title VARCHAR, viewers INTEGER
+                        )
+                    """)
+                    con.execute("DELETE FROM _incoming_streamers")
+                    if streamers:
+                        # 수천 행이라 executemany 대신 컬럼 배열 UNNEST로 한 번에 적재
+                        con.execute("""
+                            INSERT INTO _incoming_streamers
+                            SELECT UNNEST(?::TIMESTAMP[]), UNNEST(?::VARCHAR[]), UNNEST(?::VARCHAR[]),
+                                   UNNEST(?::VARCHAR[]), UNNEST(?::VARCHAR[]), UNNEST(?::VARCHAR[]),
+                                   UNNEST(?::INTEGER[])
+                        """, [list(col) for col in zip(*streamers)])
+                    con.execute("BEGIN TRANSACTION")
                     try:
-                        con.close()
+                        con.execute("INSERT INTO traffic_category_snapshot SELECT * FROM _incoming")
+                        self._update_seasonal_profile(con)
+                        self._update_anomaly_state(con)
+                        con.execute("""
+                            INSERT INTO traffic_streamer_snapshot
+                            SELECT ts_utc, platform, streamer_id, category_name, viewers
+                            FROM _incoming_streamers ORDER BY viewers DESC
+                        """)
+                        self._update_streamer_baseline(con)
+                        con.execute("COMMIT")
                     except Exception:
-                        pass
+                        con.execute("ROLLBACK")
+                        raise
+                    saved_ts = con.execute("SELECT MAX(ts_utc) FROM _incoming").fetchone()[0]
+                    print(f"[DuckDB] 스냅샷 {len(data)}건 저장 완료 (Top 5 포함, 스트리머 {len(streamers)}명).")
+                    return saved_ts
+                except Exception as e:
+                    last_err = e
+                    if _is_lock_error(e) and attempt < max_retries - 1:
+                        wait = backoff * (2**attempt)
+                        print(f"[DuckDB] 락 대기 재시도 {attempt + 1}/{max_retries} ({wait:.0f}s 후)")
+                        time.sleep(wait)
+                        continue
+                    print(f"[DuckDB] 저장 실패: {e}")
+                    raise last_err
+                finally:
+                    if con:
+                        try:
+                            con.close()
+                        except Exception:
+                            pass
@@ -0,0 +1,399 @@
+import json
+import os
+import select
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import pool as pg_pool
+from psycopg2.extensions import connection as _pg_connection
+
+_default_pg_host = "postgres" if os.path.exists("/.dockerenv") else "localhost"
+PG_HOST = os.getenv("POSTGRES_HOST", _default_pg_host)
+PG_PORT = os.getenv("POSTGRES_PORT", "5432")
+PG_DSN = (
+    f"host={PG_HOST} port={PG_PORT} "
+    f"dbname={os.getenv('POSTGRES_DB', 'streampulse_meta')} "
+    f"user={os.getenv('POSTGRES_USER', 'user')} "
+    f"password={os.getenv('POSTGRES_PASSWORD', 'password')}"
+)
+PG_POOL_MIN = int(os.getenv("PG_POOL_MIN", "1"))
+PG_POOL_MAX = int(os.getenv("PG_POOL_MAX", "5"))
+PG_POOL_TIMEOUT = float(os.getenv("PG_POOL_TIMEOUT", "10"))
+# Collector -> Detector 스냅샷 커밋 알림 채널
+SNAPSHOT_CHANNEL = "snapshot_committed"
+# Detector/Agent -> API signal_events 추가·갱신 알림 채널 (/api/stream)
+EVENTS_CHANNEL = "signal_events_changed"
+
+# signal_events 스키마. Detector(init_db)와 Agent(시작 시)가 같은 정의로 만들고 컬럼을 보강한다
+# (Agent의 update_event/mark_failed가 updated_at을 쓰므로 어느 쪽이 먼저 떠도 컬럼이 있어야 함)
+SIGNAL_EVENTS_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS signal_events (
+        event_id SERIAL PRIMARY KEY,
+        created_at TIMESTAMP DEFAULT NOW(),
+        platform VARCHAR(20),
+        category_name VARCHAR(100),
+        event_type VARCHAR(50),
+        growth_rate FLOAT,
+        cause_detail JSONB,
+        analysis_status VARCHAR(20),
+        analysis_tier VARCHAR(10),
+        spike_reason TEXT,
+        entity_keywords JSONB,
+        context_cache_key TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_cool ON signal_events (platform, category_name, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_signal_events_created_at ON signal_events (created_at DESC)",
+    "ALTER TABLE signal_events ADD COLUMN IF NOT EXISTS analysis_status VARCHAR(20)",
+    "ALTER TABLE signal_events ADD COLUMN IF NOT EXISTS analysis_tier VARCHAR(10)",
+    "ALTER TABLE signal_events ADD COLUMN IF NOT EXISTS spike_reason TEXT",
+    "ALTER TABLE signal_events ADD COLUMN IF NOT EXISTS entity_keywords JSONB",
+    "ALTER TABLE signal_events ADD COLUMN IF NOT EXISTS context_cache_key TEXT",
+    # 스트리머 단위 이벤트(STREAMER_SPIKE)의 대상. 카테고리 이벤트는 NULL
+    "ALTER TABLE signal_events ADD COLUMN IF NOT EXISTS streamer_id VARCHAR(100)",
+    # 이벤트 수명 (src/detector/lifecycle.py): 열린 동안 같은 키는 새 행 대신 이 행을 갱신
+    *(
+        f"ALTER TABLE signal_events ADD COLUMN IF NOT EXISTS {column}"
+        for column in (
+            "lifecycle_state VARCHAR(20)",
+            "updated_at TIMESTAMP",
+            "last_seen_at TIMESTAMP",
+            "closed_at TIMESTAMP",
+            "peak_viewers INT",
+            "peak_at TIMESTAMP",
+            "analyzed_viewers INT",
+            "analysis_count INT DEFAULT 1",
+            "timeline JSONB",
+        )
+    ),
+    """
+    CREATE INDEX IF NOT EXISTS idx_signal_events_open ON signal_events (lifecycle_state)
+    WHERE lifecycle_state IN ('ONSET', 'ESCALATION', 'PEAK', 'DECAY')
+    """,
+    # /api/stream 변경 피드: 추가/갱신 시각 순 조회
+    """
+    CREATE INDEX IF NOT EXISTS idx_signal_events_changed
+    ON signal_events ((COALESCE(updated_at, created_at)))
+    """,
+)
+# 여러 프로세스가 동시에 DDL을 돌릴 때 직렬화하는 pg_advisory_xact_lock 키
+SCHEMA_LOCK = 0x53500003
+
+# 열린 이벤트 재분석 조건: Python 판정(u.requeue) + 그 사이 분석 대기/진행 중이 되지 않았고
+# Agent가 항상 건너뛰는 CATEGORY_ADOPTION이 아님 (src/detector/lifecycle.py와 같은 조건)
+_REQUEUE = (
+    "u.requeue AND e.analysis_status NOT IN ('PENDING', 'IN_PROGRESS') "
+    "AND e.event_type IS DISTINCT FROM 'CATEGORY_ADOPTION'"
+)
+
+# 핫 쿼리: 연결마다 처음 한 번 PREPARE 후 EXECUTE로 재사용
+STATEMENTS = {
+    "fetch_pending": """
+        WITH cte AS (
+            SELECT event_id
+            FROM signal_events
+            WHERE analysis_status = 'PENDING'
+            ORDER BY created_at ASC
+            LIMIT $1
+            FOR UPDATE SKIP LOCKED
+        )
+        UPDATE signal_events
+        SET analysis_status = 'IN_PROGRESS'
+        WHERE event_id IN (SELECT event_id FROM cte)
+        RETURNING event_id, platform, category_name, event_type, growth_rate, cause_detail
+    """,
+    "update_event": """
+        UPDATE signal_events
+        SET analysis_status = $1,
+            analysis_tier = $2,
+            spike_reason = $3,
+            entity_keywords = $4::jsonb,
+            context_cache_key = $5,
+            cause_detail = cause_detail || $6::jsonb,
+            updated_at = NOW()
+        WHERE event_id = $7
+    """,
+    "mark_failed": """
+        UPDATE signal_events
+        SET analysis_status = 'FAILED',
+            cause_detail = cause_detail || $1::jsonb,
+            updated_at = NOW()
+        WHERE event_id = $2
+    """,
+    "cooldown_keys": """
+        SELECT n.now, e.platform, e.category_name, e.streamer_id, e.last_at
+        FROM (SELECT NOW()::timestamp AS now) n
+        LEFT JOIN (
+            SELECT platform, category_name, streamer_id, MAX(created_at) AS last_at
+            FROM (
+                SELECT platform, category_name, streamer_id, created_at
+                FROM signal_events
+                WHERE created_at >= NOW() - $1 * INTERVAL '1 minute'
+                UNION ALL
+                -- 플랫폼 간 병합 이벤트에 묶인 다른 플랫폼 카테고리
+                SELECT c->>'platform', c->>'category', NULL, s.created_at
+                FROM signal_events s, jsonb_array_elements(s.cause_detail->'correlated') c
+                WHERE s.created_at >= NOW() - $1 * INTERVAL '1 minute'
+                  AND s.cause_detail ? 'correlated'
+            ) k
+            GROUP BY platform, category_name, streamer_id
+        ) e ON TRUE
+    """,
+    # 배열 인자 unnest로 N건을 한 번에 INSERT
+    "insert_events": """
+        INSERT INTO signal_events
+            (platform, category_name, event_type, growth_rate, cause_detail, analysis_status, analysis_tier,
+             streamer_id, lifecycle_state, updated_at, last_seen_at, peak_at, peak_viewers, analyzed_viewers,
+             timeline)
+        SELECT u.platform, u.category_name, u.event_type, u.growth_rate, u.cause_detail::jsonb,
+               u.analysis_status, u.analysis_tier, u.streamer_id,
+               'ONSET', NOW(), NOW(), NOW(), u.peak, u.peak,
+               jsonb_build_array(jsonb_build_object('ts', NOW()::timestamp, 'viewers', u.peak, 'ratio', u.growth_rate))
+        FROM unnest(
+            $1::varchar[], $2::varchar[], $3::varchar[], $4::float8[],
+            $5::text[], $6::varchar[], $7::varchar[], $8::varchar[], $9::int[]
+        ) AS u(platform, category_name, event_type, growth_rate, cause_detail, analysis_status, analysis_tier,
+               streamer_id, peak)
+        RETURNING event_id
+    """,
+    # 열린 이벤트 (lifecycle_state 이전 행은 NULL이라 제외)
+    "open_events": """
+        SELECT event_id, platform, category_name, streamer_id, lifecycle_state, analysis_status,
+               cause_detail->>'signal_level', created_at, last_seen_at, peak_viewers, analyzed_viewers,
+               cause_detail->'correlated', event_type
+        FROM signal_events
+        WHERE lifecycle_state IN ('ONSET', 'ESCALATION', 'PEAK', 'DECAY')
+    """,
+    # 열린 이벤트의 단계/최고치/시계열 갱신. 재분석은 _REQUEUE 조건일 때만 PENDING으로 되돌림.
+    "lifecycle_update": f"""
+        UPDATE signal_events e SET
+            lifecycle_state = u.state,
+            updated_at = NOW(),
+            last_seen_at = CASE WHEN u.viewers IS NULL THEN e.last_seen_at ELSE NOW() END,
+            closed_at = CASE WHEN u.state = 'CLOSED' THEN NOW() END,
+            peak_at = CASE WHEN u.viewers > e.peak_viewers THEN NOW() ELSE e.peak_at END,
+            peak_viewers = GREATEST(e.peak_viewers, u.viewers),
+            timeline = CASE WHEN u.viewers IS NULL THEN e.timeline ELSE jsonb_path_query_array(
+                COALESCE(e.timeline, '[]'::jsonb)
+                    || jsonb_build_array(jsonb_build_object('ts', NOW()::timestamp, 'viewers', u.viewers, 'ratio', u.ratio)),
+                '$[last - $n + 1 to last]', jsonb_build_object('n', $8::int)
+            ) END,
+            analyzed_viewers = CASE WHEN {_REQUEUE}
+                                    THEN u.viewers ELSE e.analyzed_viewers END,
+            analysis_count = COALESCE(e.analysis_count, 1)
+                + CASE WHEN {_REQUEUE} THEN 1 ELSE 0 END,
+            cause_detail = CASE WHEN {_REQUEUE}
+                                THEN e.cause_detail || jsonb_build_object(
+                                    'signal_level', u.level,
+                                    'stats', COALESCE(e.cause_detail->'stats', '{{}}'::jsonb) || u.stats::jsonb)
+                                ELSE e.cause_detail END,
+            analysis_status = CASE WHEN {_REQUEUE}
+                                   THEN 'PENDING' ELSE e.analysis_status END
+        FROM unnest(
+            $1::int[], $2::varchar[], $3::int[], $4::float8[], $5::bool[], $6::varchar[], $7::text[]
+        ) AS u(event_id, state, viewers, ratio, requeue, level, stats)
+        WHERE e.event_id = u.event_id
+    """,
+}
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    "created": 0,
+    "acquired": 0,
+    "in_use": 0,
+    "max_in_use": 0,
+    "wait_ms_total": 0.0,
+    "wait_ms_max": 0.0,
+    "timeouts": 0,
+    "discarded": 0,
+    "prepared": 0,
+    "prepared_executions": 0,
+}
+
+
+def _bump(key, value=1):
+    with _metrics_lock:
+        _metrics[key] += value
+
+
+class _PooledConnection(_pg_connection):
+    """연결별 PREPARE 이력을 들고 다니는 psycopg2 연결"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+        _bump("created")
+
+
+_pool = None
+_slots = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool, _slots
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pg_pool.ThreadedConnectionPool(
+                    PG_POOL_MIN, PG_POOL_MAX, PG_DSN, connection_factory=_PooledConnection
+                )
+                # ThreadedConnectionPool은 소진 시 바로 예외 -> 세마포어로 대기
+                _slots = threading.BoundedSemaphore(PG_POOL_MAX)
+    return _pool
+
+
+@contextmanager
+def connection():
+    """
+    프로세스 공용 풀에서 연결 대여. 정상 종료 시 commit, 예외 시 rollback 후 반납.
+    끊어진 연결은 반납 시 폐기한다.
+    """
+    pool = _get_pool()
+    started = time.perf_counter()
+    if not _slots.acquire(timeout=PG_POOL_TIMEOUT):
+        _bump("timeouts")
+        raise pg_pool.PoolError(f"Postgres 연결 대기 {PG_POOL_TIMEOUT}s 초과")
+    try:
+        conn = pool.getconn()
+    except Exception:
+        _slots.release()
+        raise
+    waited = (time.perf_counter() - started) * 1000
+    with _metrics_lock:
+        _metrics["acquired"] += 1
+        _metrics["in_use"] += 1
+        _metrics["max_in_use"] = max(_metrics["max_in_use"], _metrics["in_use"])
+        _metrics["wait_ms_total"] += waited
+        _metrics["wait_ms_max"] = max(_metrics["wait_ms_max"], waited)
+
+    broken = False
+    try:
+        yield conn
+        conn.commit()
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception:
+            broken = True
+        raise
+    finally:
+        broken = broken or bool(conn.closed)
+        if broken:
+            _bump("discarded")
+        pool.putconn(conn, close=broken)
+        _slots.release()
+        _bump("in_use", -1)
+
+
+def execute_prepared(cur, name, params=()):
+    """STATEMENTS[name]을 연결당 한 번 PREPARE하고 EXECUTE"""
+    conn = cur.connection
+    if name not in conn.prepared:
+        cur.execute(f"PREPARE {name} AS {STATEMENTS[name]}")
+        conn.prepared.add(name)
+        _bump("prepared")
+    if params:
+        placeholders = ", ".join(["%s"] * len(params))
+        cur.execute(f"EXECUTE {name} ({placeholders})", tuple(params))
+    else:
+        cur.execute(f"EXECUTE {name}")
+    _bump("prepared_executions")
+    return cur
+
+
+def ensure_signal_events(cur=None):
+    """signal_events 테이블/컬럼/인덱스 보강 (멱등). cur를 주면 그 트랜잭션 안에서"""
+    if cur is None:
+        with connection() as conn:
+            return ensure_signal_events(conn.cursor())
+    cur.execute("SELECT pg_advisory_xact_lock(%s)", (SCHEMA_LOCK,))
+    for statement in SIGNAL_EVENTS_DDL:
+        cur.execute(statement)
+
+
+def query(sql, params=None):
+    """단발 조회: (컬럼명 목록, 행 목록)"""
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        columns = [d[0] for d in cur.description] if cur.description else []
+        return columns, cur.fetchall()
+
+
+def pool_metrics():
+    with _metrics_lock:
+        out = dict(_metrics)
+    out["wait_ms_total"] = round(out["wait_ms_total"], 3)
+    out["wait_ms_max"] = round(out["wait_ms_max"], 3)
+    out["wait_ms_avg"] = round(out["wait_ms_total"] / out["acquired"], 3) if out["acquired"] else 0.0
+    out["pool_max"] = PG_POOL_MAX
+    out["idle"] = len(_pool._pool) if _pool is not None else 0
+    return out
+
+
+def notify(channel, payload, cur=None):
+    """LISTEN 중인 프로세스로 JSON 알림 전송 (커밋 시점에 전달). cur를 주면 그 트랜잭션과 함께 커밋"""
+    if cur is not None:
+        cur.execute("SELECT pg_notify(%s, %s)", (channel, json.dumps(payload, default=str)))
+        return
+    with connection() as conn:
+        conn.cursor().execute("SELECT pg_notify(%s, %s)", (channel, json.dumps(payload, default=str)))
+
+
+class Listener:
+    """
+    LISTEN 전용 연결 (풀 밖, autocommit). wait()는 알림 payload 목록을 돌려주고
+    연결이 끊기면 다음 호출에서 다시 연결한다. 채널 여러 개를 한 연결로 들을 수 있다.
+    """
+
+    def __init__(self, *channels):
+        self.channels = channels
+        self.channel = ",".join(channels)
+        self.conn = None
+
+    def _connect(self):
+        conn = psycopg2.connect(PG_DSN)
+        conn.autocommit = True
+        cur = conn.cursor()
+        for channel in self.channels:
+            cur.execute(f"LISTEN {channel}")
+        self.conn = conn
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
+
+    def wait(self, timeout):
+        try:
+            if self.conn is None or self.conn.closed:
+                self._connect()
+            if not self.conn.notifies:
+                ready, _, _ = select.select([self.conn], [], [], timeout)
+                if ready:
+                    self.conn.poll()
+            else:
+                self.conn.poll()
+        except Exception as e:
+            print(f"[Postgres] LISTEN {self.channel} 실패: {e}")
+            self.close()
+            time.sleep(min(timeout, 5))
+            return []
+        payloads = []
+        while self.conn.notifies:
+            note = self.conn.notifies.pop(0)
+            try:
+                payloads.append(json.loads(note.payload))
+            except ValueError:
+                payloads.append({})
+        return payloads
@@ -0,0 +1,95 @@
+import duckdb
+import pytest
+
+from src.detector.query_bench import synthesize
+
+
+@pytest.fixture(scope="session")
+def snapshot_db(tmp_path_factory):
+    """8일치 합성 스냅샷 (7일 전/전날 기준선 구간 포함), 읽기 전용 DuckDB 연결"""
+    path = str(tmp_path_factory.mktemp("duck") / "synthetic.db")
+    synthesize(path, days=8, categories=20)
+    con = duckdb.connect(path, read_only=True)
+    yield con
+    con.close()
+
+
+@pytest.fixture(scope="session")
+def pg_db():
+    """
+    테스트용 임시 Postgres DB (POSTGRES_* 환경변수의 서버에 만들고 끝나면 삭제). 서버가 없으면 skip.
+    공용 풀(src.storage.postgres)이 이 DB를 보도록 DSN을 바꾸고 감지기 스키마를 만든다.
+    """
+    import os
+
+    import psycopg2
+
+    from src.storage import postgres as pg
+
+    name = f"streampulse_test_{os.getpid()}"
+    try:
+        admin = psycopg2.connect(pg.PG_DSN, connect_timeout=3)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"Postgres 없음: {e}")
+    admin.autocommit = True
+    admin.cursor().execute(f"CREATE DATABASE {name}")
+    dsn = pg.PG_DSN.replace(f"dbname={os.getenv('POSTGRES_DB', 'streampulse_meta')}", f"dbname={name}")
+    original = pg.PG_DSN
+    pg.PG_DSN, pg._pool = dsn, None
+    try:
+        from src.detector.signal_detector import init_db
+
+        init_db()
+        yield pg
+    finally:
+        if pg._pool is not None:
+            pg._pool.closeall()
+        pg.PG_DSN, pg._pool = original, None
+        admin.cursor().execute(f"DROP DATABASE IF EXISTS {name} WITH (FORCE)")
+        admin.close()
+
+
+@pytest.fixture
+def pg_clean(pg_db):
+    """테스트마다 빈 signal_events / detector_runs / signal_event_daily"""
+    with pg_db.connection() as conn:
+        conn.cursor().execute(
+            "TRUNCATE signal_events, detector_runs, detector_shards, signal_event_daily RESTART IDENTITY"
+        )
+    return pg_db
+
+
+@pytest.fixture
+def duck_db(tmp_path, monkeypatch):
+    """빈 스냅샷 테이블이 있는 DuckDB 파일 경로. API 공용 핸들(src.api.services.duck)이 이 파일을 읽는다"""
+    from src.api.services import duck
+
+    path = str(tmp_path / "analytics.db")
+    con = duckdb.connect(path)
+    con.execute("""
+        CREATE TABLE traffic_category_snapshot (
+            ts_utc TIMESTAMP, platform VARCHAR, category_id VARCHAR, category_name VARCHAR,
+            viewers INTEGER, open_lives INTEGER, top_streamers_detail VARCHAR
+        )
+    """)
+    con.close()
+    handle = duck.DuckHandle(path)
+    monkeypatch.setattr(duck, "_handle", handle)
+    yield path
+    handle.close()
+
+
+@pytest.fixture
+def insert_snapshots(duck_db):
+    """duck_db에 스냅샷 행 추가. 같은 프로세스의 읽기 전용 핸들이 열려 있으면 쓸 수 없어 먼저 닫는다"""
+    from src.api.services import duck
+
+    def insert(rows):
+        duck._handle.close()
+        con = duckdb.connect(duck_db)
+        try:
+            con.executemany("INSERT INTO traffic_category_snapshot VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        finally:
+            con.close()
+
+    return insert
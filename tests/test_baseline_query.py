@@ -0,0 +1,68 @@
+from collections import Counter
+
+import pytest
+
+from src.detector.query_bench import LEGACY_BASELINE_QUERY, replay_points, snapshot_source
+from src.detector.signal_detector import RULES, fetch_baseline_rows
+
+
+def _by_key(rows):
+    """(platform, category) -> (현재 viewers, open_lives, top, med_60m, avg_7d, avg_24h). 1시간 전 값은 제외"""
+    keys = Counter((r[0], r[1]) for r in rows)
+    assert not [k for k, n in keys.items() if n > 1], "같은 (platform, category) 행이 여러 개"
+    return {(r[0], r[1]): (r[2], r[3], r[10], r[4], r[8], r[9]) for r in rows}
+
+
+def _source(ts):
+    return f"(SELECT * FROM traffic_category_snapshot WHERE ts_utc <= TIMESTAMP '{ts}')"
+
+
+def test_synthetic_data_has_duplicate_category_names(snapshot_db):
+    dups = snapshot_db.execute("""
+        SELECT COUNT(*) FROM (
+            SELECT 1 FROM traffic_category_snapshot
+            GROUP BY ts_utc, platform, category_name HAVING COUNT(*) > 1
+        )
+    """).fetchone()[0]
+    assert dups > 0
+
+
+def test_baseline_query_matches_legacy_query(snapshot_db):
+    points = replay_points(snapshot_db, 6)
+    assert len(points) >= 6
+    for ts in points:
+        source = _source(ts)
+        expected = _by_key(snapshot_db.execute(
+            LEGACY_BASELINE_QUERY.format(source=snapshot_source(source), min_viewers=RULES["min_absolute_delta"])
+        ).fetchall())
+        actual = _by_key(fetch_baseline_rows(snapshot_db, source=source))
+
+        assert expected, ts
+        assert actual.keys() == expected.keys(), ts
+        for key, (viewers, open_lives, top, med, d7, d24) in expected.items():
+            assert actual[key][:3] == (viewers, open_lives, top), (ts, key)
+            assert actual[key][3:] == pytest.approx((med, d7, d24), rel=1e-9, nan_ok=True), (ts, key)
+
+
+def test_baseline_query_sums_duplicate_category_rows(snapshot_db):
+    ts = replay_points(snapshot_db, 1)[-1]
+    raw = snapshot_db.execute(f"""
+        SELECT platform, category_name, category_id, viewers, open_lives, top_streamers_detail
+        FROM traffic_category_snapshot
+        WHERE ts_utc = (SELECT MAX(ts_utc) FROM traffic_category_snapshot s
+                        WHERE s.platform = traffic_category_snapshot.platform AND ts_utc <= TIMESTAMP '{ts}')
+    """).fetchall()
+    groups = {}
+    for platform, name, category_id, viewers, open_lives, top in raw:
+        groups.setdefault((platform, name), []).append((viewers, category_id, open_lives, top))
+    actual = _by_key(fetch_baseline_rows(snapshot_db, source=_source(ts)))
+
+    merged = [k for k, g in groups.items() if len(g) > 1 and k in actual]
+    assert merged
+    for key in merged:
+        group = groups[key]
+        viewers, open_lives, top = actual[key][:3]
+        assert viewers == sum(g[0] for g in group)
+        assert open_lives == sum(g[2] for g in group)
+        # Top 스트리머는 시청자가 가장 많은 행(동률이면 category_id 순)
+        assert top == min(group, key=lambda g: (-g[0], g[1]))[3]
@@ -0,0 +1,94 @@
+from datetime import datetime
+
+from src.detector import signal_detector as sd
+from src.detector.category_map import CategoryIndex, correlate_events, normalize
+from src.detector.cooldown import CooldownIndex
+from src.detector.rules import build_frame
+
+SNAPSHOT = datetime(2026, 10, 1, 3, 0)
+ALIASES = {"리그 오브 레전드": ["League of Legends", "LoL"]}
+
+
+def _index():
+    return CategoryIndex(aliases=ALIASES, separate=["기타"], match_ratio=0.9)
+
+
+def test_normalize_ignores_width_case_and_punctuation():
+    assert normalize("League of Legends!") == "leagueoflegends"
+    assert normalize("ＥＬＤＥＮ_RING ") == "eldenring"
+    assert normalize(None) == ""
+
+
+def test_index_maps_equivalent_names_to_one_key():
+    index = _index().build([
+        ("SOOP", "리그 오브 레전드"), ("CHZZK", "League of Legends"),
+        ("SOOP", "ELDEN RING"), ("CHZZK", "Elden Ring"),
+        ("SOOP", "Eldenrings"),
+        ("SOOP", "Counter-Strike"), ("CHZZK", "Counter Strik"),
+        ("SOOP", "FIFA 23"), ("CHZZK", "FIFA 24"),
+        ("SOOP", "기타"), ("CHZZK", "기타"),
+    ])
+    key = index.canonical
+
+    assert key("SOOP", "리그 오브 레전드") == key("CHZZK", "League of Legends") == key("CHZZK", "LoL")
+    assert key("SOOP", "ELDEN RING") == key("CHZZK", "Elden Ring")
+    # 유사도 매칭은 다른 플랫폼에만 있는 이름과만 (같은 플랫폼 이름은 별개)
+    assert key("SOOP", "Counter-Strike") == key("CHZZK", "Counter Strik")
+    assert key("SOOP", "Eldenrings") != key("SOOP", "ELDEN RING")
+    # 숫자가 다르면 다른 카테고리, separate는 플랫폼별
+    assert key("SOOP", "FIFA 23") != key("CHZZK", "FIFA 24")
+    assert key("SOOP", "기타") != key("CHZZK", "기타")
+    # 색인 순서와 관계없이 같은 결과 (워커마다 같은 샤드)
+    names = [("CHZZK", "Counter Strik"), ("SOOP", "Counter-Strike")]
+    assert CategoryIndex().build(names).canonical(*names[0]) == CategoryIndex().build(names[::-1]).canonical(*names[0])
+
+
+def _event(platform, category, delta, level="SPIKE", status="PENDING", event_type="STRUCTURE_ISSUE"):
+    return {
+        "platform": platform, "category": category, "event_type": event_type,
+        "signal_level": level, "analysis_status": status, "actual_delta": delta, "cur_view": 1000 + delta,
+        "cause_detail": {"stats": {"delta": delta}, "clues": [{"name": f"{platform}-top"}, {"name": "x"}]},
+    }
+
+
+def test_correlate_merges_same_key_across_platforms():
+    events = [
+        _event("SOOP", "Elden Ring", 2000, level="CANDIDATE"),
+        _event("SOOP", "talk", 500),
+        _event("CHZZK", "ELDEN RING", 1500),
+        {**_event("CHZZK", "Elden Ring", 9000), "event_type": "STREAMER_SPIKE"},
+    ]
+
+    merged = correlate_events(events, _index())
+
+    assert [(ev["platform"], ev["category"]) for ev in merged] == [
+        ("CHZZK", "ELDEN RING"), ("SOOP", "talk"), ("CHZZK", "Elden Ring"),
+    ]
+    primary = merged[0]
+    # 대표는 SPIKE 우선
+    assert primary["platforms"] == ["CHZZK", "SOOP"]
+    detail = primary["cause_detail"]
+    assert detail["canonical_category"] == "eldenring"
+    assert detail["correlated"] == [{
+        "platform": "SOOP", "category": "Elden Ring", "signal_level": "CANDIDATE",
+        "event_type": "STRUCTURE_ISSUE", "stats": {"delta": 2000}, "clues": [{"name": "SOOP-top"}],
+    }]
+    assert detail["stats"]["platforms_current"] == 2500 + 3000
+    assert "correlated" not in merged[1]["cause_detail"]
+
+
+def test_merged_event_keeps_both_platforms_in_cooldown(pg_clean):
+    rows = [(p, c, 25000, 10, 10000, 10000, 10, "[]", 10000, 10000, "[]")
+            for p, c in (("SOOP", "Elden Ring"), ("CHZZK", "ELDEN RING"), ("CHZZK", "talk"))]
+    flags = sd.RULES.classify(build_frame(rows, {}, sd.RULES, min_samples=4))
+
+    events = sd.select_all_events(flags, None, CooldownIndex(SNAPSHOT), _index())
+    assert len(events) == 2
+    assert sorted(ev.get("platforms", [ev["platform"]]) for ev in events) == [["CHZZK"], ["SOOP", "CHZZK"]]
+    assert sd.insert_events(events) == 2
+
+    cooldowns = sd.load_cooldowns(SNAPSHOT)
+    minutes = sd.RULES["cooldown_minutes"]
+    assert cooldowns.active("SOOP", "Elden Ring", minutes)
+    assert cooldowns.active("CHZZK", "ELDEN RING", minutes)
+    assert sd.select_all_events(flags, None, cooldowns, _index()) == []
@@ -0,0 +1,49 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.detector import signal_detector as sd
+
+# Detector 프로세스 시계와 9시간 어긋난 DB 시각 / 판정 스냅샷 시각
+DB_NOW = datetime(2026, 10, 1, 3, 0)
+SNAPSHOT = datetime(2026, 10, 1, 2, 55)
+
+
+@contextmanager
+def _broken_connection():
+    raise RuntimeError("cooldown query failed")
+    yield
+
+
+@pytest.fixture
+def cooldown_query_fails(monkeypatch):
+    monkeypatch.setattr(sd.pg, "connection", _broken_connection)
+
+
+def test_cooldown_fallback_uses_db_clock(cooldown_query_fails, monkeypatch):
+    monkeypatch.setattr(sd.pg, "query", lambda sql, params=None: (["now"], [(DB_NOW,)]))
+    cooldowns = sd.load_cooldowns(SNAPSHOT)
+    assert len(cooldowns) == 0
+    assert cooldowns.now == DB_NOW
+
+
+def test_cooldown_fallback_uses_snapshot_time_without_db(cooldown_query_fails, monkeypatch):
+    def unreachable(sql, params=None):
+        raise RuntimeError("no postgres")
+
+    monkeypatch.setattr(sd.pg, "query", unreachable)
+    cooldowns = sd.load_cooldowns(SNAPSHOT)
+    assert cooldowns.now == SNAPSHOT
+    # 같은 실행에서 기록한 키는 그 기준 시각으로 쿨타임 적용
+    cooldowns.record("CHZZK", "game")
+    assert cooldowns.active("CHZZK", "game", 30)
+    cooldowns.advance(SNAPSHOT + timedelta(minutes=31))
+    assert not cooldowns.active("CHZZK", "game", 30)
+
+
+def test_cooldowns_load_from_db_clock(pg_db, pg_clean):
+    db_now = pg_db.query("SELECT NOW()::timestamp")[1][0][0]
+    cooldowns = sd.load_cooldowns(SNAPSHOT)
+    assert len(cooldowns) == 0
+    assert abs(cooldowns.now - db_now) < timedelta(seconds=5)
@@ -0,0 +1,95 @@
+import json
+import random
+from datetime import datetime, timedelta
+
+import duckdb
+import pandas as pd
+import pytest
+
+from src.api.services import dashboard
+
+DAY = datetime(2026, 10, 1)
+
+
+def _legacy_king(con, start_dt, end_dt):
+    """이전 pandas 구현 (행 단위 json.loads + groupby idxmax)"""
+    df_raw = con.execute("""
+        SELECT platform, category_name, top_streamers_detail, ts_utc
+        FROM traffic_category_snapshot
+        WHERE ts_utc >= ? AND ts_utc < ?
+    """, [start_dt, end_dt]).df()
+    streamer_list = []
+    for _, row in df_raw.iterrows():
+        if row["top_streamers_detail"]:
+            try:
+                details = row["top_streamers_detail"]
+                if isinstance(details, str):
+                    details = json.loads(details)
+                if isinstance(details, list):
+                    for d in details:
+                        cat_name = row["category_name"] or ""
+                        if not cat_name.strip():
+                            cat_name = "[General/Talk]"
+                        streamer_list.append({
+                            "platform": row["platform"],
+                            "category": cat_name,
+                            "streamer": d.get("name", "Unknown"),
+                            "title": d.get("title", ""),
+                            "viewers": int(d.get("viewers", 0)),
+                            "timestamp": row["ts_utc"],
+                        })
+            except Exception:
+                continue
+    if not streamer_list:
+        return []
+    df = pd.DataFrame(streamer_list)
+    idx = df.groupby(["platform", "streamer", "category"])["viewers"].idxmax()
+    return df.loc[idx].sort_values(by="viewers", ascending=False).to_dict(orient="records")
+
+
+def _king_snapshots(seed, n=300):
+    """정상 항목 + 이전 구현이 걸러내던 값(null/소수 문자열/객체 아닌 원소/깨진 JSON/NULL 카테고리 등)"""
+    rnd = random.Random(seed)
+    weird = [None, "12", " 7 ", "1_000", "1.5", 3.9, True, "x", [1], {"a": 1}, -4]
+    rows = []
+    for i in range(n):
+        items = []
+        for k in range(rnd.randint(0, 5)):
+            if rnd.random() < 0.05:
+                items.append("not-an-object")
+                continue
+            d = {"name": rnd.choice(["a", "b", "c", "d", None]), "title": f"t{k}"}
+            if rnd.random() < 0.1:
+                del d["name"]
+            if rnd.random() >= 0.05:
+                d["viewers"] = rnd.choice(weird) if rnd.random() < 0.15 else rnd.choice([100, 300, 300, 500])
+            items.append(d)
+        detail = rnd.choice([json.dumps(items)] * 12 + ["{broken", '{"x": 1}', "", None])
+        rows.append((
+            DAY + timedelta(minutes=i), rnd.choice(["SOOP", "CHZZK"]), "id",
+            rnd.choice(["g1", "g2", "g3", "", "  ", None]), 1, 1, detail,
+        ))
+    return rows
+
+
+def _record(r):
+    ts = r["timestamp"]
+    ts = ts.to_pydatetime() if hasattr(ts, "to_pydatetime") else datetime.fromisoformat(ts)
+    return (r["platform"], r["category"], r["streamer"], r["title"], r["viewers"], ts)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_king_of_streamers_matches_legacy_pandas(duck_db, insert_snapshots, seed):
+    insert_snapshots(_king_snapshots(seed))
+    con = duckdb.connect(duck_db, read_only=True)
+    try:
+        legacy = [_record(r) for r in _legacy_king(con, DAY, DAY + timedelta(days=1))]
+    finally:
+        con.close()
+    actual = [_record(r) for r in json.loads(dashboard.get_king_of_streamers("2026-10-01", "2026-10-01").body)]
+
+    assert legacy
+    # 같은 항목/최고치 시점 (idxmax와 같은 동률 선택 포함)
+    assert sorted(actual, key=repr) == sorted(legacy, key=repr)
+    # 시청자 동률 순서는 (platform, streamer, category)로 고정 (이전 구현은 불안정 정렬)
+    assert actual == sorted(actual, key=lambda r: (-r[4], r[0], r[2], r[1]))
@@ -0,0 +1,74 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from src.detector import signal_detector as sd
+
+
+class _Stop(Exception):
+    """run() 무한 루프 종료용"""
+
+
+@pytest.fixture
+def notify_mode(pg_db, monkeypatch):
+    monkeypatch.setattr(sd, "DETECTOR_TRIGGER", "notify")
+    monkeypatch.setattr(sd, "DETECTOR_SHARDS", 1)
+    monkeypatch.setattr(sd, "init_db", lambda: None)
+    return pg_db
+
+
+def test_snapshot_notify_wakes_run_loop(notify_mode, monkeypatch):
+    sent = {"epoch": "2026-10-01T03:00:00", "committed_at": time.time()}
+
+    class NotifyOnListen(notify_mode.Listener):
+        # LISTEN 직후 Collector처럼 커밋 알림 전송
+        def _connect(self):
+            super()._connect()
+            notify_mode.notify(notify_mode.SNAPSHOT_CHANNEL, sent)
+
+    received, polled = [], []
+
+    def on_snapshot(payload, lease=None):
+        received.append(payload)
+        raise _Stop
+
+    monkeypatch.setattr(notify_mode, "Listener", NotifyOnListen)
+    monkeypatch.setattr(sd, "DETECTOR_POLL_SECONDS", 60)
+    monkeypatch.setattr(sd, "run_for_snapshot", on_snapshot)
+    monkeypatch.setattr(sd, "detect_spikes", lambda **kw: polled.append(kw))
+
+    started = time.monotonic()
+    with pytest.raises(_Stop):
+        sd.run()
+    assert received == [sent]
+    assert polled == []
+    assert time.monotonic() - started < 5
+
+
+def test_run_polls_without_notify(notify_mode, monkeypatch):
+    received, polled = [], []
+
+    def poll(**kw):
+        polled.append(kw)
+        raise _Stop
+
+    monkeypatch.setattr(sd, "DETECTOR_POLL_SECONDS", 1)
+    monkeypatch.setattr(sd, "run_for_snapshot", lambda payload, lease=None: received.append(payload))
+    monkeypatch.setattr(sd, "detect_spikes", poll)
+
+    started = time.monotonic()
+    with pytest.raises(_Stop):
+        sd.run()
+    assert received == []
+    assert polled == [{"lease": None}]
+    assert 1 <= time.monotonic() - started < 5
+
+
+def test_run_for_snapshot_judges_at_notified_epoch(monkeypatch):
+    calls = []
+    monkeypatch.setattr(sd, "detect_spikes", lambda as_of=None, lease=None: calls.append(as_of))
+    sd.run_for_snapshot({"epoch": "2026-10-01T03:00:00", "committed_at": time.time()})
+    sd.run_for_snapshot({"epoch": "not-a-time"})
+    sd.run_for_snapshot({})
+    assert calls == [datetime(2026, 10, 1, 3, 0), None, None]
@@ -0,0 +1,106 @@
+import json
+import math
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.main import app
+
+DAY = datetime(2026, 10, 1)
+RANGE = {"category": "game", "start": "2026-10-01", "end": "2026-10-01"}
+
+
+def _rows(n=200, seed=0):
+    """플랫폼별 n개 (5분 간격, SOOP은 2분 늦게) + SOOP 급등 1점"""
+    rnd = random.Random(seed)
+    rows = []
+    for platform, offset in (("SOOP", 2), ("CHZZK", 0)):
+        for i in range(n):
+            viewers = 5000 + int(1000 * math.sin(i / 9)) + rnd.randint(-300, 300)
+            if platform == "SOOP" and i == 77:
+                viewers = 40000
+            detail = json.dumps([{"name": f"{platform}-{i}", "viewers": viewers // 10}])
+            rows.append((DAY + timedelta(minutes=5 * i + offset), platform, "id", "game", viewers, 1, detail))
+    return rows
+
+
+def _lttb_reference(points_xy, points):
+    """같은 규칙의 numpy 구현: 균등 개수 구간 + 앞뒤 구간 평균점과의 삼각형 넓이 최대 점 (처음/끝 점 고정)"""
+    n = len(points_xy)
+    rn = np.arange(1, n + 1)
+    bucket = np.where(
+        rn == 1, 0, np.where(rn == n, points - 1, 1 + np.floor((rn - 2) * (points - 2) / max(n - 2, 1)))
+    ).astype(int)
+    x = np.array([p[0] for p in points_xy], dtype=float)
+    y = np.array([p[1] for p in points_xy], dtype=float)
+    ids = sorted(set(bucket))
+    centers = {b: (x[bucket == b].mean(), y[bucket == b].mean()) for b in ids}
+    kept = []
+    for k, b in enumerate(ids):
+        members = np.flatnonzero(bucket == b)
+        prev = centers[ids[k - 1]] if k > 0 else None
+        nxt = centers[ids[k + 1]] if k + 1 < len(ids) else None
+        scores = []
+        for i in members:
+            pax, pay = prev if prev else (x[i], y[i])
+            nax, nay = nxt if nxt else (x[i], y[i])
+            scores.append(abs((pax - nax) * (y[i] - pay) - (pax - x[i]) * (nay - pay)))
+        kept.append(int(members[int(np.argmax(scores))]))
+    return kept
+
+
+@pytest.fixture
+def client(duck_db, insert_snapshots):
+    insert_snapshots(_rows())
+    return TestClient(app)
+
+
+def _series(rows, platform):
+    return [r for r in rows if r["platform"] == platform]
+
+
+def test_lttb_keeps_real_rows_matching_reference(client):
+    full = client.get("/api/trend", params=RANGE).json()["data"]
+    sampled = client.get("/api/trend", params=dict(RANGE, points=20)).json()["data"]
+
+    assert sampled == sorted(sampled, key=lambda r: (r["ts_utc"], r["platform"]))
+    for platform in ("SOOP", "CHZZK"):
+        original, kept = _series(full, platform), _series(sampled, platform)
+        xy = [(datetime.fromisoformat(r["ts_utc"]).timestamp(), r["viewers"]) for r in original]
+        assert kept == [original[i] for i in _lttb_reference(xy, 20)]
+        assert len(kept) == 20
+        assert kept[0] == original[0] and kept[-1] == original[-1]
+    assert 40000 in [r["viewers"] for r in _series(sampled, "SOOP")]
+
+
+def test_lttb_with_more_points_than_rows_returns_everything(client):
+    full = client.get("/api/trend", params=RANGE).json()["data"]
+    assert client.get("/api/trend", params=dict(RANGE, points=500, mode="lttb")).json()["data"] == full
+
+
+def test_avg_buckets_average_peak_and_peak_detail(client):
+    full = client.get("/api/trend", params=RANGE).json()["data"]
+    hourly = client.get("/api/trend", params=dict(RANGE, bucket=60)).json()["data"]
+
+    expected = {}
+    for r in full:
+        ts = datetime.fromisoformat(r["ts_utc"]).replace(minute=0)
+        expected.setdefault((ts.isoformat(), r["platform"]), []).append(r)
+    assert [(r["ts_utc"], r["platform"]) for r in hourly] == sorted(expected)
+    for r in hourly:
+        group = expected[(r["ts_utc"], r["platform"])]
+        peak = max(group, key=lambda g: g["viewers"])
+        assert r["viewers"] == pytest.approx(np.mean([g["viewers"] for g in group]), abs=0.5)
+        assert r["peak_viewers"] == peak["viewers"]
+        assert r["top_streamers_detail"] == peak["top_streamers_detail"]
+    # points만 주고 avg면 하루/24점 -> 1시간 버킷
+    assert client.get("/api/trend", params=dict(RANGE, points=24, mode="avg")).json()["data"] == hourly
+
+
+def test_downsampling_parameter_errors(client):
+    assert client.get("/api/trend", params=dict(RANGE, points=20, mode="max")).status_code == 400
+    assert client.get("/api/trend", params=dict(RANGE, points=2)).status_code == 422
+    assert client.get("/api/trend", params=dict(RANGE, bucket=60, limit=10)).status_code == 400
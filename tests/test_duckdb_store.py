@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import duckdb
+import pytest
+
+from src.storage.duckdb_store import DuckDBStore
+
+T0 = datetime(2026, 10, 1, 12, 0)
+
+
+def _snapshot(ts, scale):
+    # 같은 카테고리명이 두 행 (카테고리 id만 다름) + 단일 행 카테고리
+    return [
+        {"ts_utc": ts, "platform": "CHZZK", "category_id": "a", "category_name": "game",
+         "viewers": 1000 * scale, "open_lives": 3, "top_streamers_detail": []},
+        {"ts_utc": ts, "platform": "CHZZK", "category_id": "b", "category_name": "game",
+         "viewers": 3000 * scale, "open_lives": 5, "top_streamers_detail": []},
+        {"ts_utc": ts, "platform": "SOOP", "category_id": "x", "category_name": "talk",
+         "viewers": 500 * scale, "open_lives": 2, "top_streamers_detail": []},
+    ]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_PATH", str(tmp_path / "analytics.db"))
+    store = DuckDBStore()
+    for i, scale in enumerate((1, 2, 3)):
+        store.save_category_snapshot(_snapshot(T0 + timedelta(minutes=5 * i), scale))
+    return store
+
+
+def _profile(con):
+    return con.execute("""
+        SELECT platform, category_name, slot, sample_count, ewm_mean, median, mad, samples
+        FROM category_seasonal_profile ORDER BY ALL
+    """).fetchall()
+
+
+def test_profile_and_anomaly_state_use_same_per_snapshot_sample(store):
+    con = duckdb.connect(store.db_path, read_only=True)
+    try:
+        samples = dict(con.execute("""
+            SELECT category_name, samples FROM category_seasonal_profile
+        """).fetchall())
+        last = dict(con.execute("SELECT category_name, last_viewers FROM category_anomaly_state").fetchall())
+    finally:
+        con.close()
+    # 같은 이름 행은 합 (BASELINE_QUERY/stateful 경로와 같은 SNAPSHOT_AGG 규칙)
+    assert samples == {"game": [4000.0, 8000.0, 12000.0], "talk": [500.0, 1000.0, 1500.0]}
+    assert last == {"game": 12000, "talk": 1500}
+
+
+def test_profile_rebuild_matches_incremental_updates(store):
+    con = duckdb.connect(store.db_path)
+    try:
+        incremental = _profile(con)
+        con.execute("DELETE FROM category_seasonal_profile")
+        store._rebuild_seasonal_profile(con)
+        rebuilt = _profile(con)
+    finally:
+        con.close()
+    assert [r[:4] for r in rebuilt] == [r[:4] for r in incremental]
+    for new, old in zip(rebuilt, incremental):
+        assert new[4:7] == pytest.approx(old[4:7])
+        assert new[7] == old[7]
@@ -0,0 +1,98 @@
+import random
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.main import app
+from src.api.services import dashboard
+
+
+@pytest.fixture
+def events(pg_clean, monkeypatch):
+    """DB 기준 오늘부터 40일 전까지의 이벤트 (오늘 포함). 반환: DB 오늘 날짜"""
+    monkeypatch.setattr(dashboard, "_daily", {"through": None, "checked": float("-inf")})
+    rnd = random.Random(0)
+    with pg_clean.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT NOW()::timestamp")
+        now = cur.fetchone()[0]
+        rows = [
+            (rnd.choice(["SOOP", "CHZZK"]), rnd.choice(["PERSON_ISSUE", "STRUCTURE_ISSUE", "STREAMER_SPIKE"]),
+             now - timedelta(days=rnd.randint(0, 40), minutes=rnd.randint(0, 600)))
+            for _ in range(600)
+        ]
+        rows += [("SOOP", "PERSON_ISSUE", now - timedelta(seconds=s)) for s in (1, 2, 3)]
+        cur.executemany(
+            "INSERT INTO signal_events (platform, category_name, event_type, created_at) VALUES (%s, 'c', %s, %s)",
+            rows,
+        )
+    return now.date()
+
+
+def _legacy(pg, start, end):
+    """이전 구현: 원본 테이블에 COUNT 세 번"""
+    params = (start, end + timedelta(days=1))
+    where = "WHERE created_at >= %s AND created_at < %s"
+    total = pg.query(f"SELECT COUNT(*) FROM signal_events {where}", params)[1][0][0]
+    by_platform = pg.query(f"SELECT platform, COUNT(*) FROM signal_events {where} GROUP BY 1", params)[1]
+    by_type = pg.query(f"SELECT event_type, COUNT(*) FROM signal_events {where} GROUP BY 1", params)[1]
+    return {
+        "total_events": total,
+        "by_platform": {p: n for p, n in by_platform},
+        "by_event_type": {t: n for t, n in by_type},
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+    }
+
+
+def _ranges(today):
+    return [(today - timedelta(days=a), today - timedelta(days=b)) for a, b in
+            ((0, 0), (1, 1), (7, 0), (30, 2), (365, 0), (50, 45))] + [(today + timedelta(days=3),) * 2]
+
+
+def test_summary_plus_live_counts_match_raw_counts(events, pg_clean):
+    client = TestClient(app)
+    for start, end in _ranges(events):
+        body = client.get("/api/insights-period", params={"start": start.isoformat(), "end": end.isoformat()})
+        assert body.json()["data"] == _legacy(pg_clean, start, end), (start, end)
+
+    through = dashboard._daily["through"]
+    assert through is not None and through <= events
+    days = pg_clean.query("SELECT MIN(day), MAX(day), SUM(n) FROM signal_event_daily")[1][0]
+    assert days[1] < through
+    assert days[2] == pg_clean.query(
+        "SELECT COUNT(*) FROM signal_events WHERE created_at < %s", (through,)
+    )[1][0][0]
+
+
+def test_rollup_does_not_duplicate_days_and_new_events_count_immediately(events, pg_clean):
+    dashboard.get_insights_period(events.isoformat(), events.isoformat())
+    before = pg_clean.query("SELECT day, platform, event_type, n FROM signal_event_daily ORDER BY 1, 2, 3")[1]
+    # 다음 확인 주기가 와도 이미 채운 날짜는 다시 넣지 않음
+    dashboard._daily.update(through=None, checked=float("-inf"))
+    dashboard.get_insights_period(events.isoformat(), events.isoformat())
+    assert pg_clean.query("SELECT day, platform, event_type, n FROM signal_event_daily ORDER BY 1, 2, 3")[1] == before
+
+    with pg_clean.connection() as conn:
+        conn.cursor().execute(
+            "INSERT INTO signal_events (platform, category_name, event_type) VALUES ('CHZZK', 'c', 'NEW_TYPE')"
+        )
+    week = (events - timedelta(days=7)).isoformat(), events.isoformat()
+    out = dashboard.get_insights_period(*week)
+    assert out["by_event_type"]["NEW_TYPE"] == 1
+    assert out == _legacy(pg_clean, events - timedelta(days=7), events)
+
+
+def test_missing_summary_falls_back_to_raw_counts(events, pg_clean, monkeypatch):
+    monkeypatch.setattr(dashboard, "INSIGHTS_ROLLUP_CHECK", float("inf"))
+    dashboard._daily["checked"] = 0.0  # 이번 프로세스에서는 요약을 채우지 않음
+    start, end = events - timedelta(days=30), events
+    assert dashboard.get_insights_period(start.isoformat(), end.isoformat()) == _legacy(pg_clean, start, end)
+    assert pg_clean.query("SELECT COUNT(*) FROM signal_event_daily")[1][0][0] == 0
+
+
+def test_invalid_range_returns_empty_counts(events):
+    assert dashboard.get_insights_period("2026-10-05", "2026-10-01") == {
+        "total_events": 0, "by_platform": {}, "by_event_type": {}, "start": "2026-10-05", "end": "2026-10-01",
+    }
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.detector.lifecycle import LifecycleIndex, apply_updates
+from src.detector.rules import DEFAULT_THRESHOLDS
+
+NOW = datetime(2026, 10, 1, 12, 0)
+KEY = ("CHZZK", "game")
+
+
+def _index(status, event_type="SPIKE", level="CANDIDATE"):
+    return LifecycleIndex([{
+        "event_id": 1,
+        "key": KEY,
+        "state": "ONSET",
+        "event_type": event_type,
+        "analysis_status": status,
+        "signal_level": level,
+        "created_at": NOW - timedelta(minutes=30),
+        "last_seen_at": NOW - timedelta(minutes=5),
+        "peak_viewers": 10000,
+        "analyzed_viewers": 10000,
+    }])
+
+
+def _escalate(index):
+    # 분석 시점 대비 2배, +10000 -> 재분석 조건 충족 + CANDIDATE에서 SPIKE로
+    (update,) = index.observe({KEY: (20000, 3.0, True, {})}, NOW, DEFAULT_THRESHOLDS)
+    return update
+
+
+@pytest.mark.parametrize("status", ["DONE", "SKIPPED"], ids=["analyzed", "skipped_by_gate"])
+def test_escalation_requeues_finished_event(status):
+    # 게이트에서 건너뛴 CANDIDATE(below_research_threshold 등)도 SPIKE로 커지면 분석해야 한다
+    index = _index(status)
+    update = _escalate(index)
+    assert update["state"] == "ESCALATION" and update["requeue"]
+    assert index._open[KEY]["analysis_status"] == "PENDING"
+
+
+@pytest.mark.parametrize("status, event_type", [
+    ("PENDING", "SPIKE"),
+    ("IN_PROGRESS", "SPIKE"),
+    ("SKIPPED", "CATEGORY_ADOPTION"),
+])
+def test_escalation_does_not_requeue_busy_or_adoption_event(status, event_type):
+    index = _index(status, event_type)
+    update = _escalate(index)
+    assert update["state"] == "ESCALATION" and not update["requeue"]
+    assert index._open[KEY]["analysis_status"] == status
+
+
+def test_lifecycle_update_sql_requeue_condition(pg_clean):
+    """lifecycle_update의 DB 쪽 조건도 같은지: SKIPPED CANDIDATE는 PENDING, CATEGORY_ADOPTION은 그대로"""
+    with pg_clean.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO signal_events (platform, category_name, event_type, analysis_status, cause_detail,
+                                       lifecycle_state, peak_viewers, analyzed_viewers)
+            VALUES ('CHZZK', 'a', 'SPIKE', 'SKIPPED', '{"signal_level": "CANDIDATE"}', 'ONSET', 100, 100),
+                   ('CHZZK', 'b', 'CATEGORY_ADOPTION', 'SKIPPED', '{"signal_level": "CANDIDATE"}', 'ONSET', 100, 100),
+                   ('CHZZK', 'c', 'SPIKE', 'IN_PROGRESS', '{"signal_level": "CANDIDATE"}', 'ONSET', 100, 100)
+        """)
+        updates = [
+            {"event_id": i, "state": "ESCALATION", "viewers": 5000, "ratio": 3.0, "requeue": True,
+             "signal_level": "SPIKE", "stats": {"delta": 4900}}
+            for i in (1, 2, 3)
+        ]
+        apply_updates(cur, updates)
+        cur.execute("SELECT category_name, analysis_status, cause_detail->>'signal_level' FROM signal_events ORDER BY 1")
+        rows = cur.fetchall()
+    assert rows == [("a", "PENDING", "SPIKE"), ("b", "SKIPPED", "CANDIDATE"), ("c", "IN_PROGRESS", "CANDIDATE")]
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.main import app
+from src.api.services.dashboard import decode_cursor, encode_cursor
+
+DAY = datetime(2026, 10, 1)
+
+
+def test_cursor_round_trip_and_rejects_malformed_tokens():
+    token = encode_cursor("2026-10-01T12:00:00", "치지직/CHZZK")
+    assert "=" not in token and "/" not in token and "+" not in token
+    assert decode_cursor(token, 2) == ["2026-10-01T12:00:00", "치지직/CHZZK"]
+    for bad in ("not*base64", encode_cursor("only-one"), "eyJhIjogMX0", ""):
+        with pytest.raises(ValueError):
+            decode_cursor(bad, 2)
+
+
+@pytest.fixture
+def client(duck_db):
+    return TestClient(app)
+
+
+def _trend_rows():
+    # 5분 간격, 같은 시각에 두 플랫폼 (페이지 경계가 같은 시각 안에 걸리도록)
+    return [
+        (DAY + timedelta(minutes=5 * i), platform, "id", "game", 100 * i + len(platform), 1, "[]")
+        for i in range(20)
+        for platform in ("SOOP", "CHZZK")
+    ]
+
+
+def test_trend_pages_concatenate_to_the_full_range(client, insert_snapshots):
+    insert_snapshots(_trend_rows())
+    params = {"category": "game", "start": "2026-10-01", "end": "2026-10-01"}
+    full = client.get("/api/trend", params=params).json()
+    assert "next_cursor" not in full and len(full["data"]) == 40
+
+    pages, cursor = [], None
+    while True:
+        response = client.get("/api/trend", params=dict(params, limit=7, **({"cursor": cursor} if cursor else {})))
+        body = response.json()
+        pages.append(body["data"])
+        cursor = body.get("next_cursor")
+        assert response.headers.get("x-next-cursor") == cursor
+        if cursor is None:
+            break
+
+    assert [len(p) for p in pages] == [7] * 5 + [5]
+    assert [row for page in pages for row in page] == full["data"]
+
+
+def test_trend_rejects_bad_cursor_and_cursor_with_downsampling(client, insert_snapshots):
+    insert_snapshots(_trend_rows())
+    params = {"category": "game", "start": "2026-10-01", "end": "2026-10-01"}
+    assert client.get("/api/trend", params=dict(params, cursor="garbage")).status_code == 400
+    assert client.get("/api/trend", params=dict(params, cursor=encode_cursor("x", "SOOP"))).status_code == 400
+    assert client.get("/api/trend", params=dict(params, limit=5, points=10)).status_code == 400
+
+
+def _insert_events(pg, n):
+    # 3건씩 같은 created_at (event_id로 이어가야 하는 동률)
+    with pg.connection() as conn:
+        cur = conn.cursor()
+        for i in range(n):
+            cur.execute(
+                "INSERT INTO signal_events (platform, category_name, event_type, created_at) VALUES (%s, %s, %s, %s)",
+                ("SOOP", f"c{i}", "STRUCTURE_ISSUE", DAY + timedelta(minutes=i // 3)),
+            )
+
+
+def test_events_pages_follow_created_at_and_event_id(pg_clean):
+    _insert_events(pg_clean, 11)
+    client = TestClient(app)
+
+    seen, cursor = [], None
+    while True:
+        body = client.get("/api/events", params={"limit": 4, **({"cursor": cursor} if cursor else {})}).json()
+        seen.append([ev["event_id"] for ev in body["data"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert [len(page) for page in seen] == [4, 4, 3]
+    assert [e for page in seen for e in page] == list(range(11, 0, -1))
+    # since는 커서와 함께 걸린다
+    first = client.get("/api/events", params={"since": "2026-10-01", "limit": 10}).json()
+    assert first["next_cursor"] is not None and len(first["data"]) == 10
+    rest = client.get("/api/events", params={"since": "2026-10-01", "cursor": first["next_cursor"]}).json()
+    assert [ev["event_id"] for ev in rest["data"]] == [1] and rest["next_cursor"] is None
+    assert client.get("/api/events", params={"cursor": encode_cursor("2026-10-01", "x")}).status_code == 400
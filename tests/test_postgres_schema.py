@@ -0,0 +1,52 @@
+import json
+
+import psycopg2
+import pytest
+
+# 초기 버전 Detector가 만들던 signal_events (수명/변경 피드 컬럼 없음)
+LEGACY_SIGNAL_EVENTS = """
+    CREATE TABLE signal_events (
+        event_id SERIAL PRIMARY KEY,
+        created_at TIMESTAMP DEFAULT NOW(),
+        platform VARCHAR(20),
+        category_name VARCHAR(100),
+        event_type VARCHAR(50),
+        growth_rate FLOAT,
+        cause_detail JSONB
+    )
+"""
+
+
+@pytest.fixture
+def agent_conn(pg_db):
+    """Agent가 Detector보다 먼저 뜬 상황: 빈 스키마를 search_path로 둔 풀 밖 연결"""
+    conn = psycopg2.connect(pg_db.PG_DSN, connection_factory=pg_db._PooledConnection)
+    cur = conn.cursor()
+    cur.execute("DROP SCHEMA IF EXISTS agent_first CASCADE; CREATE SCHEMA agent_first")
+    cur.execute("SET search_path TO agent_first")
+    conn.commit()
+    yield conn
+    conn.rollback()
+    conn.cursor().execute("DROP SCHEMA agent_first CASCADE")
+    conn.commit()
+    conn.close()
+
+
+@pytest.mark.parametrize("existing", [None, LEGACY_SIGNAL_EVENTS], ids=["no_table", "legacy_table"])
+def test_agent_statements_work_after_ensure_signal_events(pg_db, agent_conn, existing):
+    cur = agent_conn.cursor()
+    if existing:
+        cur.execute(existing)
+    pg_db.ensure_signal_events(cur)
+    pg_db.ensure_signal_events(cur)  # 멱등
+    cur.execute("""
+        INSERT INTO signal_events (platform, category_name, event_type, cause_detail, analysis_status)
+        VALUES ('CHZZK', 'game', 'STRUCTURE_ISSUE', '{}', 'IN_PROGRESS'), ('SOOP', 'talk', 'PERSON_ISSUE', '{}', 'IN_PROGRESS')
+    """)
+
+    pg_db.execute_prepared(cur, "update_event", (
+        "DONE", "T1", "patch", json.dumps(["patch"]), "key", json.dumps({"report": "ok"}), 1,
+    ))
+    pg_db.execute_prepared(cur, "mark_failed", (json.dumps({"error": "boom"}), 2))
+    cur.execute("SELECT event_id, analysis_status, updated_at IS NOT NULL FROM signal_events ORDER BY event_id")
+    assert cur.fetchall() == [(1, "DONE", True), (2, "FAILED", True)]
@@ -0,0 +1,71 @@
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from src.api.main import app
+from src.detector import signal_detector as sd
+from src.detector.cooldown import CooldownIndex
+from src.detector.profiling import RunProfile
+from src.detector.rules import build_frame
+
+SNAPSHOT = datetime(2026, 10, 1, 3, 0)
+
+
+def test_phases_accumulate_and_summary_follows_phase_order():
+    profile = RunProfile()
+    for name in ("insert", "duckdb_query", "insert"):
+        with profile.phase(name):
+            pass
+    profile.count("inserted", 2)
+    profile.count("inserted")
+
+    assert list(profile.phases) == ["insert", "duckdb_query"]
+    assert profile.summary().split()[0].startswith("duckdb_query=")
+    assert profile.counts["inserted"] == 3
+
+
+def test_select_events_counts_events_and_cooldown_skips():
+    rows = [(p, f"{p}-{i}", 25000, 10, 10000, 10000, 10, "[]", 10000, 10000, "[]")
+            for p in ("SOOP", "CHZZK") for i in range(3)]
+    flags = sd.RULES.classify(build_frame(rows, {}, sd.RULES, min_samples=4))
+    cooldowns = CooldownIndex(SNAPSHOT)
+    cooldowns.record("SOOP", "SOOP-0")
+    profile = RunProfile()
+
+    events = sd.select_events(flags, cooldowns, log=lambda *_: None, profile=profile)
+
+    assert len(events) == 5
+    assert profile.counts["cooldown_skipped"] == 1
+    assert profile.counts["events_spike"] == 5
+    assert {"cooldown", "contribution"} <= set(profile.phases)
+
+
+def _save(status, started_at, phases=("duckdb_query",)):
+    profile = RunProfile(as_of=started_at, worker=1)
+    profile.started_at = started_at
+    profile.snapshot = SNAPSHOT
+    profile.status = status
+    for name in phases:
+        with profile.phase(name):
+            pass
+    profile.count("rows", 7)
+    profile.save({"growth_threshold": 1.7})
+
+
+def test_saved_runs_are_served_newest_first_with_status_filter(pg_clean):
+    _save("ok", datetime(2026, 10, 1, 1))
+    _save("skipped", datetime(2026, 10, 1, 2), phases=())
+    _save("ok", datetime(2026, 10, 1, 3), phases=("duckdb_query", "insert"))
+    client = TestClient(app)
+
+    runs = client.get("/api/detector-runs").json()["data"]
+    assert [r["status"] for r in runs] == ["ok", "skipped", "ok"]
+    assert runs[0]["snapshot"].startswith("2026-10-01T03:00")
+    assert set(runs[0]["phases"]) == {"duckdb_query", "insert"}
+    assert runs[0]["counts"] == {"rows": 7}
+    assert runs[0]["thresholds"] == {"growth_threshold": 1.7}
+    assert runs[0]["worker_slot"] == 1 and runs[0]["total_ms"] >= 0
+
+    ok = client.get("/api/detector-runs", params={"status": "ok", "limit": 1}).json()["data"]
+    assert [r["started_at"][:13] for r in ok] == ["2026-10-01T03"]
+    assert client.get("/api/detector-runs", params={"limit": 0}).status_code == 422
@@ -0,0 +1,144 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.main import app
+from src.api.services import cache
+from src.api.services.cache import ResponseCache, etag_matches, normalize_params
+from src.api.services.serialize import Payload
+
+
+def _compute(body, calls=None, delay=0.0, error=None):
+    def compute():
+        if calls is not None:
+            calls.append(body)
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        return Payload("application/json", body)
+
+    return compute
+
+
+def test_same_version_hits_and_new_version_recomputes():
+    rc = ResponseCache(ttl=60, stale_wait=1)
+    calls = []
+    first, status = rc.get(("live", ()), "v1", _compute(b"1", calls))
+    assert status == "MISS" and first.body == b"1"
+    again, status = rc.get(("live", ()), "v1", _compute(b"x", calls))
+    assert status == "HIT" and again is first
+    newer, status = rc.get(("live", ()), "v2", _compute(b"2", calls))
+    assert status == "MISS" and newer.body == b"2" and newer.etag != first.etag
+    assert calls == [b"1", b"2"]
+    assert rc.metrics()["hits"] == 1 and rc.metrics()["misses"] == 2
+
+
+def test_ttl_expiry_recomputes_same_version():
+    rc = ResponseCache(ttl=0.05, stale_wait=1)
+    rc.get(("live", ()), "v1", _compute(b"1"))
+    time.sleep(0.06)
+    entry, status = rc.get(("live", ()), "v1", _compute(b"2"))
+    assert (status, entry.body) == ("MISS", b"2")
+
+
+def test_failed_or_slow_recompute_serves_previous_response():
+    rc = ResponseCache(ttl=60, stale_wait=0.05)
+    key = ("flash", ())
+    rc.get(key, "v1", _compute(b"old"))
+
+    entry, status = rc.get(key, "v2", _compute(b"new", error=RuntimeError("db busy")))
+    assert (status, entry.body) == ("STALE", b"old")
+
+    entry, status = rc.get(key, "v2", _compute(b"new", delay=0.3))
+    assert (status, entry.body) == ("STALE", b"old")
+    # 늦은 재계산은 백그라운드에서 끝나 다음 요청부터 반영
+    time.sleep(0.4)
+    entry, status = rc.get(key, "v2", _compute(b"unused"))
+    assert (status, entry.body) == ("HIT", b"new")
+    assert rc.metrics()["stale"] == 2 and rc.metrics()["errors"] == 1
+
+
+def test_failure_without_previous_response_raises():
+    rc = ResponseCache(ttl=60, stale_wait=0.05)
+    with pytest.raises(RuntimeError):
+        rc.get(("king", ()), "v1", _compute(b"", error=RuntimeError("boom")))
+    # 진행 중 표시가 남지 않아 다음 요청은 다시 계산
+    entry, status = rc.get(("king", ()), "v1", _compute(b"ok"))
+    assert (status, entry.body) == ("MISS", b"ok")
+
+
+def test_concurrent_requests_for_one_key_compute_once():
+    rc = ResponseCache(ttl=60, stale_wait=1)
+    calls, results = [], []
+    threads = [
+        threading.Thread(target=lambda: results.append(rc.get(("new", ()), "v1", _compute(b"1", calls, 0.2))))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == [b"1"]
+    assert {entry.body for entry, _ in results} == {b"1"}
+    assert rc.metrics()["coalesced"] == 4
+
+
+def test_least_recently_used_entries_are_evicted():
+    rc = ResponseCache(ttl=60, stale_wait=1, max_entries=2)
+    for name in ("a", "b"):
+        rc.get((name, ()), "v1", _compute(name.encode()))
+    rc.get(("a", ()), "v1", _compute(b"x"))
+    rc.get(("c", ()), "v1", _compute(b"c"))
+    assert rc.get(("a", ()), "v1", _compute(b"x"))[1] == "HIT"
+    assert rc.get(("b", ()), "v1", _compute(b"b"))[1] == "MISS"
+
+
+def test_params_and_if_none_match_normalization():
+    assert normalize_params({"end": None, "start": " 2026-10-01", "limit": 5}) == normalize_params(
+        {"limit": "5", "start": "2026-10-01"}
+    )
+    etag = '"abc"'
+    assert etag_matches('"zzz", W/"abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"abcd"', etag)
+    assert not etag_matches(None, etag)
+
+
+@pytest.fixture
+def client(duck_db, monkeypatch):
+    monkeypatch.setattr(cache, "_cache", ResponseCache(ttl=60, stale_wait=1))
+    return TestClient(app)
+
+
+def _rows(day, viewers):
+    detail = json.dumps([{"name": "s", "title": "t", "viewers": viewers}])
+    return [(day, "SOOP", "id", "game", viewers, 1, detail)]
+
+
+def test_endpoint_etag_304_and_snapshot_version(client, insert_snapshots):
+    day = datetime(2026, 10, 1, 12)
+    insert_snapshots(_rows(day, 100))
+    params = {"start": "2026-10-01", "end": "2026-10-01"}
+
+    first = client.get("/api/king", params=params)
+    assert first.status_code == 200 and first.headers["x-cache"] == "MISS"
+    assert first.headers["cache-control"] == "no-cache" and "Accept" in first.headers["vary"]
+    assert [r["viewers"] for r in first.json()["data"]] == [100]
+    etag = first.headers["etag"]
+
+    cached = client.get("/api/king", params=params, headers={"If-None-Match": etag})
+    assert cached.status_code == 304 and cached.content == b""
+    assert cached.headers["etag"] == etag and cached.headers["x-cache"] == "HIT"
+    # 파라미터 순서가 달라도 같은 항목
+    assert client.get("/api/king", params={"end": "2026-10-01", "start": "2026-10-01"}).headers["x-cache"] == "HIT"
+
+    insert_snapshots(_rows(day + timedelta(minutes=5), 300))
+    changed = client.get("/api/king", params=params, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["x-cache"] == "MISS"
+    assert changed.headers["etag"] != etag
+    assert changed.headers["x-snapshot-version"] != first.headers["x-snapshot-version"]
+    assert [r["viewers"] for r in changed.json()["data"]] == [300]
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from src.detector.rules import DEFAULT_THRESHOLDS, build_frame, load_rules
+
+# ROW_COLUMNS 순서: platform, category, cur_view, open_now, med_60m, view_1h,
+#                   open_1h, top_1h, avg_7d, avg_24h, top_cur
+ROWS = [
+    ("CHZZK", "big", 20000, 10, 9000, 9500, 9, "[]", 10000, 11000, "[]"),
+    ("CHZZK", "tiny", 100, 1, 90, 95, 1, "[]", 120, 110, "[]"),  # 기준선 < baseline_floor -> 제외
+    ("SOOP", "mid", 5000, 4, 3000, 3100, 4, "[]", 3500, 3600, "[]"),
+    ("SOOP", "new", 50, 1, None, None, None, None, None, None, "[]"),  # 기준선 없음 -> 현재x0.8 -> 제외
+]
+
+
+@pytest.mark.parametrize("anomaly", [None, {}], ids=["backtest", "empty_anomaly_state"])
+def test_build_frame_without_anomaly_columns_after_floor_filter(anomaly):
+    frame = build_frame(ROWS, {}, DEFAULT_THRESHOLDS, min_samples=4, anomaly=anomaly)
+
+    assert list(frame["category"]) == ["big", "mid"]
+    assert list(frame["cur_view"]) == [20000, 5000]
+    assert len(frame["anomaly_score"]) == 2 and np.isnan(frame["anomaly_score"]).all()
+    assert len(frame["ewm_z"]) == 2 and np.isnan(frame["ewm_z"]).all()
+
+
+def test_build_frame_keeps_anomaly_scores_aligned_with_kept_rows():
+    anomaly = {("SOOP", "mid"): (4.5, 2.0), ("CHZZK", "tiny"): (9.0, 9.0)}
+    frame = build_frame(ROWS, {}, DEFAULT_THRESHOLDS, min_samples=4, anomaly=anomaly)
+
+    assert list(frame["category"]) == ["big", "mid"]
+    assert np.isnan(frame["anomaly_score"][0]) and frame["anomaly_score"][1] == 4.5
+    assert np.isnan(frame["ewm_z"][0]) and frame["ewm_z"][1] == 2.0
+
+
+def test_major_growth_threshold_follows_swept_growth_threshold(monkeypatch):
+    monkeypatch.delenv("MAJOR_GROWTH_THRESHOLD", raising=False)
+    monkeypatch.delenv("GROWTH_THRESHOLD", raising=False)
+    rules = load_rules("config/settings.yaml")
+    assert rules["major_growth_threshold"] == pytest.approx(rules["growth_threshold"] - 0.2)
+
+    swept = rules.with_thresholds(growth_threshold=2.5)
+    assert swept["major_growth_threshold"] == pytest.approx(2.3)
+    # 다른 값만 바꿔도 계산값 유지, 이어서 바꾸면 다시 따라감
+    assert swept.with_thresholds(delta_ratio=0.5)["major_growth_threshold"] == pytest.approx(2.3)
+    assert swept.with_thresholds(growth_threshold=1.5)["major_growth_threshold"] == pytest.approx(1.3)
+
+    explicit = rules.with_thresholds(growth_threshold=2.5, major_growth_threshold=1.6)
+    assert explicit["major_growth_threshold"] == 1.6
+    assert explicit.with_thresholds(growth_threshold=3.0)["major_growth_threshold"] == 1.6
+
+
+def test_major_growth_threshold_from_env_is_not_derived(monkeypatch):
+    monkeypatch.setenv("MAJOR_GROWTH_THRESHOLD", "1.4")
+    rules = load_rules("config/settings.yaml")
+    assert rules.with_thresholds(growth_threshold=2.5)["major_growth_threshold"] == 1.4
+
+
+def test_sweep_accepts_major_growth_threshold():
+    from src.detector.sweep import build_combinations
+
+    combos = build_combinations({"growth_threshold": [1.7, 1.9], "major_growth_threshold": [1.4]}, {}, 0)
+    assert combos == [
+        {"growth_threshold": 1.7, "major_growth_threshold": 1.4},
+        {"growth_threshold": 1.9, "major_growth_threshold": 1.4},
+    ]
@@ -0,0 +1,197 @@
+import json
+import random
+from datetime import datetime
+
+import pytest
+
+from src.detector.cooldown import CooldownIndex
+from src.detector.rules import DEFAULT_THRESHOLDS, build_frame, load_rules
+from src.detector.signal_detector import select_events
+
+# 선언형 규칙 이전(ae67206) detect_spikes의 상수
+MIN_ABSOLUTE_DELTA = 1500
+DELTA_RATIO = 0.3
+GROWTH_THRESHOLD = 1.7
+SEASONAL_THRESHOLD = 1.2
+BASELINE_FLOOR = 300
+INTEREST_GROWTH = 1.2
+INTEREST_DELTA = 500
+INTEREST_TOP_N = 10
+MAJOR_TOP_N = 12
+MAJOR_GROWTH_THRESHOLD = GROWTH_THRESHOLD - 0.2
+
+
+def _top_list(value):
+    return json.loads(value) if value else []
+
+
+def _legacy_detect(rows):
+    """
+    이전 레코드 단위 판정 루프 (쿨타임/DB 제외).
+    반환: ((platform, category) -> (event_type, signal_level), 판정 경로 기록)
+    """
+    records = []
+    for platform, cat, cur_view, open_now, med_60m, view_1h, open_1h, top_1h, avg_7d, avg_24h, top_cur in rows:
+        if avg_7d:
+            seasonal_base = avg_7d
+        elif avg_24h:
+            seasonal_base = avg_24h
+        else:
+            seasonal_base = cur_view * 0.8
+        if not med_60m:
+            med_60m = cur_view * 0.8
+        if not view_1h:
+            view_1h = cur_view * 0.8
+        if seasonal_base < BASELINE_FLOOR:
+            continue
+        records.append({
+            "platform": platform, "category": cat, "cur_view": cur_view, "open_now": open_now,
+            "med_60m": med_60m, "view_1h": view_1h, "open_1h": open_1h, "top_1h": top_1h,
+            "seasonal_base": seasonal_base,
+            "growth_ratio": cur_view / med_60m if med_60m > 0 else 0.0,
+            "dynamic_delta_req": max(MIN_ABSOLUTE_DELTA, seasonal_base * DELTA_RATIO),
+            "actual_delta": max(0, int(round(cur_view - seasonal_base))),
+            "top_cur": top_cur,
+        })
+
+    major_set = set()
+    by_platform = {}
+    for rec in records:
+        by_platform.setdefault(rec["platform"], []).append(rec)
+    for platform, recs in by_platform.items():
+        for rec in sorted(recs, key=lambda r: r["seasonal_base"], reverse=True)[:MAJOR_TOP_N]:
+            major_set.add((platform, rec["category"]))
+
+    interest_keys = {
+        (r["platform"], r["category"]) for r in records
+        if r["growth_ratio"] >= INTEREST_GROWTH and r["actual_delta"] >= INTEREST_DELTA
+    }
+    delta_candidates = [r for r in records if r["actual_delta"] > 0]
+    ratio_candidates = [r for r in records if r["growth_ratio"] > 1.0 and r["actual_delta"] > 0]
+    top_by_delta = sorted(delta_candidates, key=lambda r: r["actual_delta"], reverse=True)[:INTEREST_TOP_N]
+    top_by_ratio = sorted(ratio_candidates, key=lambda r: r["growth_ratio"], reverse=True)[:INTEREST_TOP_N]
+    interest_keys |= {(r["platform"], r["category"]) for r in top_by_delta + top_by_ratio}
+
+    events, paths = {}, set()
+    for rec in records:
+        key = (rec["platform"], rec["category"])
+        cur_view, seasonal_base, growth_ratio = rec["cur_view"], rec["seasonal_base"], rec["growth_ratio"]
+        actual_delta = rec["actual_delta"]
+        is_major = key in major_set
+        growth_threshold = MAJOR_GROWTH_THRESHOLD if is_major else GROWTH_THRESHOLD
+        cond_short = cur_view >= rec["med_60m"] * growth_threshold
+        cond_season = cur_view >= seasonal_base * SEASONAL_THRESHOLD
+        cond_delta = actual_delta >= rec["dynamic_delta_req"]
+        if actual_delta <= 0:
+            continue
+        if cond_short and cond_season and cond_delta:
+            signal_level = "SPIKE"
+            if is_major and cur_view < rec["med_60m"] * GROWTH_THRESHOLD:
+                paths.add("major_threshold")
+        elif key in interest_keys:
+            signal_level = "CANDIDATE"
+            if not (growth_ratio >= INTEREST_GROWTH and actual_delta >= INTEREST_DELTA):
+                paths.add("interest_top_n")
+        else:
+            continue
+
+        cur_list, past_list = _top_list(rec["top_cur"]), _top_list(rec["top_1h"])
+        total_delta = cur_view - rec["view_1h"]
+        top_delta = sum(i.get("viewers", 0) for i in cur_list) - sum(i.get("viewers", 0) for i in past_list)
+        cause = "PERSON_ISSUE" if total_delta > 0 and top_delta / total_delta >= 0.5 else "STRUCTURE_ISSUE"
+        top1 = int(cur_list[0].get("viewers", 0) or 0) if cur_list else 0
+        dominance_index = top1 / cur_view if cur_view else 0
+        open_delta = (
+            rec["open_now"] - rec["open_1h"]
+            if rec["open_now"] is not None and rec["open_1h"] is not None else None
+        )
+        top2_5_current = sum(int(i.get("viewers", 0) or 0) for i in cur_list[1:5]) if len(cur_list) >= 2 else 0
+        top2_5_baseline = sum(int(i.get("viewers", 0) or 0) for i in past_list[1:5]) if len(past_list) >= 2 else 0
+        market_proof = False
+        if open_delta is not None and open_delta >= 3:
+            market_proof = True
+            paths.add("market_open")
+        if top2_5_baseline > 0:
+            if top2_5_current >= top2_5_baseline * 1.2 and top2_5_current - top2_5_baseline >= 500:
+                market_proof = True
+                paths.add("market_top2_5")
+
+        classification = cause
+        if dominance_index >= 0.85:
+            if market_proof:
+                paths.add("dominance_with_market_proof")
+            else:
+                classification = "CATEGORY_ADOPTION"
+        if signal_level == "SPIKE" and classification == "PERSON_ISSUE":
+            stricter_delta = max(1500, seasonal_base * 0.5)
+            if growth_ratio < 2.0 or actual_delta < stricter_delta:
+                paths.add("person_rejected")
+                continue
+            paths.add("person_spike")
+        events[key] = (classification, signal_level)
+    return events, paths
+
+
+def _golden_rows(seed, categories=30):
+    """플랫폼 2개 x categories개 무작위 카테고리 (임계값 양쪽 배수, 방송 수 +3 경계, 1위 점유율 90% 포함)"""
+    rnd = random.Random(seed)
+    rows = []
+    for platform in ("SOOP", "CHZZK"):
+        for c in range(categories):
+            cur = rnd.randint(800, 60000)
+            growth = rnd.choice([0.9, 1.1, 1.25, 1.55, 1.65, 1.8, 1.95, 2.2, 2.8])
+            med = cur / growth
+            view_1h = med * rnd.uniform(0.9, 1.1)
+            season = cur / rnd.uniform(0.8, 2.5)
+            avg_7d, avg_24h = rnd.choice([
+                (season, season * 1.1), (None, season), (None, None), (0, season), (season, None),
+            ])
+            share = rnd.choice([0.1, 0.3, 0.6, 0.9])
+            top1 = int(cur * share)
+            rest = [int(cur * rnd.uniform(0.0, 0.05)) for _ in range(4)]
+            past_rest = [int(v * rnd.choice([0.5, 1.0, 1.0])) for v in rest]
+            top_cur = json.dumps([{"name": f"s{c}", "viewers": top1}] + [{"name": "x", "viewers": v} for v in rest])
+            top_1h = json.dumps(
+                [{"name": f"s{c}", "viewers": int(top1 * rnd.uniform(0.2, 1.0))}]
+                + [{"name": "x", "viewers": v} for v in past_rest]
+            )
+            open_1h = rnd.randint(1, 50)
+            open_now = rnd.choice([open_1h, open_1h + 1, open_1h + 3, open_1h + 5, None])
+            rows.append((platform, f"{platform}-{c}", cur, open_now, med, view_1h, open_1h, top_1h,
+                         avg_7d, avg_24h, top_cur))
+    return rows
+
+
+def _rules(monkeypatch):
+    for name in list(DEFAULT_THRESHOLDS) + ["major_growth_threshold"]:
+        monkeypatch.delenv(name.upper(), raising=False)
+    return load_rules("config/settings.yaml")
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_declarative_rules_match_legacy_record_loop(monkeypatch, seed):
+    rules = _rules(monkeypatch)
+    rows = _golden_rows(seed)
+    expected, _ = _legacy_detect(rows)
+
+    flags = rules.classify(build_frame(rows, {}, rules, min_samples=4))
+    events = select_events(flags, CooldownIndex(datetime(2026, 10, 1)), rules, log=lambda *_: None)
+    actual = {(ev["platform"], ev["category"]): (ev["event_type"], ev["signal_level"]) for ev in events}
+
+    assert expected
+    assert actual == expected
+
+
+def test_golden_fixture_covers_every_decision_path():
+    paths = set()
+    types = set()
+    for seed in range(8):
+        events, seen = _legacy_detect(_golden_rows(seed))
+        paths |= seen
+        types |= set(events.values())
+    assert paths >= {
+        "major_threshold", "interest_top_n", "market_open", "market_top2_5",
+        "dominance_with_market_proof", "person_rejected", "person_spike",
+    }
+    assert {t for t, _ in types} == {"PERSON_ISSUE", "STRUCTURE_ISSUE", "CATEGORY_ADOPTION"}
+    assert {level for _, level in types} == {"SPIKE", "CANDIDATE"}
@@ -0,0 +1,107 @@
+import io
+import json
+from datetime import datetime
+
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.main import app
+from src.api.services import cache, serialize
+from src.api.services.cache import ResponseCache
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, serialize.JSON),
+    ("*/*", serialize.JSON),
+    ("text/html, application/json", serialize.JSON),
+    ("application/vnd.apache.arrow.stream", serialize.ARROW_STREAM),
+    ("application/json;q=0.5, Application/Vnd.Apache.Parquet;q=0.9", serialize.PARQUET),
+    ("application/x-parquet", serialize.PARQUET),
+])
+def test_negotiate_accept_header(accept, expected):
+    assert serialize.negotiate(accept) == expected
+
+
+@pytest.fixture
+def rel():
+    con = duckdb.connect()
+    con.execute("""
+        CREATE TABLE t AS SELECT * FROM (VALUES
+            ('SOOP', '게임 "A"', 10, TIMESTAMP '2026-10-01 12:00:00', '[{"name": "s", "viewers": 3}]', 1.5),
+            ('CHZZK', NULL, NULL, TIMESTAMP '2026-10-01 12:00:00.250000', '{broken', NULL),
+            ('CHZZK', 'x', 2, NULL, NULL, 2.0)
+        ) v(platform, category_name, viewers, ts_utc, top_streamers_detail, ratio)
+    """)
+    yield con.sql("SELECT * FROM t ORDER BY viewers DESC NULLS LAST")
+    con.close()
+
+
+def test_json_rows_match_python_json_encoding(rel):
+    rows = json.loads(serialize.json_rows(rel, json_columns=("top_streamers_detail",)))
+    assert rows == [
+        {"platform": "SOOP", "category_name": '게임 "A"', "viewers": 10, "ts_utc": "2026-10-01T12:00:00",
+         "top_streamers_detail": [{"name": "s", "viewers": 3}], "ratio": 1.5},
+        {"platform": "CHZZK", "category_name": "x", "viewers": 2, "ts_utc": None,
+         "top_streamers_detail": [], "ratio": 2.0},
+        {"platform": "CHZZK", "category_name": None, "viewers": None,
+         "ts_utc": datetime(2026, 10, 1, 12, 0, 0, 250000).isoformat(),
+         "top_streamers_detail": [], "ratio": None},
+    ]
+    # JSON 컬럼으로 지정하지 않으면 문자열 그대로
+    assert json.loads(serialize.json_rows(rel))[0]["top_streamers_detail"] == '[{"name": "s", "viewers": 3}]'
+
+
+def _read(payload):
+    if payload.media_type == serialize.PARQUET:
+        return pq.read_table(io.BytesIO(payload.body))
+    return pa.ipc.open_stream(payload.body).read_all()
+
+
+@pytest.mark.parametrize("media_type", [serialize.ARROW_STREAM, serialize.PARQUET])
+def test_arrow_and_parquet_round_trip(rel, media_type):
+    payload = serialize.encode(rel, media_type)
+    table = _read(payload)
+
+    assert payload.media_type == media_type
+    assert table.column_names == ["platform", "category_name", "viewers", "ts_utc", "top_streamers_detail", "ratio"]
+    assert pa.types.is_timestamp(table.schema.field("ts_utc").type)
+    assert table.column("viewers").to_pylist() == [10, 2, None]
+    assert table.column("top_streamers_detail").to_pylist()[1] is None
+    assert _read(serialize.empty(media_type)).num_rows == 0
+
+
+def test_wrap_data_envelope():
+    assert json.loads(serialize.wrap_data(serialize.empty())) == {"data": []}
+    page = serialize.Payload(serialize.JSON, b"[1]", next_cursor="abc_-")
+    assert json.loads(serialize.wrap_data(page)) == {"data": [1], "next_cursor": "abc_-"}
+    arrow = serialize.empty(serialize.ARROW_STREAM)
+    assert serialize.wrap_data(arrow) is arrow.body
+
+
+def test_endpoint_negotiates_format_and_caches_each_separately(duck_db, insert_snapshots, monkeypatch):
+    monkeypatch.setattr(cache, "_cache", ResponseCache(ttl=60, stale_wait=1))
+    insert_snapshots([
+        (datetime(2026, 10, 1, 12, m), p, "id", c, v, 1, "[]")
+        for m, p, c, v in ((0, "SOOP", "game", 100), (5, "SOOP", "game", 300), (0, "CHZZK", "talk", 50))
+    ])
+    client = TestClient(app)
+    params = {"start": "2026-10-01", "end": "2026-10-01"}
+
+    as_json = client.get("/api/daily-top", params=params)
+    as_arrow = client.get("/api/daily-top", params=params, headers={"Accept": serialize.ARROW_STREAM})
+    as_parquet = client.get("/api/daily-top", params=params, headers={"Accept": serialize.PARQUET})
+
+    expected = [
+        {"platform": "SOOP", "category_name": "game", "avg_viewers": 200, "peak_viewers": 300},
+        {"platform": "CHZZK", "category_name": "talk", "avg_viewers": 50, "peak_viewers": 50},
+    ]
+    assert as_json.headers["content-type"].startswith(serialize.JSON)
+    assert as_json.json() == {"data": expected}
+    for response, media_type in ((as_arrow, serialize.ARROW_STREAM), (as_parquet, serialize.PARQUET)):
+        assert response.headers["content-type"] == media_type
+        assert response.headers["x-cache"] == "MISS"
+        assert _read(serialize.Payload(media_type, response.content)).to_pylist() == expected
+    assert len({r.headers["etag"] for r in (as_json, as_arrow, as_parquet)}) == 3
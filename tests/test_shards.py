@@ -0,0 +1,85 @@
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+from src.detector import signal_detector as sd
+from src.detector.category_map import CategoryIndex
+from src.detector.cooldown import CooldownIndex
+from src.detector.rules import build_frame
+from src.detector.shards import ShardLease, shard_mask, shard_of
+
+SNAPSHOT = datetime(2026, 10, 1, 3, 0)
+KEYS = [(p, f"{p}-{i}") for p in ("SOOP", "CHZZK") for i in range(40)]
+
+
+def test_shards_partition_key_space():
+    platforms, categories = zip(*KEYS)
+    for shards in (1, 3, 8):
+        ids = [shard_of(p, c, shards) for p, c in KEYS]
+        assert all(0 <= s < shards for s in ids)
+        masks = [shard_mask(platforms, categories, {s}, shards) for s in range(shards)]
+        assert (sum(m.astype(int) for m in masks) == 1).all()
+        assert shard_mask(platforms, categories, set(range(shards)), shards).all()
+
+
+def _spike_flags():
+    """모든 키가 SPIKE (기준선 10000 -> 25000, Top 스트리머 없음 -> STRUCTURE_ISSUE)"""
+    rows = [(p, c, 25000, 10, 10000, 10000, 10, "[]", 10000, 10000, "[]") for p, c in KEYS]
+    return sd.RULES.classify(build_frame(rows, {}, sd.RULES, min_samples=4))
+
+
+def _inserted_keys(pg):
+    return Counter(pg.query("SELECT platform, category_name FROM signal_events")[1])
+
+
+@pytest.fixture
+def leases(pg_clean):
+    made = []
+
+    def make():
+        lease = ShardLease(shards=4, max_workers=4)
+        made.append(lease)
+        return lease
+
+    yield make
+    for lease in made:
+        lease.close()
+
+
+def test_two_workers_split_shards_and_insert_each_event_once(pg_clean, leases):
+    flags = _spike_flags()
+    expected = sd.select_all_events(flags, None, CooldownIndex(SNAPSHOT), CategoryIndex())
+    a, b = leases(), leases()
+    a._connect()
+    b._connect()
+    assert len(b.acquire(SNAPSHOT)) == 2  # 멤버 2명 -> 공정 몫 2
+
+    from_a = sd.insert_shard_events(flags, a, SNAPSHOT, CategoryIndex())
+    from_b = sd.insert_shard_events(flags, b, SNAPSHOT, CategoryIndex())
+
+    assert a.owned.isdisjoint(b.owned) and a.owned | b.owned == {0, 1, 2, 3}
+    assert from_a and from_b
+    assert len(from_a) + len(from_b) == len(expected)
+    keys = _inserted_keys(pg_clean)
+    assert set(keys) == {(ev["platform"], ev["category"]) for ev in expected}
+    assert set(keys.values()) == {1}
+    # 같은 스냅샷은 다시 처리하지 않음
+    assert sd.insert_shard_events(flags, a, SNAPSHOT, CategoryIndex()) == []
+
+
+def test_surviving_worker_takes_over_dead_workers_shards(pg_clean, leases):
+    flags = _spike_flags()
+    a, b = leases(), leases()
+    a._connect()
+    b._connect()
+    assert len(b.acquire(SNAPSHOT)) == 2
+    b.close()  # 처리 전에 죽음 -> 세션 락 해제
+
+    inserted = sd.insert_shard_events(flags, a, SNAPSHOT, CategoryIndex())
+
+    assert a.owned == {0, 1, 2, 3}
+    assert len(inserted) == len(KEYS)
+    assert set(_inserted_keys(pg_clean).values()) == {1}
+    done = dict(pg_clean.query("SELECT shard, snapshot FROM detector_shards")[1])
+    assert done == {s: SNAPSHOT for s in range(4)}
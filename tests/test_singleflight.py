@@ -0,0 +1,117 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.api.services import dashboard
+from src.api.services.singleflight import SingleFlight
+
+
+def _wait_for_calls(flight, name, n, timeout=5):
+    """leader 실행 중에 n개 호출이 모두 합류할 때까지 대기"""
+    deadline = time.monotonic() + timeout
+    while flight.metrics()["endpoints"][name]["calls"] < n:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def _run_concurrently(n, fn):
+    results, errors = [None] * n, [None] * n
+
+    def worker(i):
+        try:
+            results[i] = fn()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    runs = []
+
+    def fn():
+        runs.append(1)
+        _wait_for_calls(flight, "trend", 6)
+        return {"rows": [1, 2]}
+
+    results, errors = _run_concurrently(6, lambda: flight.do(("trend", "game"), fn))
+
+    assert runs == [1] and errors == [None] * 6
+    assert all(r is results[0] for r in results)
+    stats = flight.metrics()["endpoints"]["trend"]
+    assert (stats["calls"], stats["executions"], stats["coalesced"]) == (6, 1, 5)
+    assert stats["coalescing_ratio"] == pytest.approx(5 / 6, abs=1e-4)
+    assert flight.metrics()["inflight"] == 0
+    # 끝난 뒤의 호출은 다시 실행 (결과를 캐시하지 않음)
+    assert flight.do(("trend", "game"), lambda: "again") == "again"
+
+
+def test_followers_receive_the_leaders_exception():
+    flight = SingleFlight()
+
+    def fn():
+        _wait_for_calls(flight, "events", 3)
+        raise RuntimeError("pg down")
+
+    _, errors = _run_concurrently(3, lambda: flight.do(("events", None), fn))
+
+    assert [str(e) for e in errors] == ["pg down"] * 3
+    assert flight.metrics()["endpoints"]["events"]["executions"] == 1
+    assert flight.do(("events", None), lambda: "recovered") == "recovered"
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    gate = threading.Barrier(2, timeout=5)
+
+    def fn(value):
+        gate.wait()  # 두 키가 동시에 실행 중이어야 통과
+        return value
+
+    keys = iter(range(2))
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            i = next(keys)
+        return flight.do(("trend", i), lambda: fn(i))
+
+    results, errors = _run_concurrently(2, call)
+    assert sorted(results) == [0, 1] and errors == [None, None]
+    assert flight.metrics()["endpoints"]["trend"]["executions"] == 2
+
+
+def test_trend_requests_with_same_arguments_coalesce(duck_db, insert_snapshots, monkeypatch):
+    day = datetime(2026, 10, 1)
+    insert_snapshots([
+        (day + timedelta(minutes=5 * i), "SOOP", "id", "game", 100 + i, 1, "[]") for i in range(12)
+    ])
+    flight = SingleFlight()
+    monkeypatch.setattr(dashboard, "_flight", flight)
+    original = dashboard._trend_data
+    runs = []
+
+    def slow_trend(*args, **kwargs):
+        runs.append(args[:4])
+        if len(runs) == 1:
+            _wait_for_calls(flight, "trend", 4)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(dashboard, "_trend_data", slow_trend)
+    results, errors = _run_concurrently(
+        4, lambda: dashboard.get_trend_data("game", start="2026-10-01", end="2026-10-01")
+    )
+
+    assert errors == [None] * 4 and len(runs) == 1
+    assert all(r is results[0] for r in results)
+    # 다른 인자는 따로 실행
+    dashboard.get_trend_data("game", start="2026-10-01", end="2026-10-02")
+    assert len(runs) == 2
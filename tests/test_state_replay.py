@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+import duckdb
+
+from src.detector.signal_detector import RULES, fetch_baseline_rows
+from src.detector.state import BaselineState, _rows_match
+
+
+def test_stateful_baseline_matches_sql_on_replay(snapshot_db):
+    """스냅샷 시점을 순서대로 재생하며 인메모리 링 버퍼 결과가 SQL 경로와 같은지 (1시간 전 값 포함)"""
+    points = [r[0] for r in snapshot_db.execute(
+        "SELECT DISTINCT ts_utc FROM traffic_category_snapshot ORDER BY ts_utc DESC LIMIT 36"
+    ).fetchall()]
+    state = BaselineState()
+    mismatches = []
+    for ts in reversed(points):
+        source = f"(SELECT * FROM traffic_category_snapshot WHERE ts_utc <= TIMESTAMP '{ts}')"
+        state.refresh(snapshot_db, source=source)
+        expected = sorted(fetch_baseline_rows(snapshot_db, source=source), key=lambda r: (r[0], r[1]))
+        actual = sorted(state.current_rows(RULES["min_absolute_delta"]), key=lambda r: (r[0], r[1]))
+        assert expected, ts
+        if len(expected) != len(actual) or not all(_rows_match(e, a) for e, a in zip(expected, actual)):
+            mismatches.append(ts)
+    assert mismatches == []
+
+
+def test_stateful_baseline_sums_duplicate_category_rows():
+    """같은 스냅샷에 category_id만 다른 같은 이름 행 -> SQL 경로와 같이 합산 (덮어쓰기 X)"""
+    duck = duckdb.connect()
+    duck.execute("""
+        CREATE TABLE traffic_category_snapshot (
+            ts_utc TIMESTAMP, platform VARCHAR, category_id VARCHAR, category_name VARCHAR,
+            viewers INTEGER, open_lives INTEGER, top_streamers_detail VARCHAR
+        )
+    """)
+    start = datetime(2026, 10, 1, 12, 0)
+    for i in range(6):
+        ts = start + timedelta(minutes=5 * i)
+        duck.executemany(
+            "INSERT INTO traffic_category_snapshot VALUES (?, 'CHZZK', ?, 'game', ?, ?, ?)",
+            [(ts, "2", 2000 + i, 5, '[{"id": "b"}]'), (ts, "1", 7000 + i, 20, '[{"id": "a"}]')],
+        )
+    state = BaselineState()
+    state.refresh(duck)
+    expected = fetch_baseline_rows(duck)
+    actual = state.current_rows(RULES["min_absolute_delta"])
+    assert len(actual) == len(expected) == 1
+    assert _rows_match(expected[0], actual[0])
+    assert actual[0][2:4] == (9010, 25)
+    assert actual[0][10] == '[{"id": "a"}]'
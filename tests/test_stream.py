@@ -0,0 +1,26 @@
+from datetime import datetime, timedelta
+
+from src.api.services import stream
+
+# API 프로세스 시계와 9시간 어긋난 DB 시각 (예: DB는 UTC, 앱은 KST)
+DB_NOW = datetime(2026, 10, 1, 3, 0)
+
+
+def test_events_cursor_starts_from_db_clock(monkeypatch):
+    calls = []
+    rows = [{"event_id": 7, "changed_at": (DB_NOW + timedelta(seconds=30)).isoformat()}]
+    monkeypatch.setattr(stream.dashboard, "get_events_cursor", lambda: DB_NOW)
+    monkeypatch.setattr(
+        stream.dashboard, "get_changed_events",
+        lambda after, limit: calls.append(after) or [r for r in rows if r["changed_at"] > after.isoformat()],
+    )
+    hub = stream.StreamHub(backlog=10)
+    hub._refresh_events()
+    assert calls == [DB_NOW - timedelta(seconds=stream.STREAM_EVENT_LAG)]
+    assert hub._events_cursor == DB_NOW + timedelta(seconds=30)
+    assert hub._seq == 0  # 첫 확인은 기존 이벤트를 보내지 않는다
+
+    rows.append({"event_id": 8, "changed_at": (DB_NOW + timedelta(seconds=90)).isoformat()})
+    hub._refresh_events()
+    assert hub._seq == 1
+    assert b'"event_id":8' in hub._log[-1][1] and b'"event_id":7' not in hub._log[-1][1]
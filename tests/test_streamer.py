@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import duckdb
+import pytest
+
+from src.detector.cooldown import CooldownIndex
+from src.detector.signal_detector import RULES
+from src.detector.streamer import build_streamer_frame, fetch_streamer_rows, select_streamer_events
+from src.storage.duckdb_store import DuckDBStore
+
+T0 = datetime(2026, 10, 1, 12, 0)
+
+
+def _stream(sid, viewers):
+    return {"id": sid, "name": f"name-{sid}", "title": f"title-{sid}", "viewers": viewers}
+
+
+def _snapshot(ts, spike_viewers):
+    """s1: 평소 500 -> spike_viewers, s2: 500 유지 (다른 카테고리에 더 작게 한 번 더), s3: 저장 하한 미만"""
+    return [
+        {"ts_utc": ts, "platform": "CHZZK", "category_id": "a", "category_name": "game",
+         "viewers": 5000, "open_lives": 3, "top_streamers_detail": [],
+         "streams": [_stream("s1", spike_viewers), _stream("s2", 500), _stream("s3", 50)]},
+        {"ts_utc": ts, "platform": "CHZZK", "category_id": "b", "category_name": "talk",
+         "viewers": 1000, "open_lives": 2, "top_streamers_detail": [],
+         "streams": [_stream("s2", 200)]},
+    ]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_PATH", str(tmp_path / "analytics.db"))
+    return DuckDBStore()
+
+
+def _save(store, viewers_by_step, start=T0):
+    ts = start
+    for i, viewers in enumerate(viewers_by_step):
+        ts = start + timedelta(minutes=5 * i)
+        store.save_category_snapshot(_snapshot(ts, viewers))
+    return ts
+
+
+def _streamer_flags(store, last_ts):
+    con = duckdb.connect(store.db_path, read_only=True)
+    try:
+        rows = fetch_streamer_rows(con, [("CHZZK", last_ts)])
+    finally:
+        con.close()
+    return RULES.classify_streamers(build_streamer_frame(rows))
+
+
+def test_streamer_spike_against_session_baseline(store):
+    last = _save(store, [500] * 5 + [3000])
+    flags = _streamer_flags(store, last)
+    row = {sid: i for i, sid in enumerate(flags["streamer_id"])}
+
+    assert set(row) == {"s1", "s2"}
+    s1, s2 = row["s1"], row["s2"]
+    assert flags["viewers"][s1] == 3000 and flags["base_short"][s1] == pytest.approx(500)
+    assert flags["session_samples"][s1] == 6
+    # 여러 카테고리에 잡힌 스트리머는 시청자가 가장 많은 행
+    assert flags["viewers"][s2] == 500 and flags["category"][s2] == "game"
+    assert list(flags["streamer_spike"]) == [i == s1 for i in range(2)]
+
+    cooldowns = CooldownIndex(last)
+    events = select_streamer_events(flags, cooldowns, RULES, log=lambda *_: None)
+    assert len(events) == 1
+    ev = events[0]
+    assert (ev["event_type"], ev["streamer_id"], ev["category"]) == ("STREAMER_SPIKE", "s1", "game")
+    assert (ev["cur_view"], ev["actual_delta"], ev["growth_rate"]) == (3000, 2500, 6.0)
+    assert ev["cause_detail"]["stats"]["baseline_source"] == "streamer"
+    # 같은 스트리머는 쿨타임 동안 다시 나오지 않음
+    assert select_streamer_events(flags, cooldowns, RULES, log=lambda *_: None) == []
+
+
+def test_new_session_and_past_replay_have_no_streamer_spike(store):
+    last = _save(store, [500] * 5)
+    # 세션 간격보다 오래 끊긴 뒤 재시작 -> 단기 기준선 초기화
+    resumed = _save(store, [3000], start=last + timedelta(hours=2))
+    flags = _streamer_flags(store, resumed)
+    s1 = list(flags["streamer_id"]).index("s1")
+    assert flags["session_samples"][s1] == 1
+    assert not flags["streamer_spike"].any()
+
+    # 기준선은 최신 상태라 과거 시점 재생에는 평가 대상이 없다
+    assert len(_streamer_flags(store, last)["streamer_id"]) == 0
@@ -0,0 +1,76 @@
+import io
+import json
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.main import app
+from src.api.services import serialize
+
+DAY = datetime(2026, 10, 1)
+RANGE = {"start": "2026-10-01", "end": "2026-10-01"}
+CATEGORIES = ("game", "talk", "music")
+
+
+@pytest.fixture
+def client(duck_db, insert_snapshots):
+    rows = []
+    for i in range(48):
+        for k, category in enumerate(CATEGORIES):
+            for platform, offset in (("SOOP", 1), ("CHZZK", 0)):
+                viewers = 1000 * (k + 1) + 37 * i + len(platform)
+                detail = json.dumps([{"name": f"{category}-{i}", "viewers": viewers // 3}])
+                rows.append((DAY + timedelta(minutes=10 * i + offset), platform, "id", category, viewers, 1, detail))
+    insert_snapshots(rows)
+    return TestClient(app)
+
+
+def _slice(rows, category):
+    return [{k: v for k, v in r.items() if k != "category_name"} for r in rows if r["category_name"] == category]
+
+
+@pytest.mark.parametrize("sample", [{}, {"bucket": 60}, {"points": 24, "mode": "avg"}])
+def test_batch_slices_equal_single_category_trend(client, sample):
+    batch_sample = {k: v for k, v in sample.items() if k != "mode"}
+    batch = client.get(
+        "/api/trend/batch", params=dict(RANGE, category=["talk", "game", "talk"], detail="true", **batch_sample)
+    ).json()["data"]
+
+    assert {r["category_name"] for r in batch} == {"game", "talk"}
+    assert batch == sorted(batch, key=lambda r: (r["ts_utc"], r["platform"], r["category_name"]))
+    for category in ("game", "talk"):
+        single = client.get("/api/trend", params=dict(RANGE, category=category, **sample)).json()["data"]
+        assert _slice(batch, category) == single
+
+
+def test_batch_buckets_are_shared_and_detail_is_opt_in(client):
+    rows = client.get(
+        "/api/trend/batch", params=dict(RANGE, category=list(CATEGORIES), platform="SOOP", points=24)
+    ).json()["data"]
+
+    assert {r["platform"] for r in rows} == {"SOOP"}
+    stamps = {c: [r["ts_utc"] for r in rows if r["category_name"] == c] for c in CATEGORIES}
+    assert len(stamps["game"]) == 8 and stamps["game"] == stamps["talk"] == stamps["music"]
+    assert set(rows[0]) == {"ts_utc", "platform", "category_name", "viewers", "peak_viewers"}
+
+
+def test_batch_arrow_matches_json(client):
+    params = dict(RANGE, category=["game", "music"])
+    as_json = client.get("/api/trend/batch", params=params).json()["data"]
+    response = client.get("/api/trend/batch", params=params, headers={"Accept": serialize.ARROW_STREAM})
+    table = pa.ipc.open_stream(io.BytesIO(response.content)).read_all()
+
+    assert response.headers["content-type"] == serialize.ARROW_STREAM
+    assert table.column_names == ["ts_utc", "platform", "category_name", "viewers"]
+    assert [
+        dict(r, ts_utc=r["ts_utc"].isoformat()) for r in table.to_pylist()
+    ] == as_json
+
+
+def test_batch_limits(client):
+    too_many = [f"c{i}" for i in range(51)]
+    assert client.get("/api/trend/batch", params=dict(RANGE, category=too_many)).status_code == 400
+    assert client.get("/api/trend/batch", params=RANGE).status_code == 422
+    assert client.get("/api/trend/batch", params=dict(RANGE, category="nope")).json() == {"data": []}
@@ -1,3 +1,5 @@
+import type { LiveStreamMessage } from "./types";
+
 const API_BASE = import.meta.env.VITE_API_BASE_URL || "";
 
 async function fetchJson<T>(path: string): Promise<T> {
@@ -13,25 +15,83 @@ export function getLive() {
   return fetchJson<{ data: unknown[] }>("/api/live");
 }
 
-export function getEvents(opts?: { since?: string; limit?: number }) {
+// cursor: 이전 페이지의 next_cursor (null이면 마지막 페이지)
+export function getEvents(opts?: { since?: string; limit?: number; cursor?: string }) {
   const qs = new URLSearchParams();
   if (opts?.since) qs.set("since", opts.since);
   if (opts?.limit != null) qs.set("limit", String(opts.limit));
+  if (opts?.cursor) qs.set("cursor", opts.cursor);
   const suffix = qs.toString() ? `?${qs.toString()}` : "";
-  return fetchJson<{ data: unknown[] }>(`/api/events${suffix}`);
+  return fetchJson<{ data: unknown[]; next_cursor: string | null }>(`/api/events${suffix}`);
+}
+
+export type StreamHandlers = {
+  onLive?: (msg: LiveStreamMessage) => void;
+  onEvents?: (rows: unknown[]) => void;
+  // 재연결 후 이어받지 못해 전체 스냅샷부터 다시 받은 경우 (그 사이 이벤트는 다시 조회)
+  onResync?: () => void;
+};
+
+// /api/stream 구독. 끊기면 EventSource가 Last-Event-ID로 자동 재연결한다. 반환값으로 구독 해제.
+export function subscribeStream(handlers: StreamHandlers) {
+  const source = new EventSource(`${API_BASE}/api/stream`);
+  let synced = false;
+  source.addEventListener("live", (e) => {
+    const msg = JSON.parse((e as MessageEvent).data) as LiveStreamMessage;
+    if (msg.full && synced) handlers.onResync?.();
+    synced = true;
+    handlers.onLive?.(msg);
+  });
+  source.addEventListener("events", (e) => {
+    handlers.onEvents?.((JSON.parse((e as MessageEvent).data) as { data: unknown[] }).data);
+  });
+  return () => source.close();
 }
 
 export function getTrend(
   category: string,
   hours: number,
-  opts?: { start?: string; end?: string }
+  opts?: {
+    start?: string;
+    end?: string;
+    limit?: number;
+    cursor?: string;
+    // 서버 다운샘플: 플랫폼별 목표 점 수 / 버킷(분), mode lttb(모양 유지) | avg(시간 버킷, 카테고리 간 시각 정렬)
+    points?: number;
+    bucket?: number;
+    mode?: "lttb" | "avg";
+  }
 ) {
   const qs = new URLSearchParams({ category, hours: String(hours) });
   if (opts?.start && opts?.end) {
     qs.set("start", opts.start);
     qs.set("end", opts.end);
   }
-  return fetchJson<{ data: unknown[] }>(`/api/trend?${qs.toString()}`);
+  if (opts?.limit != null) qs.set("limit", String(opts.limit));
+  if (opts?.cursor) qs.set("cursor", opts.cursor);
+  if (opts?.points != null) qs.set("points", String(opts.points));
+  if (opts?.bucket != null) qs.set("bucket", String(opts.bucket));
+  if (opts?.mode) qs.set("mode", opts.mode);
+  return fetchJson<{ data: unknown[]; next_cursor?: string }>(`/api/trend?${qs.toString()}`);
+}
+
+// 여러 카테고리 트렌드를 한 번에 (한 번의 스캔, points/bucket이면 공통 시간 버킷). 행마다 category_name 포함
+export function getTrendBatch(
+  categories: string[],
+  hours: number,
+  opts?: { start?: string; end?: string; platforms?: string[]; points?: number; bucket?: number; detail?: boolean }
+) {
+  const qs = new URLSearchParams({ hours: String(hours) });
+  categories.forEach((category) => qs.append("category", category));
+  opts?.platforms?.forEach((platform) => qs.append("platform", platform));
+  if (opts?.start && opts?.end) {
+    qs.set("start", opts.start);
+    qs.set("end", opts.end);
+  }
+  if (opts?.points != null) qs.set("points", String(opts.points));
+  if (opts?.bucket != null) qs.set("bucket", String(opts.bucket));
+  if (opts?.detail) qs.set("detail", "true");
+  return fetchJson<{ data: unknown[] }>(`/api/trend/batch?${qs.toString()}`);
 }
 
 export function getDailyTop() {
@@ -11,11 +11,11 @@ import {
   XAxis,
   YAxis,
 } from "recharts";
-import { getEvents, getLive, getTrend } from "../api";
+import { getEvents, getLive, getTrend, subscribeStream } from "../api";
 import DataTable from "../components/DataTable";
 import Section from "../components/Section";
 import StatCard from "../components/StatCard";
-import { EventItem, LiveTraffic } from "../types";
+import { EventItem, LiveStreamMessage, LiveTraffic } from "../types";
 import { formatNumber, formatTime, formatTimeForChart, formatTimeShort } from "../utils";
 
 type TrendOption = { label: string; hours: number };
@@ -42,6 +42,36 @@ const normalizeTimestamp = (value: string) => {
   return date.toISOString();
 };
 
+const normalizeLive = (rows: LiveTraffic[]) =>
+  rows
+    .map((item) => ({
+      ...item,
+      platform: (item.platform || "").trim(),
+      viewers: Number(item.viewers) || 0,
+    }))
+    .sort((a, b) => b.viewers - a.viewers);
+
+const liveKey = (item: { platform: string; category_name: string }) =>
+  `${(item.platform || "").trim()}|${item.category_name}`;
+
+// 스트림 변경분 반영: 전체 스냅샷이면 교체, 아니면 바뀐/빠진 카테고리만 갱신
+const applyLiveMessage = (prev: LiveTraffic[], msg: LiveStreamMessage) => {
+  if (msg.full) return normalizeLive(msg.upserts);
+  const rows = new Map(prev.map((item) => [liveKey(item), item]));
+  msg.removed.forEach((item) => rows.delete(liveKey(item)));
+  msg.upserts.forEach((item) => rows.set(liveKey(item), item));
+  return normalizeLive(Array.from(rows.values()));
+};
+
+// 추가/갱신된 이벤트를 event_id 기준으로 합치고 최신순 유지
+const mergeEvents = (prev: EventItem[], rows: EventItem[]) => {
+  const byId = new Map(prev.map((item) => [item.event_id, item]));
+  rows.forEach((item) => byId.set(item.event_id, item));
+  return Array.from(byId.values())
+    .sort((a, b) => new Date(b.created_at).getTime() - new Date(a.created_at).getTime())
+    .slice(0, Math.max(prev.length, 20));
+};
+
 export default function Realtime() {
   const [live, setLive] = useState<LiveTraffic[]>([]);
   const [events, setEvents] = useState<EventItem[]>([]);
@@ -61,11 +91,7 @@ export default function Realtime() {
     Promise.all([getLive(), getEvents()])
       .then(([liveRes, eventRes]) => {
         if (!mounted) return;
-        const liveData = (liveRes.data as LiveTraffic[]).map((item) => ({
-          ...item,
-          platform: (item.platform || "").trim(),
-          viewers: Number(item.viewers) || 0,
-        }));
+        const liveData = normalizeLive(liveRes.data as LiveTraffic[]);
         setLive(liveData);
         setEvents(eventRes.data as EventItem[]);
         setErrorLive("");
@@ -89,6 +115,20 @@ export default function Realtime() {
     };
   }, []);
 
+  useEffect(
+    () =>
+      subscribeStream({
+        onLive: (msg) => setLive((prev) => applyLiveMessage(prev, msg)),
+        onEvents: (rows) => setEvents((prev) => mergeEvents(prev, rows as EventItem[])),
+        onResync: () => {
+          getEvents()
+            .then((res) => setEvents(res.data as EventItem[]))
+            .catch(() => undefined);
+        },
+      }),
+    []
+  );
+
   useEffect(() => {
     if (!selectedCategory) return;
     let mounted = true;
@@ -8,7 +8,7 @@ import {
   YAxis,
   Legend,
 } from "recharts";
-import { getLive, getTrend } from "../api";
+import { getLive, getTrendBatch } from "../api";
 import { LiveTraffic, TrendPoint } from "../types";
 import { formatNumber, formatTime, formatTimeShort } from "../utils";
 
@@ -18,6 +18,8 @@ const PRESETS = [
   { label: "30D", hours: 720 },
 ] as const;
 
+const CHART_POINTS = 300;
+
 const LINE_COLORS = ["var(--primary)", "#ff7a59", "#2bb0a3"];
 
 type TrendItem = {
@@ -82,18 +84,17 @@ export default function Trends() {
       return;
     }
     let mounted = true;
+    // 선택 카테고리를 한 번에 조회하고, 차트 폭에 맞춰 서버에서 공통 시간 버킷으로 줄임
+    const sampling = { points: CHART_POINTS };
     const trendOpts =
-      rangeStart && rangeEnd ? { start: rangeStart, end: rangeEnd } : undefined;
-    Promise.all(
-      targets.map((cat) =>
-        trendOpts ? getTrend(cat, hours, trendOpts) : getTrend(cat, hours)
-      )
-    )
-      .then((results) => {
+      rangeStart && rangeEnd ? { start: rangeStart, end: rangeEnd, ...sampling } : sampling;
+    getTrendBatch(targets, hours, trendOpts)
+      .then((res) => {
         if (!mounted) return;
-        const merged = targets.map((cat, idx) => ({
+        const rows = (res.data as Array<TrendPoint & { category_name: string }>) || [];
+        const merged = targets.map((cat) => ({
           category: cat,
-          points: (results[idx].data as TrendPoint[]) || [],
+          points: rows.filter((row) => row.category_name === cat),
         }));
         setTrends(merged);
       })
@@ -6,6 +6,14 @@ export type LiveTraffic = {
   ts_utc: string;
 };
 
+export type LiveStreamMessage = {
+  version: string;
+  full: boolean;
+  snapshots?: Record<string, string>;
+  upserts: LiveTraffic[];
+  removed: Array<{ platform: string; category_name: string }>;
+};
+
 export type TrendPoint = {
   ts_utc: string;
   platform: string;